@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the per-request access-log path of the API middleware (server/access_log.py).
+
+Replays the logging tail of `request_id_and_logging` (sampling decision + field dict + emit)
+for N synthetic requests under several configurations and reports the added cost per request:
+
+  off           logging disabled (baseline)
+  sync          stdlib handler chain on the caller's thread (JSON formatted + written inline)
+  async         QueueHandler -> QueueListener background writer, every request logged
+  async-sampled background writer, successful fast requests sampled at --sample-rate
+
+Output goes to /dev/null so disk/terminal speed does not dominate.
+
+Usage:
+  python scripts/bench_access_log.py
+  python scripts/bench_access_log.py --requests 200000 --sample-rate 0.01 --error-ratio 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from server.access_log import AccessLog, JsonLineFormatter  # noqa: E402
+
+
+def _make(mode: str, sink, *, sample_rate: float, slow_ms: float) -> AccessLog:
+    logger = logging.getLogger(f"bench.access.{mode}")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    if mode == "off":
+        return AccessLog(logger, enabled=False, sample_rate=1.0, slow_ms=slow_ms)
+    if mode == "sync":
+        h = logging.StreamHandler(sink)
+        h.setFormatter(JsonLineFormatter())
+        logger.addHandler(h)
+        return AccessLog(logger, enabled=True, sample_rate=1.0, slow_ms=slow_ms)
+    rate = 1.0 if mode == "async" else sample_rate
+    log = AccessLog(logger, enabled=True, sample_rate=rate, slow_ms=slow_ms)
+    log.start_async(stream=sink)
+    return log
+
+
+def _run(log: AccessLog, n: int, *, error_ratio: float, seed: int) -> tuple[float, int]:
+    rng = random.Random(seed)
+    statuses = [500 if rng.random() < error_ratio else 200 for _ in range(n)]
+    rids = [str(uuid.uuid4()) for _ in range(n)]
+    emitted = 0
+    t0 = time.perf_counter()
+    for i in range(n):
+        start = time.perf_counter()
+        status_code = statuses[i]
+        duration_ms = (time.perf_counter() - start) * 1000.0
+        if log.should_log(status_code, duration_ms):
+            log.log(
+                "request",
+                {
+                    "request_id": rids[i],
+                    "method": "GET",
+                    "path": "/api/v1/jobs",
+                    "status_code": status_code,
+                    "ip": "10.0.0.1",
+                    "duration_ms": round(duration_ms, 2),
+                },
+                status_code=status_code,
+            )
+            emitted += 1
+    elapsed = time.perf_counter() - t0
+    return elapsed, emitted
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Access-log middleware overhead benchmark")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--error-ratio", type=float, default=0.005, help="Fraction of synthetic 5xx responses")
+    parser.add_argument("--modes", default="off,sync,async,async-sampled")
+    args = parser.parse_args(argv)
+
+    n = max(1, int(args.requests))
+    modes = [m.strip() for m in str(args.modes).split(",") if m.strip()]
+    baseline_us: float | None = None
+
+    with open(os.devnull, "w", encoding="utf-8") as sink:
+        for mode in modes:
+            log = _make(mode, sink, sample_rate=args.sample_rate, slow_ms=args.slow_ms)
+            elapsed, emitted = _run(log, n, error_ratio=args.error_ratio, seed=7)
+            t_flush = time.perf_counter()
+            log.stop()
+            drain_s = time.perf_counter() - t_flush
+
+            us = elapsed / n * 1e6
+            if baseline_us is None and mode == "off":
+                baseline_us = us
+            overhead = f" overhead_us={us - baseline_us:.2f}" if baseline_us is not None else ""
+            print(
+                f"mode={mode:<14} requests={n} emitted={emitted} us_per_request={us:.2f}{overhead}"
+                f" background_drain_s={drain_s:.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark AGR balance reads for an address with a long ledger (default: 1,000,000 entries), and check
+that concurrent debits cannot overspend.
+
+Compares:
+  - legacy:   load every agr_ledger row for the address and sum in Python (the old agr_balance)
+  - replay:   SUM(delta) in SQL (what verify_agr_balances does per address)
+  - balances: PostgresStore.agr_balance (one primary-key read of agr_balances)
+
+Then funds a fresh address for exactly --debit-ok debits and fires --debits concurrent agr_debit calls;
+exactly --debit-ok must succeed and the final balance must be 0.
+
+Requires DATABASE_URL (migrated to head). Writes synthetic rows; they are removed at the end unless --keep.
+
+Usage:
+  DATABASE_URL=postgresql+psycopg://... python scripts/bench_agr_balance.py
+  python scripts/bench_agr_balance.py --entries 1000000 --reads 200 --debits 64 --debit-ok 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from sqlalchemy import delete, func, select, text  # noqa: E402
+
+from server.config import settings  # noqa: E402
+from server.db.models import AgrBalanceDB, AgrLedgerDB  # noqa: E402
+from server.storage import PostgresStore  # noqa: E402
+
+
+def _timed(fn, n: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(max(1, n)):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="AGR balance benchmark (Postgres)")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--reads", type=int, default=200, help="Samples for the fast paths")
+    parser.add_argument("--legacy-reads", type=int, default=3, help="Samples for the legacy full-ledger path")
+    parser.add_argument("--debits", type=int, default=64)
+    parser.add_argument("--debit-ok", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic ledger rows")
+    args = parser.parse_args(argv)
+
+    if not settings.DATABASE_URL:
+        print("DATABASE_URL is not set (this benchmark needs Postgres)", file=sys.stderr)
+        return 2
+
+    store = PostgresStore()
+    addr = "0x" + uuid.uuid4().hex + "00000000"
+    n = int(args.entries)
+
+    # Seed: alternating +3/-1 entries generated server-side, then materialize the balance by replay.
+    t0 = time.perf_counter()
+    with store._session() as db:
+        db.execute(
+            text(
+                """
+                INSERT INTO agr_ledger (id, address, delta, reason, job_id, created_at)
+                SELECT md5(random()::text || g::text), :addr,
+                       CASE WHEN g % 2 = 0 THEN 3 ELSE -1 END,
+                       CASE WHEN g % 2 = 0 THEN 'bench_credit' ELSE 'bench_debit' END,
+                       NULL, now() - (g || ' seconds')::interval
+                FROM generate_series(1, :n) AS g
+                """
+            ),
+            {"addr": addr, "n": n},
+        )
+        db.commit()
+    store.verify_agr_balances(address=addr, repair=True)
+    print(f"seeded entries={n:,} address={addr} in {time.perf_counter() - t0:.1f}s")
+
+    def legacy() -> int:
+        with store._session() as db:
+            rows = list(db.execute(select(AgrLedgerDB).where(AgrLedgerDB.address == addr)).scalars().all())
+        return sum(int(r.delta) for r in rows)
+
+    def replay() -> int:
+        with store._session() as db:
+            return int(db.execute(select(func.coalesce(func.sum(AgrLedgerDB.delta), 0)).where(AgrLedgerDB.address == addr)).scalar_one())
+
+    def materialized() -> int:
+        return int(store.agr_balance(addr)["balance"])
+
+    expected = materialized()
+    ok = legacy() == replay() == expected
+    for name, fn, reps in (("legacy", legacy, args.legacy_reads), ("replay", replay, args.reads), ("balances", materialized, args.reads)):
+        p50, p99 = _timed(fn, int(reps))
+        print(f"{name:>9}: p50={p50:10.3f}ms p99={p99:10.3f}ms")
+    print(f"balance={expected:,} consistent={ok}")
+
+    # Concurrent debits against a balance that covers exactly --debit-ok of them.
+    spender = "0x" + uuid.uuid4().hex + "11111111"
+    amount = 7
+    store.agr_credit(address=spender, amount=amount * int(args.debit_ok), reason="bench_credit")
+
+    def debit(_: int) -> bool:
+        try:
+            store.agr_debit(address=spender, amount=amount, reason="bench_debit")
+            return True
+        except ValueError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=min(64, int(args.debits))) as pool:
+        succeeded = sum(1 for r in pool.map(debit, range(int(args.debits))) if r)
+    final = store.agr_balance(spender)
+    check = store.verify_agr_balances(address=spender)
+    overspend_ok = succeeded == int(args.debit_ok) and int(final["balance"]) == 0 and not check["mismatches"]
+    print(f"concurrent_debits={args.debits} succeeded={succeeded} expected={args.debit_ok} final_balance={final['balance']} ok={overspend_ok}")
+
+    if not args.keep:
+        with store._session() as db:
+            for a in (addr, spender):
+                db.execute(delete(AgrLedgerDB).where(AgrLedgerDB.address == a))
+                db.execute(delete(AgrBalanceDB).where(AgrBalanceDB.address == a))
+            db.commit()
+    return 0 if (ok and overspend_ok) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
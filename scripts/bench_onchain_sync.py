@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Benchmark onchain sync catch-up (default: 1,000,000 blocks) against an in-process stub JSON-RPC node.
+
+The stub serves synthetic StakeVault (Deposited/Withdrawn/Slashed) and TreasuryVault (DonationReceived)
+logs, adds --latency-ms to every request (requests are served concurrently, like a real provider), and
+enforces provider limits: ranges wider than --provider-max-range blocks or with more than
+--provider-max-results logs are rejected with -32005.
+
+Two modes over the same chain:
+  legacy  the previous loop: per MAX_BLOCKS_PER_BATCH window, one eth_getLogs per event and contract,
+          sequentially (and one poll sleep per window, reported but not slept)
+  engine  server.onchain_sync.sync_once: one eth_getLogs per range for all contracts/topics, ranges fetched
+          concurrently with adaptive sizing, committed in block order into InMemoryStore
+
+Needs web3 (ABI decoding). stakeOf reads are served by the same stub and counted.
+
+Usage:
+  python scripts/bench_onchain_sync.py
+  python scripts/bench_onchain_sync.py --blocks 1000000 --latency-ms 40 --workers 8 --max-span 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from eth_utils import keccak  # noqa: E402
+
+from server import onchain_sync  # noqa: E402
+from server.config import settings  # noqa: E402
+from server.storage import InMemoryStore  # noqa: E402
+
+_STAKE = "0x" + "5a" * 20
+_TREASURY = "0x" + "7e" * 20
+_CHAIN_ID = 8453
+
+
+def _topic(sig: str) -> str:
+    return "0x" + keccak(text=sig).hex()
+
+
+T_DEPOSITED = _topic("Deposited(address,address,uint256)")
+T_WITHDRAWN = _topic("Withdrawn(address,uint256)")
+T_SLASHED = _topic("Slashed(address,address,uint256,uint256)")
+T_DONATION = _topic("DonationReceived(address,address,uint256,uint32,bytes32)")
+
+
+def _word(v: int) -> str:
+    return int(v).to_bytes(32, "big").hex()
+
+
+def _addr_topic(i: int) -> str:
+    return "0x" + _word(i)
+
+
+class StubChain:
+    def __init__(self, *, head: int, every: int, agents: int, latency: float, max_range: int, max_results: int) -> None:
+        self.head = int(head)
+        self.every = max(1, int(every))
+        self.agents = max(1, int(agents))
+        self.latency = float(latency)
+        self.max_range = int(max_range)
+        self.max_results = int(max_results)
+        self.lock = threading.Lock()
+        self.calls: dict[str, int] = {}
+        self.rejected = 0
+
+    def _agent(self, n: int) -> int:
+        return 0x1000 + (n * 7919) % self.agents
+
+    def event_at(self, b: int) -> dict[str, Any] | None:
+        if b % self.every:
+            return None
+        n = b // self.every
+        kind = n % 10
+        common = {
+            "blockNumber": hex(b),
+            "blockHash": "0x" + _word(b),
+            "transactionHash": "0x" + _word(b * 31 + 7),
+            "transactionIndex": "0x0",
+            "logIndex": "0x0",
+            "removed": False,
+        }
+        agent = self._agent(n)
+        if kind <= 5:
+            return {**common, "address": _STAKE, "topics": [T_DEPOSITED, _addr_topic(0xFEE), _addr_topic(agent)], "data": "0x" + _word(25_000_000)}
+        if kind <= 7:
+            return {**common, "address": _STAKE, "topics": [T_WITHDRAWN, _addr_topic(agent)], "data": "0x" + _word(5_000_000)}
+        if kind == 8:
+            return {
+                **common,
+                "address": _STAKE,
+                "topics": [T_SLASHED, _addr_topic(agent), _addr_topic(0xBEEF)],
+                "data": "0x" + _word(1_000_000) + _word(1_000_000),
+            }
+        return {
+            **common,
+            "address": _TREASURY,
+            "topics": [T_DONATION, _addr_topic(agent), _addr_topic(0), "0x" + _word(1)],
+            "data": "0x" + _word(10**16) + _word(0),
+        }
+
+    def expected(self) -> dict[str, int]:
+        out = {"slashes": 0, "donations": 0}
+        for b in range(0, self.head + 1, self.every):
+            kind = (b // self.every) % 10
+            out["slashes"] += kind == 8
+            out["donations"] += kind == 9
+        return out
+
+    def get_logs(self, flt: dict[str, Any]) -> list[dict[str, Any]]:
+        lo, hi = int(flt["fromBlock"], 16), int(flt["toBlock"], 16)
+        if hi - lo + 1 > self.max_range:
+            raise _RpcError(-32005, f"block range too large (max {self.max_range})")
+        addrs = flt.get("address")
+        addrs = {a.lower() for a in (addrs if isinstance(addrs, list) else [addrs])}
+        t0 = (flt.get("topics") or [None])[0]
+        t0 = None if t0 is None else {t.lower() for t in (t0 if isinstance(t0, list) else [t0])}
+        out = []
+        for b in range(-(-lo // self.every) * self.every, hi + 1, self.every):
+            ev = self.event_at(b)
+            if ev and ev["address"] in addrs and (t0 is None or ev["topics"][0] in t0):
+                out.append(ev)
+                if len(out) > self.max_results:
+                    raise _RpcError(-32005, f"query returned more than {self.max_results} results")
+        return out
+
+    def handle(self, method: str, params: list[Any]) -> Any:
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "eth_chainId":
+            return hex(_CHAIN_ID)
+        if method == "eth_blockNumber":
+            return hex(self.head)
+        if method == "eth_getLogs":
+            return self.get_logs(params[0])
+        if method == "eth_getBlockByNumber":
+            n = int(params[0], 16)
+            if n > self.head:
+                return None
+            return {"number": hex(n), "hash": "0x" + _word(n), "parentHash": "0x" + _word(max(0, n - 1))}
+        if method == "eth_call":
+            agent = int(str(params[0]["data"])[-40:], 16)
+            return "0x" + _word(agent % 100 * 1_000_000)
+        raise _RpcError(-32601, f"method not found: {method}")
+
+
+class _RpcError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+def _serve(chain: StubChain) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def _one(self, req: dict[str, Any]) -> dict[str, Any]:
+            try:
+                return {"jsonrpc": "2.0", "id": req.get("id"), "result": chain.handle(req["method"], req.get("params") or [])}
+            except _RpcError as e:
+                with chain.lock:
+                    chain.rejected += 1
+                return {"jsonrpc": "2.0", "id": req.get("id"), "error": {"code": e.code, "message": str(e)}}
+
+        def do_POST(self) -> None:  # noqa: N802
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            if chain.latency:
+                time.sleep(chain.latency)
+            out: Any = [self._one(r) for r in body] if isinstance(body, list) else self._one(body)
+            data = json.dumps(out).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _post(url: str, method: str, params: list[Any]) -> Any:
+    req = urllib.request.Request(
+        url,
+        data=json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return json.loads(resp.read().decode("utf-8")).get("result")
+
+
+def _legacy(url: str, *, blocks: int, batch: int) -> dict[str, Any]:
+    """getLogs request pattern of the previous sync loop (stakeOf reads not included)."""
+    windows = 0
+    t0 = time.perf_counter()
+    lo = 0
+    while lo <= blocks:
+        hi = min(blocks, lo + batch - 1)
+        for addr, topic in ((_STAKE, T_DEPOSITED), (_STAKE, T_WITHDRAWN), (_STAKE, T_SLASHED), (_TREASURY, T_DONATION)):
+            _post(url, "eth_getLogs", [{"address": addr, "fromBlock": hex(lo), "toBlock": hex(hi), "topics": [topic]}])
+        windows += 1
+        lo = hi + 1
+    return {"seconds": time.perf_counter() - t0, "windows": windows}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark onchain sync catch-up against a stub RPC")
+    parser.add_argument("--blocks", type=int, default=1_000_000)
+    parser.add_argument("--event-every", type=int, default=100, help="one log every N blocks")
+    parser.add_argument("--agents", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=25.0)
+    parser.add_argument("--provider-max-range", type=int, default=5000)
+    parser.add_argument("--provider-max-results", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=2000, help="legacy MAX_BLOCKS_PER_BATCH")
+    parser.add_argument("--max-span", type=int, default=10_000, help="engine MAX_BLOCKS_PER_BATCH")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args(argv)
+
+    chain = StubChain(
+        head=args.blocks,
+        every=args.event_every,
+        agents=args.agents,
+        latency=args.latency_ms / 1000.0,
+        max_range=args.provider_max_range,
+        max_results=args.provider_max_results,
+    )
+    server = _serve(chain)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    poll = int(getattr(settings, "ONCHAIN_SYNC_POLL_SECONDS", 5))
+
+    if not args.skip_legacy:
+        res = _legacy(url, blocks=args.blocks, batch=min(args.batch, args.provider_max_range))
+        calls = chain.calls.get("eth_getLogs", 0)
+        print(
+            f"legacy: {res['seconds']:.1f}s getLogs={calls} windows={res['windows']} "
+            f"(+{res['windows'] * poll}s of poll sleeps in the real loop)"
+        )
+        chain.calls.clear()
+
+    settings.RPC_URL = url
+    settings.ONCHAIN_SYNC_ENABLED = True
+    settings.ONCHAIN_STAKE_ENABLED = True
+    settings.STAKE_CONTRACT_ADDRESS = _STAKE
+    settings.TREASURY_CONTRACT_ADDRESS = _TREASURY
+    settings.ONCHAIN_SYNC_CONFIRMATIONS = 0
+    settings.ONCHAIN_SYNC_LOOKBACK_BLOCKS = args.blocks
+    settings.ONCHAIN_SYNC_MAX_BLOCKS_PER_PASS = args.blocks + 1
+    settings.ONCHAIN_SYNC_MAX_BLOCKS_PER_BATCH = args.max_span
+    settings.ONCHAIN_SYNC_FETCH_WORKERS = args.workers
+
+    store = InMemoryStore()
+    t0 = time.perf_counter()
+    out = onchain_sync.sync_once(store)
+    elapsed = time.perf_counter() - t0
+    server.shutdown()
+
+    exp = chain.expected()
+    print(
+        f"engine: {elapsed:.1f}s getLogs={chain.calls.get('eth_getLogs', 0)} rejected={chain.rejected} "
+        f"ranges={out.get('ranges')} final_span={out.get('getlogs_span')} stakeOf={chain.calls.get('eth_call', 0)}"
+    )
+    print(f"stake={out['stake']}")
+    print(f"treasury={out['treasury']}")
+    ok = (
+        out["stake"].get("next_from_block") == args.blocks + 1
+        and out["treasury"].get("next_from_block") == args.blocks + 1
+        and out["stake"]["slashes_recorded"] == exp["slashes"]
+        and out["treasury"]["donations_seen"] == exp["donations"]
+    )
+    print("ok" if ok else f"MISMATCH expected={exp}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Stress benchmark for the in-process rate limiter (server/ratelimit.py).
+
+Simulates N distinct client IPs (default: 1,000,000) hitting the limiter from several threads
+and reports throughput, tracked keys, evictions/sweeps and peak RSS.
+
+Usage:
+  python scripts/bench_rate_limiter.py
+  python scripts/bench_rate_limiter.py --clients 1000000 --threads 8 --shards 16 --max-keys 200000
+
+Note:
+  - Timestamps are simulated (spread over --duration-seconds) so sweeping is exercised without sleeping.
+  - CPython threads share the GIL; the point is lock contention + memory bounds, not parallel speedup.
+"""
+
+from __future__ import annotations
+
+import argparse
+import resource
+import sys
+import time
+from pathlib import Path
+from threading import Thread
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from server.ratelimit import ShardedRateLimiter  # noqa: E402
+
+
+def _ip(i: int) -> str:
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}:{i >> 24}"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Rate limiter stress benchmark")
+    parser.add_argument("--clients", type=int, default=1_000_000)
+    parser.add_argument("--hits-per-client", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--max-keys", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=300)
+    parser.add_argument("--window-seconds", type=float, default=60.0)
+    parser.add_argument("--duration-seconds", type=float, default=600.0, help="Simulated wall-clock span")
+    args = parser.parse_args(argv)
+
+    limiter = ShardedRateLimiter(shards=args.shards, max_keys=args.max_keys)
+    clients = int(args.clients)
+    threads = max(1, int(args.threads))
+    t0 = 1_700_000_000.0
+    step = float(args.duration_seconds) / max(1, clients)
+    rejected = [0] * threads
+
+    def worker(idx: int) -> None:
+        hit = limiter.hit
+        lim = int(args.limit)
+        win = float(args.window_seconds)
+        n = 0
+        for i in range(idx, clients, threads):
+            key = _ip(i)
+            now = t0 + i * step
+            for _ in range(int(args.hits_per_client)):
+                if hit(key, limit=lim, window_seconds=win, now=now) is not None:
+                    n += 1
+        rejected[idx] = n
+
+    start = time.perf_counter()
+    pool = [Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    total_hits = clients * int(args.hits_per_client)
+    st = limiter.stats()
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print(f"clients={clients} hits={total_hits} threads={threads} shards={st['shards']} max_keys={args.max_keys}")
+    print(f"elapsed_s={elapsed:.2f} hits_per_s={total_hits / elapsed:,.0f} us_per_hit={elapsed / total_hits * 1e6:.2f}")
+    print(f"tracked_keys={st['keys']} evicted={st['evicted']} swept={st['swept']} rejected={sum(rejected)}")
+    print(f"peak_rss_mb={rss_mb:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
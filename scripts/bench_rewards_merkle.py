@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the epoch Merkle builder and proof lookups (default: 1,000,000 addresses). No database needed:
+claims come from a synthetic, address-ordered generator, exactly as iter_epoch_rewards would stream them.
+
+Reports build time, peak RSS (should stay flat as --addresses grows), proof file size, and lookup latency
+through ProofFile (binary search + one read per tree level). Every sampled proof is verified against the root.
+
+keccak256 needs eth_utils (installed with web3). --hash sha3-256 only exercises the plumbing; its roots are
+not claim-compatible.
+
+Usage:
+  python scripts/bench_rewards_merkle.py
+  python scripts/bench_rewards_merkle.py --addresses 1000000 --lookups 5000 --out-dir /tmp/agora-rewards
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from server.merkle import verify_proof  # noqa: E402
+from server.rewards import ProofFile, build_proof_file, keccak256  # noqa: E402
+
+
+def _address(i: int, step: int) -> str:
+    return "0x" + (i * step + 1).to_bytes(20, "big").hex()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Rewards Merkle builder benchmark")
+    parser.add_argument("--addresses", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--hash", choices=("keccak", "sha3-256"), default="keccak")
+    parser.add_argument("--out-dir", default=None, help="Defaults to a temporary directory")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    hash_fn = keccak256 if args.hash == "keccak" else (lambda b: hashlib.sha3_256(b).digest())
+    n = max(1, int(args.addresses))
+    step = (1 << 160) // (n + 1)
+    rng = random.Random(int(args.seed))
+
+    def claims():
+        for i in range(n):
+            yield _address(i, step), 1 + (i * 2654435761) % 500, 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(args.out_dir or tmp) / "bench.proofs"
+        rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        t0 = time.perf_counter()
+        header = build_proof_file(claims(), out, meta={"epoch_id": "bench"}, hash_fn=hash_fn)
+        build_s = time.perf_counter() - t0
+        rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(
+            f"built addresses={n:,} in {build_s:.1f}s ({n / build_s:,.0f}/s) root={header['merkle_root']} "
+            f"depth={len(header['levels']) - 1} file={out.stat().st_size / 1e6:.1f}MB "
+            f"peak_rss_growth={(rss1 - rss0) / 1024:.1f}MB"
+        )
+
+        pf = ProofFile(out)
+        samples: list[float] = []
+        ok = True
+        try:
+            for _ in range(max(1, int(args.lookups))):
+                i = rng.randrange(n)
+                t1 = time.perf_counter()
+                res = pf.lookup(_address(i, step))
+                samples.append((time.perf_counter() - t1) * 1000.0)
+                if res is None or res["index"] != i:
+                    ok = False
+                    continue
+                leaf = bytes.fromhex(res["leaf"][2:])
+                proof = [bytes.fromhex(p[2:]) for p in res["proof"]]
+                ok = ok and verify_proof(leaf, proof, pf.root, hash_fn=hash_fn)
+            ok = ok and pf.lookup("0x" + "00" * 20) is None
+        finally:
+            pf.close()
+        samples.sort()
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"lookups={len(samples)} p50={statistics.median(samples):.3f}ms p99={p99:.3f}ms proofs_valid={ok}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark stake refreshes for many touched agents (default: 5,000) against an in-process stub JSON-RPC node
+that adds --latency-ms to every HTTP request.
+
+Compares:
+  - legacy:    one stakeOf eth_call per agent + one set_stake per agent (the old sync loop)
+  - batch:     stake_of_many via JSON-RPC batches of eth_call + one set_stakes
+  - multicall: stake_of_many via Multicall3 aggregate3 (one eth_call per --chunk agents) + one set_stakes
+
+All reads are pinned to one block; every mode must produce the same stakes. Writes go to InMemoryStore, or
+to Postgres with --postgres (DATABASE_URL, migrated to head; synthetic stake rows are left in place).
+
+Needs web3 (eth_abi for the Multicall3 stub).
+
+Usage:
+  python scripts/bench_stake_reads.py
+  python scripts/bench_stake_reads.py --agents 5000 --latency-ms 20 --chunk 500 --postgres
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from eth_abi import decode as abi_decode  # noqa: E402
+from eth_abi import encode as abi_encode  # noqa: E402
+from web3 import Web3  # noqa: E402
+
+from server.config import settings  # noqa: E402
+from server.onchain import MULTICALL3_ADDRESS, STAKE_VAULT_ABI, http_provider, stake_of_many  # noqa: E402
+from server.storage import InMemoryStore, PostgresStore  # noqa: E402
+
+_STAKE = "0x" + "5a" * 20
+_BLOCK = 1_234_567
+_STAKE_OF = bytes(Web3.keccak(text="stakeOf(address)"))[:4]
+_AGGREGATE3 = bytes(Web3.keccak(text="aggregate3((address,bool,bytes)[])"))[:4]
+
+
+def _stake_raw(agent_hex: str) -> int:
+    return (int(agent_hex, 16) % 1000) * 1_000_000
+
+
+class StubNode:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.http_requests = 0
+        self.calls = 0
+        self.blocks: set[str] = set()
+
+    def _stake_of(self, data: bytes) -> bytes:
+        assert data[:4] == _STAKE_OF
+        return _stake_raw(data[-20:].hex()).to_bytes(32, "big")
+
+    def handle(self, method: str, params: list[Any]) -> Any:
+        with self.lock:
+            self.calls += 1
+        if method == "eth_chainId":
+            return hex(8453)
+        if method != "eth_call":
+            raise ValueError(f"method not found: {method}")
+        tx, block = params[0], params[1] if len(params) > 1 else "latest"
+        with self.lock:
+            self.blocks.add(str(block))
+        to = str(tx["to"]).lower()
+        data = bytes.fromhex(str(tx.get("data") or tx.get("input"))[2:])
+        if to == _STAKE:
+            return "0x" + self._stake_of(data).hex()
+        if to == MULTICALL3_ADDRESS.lower() and data[:4] == _AGGREGATE3:
+            (calls,) = abi_decode(["(address,bool,bytes)[]"], data[4:])
+            results = [(True, self._stake_of(cd)) for _, _, cd in calls]
+            return "0x" + abi_encode(["(bool,bytes)[]"], [results]).hex()
+        raise ValueError("execution reverted")
+
+    def dispatch(self, req: dict[str, Any]) -> dict[str, Any]:
+        try:
+            return {"jsonrpc": "2.0", "id": req.get("id"), "result": self.handle(req["method"], req.get("params") or [])}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": req.get("id"), "error": {"code": -32000, "message": str(e)}}
+
+
+def _serve(node: StubNode) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:  # noqa: N802
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            with node.lock:
+                node.http_requests += 1
+            if node.latency:
+                time.sleep(node.latency)
+            out: Any = [node.dispatch(r) for r in body] if isinstance(body, list) else node.dispatch(body)
+            data = json.dumps(out).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _rows(raws: dict[str, int]) -> list[dict[str, Any]]:
+    return [
+        {"address": a, "amount": raw / 1_000_000, "stake_chain_id": 8453, "stake_contract_address": _STAKE, "stake_block_number": _BLOCK}
+        for a, raw in raws.items()
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark batched stakeOf reads + stake writes")
+    parser.add_argument("--agents", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--postgres", action="store_true", help="Write to PostgresStore (DATABASE_URL) instead of memory")
+    args = parser.parse_args(argv)
+
+    if args.postgres and not settings.DATABASE_URL:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+
+    node = StubNode(args.latency_ms / 1000.0)
+    server = _serve(node)
+    w3 = Web3(http_provider(f"http://127.0.0.1:{server.server_address[1]}"))
+    agents = ["0x" + (0xA000_0000 + i).to_bytes(20, "big").hex() for i in range(args.agents)]
+    expected = {a: _stake_raw(a[2:]) for a in agents}
+
+    def store() -> Any:
+        return PostgresStore() if args.postgres else InMemoryStore()
+
+    results: dict[str, dict[str, int]] = {}
+
+    # legacy
+    s = store()
+    c = w3.eth.contract(address=Web3.to_checksum_address(_STAKE), abi=STAKE_VAULT_ABI)
+    node.http_requests = 0
+    t0 = time.perf_counter()
+    raws: dict[str, int] = {}
+    for a in agents:
+        raws[a] = int(c.functions.stakeOf(Web3.to_checksum_address(a)).call(block_identifier=_BLOCK))
+    t_read = time.perf_counter() - t0
+    for r in _rows(raws):
+        s.set_stake(r["address"], r["amount"], stake_chain_id=8453, stake_contract_address=_STAKE, stake_block_number=_BLOCK)
+    t_total = time.perf_counter() - t0
+    results["legacy"] = raws
+    print(f"legacy:    reads {t_read:7.2f}s  writes {t_total - t_read:6.2f}s  http_requests={node.http_requests}")
+
+    for mode, multicall in (("batch", ""), ("multicall", MULTICALL3_ADDRESS)):
+        s = store()
+        node.http_requests = 0
+        t0 = time.perf_counter()
+        raws = stake_of_many(w3, stake_contract=_STAKE, agents=agents, block_identifier=_BLOCK, chunk_size=args.chunk, multicall_address=multicall)
+        t_read = time.perf_counter() - t0
+        s.set_stakes(rows=_rows(raws))
+        t_total = time.perf_counter() - t0
+        results[mode] = raws
+        print(f"{mode + ':':10s} reads {t_read:7.2f}s  writes {t_total - t_read:6.2f}s  http_requests={node.http_requests}")
+
+    server.shutdown()
+    ok = all(r == expected for r in results.values()) and node.blocks == {hex(_BLOCK)}
+    print("ok: identical stakes, all reads pinned to one block" if ok else f"MISMATCH (blocks seen: {sorted(node.blocks)})")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Exercise the anchor tx manager (server/anchor_tx.py) end to end against an in-process stub JSON-RPC node.
+No database or real chain needed: anchors live in InMemoryStore and the stub keeps a tiny mempool.
+
+The stub only mines txs whose maxFeePerGas >= --min-fee-gwei, so with the default market fee (2 * 10 gwei
+base + 1 gwei tip = 21 gwei) and --min-fee-gwei 30 every tx has to be bumped (same nonce) before it confirms.
+Replacements below +10% are rejected, as geth does.
+
+Checks: nonces are contiguous from the node's pending count, eth_getTransactionCount is called once, every
+anchor (jobs + one rollup) ends up with a recorded receipt, bumps happened, and receipts were polled in batches.
+
+Needs eth_account + rlp (installed with web3).
+
+Usage:
+  python scripts/check_anchor_tx_manager.py
+  python scripts/check_anchor_tx_manager.py --jobs 25 --min-fee-gwei 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import secrets
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import rlp  # noqa: E402
+from eth_utils import keccak  # noqa: E402
+
+from server.anchor_tx import AnchorTxManager  # noqa: E402
+from server.config import settings  # noqa: E402
+from server.rpc import RpcClient  # noqa: E402
+from server.storage import InMemoryStore  # noqa: E402
+
+_GWEI = 10**9
+_CHAIN_ID = 31337
+_REGISTRY = "0x" + "a5" * 20
+# Anvil's first dev account.
+_DEV_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+
+
+class StubNode:
+    def __init__(self, *, start_nonce: int, min_fee: int, base_fee: int, tip: int) -> None:
+        self.lock = threading.Lock()
+        self.mined_nonce = int(start_nonce)
+        self.min_fee = int(min_fee)
+        self.base_fee = int(base_fee)
+        self.tip = int(tip)
+        self.block = 100
+        self.mempool: dict[int, tuple[str, int]] = {}  # nonce -> (hash, maxFeePerGas)
+        self.receipts: dict[str, dict[str, Any]] = {}
+        self.calls: dict[str, int] = {}
+        self.batches = 0
+
+    def _mine(self) -> None:
+        while self.mined_nonce in self.mempool and self.mempool[self.mined_nonce][1] >= self.min_fee:
+            h, _ = self.mempool.pop(self.mined_nonce)
+            self.block += 1
+            self.receipts[h] = {
+                "transactionHash": h,
+                "blockNumber": hex(self.block),
+                "status": "0x1",
+                "logs": [{"address": _REGISTRY, "logIndex": "0x0"}],
+            }
+            self.mined_nonce += 1
+
+    def handle(self, method: str, params: list[Any]) -> Any:
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "eth_chainId":
+            return hex(_CHAIN_ID)
+        if method == "eth_getTransactionCount":
+            n = self.mined_nonce
+            while n in self.mempool:
+                n += 1
+            return hex(n)
+        if method == "eth_getBlockByNumber":
+            return {"number": hex(self.block), "baseFeePerGas": hex(self.base_fee)}
+        if method == "eth_maxPriorityFeePerGas":
+            return hex(self.tip)
+        if method == "eth_estimateGas":
+            return hex(90_000)
+        if method == "eth_getTransactionReceipt":
+            self._mine()
+            return self.receipts.get(str(params[0]))
+        if method == "eth_sendRawTransaction":
+            raw = bytes.fromhex(str(params[0])[2:])
+            if raw[0] != 2:
+                raise ValueError("stub only accepts EIP-1559 txs")
+            fields = rlp.decode(raw[1:])
+            nonce = int.from_bytes(fields[1], "big")
+            max_fee = int.from_bytes(fields[3], "big")
+            h = "0x" + keccak(raw).hex()
+            if nonce < self.mined_nonce:
+                raise ValueError("nonce too low")
+            prev = self.mempool.get(nonce)
+            if prev and prev[0] == h:
+                raise ValueError("already known")
+            if prev and max_fee * 10 < prev[1] * 11:
+                raise ValueError("replacement transaction underpriced")
+            self.mempool[nonce] = (h, max_fee)
+            return h
+        raise ValueError(f"method not found: {method}")
+
+    def dispatch(self, req: dict[str, Any]) -> dict[str, Any]:
+        try:
+            return {"jsonrpc": "2.0", "id": req.get("id"), "result": self.handle(req["method"], req.get("params") or [])}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": req.get("id"), "error": {"code": -32000, "message": str(e)}}
+
+
+def _serve(node: StubNode) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:  # noqa: N802
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            with node.lock:
+                if isinstance(body, list):
+                    node.batches += 1
+                    out: Any = [node.dispatch(r) for r in body]
+                else:
+                    out = node.dispatch(body)
+            data = json.dumps(out).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the anchor tx manager against a stub JSON-RPC node")
+    parser.add_argument("--jobs", type=int, default=12)
+    parser.add_argument("--start-nonce", type=int, default=7)
+    parser.add_argument("--min-fee-gwei", type=float, default=30.0)
+    parser.add_argument("--max-ticks", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    settings.CHAIN_ID = _CHAIN_ID
+    settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS = _REGISTRY
+
+    node = StubNode(start_nonce=args.start_nonce, min_fee=int(args.min_fee_gwei * _GWEI), base_fee=10 * _GWEI, tip=_GWEI)
+    server = _serve(node)
+    store = InMemoryStore()
+
+    for i in range(int(args.jobs)):
+        job_id = f"job_{i}"
+        store.upsert_anchor_batch(
+            job_id=job_id,
+            anchor_root="0x" + secrets.token_hex(32),
+            anchor_uri=f"https://example.org/static/anchors/{job_id}.json",
+            schema_version=1,
+            salt="0x" + secrets.token_hex(32),
+        )
+        store.enqueue_anchor_tx(kind="job", target_id=job_id)
+    rollup = store.create_anchor_rollup(
+        rollup={
+            "id": "r_check",
+            "merkle_root": "0x" + secrets.token_hex(32),
+            "leaf_count": 0,
+            "schema_version": 1,
+            "salt": "0x" + secrets.token_hex(32),
+            "anchor_uri": "https://example.org/static/anchors/rollups/r_check.json",
+        },
+        members=[],
+    )
+    assert rollup is not None
+    store.enqueue_anchor_tx(kind="rollup", target_id="r_check")
+
+    mgr = AnchorTxManager(
+        store,
+        rpc=RpcClient([f"http://127.0.0.1:{server.server_address[1]}"]),
+        private_key=_DEV_KEY,
+        bump_after_seconds=0,
+        bump_percent=20,
+        max_fee_gwei=200,
+        send_batch=100,
+    )
+    totals = {"mined": 0, "failed": 0, "bumped": 0, "sent": 0}
+    for tick in range(int(args.max_ticks)):
+        stats = mgr.tick()
+        for k, v in stats.items():
+            totals[k] += v
+        print(f"tick {tick}: {stats}")
+        if not store.list_anchor_txs(statuses=["queued", "sent"]):
+            break
+    server.shutdown()
+
+    txs = store.list_anchor_txs(statuses=["mined", "failed", "queued", "sent"], limit=1000)
+    nonces = sorted(int(t["nonce"]) for t in txs)
+    expected = list(range(args.start_nonce, args.start_nonce + len(txs)))
+    print(f"totals={totals} rpc_calls={node.calls} batches={node.batches}")
+
+    ok = True
+    for name, cond in (
+        ("all txs mined", all(t["status"] == "mined" for t in txs) and len(txs) == args.jobs + 1),
+        ("contiguous nonces", nonces == expected),
+        ("single nonce fetch", node.calls.get("eth_getTransactionCount") == 1),
+        ("bumps happened", totals["bumped"] >= len(txs)),
+        ("receipts batched", node.batches >= 1 and node.calls.get("eth_getTransactionReceipt", 0) >= len(txs)),
+        (
+            "job receipts recorded",
+            all((store.get_anchor_batch(f"job_{i}") or {}).get("anchor_tx_hash") for i in range(args.jobs)),
+        ),
+        ("rollup receipt recorded", bool((store.get_anchor_rollup("r_check") or {}).get("anchor_tx_hash"))),
+    ):
+        print(f"{'ok  ' if cond else 'FAIL'} {name}")
+        ok = ok and bool(cond)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
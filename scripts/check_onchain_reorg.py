@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Exercise reorg handling in onchain sync (server/onchain_sync.py) against an in-process stub JSON-RPC node that
+can switch the chain to another fork. No database or real chain needed: rows live in InMemoryStore.
+
+Scenario (defaults: head 300, confirmations 2, reorg depth 64, fork above block 280):
+  fork A  Deposited(X) @100 (final), Deposited(X) @285, Slashed(X) @290, DonationReceived(D, $25) @292
+  pass 1  ingests fork A up to head - confirmations
+  reorg   blocks above 280 are replaced by fork B (head moves to 310):
+          Deposited(Y) @286, DonationReceived(D, $5) @300
+  pass 2  must detect the parent-hash mismatch, roll back the fork A slash, donation and stake changes, and
+          ingest fork B
+  pass 3  no reorg: nothing is rolled back
+
+Needs web3 (ABI decoding).
+
+Usage:
+  python scripts/check_onchain_reorg.py
+  python scripts/check_onchain_reorg.py --fork-above 240 --span 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from eth_utils import keccak  # noqa: E402
+
+from server import onchain_sync  # noqa: E402
+from server.config import settings  # noqa: E402
+from server.storage import InMemoryStore  # noqa: E402
+
+_STAKE = "0x" + "5a" * 20
+_TREASURY = "0x" + "7e" * 20
+_CHAIN_ID = 8453
+_USDC = 1_000_000
+_ETH_25_USD = 10**16  # 0.01 ETH at the default ETH_USD_RATE (2500)
+
+
+def _topic(sig: str) -> str:
+    return "0x" + keccak(text=sig).hex()
+
+
+T_DEPOSITED = _topic("Deposited(address,address,uint256)")
+T_SLASHED = _topic("Slashed(address,address,uint256,uint256)")
+T_DONATION = _topic("DonationReceived(address,address,uint256,uint32,bytes32)")
+_STAKE_OF = keccak(text="stakeOf(address)")[:4].hex()
+
+
+def _word(v: int) -> str:
+    return int(v).to_bytes(32, "big").hex()
+
+
+def _addr(i: int) -> str:
+    return "0x" + i.to_bytes(20, "big").hex()
+
+
+AGENT_X, AGENT_Y, DONOR = 0xA11CE, 0xB0B, 0xD0D0
+
+
+class StubChain:
+    """
+    Fork "A" until `reorg()`; then blocks above `fork_above` belong to fork "B". Block hashes are derived from
+    (fork, number), so parent hashes change across the fork point exactly like a real reorg.
+    """
+
+    def __init__(self, *, head: int, fork_above: int) -> None:
+        self.head = int(head)
+        self.fork_above = int(fork_above)
+        self.fork = "A"
+        self.lock = threading.Lock()
+        self.events: dict[str, dict[int, tuple[str, int, int]]] = {
+            # block -> (kind, subject, amount)
+            "A": {100: ("deposit", AGENT_X, 25 * _USDC), 285: ("deposit", AGENT_X, 25 * _USDC), 290: ("slash", AGENT_X, 5 * _USDC), 292: ("donation", DONOR, _ETH_25_USD)},
+            "B": {100: ("deposit", AGENT_X, 25 * _USDC), 286: ("deposit", AGENT_Y, 25 * _USDC), 300: ("donation", DONOR, _ETH_25_USD // 5)},
+        }
+
+    def reorg(self, new_head: int) -> None:
+        with self.lock:
+            self.fork = "B"
+            self.head = int(new_head)
+
+    def _fork_at(self, n: int) -> str:
+        return self.fork if n > self.fork_above else "A"
+
+    def block_hash(self, n: int) -> str:
+        return "0x" + keccak(text=f"{self._fork_at(n)}:{n}").hex()
+
+    def _events(self) -> dict[int, tuple[str, int, int]]:
+        return {b: ev for b, ev in self.events[self.fork].items() if b <= self.head}
+
+    def log_at(self, b: int) -> dict[str, Any] | None:
+        ev = self._events().get(b)
+        if ev is None:
+            return None
+        kind, subject, amount = ev
+        common = {
+            "blockNumber": hex(b),
+            "blockHash": self.block_hash(b),
+            "transactionHash": "0x" + keccak(text=f"tx:{self._fork_at(b)}:{b}").hex(),
+            "transactionIndex": "0x0",
+            "logIndex": "0x0",
+            "removed": False,
+        }
+        if kind == "deposit":
+            return {**common, "address": _STAKE, "topics": [T_DEPOSITED, "0x" + _word(0xFEE), "0x" + _word(subject)], "data": "0x" + _word(amount)}
+        if kind == "slash":
+            return {
+                **common,
+                "address": _STAKE,
+                "topics": [T_SLASHED, "0x" + _word(subject), "0x" + _word(0xBEEF)],
+                "data": "0x" + _word(amount) + _word(amount),
+            }
+        return {
+            **common,
+            "address": _TREASURY,
+            "topics": [T_DONATION, "0x" + _word(subject), "0x" + _word(0), "0x" + _word(1)],
+            "data": "0x" + _word(amount) + _word(0),
+        }
+
+    def stake_of(self, agent: int, block: int) -> int:
+        total = 0
+        for b, (kind, subject, amount) in self._events().items():
+            if b <= block and subject == agent:
+                total += amount if kind == "deposit" else -amount if kind == "slash" else 0
+        return total
+
+    def handle(self, method: str, params: list[Any]) -> Any:
+        with self.lock:
+            if method == "eth_chainId":
+                return hex(_CHAIN_ID)
+            if method == "eth_blockNumber":
+                return hex(self.head)
+            if method == "eth_getBlockByNumber":
+                n = int(params[0], 16)
+                if n > self.head:
+                    return None
+                return {"number": hex(n), "hash": self.block_hash(n), "parentHash": self.block_hash(n - 1) if n else "0x" + _word(0)}
+            if method == "eth_getLogs":
+                flt = params[0]
+                lo, hi = int(flt["fromBlock"], 16), min(int(flt["toBlock"], 16), self.head)
+                addrs = {a.lower() for a in flt["address"]}
+                logs = [self.log_at(b) for b in sorted(self._events()) if lo <= b <= hi]
+                return [log for log in logs if log and log["address"] in addrs]
+            if method == "eth_call":
+                data = str(params[0].get("data") or params[0].get("input"))[2:]
+                if not data.startswith(_STAKE_OF):
+                    raise ValueError("execution reverted")
+                block = params[1] if len(params) > 1 else "latest"
+                n = self.head if block == "latest" else int(block, 16)
+                return "0x" + _word(self.stake_of(int(data[-40:], 16), n))
+        raise ValueError(f"method not found: {method}")
+
+    def dispatch(self, req: dict[str, Any]) -> dict[str, Any]:
+        try:
+            return {"jsonrpc": "2.0", "id": req.get("id"), "result": self.handle(req["method"], req.get("params") or [])}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": req.get("id"), "error": {"code": -32000, "message": str(e)}}
+
+
+def _serve(chain: StubChain) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:  # noqa: N802
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            out: Any = [chain.dispatch(r) for r in body] if isinstance(body, list) else chain.dispatch(body)
+            data = json.dumps(out).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check onchain sync reorg detection and rollback against a stub RPC")
+    parser.add_argument("--head", type=int, default=300)
+    parser.add_argument("--fork-above", type=int, default=280)
+    parser.add_argument("--new-head", type=int, default=310)
+    parser.add_argument("--depth", type=int, default=64)
+    parser.add_argument("--span", type=int, default=16, help="ONCHAIN_SYNC_MAX_BLOCKS_PER_BATCH")
+    args = parser.parse_args(argv)
+
+    chain = StubChain(head=args.head, fork_above=args.fork_above)
+    server = _serve(chain)
+    settings.RPC_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    settings.ONCHAIN_SYNC_ENABLED = True
+    settings.ONCHAIN_STAKE_ENABLED = True
+    settings.STAKE_CONTRACT_ADDRESS = _STAKE
+    settings.TREASURY_CONTRACT_ADDRESS = _TREASURY
+    settings.ONCHAIN_MULTICALL3_ADDRESS = ""
+    settings.ONCHAIN_SYNC_CONFIRMATIONS = 2
+    settings.ONCHAIN_SYNC_REORG_DEPTH = args.depth
+    settings.ONCHAIN_SYNC_LOOKBACK_BLOCKS = args.head
+    settings.ONCHAIN_SYNC_MAX_BLOCKS_PER_BATCH = args.span
+    settings.ONCHAIN_SYNC_FETCH_WORKERS = 2
+
+    store = InMemoryStore()
+    x, y, donor = _addr(AGENT_X), _addr(AGENT_Y), _addr(DONOR)
+
+    def totals() -> dict[str, Any]:
+        return (store.jobs.get("__donor_totals__") or {}).get(donor) or {}
+
+    p1 = onchain_sync.sync_once(store)
+    print(f"pass 1: stake={p1['stake']} reorg={p1['reorg']}")
+    fork_a = {
+        "x": store.get_stake(x),
+        "slashes": len(store.list_slashes(agent_address=x)),
+        "donations": len(store.jobs.get("__donation_events__") or {}),
+        "donor_usd": float(totals().get("total_usd") or 0.0),
+    }
+    print(f"fork A: {fork_a}")
+
+    chain.reorg(args.new_head)
+    p2 = onchain_sync.sync_once(store)
+    print(f"pass 2: reorg={p2['reorg']} stake_next={p2['stake'].get('next_from_block')}")
+    fork_b = {
+        "x": store.get_stake(x),
+        "y": store.get_stake(y),
+        "slashes": len(store.list_slashes(agent_address=x)),
+        "donations": len(store.jobs.get("__donation_events__") or {}),
+        "donor_usd": float(totals().get("total_usd") or 0.0),
+    }
+    print(f"fork B: {fork_b}")
+
+    p3 = onchain_sync.sync_once(store)
+    print(f"pass 3: reorg={p3['reorg']}")
+    server.shutdown()
+
+    rollback = p2["reorg"].get("rollback") or {}
+    ok = True
+    for name, cond in (
+        ("fork A ingested", fork_a == {"x": 45.0, "slashes": 1, "donations": 1, "donor_usd": 25.0}),
+        ("reorg detected at the fork point", rollback.get("fork_block") is not None and rollback["fork_block"] <= args.fork_above),
+        ("fork A changes undone", rollback.get("undone", 0) >= 3),
+        ("fork B ingested", fork_b == {"x": 25.0, "y": 25.0, "slashes": 0, "donations": 1, "donor_usd": 5.0}),
+        ("cursor at new safe head", p2["stake"].get("next_from_block") == args.new_head - 1),
+        ("no rollback without a reorg", p3["reorg"].get("rollback") is None),
+    ):
+        print(f"{'ok  ' if cond else 'FAIL'} {name}")
+        ok = ok and bool(cond)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Reconcile AGR win rewards.
+
+Before win credits carried an idempotency key, close/finalize deduplicated them by scanning the winner's
+last 500 ledger rows, which could race or miss. This command reports:
+  - duplicates: win credits for a job beyond one (kept: the one paid to the current winner), not reversed yet
+  - multi_winner_jobs: jobs whose win credits went to more than one address (e.g. closed twice)
+  - missing: closed jobs whose winning author never received a win credit (informational)
+
+With --apply, each duplicate gets a compensating ledger entry (reason "win_duplicate_reversal").
+Entries are keyed by the duplicate's id, so re-running is safe; nothing is deleted.
+
+Usage:
+  DATABASE_URL=postgresql+psycopg://... python scripts/reconcile_win_rewards.py
+  python scripts/reconcile_win_rewards.py --apply
+  python scripts/reconcile_win_rewards.py --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from server.storage import get_store  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Detect (and optionally reverse) duplicate AGR win rewards")
+    parser.add_argument("--apply", action="store_true", help="Write compensating entries for duplicates")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    res = get_store().reconcile_win_rewards(apply=bool(args.apply))
+    if args.json:
+        print(json.dumps(res, indent=2, sort_keys=True))
+    else:
+        dups = res.get("duplicates") or []
+        missing = res.get("missing") or []
+        print(f"duplicate_win_credits={len(dups)} extra_agr={sum(int(d.get('delta') or 0) for d in dups)}")
+        for d in dups[:50]:
+            print(f"  dup id={d['id']} job={d['job_id']} address={d['address']} delta={d['delta']} at={d['created_at']}")
+        multi = res.get("multi_winner_jobs") or []
+        print(f"jobs_with_multiple_credited_winners={len(multi)}")
+        for j in multi[:50]:
+            print(f"  multi job={j}")
+        print(f"closed_jobs_without_win_credit={len(missing)}")
+        for m in missing[:50]:
+            print(f"  missing job={m['job_id']} address={m['address']}")
+        if args.apply:
+            print(f"reversed={int(res.get('reversed') or 0)}")
+    return 1 if (res.get("duplicates") and not args.apply) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,11 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Standalone anchor rollup worker (recommended for production).
+# Rolls pending job snapshots into one Merkle root per batch; posts it when an EOA key is configured.
+# Run a single instance (rollup membership is claimed atomically, but one poster keeps nonces simple).
+# Requires:
+# - DATABASE_URL
+# - AGORA_ANCHOR_ROLLUP_ENABLED=1
+
+python3 "server/anchor_worker.py"
@@ -0,0 +1,10 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Standalone auto-finalization worker (recommended for production).
+# Closes open jobs whose final vote window has ended; several instances may run (SKIP LOCKED).
+# Requires:
+# - DATABASE_URL
+# - AGORA_AUTO_FINALIZE_ENABLED=1
+
+python3 "server/finalize_worker.py"
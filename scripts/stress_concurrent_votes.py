@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for vote upserts against Postgres (PostgresStore).
+
+Creates one job with a few submissions, then N voters (default: 1,000) vote in parallel; a fraction
+of them immediately re-vote / switch submissions (also in parallel, including duplicate re-sends).
+Afterwards it checks that:
+  - there is exactly one vote row per voter (no duplicates, no lost writes)
+  - maintained tallies (vote_tallies) == SQL GROUP BY over raw votes == each voter's last choice
+  - the same holds for final votes
+
+Requires DATABASE_URL (migrated to head). Writes real rows into that database - use a scratch DB.
+
+Usage:
+  DATABASE_URL=postgresql+psycopg://... python scripts/stress_concurrent_votes.py
+  python scripts/stress_concurrent_votes.py --voters 1000 --workers 64 --switch-ratio 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from server.config import settings  # noqa: E402
+from server.models import utc_now_iso  # noqa: E402
+from server.storage import PostgresStore  # noqa: E402
+
+
+def _addr(i: int) -> str:
+    return "0x" + f"{i:040x}"
+
+
+def _check(store: PostgresStore, job_id: str, expected: dict[str, str], weights: dict[str, float], *, kind: str) -> list[str]:
+    errors: list[str] = []
+    want: dict[str, tuple[float, int]] = {}
+    for voter, sid in expected.items():
+        w, n = want.get(sid, (0.0, 0))
+        want[sid] = (w + weights.get(voter, 1.0), n + 1)
+
+    if kind == "jury":
+        rows = store.list_votes_for_job(job_id)
+        tally_fn = store.tally_votes_for_job
+        weight_key = "weighted_votes"
+    else:
+        rows = store.list_final_votes_for_job(job_id)
+        tally_fn = store.tally_final_votes_for_job
+        weight_key = "votes"
+
+    if len(rows) != len(expected):
+        errors.append(f"{kind}: {len(rows)} vote rows for {len(expected)} voters")
+    seen: dict[str, str] = {str(r["voter_address"]): str(r["submission_id"]) for r in rows}
+    wrong = [v for v, sid in expected.items() if seen.get(v) != sid]
+    if wrong:
+        errors.append(f"{kind}: {len(wrong)} voters with unexpected stored choice (e.g. {wrong[0]})")
+
+    for source in ("table", "group_by"):
+        settings.VOTE_TALLY_SOURCE = source
+        got = {sid: (float(t[weight_key]), int(t["voters"])) for sid, t in tally_fn(job_id).items()}
+        for sid in set(want) | set(got):
+            w_exp, n_exp = want.get(sid, (0.0, 0))
+            w_got, n_got = got.get(sid, (0.0, 0))
+            if n_exp != n_got or abs(w_exp - w_got) > 1e-6:
+                errors.append(f"{kind}/{source}: submission {sid} expected ({w_exp:.3f}, {n_exp}) got ({w_got:.3f}, {n_got})")
+    settings.VOTE_TALLY_SOURCE = "table"
+    return errors
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Parallel voters stress test (Postgres)")
+    parser.add_argument("--voters", type=int, default=1000)
+    parser.add_argument("--submissions", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--switch-ratio", type=float, default=0.3, help="Fraction of voters that re-vote")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if not settings.DATABASE_URL:
+        print("DATABASE_URL is not set (this test needs Postgres)", file=sys.stderr)
+        return 2
+
+    rng = random.Random(args.seed)
+    store = PostgresStore()
+    job = store.create_job(
+        {
+            "title": f"stress votes {int(time.time())}",
+            "prompt": "concurrency stress test",
+            "bounty_usdc": 0.0,
+            "tags": ["stress"],
+            "status": "open",
+            "sponsor_address": _addr(0),
+            "created_at": utc_now_iso(),
+        }
+    )
+    job_id = str(job["id"])
+    sub_ids = [
+        str(store.create_submission({"job_id": job_id, "agent_address": _addr(10_000 + i), "content": f"s{i}", "evidence": []})["id"])
+        for i in range(max(2, int(args.submissions)))
+    ]
+
+    voters = [_addr(1 + i) for i in range(int(args.voters))]
+    weights = {v: float(rng.choice([0.5, 1.0, 1.5, 2.0])) for v in voters}
+    first = {v: rng.choice(sub_ids) for v in voters}
+    switchers = [v for v in voters if rng.random() < float(args.switch_ratio)]
+    second = {v: rng.choice(sub_ids) for v in switchers}
+
+    def vote(voter: str, sid: str) -> None:
+        store.upsert_vote(
+            job_id=job_id,
+            voter_address=voter,
+            vote={"job_id": job_id, "submission_id": sid, "voter_address": voter, "weight": weights[voter], "created_at": utc_now_iso()},
+        )
+        store.upsert_final_vote(job_id=job_id, voter_address=voter, submission_id=sid)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=int(args.workers)) as pool:
+        list(pool.map(lambda v: vote(v, first[v]), voters))
+    t1 = time.perf_counter()
+    # Switches are sent twice concurrently (duplicate client retries); the result must be the same.
+    with ThreadPoolExecutor(max_workers=int(args.workers)) as pool:
+        list(pool.map(lambda v: vote(v, second[v]), switchers + switchers))
+    t2 = time.perf_counter()
+
+    expected = dict(first)
+    expected.update(second)
+    errors = _check(store, job_id, expected, weights, kind="jury")
+    errors += _check(store, job_id, expected, {}, kind="final")
+
+    n_first = len(voters) * 2
+    n_second = len(switchers) * 4
+    print(f"job_id={job_id} voters={len(voters)} submissions={len(sub_ids)} switchers={len(switchers)} workers={args.workers}")
+    print(f"first_round_s={t1 - t0:.2f} writes_per_s={n_first / (t1 - t0):,.0f}")
+    print(f"switch_round_s={t2 - t1:.2f} writes_per_s={n_second / max(1e-9, t2 - t1):,.0f}")
+    if errors:
+        print("FAILED")
+        for e in errors[:50]:
+            print(" -", e)
+        return 1
+    print("OK: one row per voter; maintained tallies == GROUP BY == expected")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
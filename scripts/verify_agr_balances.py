@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Verify materialized AGR balances (agr_balances) against a full replay of the agr_ledger.
+
+Reports every address whose stored earned/spent/balance differ from the ledger sums, including addresses
+missing from either side. With --repair, mismatched rows are overwritten with the replayed totals.
+
+Usage:
+  DATABASE_URL=postgresql+psycopg://... python scripts/verify_agr_balances.py
+  python scripts/verify_agr_balances.py --address 0xabc... --repair
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from server.storage import get_store  # noqa: E402
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay the AGR ledger and compare with agr_balances")
+    parser.add_argument("--address", default=None, help="Only check one address")
+    parser.add_argument("--repair", action="store_true", help="Overwrite mismatched balances with replayed totals")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    res = get_store().verify_agr_balances(address=args.address, repair=bool(args.repair))
+    if args.json:
+        print(json.dumps(res, indent=2, sort_keys=True))
+    else:
+        mismatches = res.get("mismatches") or []
+        print(f"addresses_checked={res.get('addresses_checked')} mismatches={len(mismatches)} repaired={res.get('repaired')}")
+        for m in mismatches[:50]:
+            print(f"  {m['address']} replayed={m['replayed']} stored={m['stored']}")
+    return 1 if (res.get("mismatches") and not args.repair) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
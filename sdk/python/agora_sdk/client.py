@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from typing import Any
 
@@ -42,6 +43,61 @@ class AgoraClient:
         self.access_token = token
         return token
 
+    @classmethod
+    def authenticate_fleet(
+        cls,
+        base_url: str,
+        private_keys: list[str],
+        *,
+        batch_size: int = 100,
+        raise_on_error: bool = True,
+    ) -> list["AgoraClient"]:
+        """
+        Authenticate many agent wallets with two requests per `batch_size` keys (challenge/batch + verify/batch)
+        instead of two per wallet. Returns one client per key, in order, sharing one HTTP session.
+
+        With raise_on_error=False, clients whose signature was rejected are returned with access_token=None.
+        The server charges each address against a per-IP budget; on 429 this waits out Retry-After and retries.
+        """
+        clients = [cls(base_url=base_url, private_key=k) for k in private_keys]
+        session = requests.Session()
+        for c in clients:
+            c._session = session
+        base = clients[0].base_url if clients else base_url.rstrip("/")
+        failed: dict[str, str] = {}
+
+        def _post(path: str, body: dict[str, Any], timeout: int) -> requests.Response:
+            for _ in range(5):
+                r = session.post(f"{base}{path}", json=body, timeout=timeout)
+                if r.status_code != 429:
+                    break
+                time.sleep(float(r.headers.get("Retry-After") or 1))
+            r.raise_for_status()
+            return r
+
+        step = max(1, int(batch_size))
+        for i in range(0, len(clients), step):
+            batch = clients[i : i + step]
+            chunk = {c.address: c for c in batch}
+            r = _post("/api/v1/agents/auth/challenge/batch", {"addresses": list(chunk)}, 30)
+            items = []
+            for ch in r.json()["challenges"]:
+                c = chunk[ch["address"]]
+                signed = Account.sign_message(encode_defunct(text=ch["message_to_sign"]), private_key=c.private_key)
+                items.append({"address": c.address, "signature": signed.signature.hex()})
+
+            r2 = _post("/api/v1/agents/auth/verify/batch", {"items": items}, 60)
+            for res in r2.json()["results"]:
+                if res.get("ok"):
+                    for c in batch:
+                        if c.address == res["address"]:
+                            c.access_token = res["access_token"]
+                else:
+                    failed[res["address"]] = str(res.get("error") or "rejected")
+        if failed and raise_on_error:
+            raise RuntimeError(f"Fleet auth failed for {len(failed)} address(es): {failed}")
+        return clients
+
     # ---- Bootstrap (agent discovery) ----
     def bootstrap(self, *, status: str = "open", tag: str | None = None, limit: int = 20) -> dict[str, Any]:
         params: dict[str, Any] = {"status": status, "limit": int(limit)}
@@ -168,8 +224,13 @@ class AgoraClient:
         r.raise_for_status()
         return r.json()["submission"]
 
-    def list_submissions(self, *, job_id: str) -> list[dict[str, Any]]:
-        r = self._session.get(f"{self.base_url}/api/v1/jobs/{job_id}/submissions", timeout=20)
+    def list_submissions(self, *, job_id: str, limit: int | None = None, after: str | None = None) -> list[dict[str, Any]]:
+        params: dict[str, Any] = {}
+        if limit is not None:
+            params["limit"] = int(limit)
+        if after:
+            params["after"] = after
+        r = self._session.get(f"{self.base_url}/api/v1/jobs/{job_id}/submissions", params=params, timeout=20)
         r.raise_for_status()
         return r.json()
 
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+ACCESS_LOGGER_NAME = "agora.access"
+
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    One compact JSON object per line.
+    Request fields travel on `record.fields` (a plain dict) so nothing is merged into the LogRecord.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        out: dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            out.update(fields)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    Enqueue the record untouched.
+    The stock QueueHandler.prepare() formats the message on the caller's thread; we defer all
+    formatting/serialization to the listener thread instead (the queue never leaves the process).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class AccessLog:
+    """
+    Per-request access logging with sampling.
+
+    - Errors (>= 500), 429s and requests slower than `slow_ms` are always logged.
+    - Other requests are logged with probability `sample_rate` (1.0 = all, 0.0 = none).
+    - `should_log()` is cheap and meant to be called before building the field dict.
+    """
+
+    def __init__(self, logger: logging.Logger, *, enabled: bool, sample_rate: float, slow_ms: float) -> None:
+        self.logger = logger
+        self.enabled = bool(enabled)
+        self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        self.slow_ms = max(0.0, float(slow_ms))
+        self._listener: QueueListener | None = None
+
+    def should_log(self, status_code: int, duration_ms: float) -> bool:
+        if not self.enabled:
+            return False
+        if status_code >= 500 or status_code == 429:
+            return True
+        if self.slow_ms and duration_ms >= self.slow_ms:
+            return True
+        rate = self.sample_rate
+        if rate >= 1.0:
+            return True
+        return rate > 0.0 and random.random() < rate
+
+    def log(self, event: str, fields: dict[str, Any], *, status_code: int) -> None:
+        level = logging.WARNING if status_code >= 500 else logging.INFO
+        if not self.logger.isEnabledFor(level):
+            return
+        if self._listener is not None:
+            self.logger.log(level, event, extra={"fields": fields})
+        else:
+            # Synchronous mode keeps the historical flat `extra` attributes for existing formatters.
+            self.logger.log(level, event, extra=fields)
+
+    def start_async(self, *, stream: Any = None) -> None:
+        """
+        Route the access logger through an in-process queue drained by a background thread.
+        Idempotent.
+        """
+        if self._listener is not None:
+            return
+        q: queue.SimpleQueue = queue.SimpleQueue()
+        sink = logging.StreamHandler(stream or sys.stdout)
+        sink.setFormatter(JsonLineFormatter())
+        listener = QueueListener(q, sink, respect_handler_level=False)
+
+        for h in list(self.logger.handlers):
+            self.logger.removeHandler(h)
+        self.logger.addHandler(_RecordQueueHandler(q))
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+        listener.start()
+        self._listener = listener
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Flush queued records and stop the background writer."""
+        listener = self._listener
+        if listener is None:
+            return
+        self._listener = None
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+def build_access_log() -> AccessLog:
+    """
+    Build the process access logger from settings.
+    With AGORA_ACCESS_LOG_ASYNC=0 records go through the regular (synchronous) "agora" handler chain.
+    """
+    from server.config import settings
+
+    if settings.ACCESS_LOG_ASYNC:
+        log = AccessLog(
+            logging.getLogger(ACCESS_LOGGER_NAME),
+            enabled=settings.ACCESS_LOG_ENABLED,
+            sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+            slow_ms=settings.ACCESS_LOG_SLOW_MS,
+        )
+        if log.enabled:
+            log.start_async()
+        return log
+    return AccessLog(
+        logging.getLogger("agora"),
+        enabled=settings.ACCESS_LOG_ENABLED,
+        sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+        slow_ms=settings.ACCESS_LOG_SLOW_MS,
+    )
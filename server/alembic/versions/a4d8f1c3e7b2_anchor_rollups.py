@@ -0,0 +1,55 @@
+"""multi-job anchor rollups
+
+Revision ID: a4d8f1c3e7b2
+Revises: f3a8c2e6b9d1
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a4d8f1c3e7b2"
+down_revision = "f3a8c2e6b9d1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "anchor_rollups",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("merkle_root", sa.String(), nullable=False),
+        sa.Column("leaf_count", sa.Integer(), nullable=False),
+        sa.Column("schema_version", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("salt", sa.String(), nullable=False),
+        sa.Column("anchor_uri", sa.String(), nullable=False),
+        sa.Column("anchor_tx_hash", sa.String(), nullable=True),
+        sa.Column("anchor_chain_id", sa.Integer(), nullable=True),
+        sa.Column("anchor_contract_address", sa.String(), nullable=True),
+        sa.Column("anchor_block_number", sa.Integer(), nullable=True),
+        sa.Column("anchor_log_index", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.add_column("anchor_batches", sa.Column("rollup_id", sa.String(), sa.ForeignKey("anchor_rollups.id"), nullable=True))
+    op.add_column("anchor_batches", sa.Column("rollup_index", sa.Integer(), nullable=True))
+    op.add_column("anchor_batches", sa.Column("rollup_proof", sa.JSON(), nullable=True))
+    op.create_index("ix_anchor_batches_rollup_id", "anchor_batches", ["rollup_id"])
+    op.create_index(
+        "ix_anchor_batches_unrolled",
+        "anchor_batches",
+        ["created_at"],
+        postgresql_where=sa.text("rollup_id IS NULL AND anchor_tx_hash IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_anchor_batches_unrolled", table_name="anchor_batches")
+    op.drop_index("ix_anchor_batches_rollup_id", table_name="anchor_batches")
+    op.drop_column("anchor_batches", "rollup_proof")
+    op.drop_column("anchor_batches", "rollup_index")
+    op.drop_column("anchor_batches", "rollup_id")
+    op.drop_table("anchor_rollups")
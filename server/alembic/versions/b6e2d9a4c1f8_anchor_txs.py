@@ -0,0 +1,51 @@
+"""anchor transaction manager queue
+
+Revision ID: b6e2d9a4c1f8
+Revises: a4d8f1c3e7b2
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b6e2d9a4c1f8"
+down_revision = "a4d8f1c3e7b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "anchor_txs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("target_id", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="queued"),
+        sa.Column("from_address", sa.String(), nullable=True),
+        sa.Column("nonce", sa.BigInteger(), nullable=True),
+        sa.Column("tx_hash", sa.String(), nullable=True),
+        sa.Column("tx_hashes", sa.JSON(), nullable=True),
+        sa.Column("gas_limit", sa.BigInteger(), nullable=True),
+        sa.Column("max_fee_per_gas", sa.BigInteger(), nullable=True),
+        sa.Column("max_priority_fee_per_gas", sa.BigInteger(), nullable=True),
+        sa.Column("gas_price", sa.BigInteger(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("bumps", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("block_number", sa.BigInteger(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("mined_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("kind", "target_id", name="uq_anchor_txs_target"),
+    )
+    op.create_index("ix_anchor_txs_status", "anchor_txs", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_anchor_txs_status", table_name="anchor_txs")
+    op.drop_table("anchor_txs")
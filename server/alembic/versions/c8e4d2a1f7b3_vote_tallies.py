@@ -0,0 +1,52 @@
+"""maintained vote tallies
+
+Revision ID: c8e4d2a1f7b3
+Revises: b7f2c1d4e5a6
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c8e4d2a1f7b3"
+down_revision = "b7f2c1d4e5a6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vote_tallies",
+        sa.Column("job_id", sa.String(), sa.ForeignKey("jobs.id"), primary_key=True),
+        sa.Column("kind", sa.String(), primary_key=True),
+        sa.Column("submission_id", sa.String(), primary_key=True),
+        sa.Column("weighted_votes", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("voters", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("first_vote_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+    # Backfill from existing votes.
+    op.execute(
+        """
+        INSERT INTO vote_tallies (job_id, kind, submission_id, weighted_votes, voters, first_vote_at)
+        SELECT job_id, 'jury', submission_id, COALESCE(SUM(weight), 0), COUNT(*), MIN(created_at)
+        FROM votes
+        GROUP BY job_id, submission_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO vote_tallies (job_id, kind, submission_id, weighted_votes, voters, first_vote_at)
+        SELECT job_id, 'final', submission_id, COUNT(*), COUNT(*), MIN(created_at)
+        FROM final_votes
+        GROUP BY job_id, submission_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("vote_tallies")
@@ -0,0 +1,25 @@
+"""stakes.updated_at index (stake cache change feed)
+
+Revision ID: c8e4f2a7b1d9
+Revises: b6e2d9a4c1f8
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c8e4f2a7b1d9"
+down_revision = "b6e2d9a4c1f8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_stakes_updated_at", "stakes", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stakes_updated_at", table_name="stakes")
@@ -0,0 +1,32 @@
+"""index open jobs by final vote end (auto-finalization queue)
+
+Revision ID: d2b9e7f4a1c6
+Revises: c8e4d2a1f7b3
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d2b9e7f4a1c6"
+down_revision = "c8e4d2a1f7b3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Partial index: only open jobs are ever due, so the queue stays as small as the open set.
+    op.create_index(
+        "ix_jobs_open_final_vote_ends",
+        "jobs",
+        ["final_vote_ends_at"],
+        postgresql_where=sa.text("status = 'open'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_open_final_vote_ends", table_name="jobs")
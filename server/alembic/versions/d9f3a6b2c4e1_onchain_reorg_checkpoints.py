@@ -0,0 +1,46 @@
+"""onchain sync block-hash checkpoints and undo log
+
+Revision ID: d9f3a6b2c4e1
+Revises: c8e4f2a7b1d9
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d9f3a6b2c4e1"
+down_revision = "c8e4f2a7b1d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "onchain_blocks",
+        sa.Column("chain_id", sa.Integer(), primary_key=True),
+        sa.Column("block_number", sa.BigInteger(), primary_key=True),
+        sa.Column("block_hash", sa.String(), nullable=False),
+        sa.Column("parent_hash", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_table(
+        "onchain_undo",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("chain_id", sa.Integer(), nullable=False),
+        sa.Column("block_number", sa.BigInteger(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("ref", sa.String(), nullable=False),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_onchain_undo_chain_block", "onchain_undo", ["chain_id", "block_number"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_onchain_undo_chain_block", table_name="onchain_undo")
+    op.drop_table("onchain_undo")
+    op.drop_table("onchain_blocks")
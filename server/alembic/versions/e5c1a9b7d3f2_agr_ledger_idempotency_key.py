@@ -0,0 +1,43 @@
+"""agr ledger idempotency key (one win reward per job)
+
+Revision ID: e5c1a9b7d3f2
+Revises: d2b9e7f4a1c6
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e5c1a9b7d3f2"
+down_revision = "d2b9e7f4a1c6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("agr_ledger", sa.Column("idempotency_key", sa.String(), nullable=True))
+    # One win reward per job: key the earliest win credit of each job (same key as storage._win_reward_key).
+    # Historical duplicates, including extra winners of the same job, keep a NULL key so the unique index can be
+    # created; scripts/reconcile_win_rewards.py reports (and optionally reverses) them.
+    op.execute(
+        """
+        UPDATE agr_ledger AS l
+        SET idempotency_key = 'win:' || l.job_id
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY job_id ORDER BY created_at, id) AS rn
+            FROM agr_ledger
+            WHERE reason = 'win' AND job_id IS NOT NULL
+        ) AS first_win
+        WHERE l.id = first_win.id AND first_win.rn = 1
+        """
+    )
+    op.create_index("uq_agr_ledger_idempotency_key", "agr_ledger", ["idempotency_key"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_agr_ledger_idempotency_key", table_name="agr_ledger")
+    op.drop_column("agr_ledger", "idempotency_key")
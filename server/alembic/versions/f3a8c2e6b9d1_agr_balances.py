@@ -0,0 +1,47 @@
+"""materialized agr balances
+
+Revision ID: f3a8c2e6b9d1
+Revises: e5c1a9b7d3f2
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f3a8c2e6b9d1"
+down_revision = "e5c1a9b7d3f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "agr_balances",
+        sa.Column("address", sa.String(), primary_key=True),
+        sa.Column("earned", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("spent", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("balance", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+    # Backfill by replaying the ledger.
+    op.execute(
+        """
+        INSERT INTO agr_balances (address, earned, spent, balance, updated_at)
+        SELECT address,
+               COALESCE(SUM(delta) FILTER (WHERE delta > 0), 0),
+               COALESCE(-SUM(delta) FILTER (WHERE delta < 0), 0),
+               COALESCE(SUM(delta), 0),
+               now()
+        FROM agr_ledger
+        GROUP BY address
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("agr_balances")
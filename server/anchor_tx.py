@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from web3 import Web3
+
+from server.anchoring import anchor_rollup_once, encode_post_anchor_calldata
+from server.config import settings
+from server.models import utc_now_iso
+from server.rpc import RpcClient, RpcError, get_rpc_client
+from server.storage import Store
+
+logger = logging.getLogger("agora.anchor_tx")
+
+# Replacement txs must beat the pending one by >= 10% (geth/anvil); bump a bit more so every bump is accepted.
+_MIN_BUMP_PERCENT = 12.5
+_GWEI = 10**9
+
+
+def _hex_int(v: Any) -> int:
+    if v is None:
+        return 0
+    if isinstance(v, int):
+        return v
+    return int(str(v), 16)
+
+
+def _iso_age_seconds(iso: str | None) -> float:
+    if not iso:
+        return float("inf")
+    dt = datetime.fromisoformat(str(iso).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - dt).total_seconds()
+
+
+class AnchorTxManager:
+    """
+    Sends queued postAnchor() transactions from the anchoring EOA without blocking anyone:
+    - nonces are tracked locally (one eth_getTransactionCount at startup or after a nonce error)
+    - a tx without a receipt after `bump_after_seconds` is re-sent with the same nonce and higher fees
+    - receipts for every in-flight hash (including replaced ones) are fetched in one batch per tick
+    - mined txs are recorded via set_anchor_receipt / set_anchor_rollup_receipt
+
+    Run exactly one manager per sending address (server/anchor_worker.py).
+    """
+
+    def __init__(
+        self,
+        store: Store,
+        *,
+        rpc: RpcClient | None = None,
+        private_key: str | None = None,
+        bump_after_seconds: float | None = None,
+        bump_percent: float | None = None,
+        max_fee_gwei: float | None = None,
+        max_attempts: int | None = None,
+        send_batch: int = 20,
+    ) -> None:
+        from eth_account import Account  # installed with web3
+
+        self.store = store
+        self.rpc = rpc or get_rpc_client()
+        self._acct = Account.from_key(private_key or settings.ANCHORING_EOA_PRIVATE_KEY)
+        self.address = str(self._acct.address).lower()
+        self.bump_after_seconds = float(bump_after_seconds if bump_after_seconds is not None else settings.ANCHOR_TX_BUMP_AFTER_SECONDS)
+        self.bump_percent = max(_MIN_BUMP_PERCENT, float(bump_percent if bump_percent is not None else settings.ANCHOR_TX_BUMP_PERCENT))
+        cap = float(max_fee_gwei if max_fee_gwei is not None else settings.ANCHOR_TX_MAX_FEE_GWEI)
+        self.max_fee_wei = int(cap * _GWEI) if cap > 0 else 0
+        self.max_attempts = max(1, int(max_attempts if max_attempts is not None else settings.ANCHOR_TX_MAX_ATTEMPTS))
+        self.send_batch = max(1, int(send_batch))
+        # Checksummed for tx fields (eth-account rejects a lowercase `to`); lowercase for comparing receipt logs.
+        self.registry_checksum = Web3.to_checksum_address(settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS)
+        self.registry = self.registry_checksum.lower()
+        self._chain_id: int | None = None
+        self._next_nonce: int | None = None
+
+    # ---- chain state ----
+    def _ensure_chain(self) -> None:
+        if self._chain_id is None:
+            self._chain_id = _hex_int(self.rpc.call("eth_chainId", []))
+            if int(settings.CHAIN_ID) and int(settings.CHAIN_ID) != self._chain_id:
+                raise RuntimeError(f"CHAIN_ID mismatch: settings={settings.CHAIN_ID} rpc={self._chain_id}")
+        if self._next_nonce is None:
+            self._sync_nonce()
+
+    def _sync_nonce(self) -> None:
+        # "pending" includes our in-mempool txs; stored nonces cover txs the node may have dropped (re-sent on bump).
+        chain_next = _hex_int(self.rpc.call("eth_getTransactionCount", [self.address, "pending"]))
+        stored = self.store.max_anchor_tx_nonce(from_address=self.address)
+        self._next_nonce = max(chain_next, (stored + 1) if stored is not None else 0)
+
+    def _fees(self) -> dict[str, int]:
+        block = self.rpc.call("eth_getBlockByNumber", ["latest", False]) or {}
+        base_fee = block.get("baseFeePerGas")
+        if base_fee is None:
+            return {"gas_price": _hex_int(self.rpc.call("eth_gasPrice", []))}
+        try:
+            tip = _hex_int(self.rpc.call("eth_maxPriorityFeePerGas", []))
+        except RpcError:
+            tip = 0
+        tip = tip or _GWEI // 1000  # 0.001 gwei floor
+        return {"max_fee_per_gas": _hex_int(base_fee) * 2 + tip, "max_priority_fee_per_gas": tip}
+
+    def _cap(self, fee: int) -> int:
+        return min(fee, self.max_fee_wei) if self.max_fee_wei else fee
+
+    # ---- tx building ----
+    def _calldata(self, tx: dict[str, Any]) -> str | None:
+        if tx["kind"] == "job":
+            a = self.store.get_anchor_batch(tx["target_id"])
+            root, uri, ver, salt = (a or {}).get("anchor_root"), (a or {}).get("anchor_uri"), (a or {}).get("schema_version"), (a or {}).get("salt")
+        else:
+            r = self.store.get_anchor_rollup(tx["target_id"])
+            root, uri, ver, salt = (r or {}).get("merkle_root"), (r or {}).get("anchor_uri"), (r or {}).get("schema_version"), (r or {}).get("salt")
+        if not root:
+            return None
+        return encode_post_anchor_calldata(root_hex=str(root), uri=str(uri), schema_version=int(ver or 1), salt_hex=str(salt))
+
+    def _sign_and_send(self, *, nonce: int, data: str, gas: int, fees: dict[str, int]) -> str:
+        txd: dict[str, Any] = {
+            "to": self.registry_checksum,
+            "data": data,
+            "value": 0,
+            "nonce": int(nonce),
+            "gas": int(gas),
+            "chainId": int(self._chain_id or 0),
+        }
+        if "gas_price" in fees:
+            txd["gasPrice"] = int(fees["gas_price"])
+        else:
+            txd["maxFeePerGas"] = int(fees["max_fee_per_gas"])
+            txd["maxPriorityFeePerGas"] = int(fees["max_priority_fee_per_gas"])
+        signed = self._acct.sign_transaction(txd)
+        raw = getattr(signed, "raw_transaction", None) or getattr(signed, "rawTransaction")
+        tx_hash = "0x" + bytes(signed.hash).hex()
+        try:
+            self.rpc.call("eth_sendRawTransaction", ["0x" + bytes(raw).hex()])
+        except RpcError as e:
+            if "already known" not in str(e).lower():
+                raise
+        return tx_hash
+
+    # ---- one pass ----
+    def tick(self) -> dict[str, int]:
+        self._ensure_chain()
+        stats = {"mined": 0, "failed": 0, "bumped": 0, "sent": 0}
+        self._poll_receipts(stats)
+        self._bump_stuck(stats)
+        self._send_queued(stats)
+        return stats
+
+    def _poll_receipts(self, stats: dict[str, int]) -> None:
+        inflight = self.store.list_anchor_txs(statuses=["sent"], limit=500)
+        hashes: list[tuple[dict[str, Any], str]] = [(tx, h) for tx in inflight for h in (tx.get("tx_hashes") or [tx.get("tx_hash")]) if h]
+        if not hashes:
+            return
+        receipts = self.rpc.batch("eth_getTransactionReceipt", [[h] for _, h in hashes])
+        done: set[str] = set()
+        for (tx, h), rcpt in zip(hashes, receipts):
+            if tx["id"] in done or not isinstance(rcpt, dict) or not rcpt.get("blockNumber"):
+                continue
+            done.add(tx["id"])
+            block = _hex_int(rcpt.get("blockNumber"))
+            if _hex_int(rcpt.get("status", "0x1")) != 1:
+                self.store.update_anchor_tx(
+                    tx_id=tx["id"],
+                    fields={"status": "failed", "tx_hash": h, "block_number": block, "last_error": "reverted", "mined_at": utc_now_iso()},
+                )
+                stats["failed"] += 1
+                continue
+            log_index = 0
+            for lg in rcpt.get("logs") or []:
+                if str(lg.get("address") or "").lower() == self.registry:
+                    log_index = _hex_int(lg.get("logIndex"))
+                    break
+            receipt = {
+                "anchor_tx_hash": h,
+                "anchor_chain_id": int(self._chain_id or 0),
+                "anchor_contract_address": self.registry,
+                "anchor_block_number": block,
+                "anchor_log_index": log_index,
+            }
+            if tx["kind"] == "job":
+                self.store.set_anchor_receipt(job_id=tx["target_id"], **receipt)
+            else:
+                self.store.set_anchor_rollup_receipt(rollup_id=tx["target_id"], **receipt)
+            self.store.update_anchor_tx(
+                tx_id=tx["id"], fields={"status": "mined", "tx_hash": h, "block_number": block, "mined_at": utc_now_iso()}
+            )
+            stats["mined"] += 1
+
+    def _bump_stuck(self, stats: dict[str, int]) -> None:
+        market: dict[str, int] | None = None
+        for tx in self.store.list_anchor_txs(statuses=["sent"], limit=500):
+            if _iso_age_seconds(tx.get("sent_at")) < self.bump_after_seconds:
+                continue
+            data = self._calldata(tx)
+            if data is None:
+                continue
+            market = market or self._fees()
+            mult = 1.0 + self.bump_percent / 100.0
+            if "gas_price" in market:
+                fees = {"gas_price": self._cap(max(int(int(tx.get("gas_price") or 0) * mult) + 1, market["gas_price"]))}
+            else:
+                fees = {
+                    "max_fee_per_gas": self._cap(max(int(int(tx.get("max_fee_per_gas") or 0) * mult) + 1, market["max_fee_per_gas"])),
+                    "max_priority_fee_per_gas": max(
+                        int(int(tx.get("max_priority_fee_per_gas") or 0) * mult) + 1, market["max_priority_fee_per_gas"]
+                    ),
+                }
+                fees["max_priority_fee_per_gas"] = min(fees["max_priority_fee_per_gas"], fees["max_fee_per_gas"])
+            if all(int(fees[k]) <= int(tx.get(k) or 0) for k in fees):
+                continue  # at the fee cap: keep waiting
+            try:
+                h = self._sign_and_send(nonce=int(tx["nonce"]), data=data, gas=int(tx.get("gas_limit") or 350_000), fees=fees)
+            except RpcError as e:
+                self.store.update_anchor_tx(tx_id=tx["id"], fields={"last_error": f"bump: {e}"})
+                continue
+            except Exception as e:
+                # Not the node's answer (signing/encoding bug on this row): record it and keep the rest of the tick going.
+                logger.exception("anchor_tx_bump_failed id=%s", tx["id"])
+                self.store.update_anchor_tx(tx_id=tx["id"], fields={"last_error": f"bump: {e!r}"})
+                continue
+            self.store.update_anchor_tx(
+                tx_id=tx["id"],
+                fields={
+                    **fees,
+                    "tx_hash": h,
+                    "tx_hashes": [*(tx.get("tx_hashes") or []), h],
+                    "bumps": int(tx.get("bumps") or 0) + 1,
+                    "sent_at": utc_now_iso(),
+                },
+            )
+            stats["bumped"] += 1
+
+    def _send_queued(self, stats: dict[str, int]) -> None:
+        queued = self.store.list_anchor_txs(statuses=["queued"], limit=self.send_batch)
+        if not queued:
+            return
+        fees = self._fees()
+        fees = {k: (self._cap(v) if k != "max_priority_fee_per_gas" else v) for k, v in fees.items()}
+        for tx in queued:
+            if tx["kind"] == "job" and (self.store.get_anchor_batch(tx["target_id"]) or {}).get("rollup_id"):
+                # Rolled up between the broadcast request and now: the rollup tx anchors it.
+                self.store.update_anchor_tx(tx_id=tx["id"], fields={"status": "failed", "last_error": "included in rollup"})
+                stats["failed"] += 1
+                continue
+            data = self._calldata(tx)
+            if data is None:
+                self.store.update_anchor_tx(tx_id=tx["id"], fields={"status": "failed", "last_error": "anchor target not found"})
+                stats["failed"] += 1
+                continue
+            nonce = int(self._next_nonce or 0)
+            try:
+                est = _hex_int(self.rpc.call("eth_estimateGas", [{"from": self.address, "to": self.registry_checksum, "data": data}]))
+                gas = int(est * 1.2) + 10_000
+                h = self._sign_and_send(nonce=nonce, data=data, gas=gas, fees=fees)
+            except RpcError as e:
+                attempts = int(tx.get("attempts") or 0) + 1
+                status = "failed" if attempts >= self.max_attempts else "queued"
+                self.store.update_anchor_tx(tx_id=tx["id"], fields={"attempts": attempts, "status": status, "last_error": str(e)})
+                if "nonce" in str(e).lower():
+                    self._sync_nonce()
+                stats["failed"] += 1 if status == "failed" else 0
+                continue
+            except Exception as e:
+                # A row that cannot even be signed will not succeed on retry: fail it so it does not stall the queue.
+                logger.exception("anchor_tx_send_failed id=%s", tx["id"])
+                self.store.update_anchor_tx(
+                    tx_id=tx["id"],
+                    fields={"attempts": int(tx.get("attempts") or 0) + 1, "status": "failed", "last_error": repr(e)},
+                )
+                stats["failed"] += 1
+                continue
+            self._next_nonce = nonce + 1
+            self.store.update_anchor_tx(
+                tx_id=tx["id"],
+                fields={
+                    **fees,
+                    "status": "sent",
+                    "from_address": self.address,
+                    "nonce": nonce,
+                    "tx_hash": h,
+                    "tx_hashes": [h],
+                    "gas_limit": gas,
+                    "attempts": int(tx.get("attempts") or 0) + 1,
+                    "last_error": None,
+                    "sent_at": utc_now_iso(),
+                },
+            )
+            stats["sent"] += 1
+
+
+def tx_manager_enabled() -> bool:
+    return bool(
+        settings.ANCHORING_ENABLED
+        and settings.ANCHORING_EOA_PRIVATE_KEY
+        and (settings.RPC_URL or "").strip()
+        and settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS.lower() != "0x" + "0" * 40
+    )
+
+
+def run_loop(store: Store) -> None:
+    """
+    Anchor worker loop: build rollups every ANCHOR_ROLLUP_POLL_SECONDS (if enabled) and run the tx manager
+    every ANCHOR_TX_POLL_SECONDS (if an EOA key is configured).
+    """
+    mgr = AnchorTxManager(store) if tx_manager_enabled() else None
+    tx_poll = max(1, int(settings.ANCHOR_TX_POLL_SECONDS))
+    rollup_every = timedelta(seconds=max(1, int(settings.ANCHOR_ROLLUP_POLL_SECONDS)))
+    next_rollup = datetime.now(timezone.utc)
+    while True:
+        if settings.ANCHOR_ROLLUP_ENABLED and datetime.now(timezone.utc) >= next_rollup:
+            next_rollup = datetime.now(timezone.utc) + rollup_every
+            try:
+                res = anchor_rollup_once(store)
+                if res["rollup_id"]:
+                    logger.info("anchor_rollup %s", res)
+            except Exception:
+                logger.exception("anchor_rollup_failed")
+        if mgr is not None:
+            try:
+                stats = mgr.tick()
+                if any(stats.values()):
+                    logger.info("anchor_tx %s", stats)
+            except Exception:
+                logger.exception("anchor_tx_tick_failed")
+                mgr._chain_id = None
+                mgr._next_nonce = None
+        time.sleep(tx_poll)
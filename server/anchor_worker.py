@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+
+from server.anchor_tx import AnchorTxManager, run_loop, tx_manager_enabled
+from server.anchoring import anchor_rollup_once
+from server.config import settings
+from server.storage import get_store
+
+
+logger = logging.getLogger("agora.anchor_worker")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Project Agora anchor worker (rollups + EOA tx manager)")
+    parser.add_argument("--once", action="store_true", help="Build a single rollup, run one tx manager pass and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    if not settings.ANCHOR_ROLLUP_ENABLED and not tx_manager_enabled():
+        logger.info("anchor_worker_disabled")
+        return 0
+
+    store = get_store()
+
+    if args.once:
+        if settings.ANCHOR_ROLLUP_ENABLED:
+            logger.info("anchor_rollup_once_done %s", anchor_rollup_once(store))
+        if tx_manager_enabled():
+            logger.info("anchor_tx_tick_done %s", AnchorTxManager(store).tick())
+        return 0
+
+    logger.info(
+        "anchor_worker_started rollups=%s poll=%s max_jobs=%s tx_manager=%s tx_poll=%s",
+        settings.ANCHOR_ROLLUP_ENABLED,
+        settings.ANCHOR_ROLLUP_POLL_SECONDS,
+        settings.ANCHOR_ROLLUP_MAX_JOBS,
+        tx_manager_enabled(),
+        settings.ANCHOR_TX_POLL_SECONDS,
+    )
+    run_loop(store)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -2,30 +2,48 @@ from __future__ import annotations
 
 import hashlib
 import json
+import logging
+import os
 import secrets
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from threading import Lock
+from typing import Any, BinaryIO, Iterable
 
+from web3 import Web3
+
+from server.artifacts import get_artifact_store
 from server.config import settings
+from server.merkle import build_levels, proof_for, verify_proof
 from server.storage import Store
 
+logger = logging.getLogger("agora.anchoring")
+
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
 
-def _canonical_json_bytes(obj: Any) -> bytes:
+def _canonical_json(obj: Any) -> str:
     # Canonical-ish: stable key ordering + compact separators.
     # ensure_ascii=False keeps UTF-8 stable for any unicode content.
-    s = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
-    return s.encode("utf-8")
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _canonical_json_bytes(obj: Any) -> bytes:
+    return _canonical_json(obj).encode("utf-8")
+
+
+_SNAPSHOT_COMMENT_LIMIT = 500
 
 
 def build_job_snapshot(store: Store, job_id: str) -> dict[str, Any]:
     """
     Build a canonical snapshot payload for a job at close time.
     Offchain DB remains source-of-truth; this snapshot is meant for transparency + future anchoring.
+    In-memory reference form of write_job_snapshot (which streams the same bytes to a file).
     """
     job = store.get_job(job_id)
     if not job:
@@ -36,13 +54,11 @@ def build_job_snapshot(store: Store, job_id: str) -> dict[str, Any]:
     final_votes = list(store.list_final_votes_for_job(job_id))
 
     # Discussion threads
-    job_comments = list(store.list_comments(target_type="job", target_id=job_id, limit=500))
-    submission_comments: dict[str, list[dict]] = {}
-    for sub in submissions:
-        sid = str(sub.get("id") or "")
-        if not sid:
-            continue
-        submission_comments[sid] = list(store.list_comments(target_type="submission", target_id=sid, limit=500))
+    job_comments = list(store.list_comments(target_type="job", target_id=job_id, limit=_SNAPSHOT_COMMENT_LIMIT))
+    sids = [str(sub.get("id") or "") for sub in submissions if sub.get("id")]
+    submission_comments: dict[str, list[dict]] = {sid: [] for sid in sids}
+    for c in store.iter_comments_for_targets(target_type="submission", target_ids=sids, limit_per_target=_SNAPSHOT_COMMENT_LIMIT):
+        submission_comments[str(c.get("target_id") or "")].append(c)
 
     return {
         "schema_version": int(getattr(settings, "ANCHOR_SCHEMA_VERSION", 1)),
@@ -55,9 +71,100 @@ def build_job_snapshot(store: Store, job_id: str) -> dict[str, Any]:
     }
 
 
+class _HashingWriter:
+    """Buffered UTF-8 writer that feeds sha256 with exactly the bytes written to `out`."""
+
+    def __init__(self, out: BinaryIO, *, buffer_bytes: int = 1 << 16) -> None:
+        self._out = out
+        self._hash = hashlib.sha256()
+        self._buf: list[bytes] = []
+        self._buffered = 0
+        self._limit = int(buffer_bytes)
+
+    def write(self, s: str) -> None:
+        b = s.encode("utf-8")
+        self._buf.append(b)
+        self._buffered += len(b)
+        if self._buffered >= self._limit:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buf:
+            return
+        data = b"".join(self._buf)
+        self._hash.update(data)
+        self._out.write(data)
+        self._buf = []
+        self._buffered = 0
+
+    def hexdigest(self) -> str:
+        self.flush()
+        return self._hash.hexdigest()
+
+
+def _write_array(w: _HashingWriter, rows: Iterable[Any]) -> None:
+    w.write("[")
+    for i, row in enumerate(rows):
+        if i:
+            w.write(",")
+        w.write(_canonical_json(row))
+    w.write("]")
+
+
+def write_job_snapshot(store: Store, job_id: str, out: BinaryIO, *, generated_at: str | None = None) -> str:
+    """
+    Stream the snapshot of build_job_snapshot to `out` and return sha256 of the written bytes (hex).
+
+    Output is byte-identical to _canonical_json_bytes(build_job_snapshot(...)): keys are emitted in sorted
+    order by hand and every row is encoded with the same json.dumps settings, so the anchor root format is
+    unchanged. Submission comments come from one batched query and are written as they stream in.
+    """
+    job = store.get_job(job_id)
+    if not job:
+        raise KeyError("job not found")
+    submissions = list(store.list_submissions_for_job(job_id))
+    sids = sorted({str(sub.get("id") or "") for sub in submissions if sub.get("id")})
+
+    w = _HashingWriter(out)
+    # Top-level keys in sorted order: comments, final_votes, generated_at, job, schema_version, submissions, votes.
+    w.write('{"comments":{"job":')
+    _write_array(w, store.list_comments(target_type="job", target_id=job_id, limit=_SNAPSHOT_COMMENT_LIMIT))
+    w.write(',"submissions":{')
+    stream = iter(
+        store.iter_comments_for_targets(target_type="submission", target_ids=sids, limit_per_target=_SNAPSHOT_COMMENT_LIMIT)
+    )
+    pending = next(stream, None)
+    for i, sid in enumerate(sids):
+        if i:
+            w.write(",")
+        w.write(_canonical_json(sid) + ":[")
+        first = True
+        while pending is not None and str(pending.get("target_id") or "") == sid:
+            if not first:
+                w.write(",")
+            w.write(_canonical_json(pending))
+            first = False
+            pending = next(stream, None)
+        w.write("]")
+    if pending is not None:
+        raise RuntimeError("submission comments were not ordered by target_id")
+    w.write('}},"final_votes":')
+    _write_array(w, store.list_final_votes_for_job(job_id))
+    w.write(',"generated_at":' + _canonical_json(generated_at or _utc_now_iso()))
+    w.write(',"job":' + _canonical_json(job))
+    w.write(',"schema_version":' + _canonical_json(int(getattr(settings, "ANCHOR_SCHEMA_VERSION", 1))))
+    w.write(',"submissions":')
+    _write_array(w, submissions)
+    w.write(',"votes":')
+    _write_array(w, store.list_votes_for_job(job_id))
+    w.write("}")
+    return w.hexdigest()
+
+
 def create_job_anchor_snapshot(*, store: Store, job_id: str) -> dict[str, Any]:
     """
-    Create (idempotently) an offchain anchor batch row + write the snapshot JSON to a static URI.
+    Create (idempotently) an offchain anchor batch row + store the snapshot JSON in the anchor artifact store.
+    The snapshot is content-addressed by its root (sha256 of the served bytes): anchor_uri is /anchors/<root>.json.
     Returns the anchor batch dict.
     """
     # If already created, return existing.
@@ -65,27 +172,238 @@ def create_job_anchor_snapshot(*, store: Store, job_id: str) -> dict[str, Any]:
     if existing:
         return existing
 
-    snapshot = build_job_snapshot(store, job_id)
-    data = _canonical_json_bytes(snapshot)
+    artifacts = get_artifact_store()
+    fd, tmp_name = tempfile.mkstemp(prefix=f"agora-anchor-{job_id}.", suffix=".json")
+    tmp = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            root_hex = "0x" + write_job_snapshot(store, job_id, f)
+        artifacts.put_file(tmp, root_hex)
+
+        salt_hex = "0x" + secrets.token_hex(32)
+        schema_version = int(getattr(settings, "ANCHOR_SCHEMA_VERSION", 1))
+        batch = store.upsert_anchor_batch(
+            job_id=job_id,
+            anchor_root=root_hex,
+            anchor_uri=artifacts.url_for(root_hex),
+            schema_version=schema_version,
+            salt=salt_hex,
+        )
+        # First writer wins (upsert keeps the existing row); a losing writer's snapshot is never referenced.
+        if batch.get("anchor_root") != root_hex:
+            artifacts.delete(root_hex)
+        return batch
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+_snapshot_lock = Lock()
+_snapshot_pending: set[str] = set()
+_snapshot_executor: ThreadPoolExecutor | None = None
+
+
+def _run_scheduled_snapshot(store: Store, job_id: str) -> None:
+    try:
+        create_job_anchor_snapshot(store=store, job_id=job_id)
+    except Exception as e:
+        logger.warning("anchor_snapshot_failed job_id=%s: %s", job_id, e)
+    finally:
+        with _snapshot_lock:
+            _snapshot_pending.discard(job_id)
+
 
-    root_hex = "0x" + hashlib.sha256(data).hexdigest()
-    salt_hex = "0x" + secrets.token_hex(32)
+def schedule_job_anchor_snapshot(*, store: Store, job_id: str) -> bool:
+    """
+    Build the anchor snapshot on a background thread so close requests do not wait for it.
+    Duplicate requests for a job that is already queued are dropped. If the process exits first, the
+    snapshot is still created on demand (admin prepare/broadcast call create_job_anchor_snapshot).
+    """
+    global _snapshot_executor
+    jid = str(job_id)
+    with _snapshot_lock:
+        if jid in _snapshot_pending:
+            return False
+        _snapshot_pending.add(jid)
+        if _snapshot_executor is None:
+            _snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agora-anchor-snapshot")
+        executor = _snapshot_executor
+    executor.submit(_run_scheduled_snapshot, store, jid)
+    return True
+
+
+# ---- Onchain posting (AgoraAnchorRegistry.postAnchor) ----
+
+ANCHOR_REGISTRY_ABI = [
+    {
+        "type": "function",
+        "name": "postAnchor",
+        "stateMutability": "nonpayable",
+        "inputs": [
+            {"name": "root", "type": "bytes32"},
+            {"name": "uri", "type": "string"},
+            {"name": "schemaVersion", "type": "uint32"},
+            {"name": "salt", "type": "bytes32"},
+        ],
+        "outputs": [],
+    }
+]
+
+
+def _registry(w3: Web3) -> Any:
+    return w3.eth.contract(address=Web3.to_checksum_address(settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS), abi=ANCHOR_REGISTRY_ABI)
+
+
+def encode_post_anchor_calldata(*, root_hex: str, uri: str, schema_version: int, salt_hex: str) -> str:
+    """Calldata for postAnchor() (no RPC needed); for Safe/multisig execution."""
+    return _registry(Web3()).encode_abi(
+        "postAnchor",
+        args=[Web3.to_bytes(hexstr=root_hex), uri, int(schema_version), Web3.to_bytes(hexstr=salt_hex)],
+    )
+
+
+# ---- Multi-job rollups: one onchain root per batch of job snapshots ----
+
+ROLLUP_LEAF_ENCODING = "sha256(sha256(anchor_root_bytes32 || utf8(job_id)))"
+ROLLUP_PAIR_HASH = "sha256(sorted(a, b))"
+
+
+def _sha256(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def rollup_leaf(*, job_id: str, anchor_root: str) -> bytes:
+    # Binds the job id to its snapshot root; double hashing keeps leaves distinct from inner nodes.
+    return _sha256(_sha256(bytes.fromhex(str(anchor_root)[2:]) + str(job_id).encode("utf-8")))
+
+
+def build_anchor_rollup(store: Store, *, max_jobs: int | None = None) -> dict[str, Any] | None:
+    """
+    Collect unanchored job snapshots (oldest first), commit to their roots with one Merkle tree, put the
+    manifest (members + inclusion proofs) in the anchor artifact store and save the rollup with a proof
+    per job. Returns the rollup dict, or None if nothing is pending or a concurrent builder claimed a member.
+    """
+    limit = max(1, int(max_jobs if max_jobs is not None else settings.ANCHOR_ROLLUP_MAX_JOBS))
+    batches = store.list_unrolled_anchor_batches(limit=limit)
+    if not batches:
+        return None
+
+    levels = build_levels([rollup_leaf(job_id=b["job_id"], anchor_root=b["anchor_root"]) for b in batches], hash_fn=_sha256)
+    root_hex = "0x" + levels[-1][0].hex()
+    rollup_id = "r_" + secrets.token_hex(12)
+    members = [
+        {
+            "job_id": b["job_id"],
+            "anchor_root": b["anchor_root"],
+            "anchor_uri": b["anchor_uri"],
+            "rollup_index": i,
+            "rollup_proof": ["0x" + p.hex() for p in proof_for(levels, i)],
+        }
+        for i, b in enumerate(batches)
+    ]
     schema_version = int(getattr(settings, "ANCHOR_SCHEMA_VERSION", 1))
+    manifest = {
+        "type": "anchor_rollup",
+        "schema_version": schema_version,
+        "rollup_id": rollup_id,
+        "merkle_root": root_hex,
+        "leaf_encoding": ROLLUP_LEAF_ENCODING,
+        "pair_hash": ROLLUP_PAIR_HASH,
+        "generated_at": _utc_now_iso(),
+        "members": members,
+    }
+    artifacts = get_artifact_store()
+    digest = artifacts.put_bytes(_canonical_json_bytes(manifest))
 
-    # Write under server/static so it is served at /static/...
-    static_dir = Path(__file__).resolve().parent / "static" / "anchors"
-    static_dir.mkdir(parents=True, exist_ok=True)
-    p = static_dir / f"{job_id}.json"
-    p.write_bytes(data + b"\n")
-
-    base = str(getattr(settings, "BASE_URL", "http://localhost:8000")).rstrip("/")
-    uri = f"{base}/static/anchors/{job_id}.json"
-
-    return store.upsert_anchor_batch(
-        job_id=job_id,
-        anchor_root=root_hex,
-        anchor_uri=uri,
-        schema_version=schema_version,
-        salt=salt_hex,
+    rollup = store.create_anchor_rollup(
+        rollup={
+            "id": rollup_id,
+            "merkle_root": root_hex,
+            "leaf_count": len(members),
+            "schema_version": schema_version,
+            "salt": "0x" + secrets.token_hex(32),
+            "anchor_uri": artifacts.url_for(digest),
+        },
+        members=members,
     )
+    if rollup is None:
+        artifacts.delete(digest)
+        logger.info("anchor_rollup_conflict rollup_id=%s (members claimed concurrently)", rollup_id)
+    return rollup
 
+
+def anchor_rollup_once(store: Store) -> dict[str, Any]:
+    """
+    One worker pass: build a rollup from pending snapshots and, when an EOA key is configured, queue its
+    postAnchor() tx for the tx manager (server/anchor_tx.py). Without a key the rollup waits for the operator
+    (prepare calldata for the Safe, then record the receipt).
+    """
+    rollup = build_anchor_rollup(store)
+    if rollup is None:
+        return {"rollup_id": None, "jobs": 0, "queued": False}
+    queued = False
+    if settings.ANCHORING_ENABLED and settings.ANCHORING_EOA_PRIVATE_KEY and (settings.RPC_URL or "").strip():
+        store.enqueue_anchor_tx(kind="rollup", target_id=rollup["id"])
+        queued = True
+    return {"rollup_id": rollup["id"], "jobs": int(rollup["leaf_count"]), "queued": queued, "merkle_root": rollup["merkle_root"]}
+
+
+def verify_job_anchor(store: Store, job_id: str) -> dict[str, Any]:
+    """
+    Check a job's anchor: for rolled-up snapshots, recompute the leaf from (job_id, anchor_root) and fold the
+    stored inclusion proof up to the rollup root; for snapshots posted on their own the root is the leaf.
+    `posted` reports whether the covering root has an onchain receipt.
+    """
+    batch = store.get_anchor_batch(job_id)
+    if not batch:
+        raise KeyError("Anchor not found")
+    out: dict[str, Any] = {
+        "job_id": str(job_id),
+        "anchor_root": batch["anchor_root"],
+        "anchor_uri": batch["anchor_uri"],
+        "mode": "none",
+        "leaf": None,
+        "rollup_id": None,
+        "rollup_root": None,
+        "rollup_index": None,
+        "proof": [],
+        "verified": False,
+        "posted": False,
+        "anchor_tx_hash": None,
+        "anchor_chain_id": None,
+        "anchor_contract_address": None,
+        "anchor_block_number": None,
+    }
+    receipt_src: dict[str, Any] | None = None
+    if batch.get("rollup_id"):
+        rollup = store.get_anchor_rollup(str(batch["rollup_id"]))
+        if rollup:
+            leaf = rollup_leaf(job_id=str(job_id), anchor_root=batch["anchor_root"])
+            proof = [str(p) for p in (batch.get("rollup_proof") or [])]
+            out.update(
+                {
+                    "mode": "rollup",
+                    "leaf": "0x" + leaf.hex(),
+                    "rollup_id": rollup["id"],
+                    "rollup_root": rollup["merkle_root"],
+                    "rollup_index": batch.get("rollup_index"),
+                    "proof": proof,
+                    "verified": verify_proof(
+                        leaf, [bytes.fromhex(p[2:]) for p in proof], bytes.fromhex(rollup["merkle_root"][2:]), hash_fn=_sha256
+                    ),
+                }
+            )
+            receipt_src = rollup
+    elif batch.get("anchor_tx_hash"):
+        out.update({"mode": "direct", "verified": True})
+        receipt_src = batch
+    if receipt_src and receipt_src.get("anchor_tx_hash"):
+        out.update(
+            {
+                "posted": True,
+                "anchor_tx_hash": receipt_src.get("anchor_tx_hash"),
+                "anchor_chain_id": receipt_src.get("anchor_chain_id"),
+                "anchor_contract_address": receipt_src.get("anchor_contract_address"),
+                "anchor_block_number": receipt_src.get("anchor_block_number"),
+            }
+        )
+    return out
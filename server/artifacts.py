@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterator, Protocol
+
+from server.config import settings
+from server.discovery import accepts_encoding
+
+try:  # optional: zstd variants are only produced when the module is installed
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger("agora.artifacts")
+
+_CHUNK = 1 << 16
+_IMMUTABLE = "public, max-age=31536000, immutable"
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Content-Encoding -> key suffix of the pre-compressed variant (preference order when serving).
+ENCODINGS: tuple[tuple[str, str], ...] = (("zstd", ".zst"), ("gzip", ".gz"))
+
+
+class ArtifactBackend(Protocol):
+    """
+    Blob storage for immutable artifacts. Keys are relative, '/'-separated paths. Local FS today; an object
+    storage backend (S3/GCS/R2) maps these onto head/get(Range)/put/delete of the same keys.
+    """
+
+    def size(self, key: str) -> int | None: ...
+    def iter_bytes(self, key: str, *, start: int = 0, end: int | None = None) -> Iterator[bytes]: ...
+    def put_file(self, key: str, src: Path) -> None: ...
+    def delete(self, key: str) -> None: ...
+
+
+class LocalArtifactBackend:
+    """Files under `root`; writes go through a temp file + os.replace so readers never see partial objects."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        parts = [p for p in str(key).split("/") if p]
+        if not parts or any(p in (".", "..") for p in parts):
+            raise ValueError(f"Invalid artifact key: {key!r}")
+        return self.root.joinpath(*parts)
+
+    def size(self, key: str) -> int | None:
+        try:
+            return self._path(key).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def iter_bytes(self, key: str, *, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        """Yield bytes [start, end] (inclusive end, like HTTP ranges); end=None reads to EOF."""
+        with self._path(key).open("rb") as f:
+            f.seek(int(start))
+            remaining = None if end is None else int(end) - int(start) + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(_CHUNK if remaining is None else min(_CHUNK, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def put_file(self, key: str, src: Path) -> None:
+        dst = self._path(key)
+        if dst.exists():
+            return  # immutable: same key, same bytes
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out, Path(src).open("rb") as f:
+                shutil.copyfileobj(f, out, _CHUNK)
+            os.replace(tmp_name, dst)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+@dataclass(frozen=True)
+class ArtifactVariant:
+    key: str
+    size: int
+    encoding: str | None  # None = identity
+
+
+class AnchorArtifactStore:
+    """
+    Content-addressed anchor artifacts (job snapshots, rollup manifests).
+
+    An artifact is stored once under its sha256: sha256/<d[0:2]>/<d[2:4]>/<d>.json, so directories stay small
+    and the URL is a checksum of the bytes it serves. Pre-compressed siblings (.json.gz, plus .json.zst when
+    `zstandard` is installed) are written alongside and served with Content-Encoding; identity is always kept
+    for range requests and clients that do not negotiate. Objects never change, so responses are cacheable
+    forever.
+    """
+
+    def __init__(self, backend: ArtifactBackend, *, ext: str = "json") -> None:
+        self.backend = backend
+        self.ext = ext
+
+    @staticmethod
+    def valid_digest(digest: str) -> bool:
+        return bool(_DIGEST_RE.match(str(digest or "")))
+
+    def key_for(self, digest: str) -> str:
+        d = str(digest).lower().removeprefix("0x")
+        if not self.valid_digest(d):
+            raise ValueError("Invalid artifact digest")
+        return f"sha256/{d[0:2]}/{d[2:4]}/{d}.{self.ext}"
+
+    def exists(self, digest: str) -> bool:
+        return self.backend.size(self.key_for(digest)) is not None
+
+    def put_file(self, src: Path, digest: str) -> str:
+        """
+        Store `src` (whose sha256 is `digest`) plus its compressed variants; returns the identity key.
+        Variants are written before the identity object, which marks the artifact complete.
+        """
+        key = self.key_for(digest)
+        if self.backend.size(key) is not None:
+            return key
+        src = Path(src)
+        with tempfile.TemporaryDirectory(prefix="agora-artifact-") as tmp_dir:
+            gz = Path(tmp_dir) / "v.gz"
+            with src.open("rb") as f, gz.open("wb") as raw:
+                with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0) as out:
+                    shutil.copyfileobj(f, out, _CHUNK)
+            self._put_if_smaller(key + ".gz", gz, src)
+            if zstandard is not None:
+                zst = Path(tmp_dir) / "v.zst"
+                with src.open("rb") as f, zst.open("wb") as out:
+                    zstandard.ZstdCompressor(level=19).copy_stream(f, out)
+                self._put_if_smaller(key + ".zst", zst, src)
+        self.backend.put_file(key, src)
+        return key
+
+    def put_bytes(self, data: bytes) -> str:
+        """Store `data` under its own sha256; returns the hex digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        if self.exists(digest):
+            return digest
+        fd, tmp_name = tempfile.mkstemp(prefix="agora-artifact-", suffix=f".{self.ext}")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            self.put_file(Path(tmp_name), digest)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+        return digest
+
+    def _put_if_smaller(self, key: str, variant: Path, src: Path) -> None:
+        # Tiny documents can grow when compressed; only keep a variant that is actually smaller.
+        if variant.stat().st_size < src.stat().st_size:
+            self.backend.put_file(key, variant)
+
+    def delete(self, digest: str) -> None:
+        key = self.key_for(digest)
+        self.backend.delete(key)
+        for _, suffix in ENCODINGS:
+            self.backend.delete(key + suffix)
+
+    def variants(self, digest: str) -> list[ArtifactVariant]:
+        """Identity first, then stored encodings in ENCODINGS order. Empty if the artifact does not exist."""
+        key = self.key_for(digest)
+        size = self.backend.size(key)
+        if size is None:
+            return []
+        out = [ArtifactVariant(key=key, size=size, encoding=None)]
+        for coding, suffix in ENCODINGS:
+            vsize = self.backend.size(key + suffix)
+            if vsize is not None:
+                out.append(ArtifactVariant(key=key + suffix, size=vsize, encoding=coding))
+        return out
+
+    def respond(self, digest: str, headers: Any, response_cls: Any, streaming_cls: Any) -> Any:
+        """
+        Serve an artifact: If-None-Match -> 304, a single `Range: bytes=` range -> 206 on the identity bytes,
+        otherwise the smallest pre-compressed variant the client accepts. Returns None if it does not exist.
+        `headers` is a case-insensitive mapping of request headers.
+        """
+        variants = self.variants(digest)
+        if not variants:
+            return None
+        etag = '"' + str(digest).lower().removeprefix("0x") + '"'
+        media_type = "application/json" if self.ext == "json" else "application/octet-stream"
+        out = {"ETag": etag, "Cache-Control": _IMMUTABLE, "Vary": "Accept-Encoding", "Accept-Ranges": "bytes"}
+
+        inm = headers.get("if-none-match")
+        if inm:
+            tags = [t.strip()[2:] if t.strip().startswith("W/") else t.strip() for t in inm.split(",")]
+            tags = [re.sub(r'-(gz|zst)"$', '"', t) for t in tags]
+            if "*" in tags or etag in tags:
+                return response_cls(status_code=304, headers=out)
+
+        identity = variants[0]
+        rng = headers.get("range")
+        if_range = headers.get("if-range")
+        if rng and (not if_range or if_range.strip() == etag):
+            span = _parse_range(rng, identity.size)
+            if span == "unsatisfiable":
+                return response_cls(status_code=416, headers={**out, "Content-Range": f"bytes */{identity.size}"})
+            if span is not None:
+                start, end = span
+                out.update({"Content-Range": f"bytes {start}-{end}/{identity.size}", "Content-Length": str(end - start + 1)})
+                return streaming_cls(
+                    self.backend.iter_bytes(identity.key, start=start, end=end),
+                    status_code=206,
+                    media_type=media_type,
+                    headers=out,
+                )
+
+        ae = headers.get("accept-encoding") or ""
+        chosen = identity
+        for v in variants[1:]:
+            if v.size < chosen.size and accepts_encoding(ae, str(v.encoding)):
+                chosen = v
+        if chosen.encoding is not None:
+            out["Content-Encoding"] = chosen.encoding
+            out["ETag"] = etag[:-1] + ("-zst" if chosen.encoding == "zstd" else "-gz") + '"'
+        out["Content-Length"] = str(chosen.size)
+        return streaming_cls(self.backend.iter_bytes(chosen.key), media_type=media_type, headers=out)
+
+    def url_for(self, digest: str) -> str:
+        base = str(getattr(settings, "BASE_URL", "http://localhost:8000")).rstrip("/")
+        return f"{base}/anchors/{str(digest).lower().removeprefix('0x')}.{self.ext}"
+
+
+def _parse_range(value: str, size: int) -> tuple[int, int] | str | None:
+    """
+    Parse a single `bytes=` range against `size`. Returns (start, end) inclusive, "unsatisfiable", or None to
+    ignore the header (malformed or multi-range; the full body is served instead).
+    """
+    unit, _, spec = str(value).strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            n = int(last)
+            if n <= 0:
+                return "unsatisfiable"
+            return (max(0, size - n), size - 1)
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    if start > end:
+        return None
+    return (start, min(end, size - 1))
+
+
+def artifact_dir() -> Path:
+    d = str(getattr(settings, "ANCHOR_ARTIFACT_DIR", "") or "").strip()
+    return Path(d) if d else Path(__file__).resolve().parent / "data" / "anchors"
+
+
+_store_lock = Lock()
+_store: AnchorArtifactStore | None = None
+
+
+def get_artifact_store() -> AnchorArtifactStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            kind = str(getattr(settings, "ANCHOR_ARTIFACT_BACKEND", "local") or "local").strip().lower()
+            if kind != "local":
+                raise ValueError(f"Unsupported AGORA_ANCHOR_ARTIFACT_BACKEND: {kind!r} (supported: local)")
+            _store = AnchorArtifactStore(LocalArtifactBackend(artifact_dir()))
+        return _store
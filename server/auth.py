@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any
+
 from eth_account import Account
 from eth_account.messages import encode_defunct
 from web3 import Web3
 
+from server import metrics
 from server.config import settings
+from server.rpc import get_web3
+
+logger = logging.getLogger("agora.auth")
 
 
 def normalize_address(address: str) -> str:
@@ -35,51 +48,208 @@ def build_admin_message_to_sign(*, address: str, nonce: str, base_url: str) -> s
     )
 
 
-def verify_signature(*, address: str, message: str, signature: str) -> bool:
-    addr = normalize_address(address)
-    # 1) EOA signature (personal_sign / EIP-191)
+class _TtlCache:
+    """Bounded LRU with per-entry expiry (monotonic clock)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._lock = Lock()
+        self._entries: OrderedDict[Any, tuple[Any, float]] = OrderedDict()
+        self._max_entries = max(1, int(max_entries))
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return default
+            if hit[1] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return hit[0]
+
+    def put(self, key: Any, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + float(ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_MISSING = object()
+# address -> keccak of its code ("" = no code, i.e. an EOA: skip EIP-1271 entirely)
+_code_cache = _TtlCache(max_entries=50_000)
+# (address, EIP-191 message hash, signature) -> True (only successes are cached: a Safe owner can approve the
+# message on-chain between two attempts, so a failure must be re-checked)
+_result_cache = _TtlCache(max_entries=10_000)
+
+_EIP1271_ABI = [
+    {
+        "type": "function",
+        "name": "isValidSignature",
+        "stateMutability": "view",
+        "inputs": [{"name": "hash", "type": "bytes32"}, {"name": "signature", "type": "bytes"}],
+        "outputs": [{"name": "magicValue", "type": "bytes4"}],
+    }
+]
+
+
+def _verify_ecdsa(addr: str, message: str, signature: str) -> bool:
+    # EOA signature (personal_sign / EIP-191)
     try:
         recovered = Account.recover_message(encode_defunct(text=message), signature=signature)
-        if normalize_address(recovered) == addr:
-            return True
+        return normalize_address(recovered) == addr
+    except Exception:
+        return False
+
+
+def _code_hash(w3: Any, addr: str) -> str:
+    cached = _code_cache.get(addr, _MISSING)
+    metrics.registry.inc("agora_auth_eip1271_cache_total", (("cache", "code"), ("outcome", "miss" if cached is _MISSING else "hit")))
+    if cached is not _MISSING:
+        return str(cached)
+    code = bytes(w3.eth.get_code(w3.to_checksum_address(addr)) or b"")
+    digest = "" if not code or code == b"\x00" else Web3.keccak(code).hex()
+    _code_cache.put(addr, digest, float(getattr(settings, "AUTH_EIP1271_CODE_CACHE_TTL_SECONDS", 600.0)))
+    return digest
+
+
+def _verify_eip1271(addr: str, message: str, signature: str) -> tuple[bool, bool]:
+    """(valid, answered from cache)."""
+    # EIP-1271: isValidSignature(bytes32,bytes) => bytes4 magicValue
+    # magicValue: 0x1626ba7e
+    #
+    # For "personal_sign"/EIP-191 style signatures, eth-account signs the EIP-191 payload:
+    #   keccak256(0x19 || version || header || body)
+    # where encode_defunct returns a SignableMessage(version, header, body).
+    m = encode_defunct(text=message)
+    msg_hash = Web3.keccak(b"\x19" + m.version + m.header + m.body)
+    key = (addr, bytes(msg_hash), signature.strip().lower())
+    hit = _result_cache.get(key) is True
+    metrics.registry.inc("agora_auth_eip1271_cache_total", (("cache", "result"), ("outcome", "hit" if hit else "miss")))
+    if hit:
+        return True, True
+    try:
+        code_known = _code_cache.get(addr, _MISSING) is not _MISSING
+        w3 = get_web3()
+        if not _code_hash(w3, addr):
+            return False, code_known
+        c = w3.eth.contract(address=w3.to_checksum_address(addr), abi=_EIP1271_ABI)
+        magic: bytes = c.functions.isValidSignature(msg_hash, bytes.fromhex(signature.removeprefix("0x"))).call()
     except Exception:
-        pass
+        return False, False
+    ok = magic == bytes.fromhex("1626ba7e")
+    if ok:
+        _result_cache.put(key, True, float(getattr(settings, "AUTH_EIP1271_RESULT_CACHE_TTL_SECONDS", 300.0)))
+    return ok, False
+
+
+def verify_signature(*, address: str, message: str, signature: str) -> bool:
+    addr = normalize_address(address)
+    # 1) EOA signature (personal_sign / EIP-191)
+    t0 = time.perf_counter()
+    ok = _verify_ecdsa(addr, message, signature)
+    metrics.observe_auth_verify("ecdsa", time.perf_counter() - t0, ok=ok)
+    if ok:
+        return True
 
     # 2) Contract wallet / multisig (EIP-1271) - optional
     # Many multisigs (e.g. Safe) are contract accounts and cannot "sign" like EOAs.
-    # They validate signatures on-chain via isValidSignature.
+    # They validate signatures on-chain via isValidSignature. Whether an address has code is cached, so EOAs
+    # with a bad signature cost no RPC after the first attempt.
     if not settings.AUTH_EIP1271_ENABLED:
         return False
     if not settings.RPC_URL:
         return False
+    t0 = time.perf_counter()
+    ok, cached = _verify_eip1271(addr, message, signature)
+    metrics.observe_auth_verify("eip1271_cached" if cached else "eip1271", time.perf_counter() - t0, ok=ok)
+    return ok
 
-    try:
-        w3 = Web3(Web3.HTTPProvider(settings.RPC_URL))
-        checksum = w3.to_checksum_address(addr)
-        code = w3.eth.get_code(checksum)
-        if not code or code == b"\x00":
-            return False
-
-        # EIP-1271: isValidSignature(bytes32,bytes) => bytes4 magicValue
-        # magicValue: 0x1626ba7e
-        #
-        # For "personal_sign"/EIP-191 style signatures, eth-account signs the EIP-191 payload:
-        #   keccak256(0x19 || version || header || body)
-        # where encode_defunct returns a SignableMessage(version, header, body).
-        m = encode_defunct(text=message)
-        msg_hash = w3.keccak(b"\x19" + m.version + m.header + m.body)
-        abi = [
-            {
-                "type": "function",
-                "name": "isValidSignature",
-                "stateMutability": "view",
-                "inputs": [{"name": "hash", "type": "bytes32"}, {"name": "signature", "type": "bytes"}],
-                "outputs": [{"name": "magicValue", "type": "bytes4"}],
-            }
-        ]
-        c = w3.eth.contract(address=checksum, abi=abi)
-        magic: bytes = c.functions.isValidSignature(msg_hash, bytes.fromhex(signature.removeprefix("0x"))).call()
-        return magic == bytes.fromhex("1626ba7e")
-    except Exception:
-        return False
 
+# Below this many signatures, pickling to the worker processes costs more than recovering inline.
+_POOL_MIN_BATCH = 8
+
+_pool_lock = Lock()
+_recover_pool: ProcessPoolExecutor | None = None
+
+
+def _recover_chunk(items: list[tuple[str, str]]) -> list[str]:
+    """(message, signature) -> recovered address, "" if unrecoverable. Runs in a worker process."""
+    out: list[str] = []
+    for message, signature in items:
+        try:
+            out.append(normalize_address(Account.recover_message(encode_defunct(text=message), signature=signature)))
+        except Exception:
+            out.append("")
+    return out
+
+
+def _get_recover_pool() -> ProcessPoolExecutor | None:
+    global _recover_pool
+    workers = int(getattr(settings, "AUTH_VERIFY_WORKERS", 0))
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _recover_pool is None:
+            # spawn, not fork: the API process runs threads (server, executors) that fork would copy mid-flight.
+            _recover_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _recover_pool
+
+
+def _reset_recover_pool(pool: ProcessPoolExecutor) -> None:
+    global _recover_pool
+    with _pool_lock:
+        if _recover_pool is pool:
+            _recover_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def verify_signatures(items: list[tuple[str, str, str]]) -> list[bool]:
+    """
+    Batch form of verify_signature for (address, message, signature) triples, results in input order.
+
+    ECDSA recovery is CPU-bound and holds the GIL, so large batches are split across a process pool
+    (AUTH_VERIFY_WORKERS; 0 recovers inline). Signatures that do not recover to their address then go through
+    the EIP-1271 branch in this process, where the code/result caches apply. At most AUTH_BATCH_MAX_EIP1271 of
+    those may need RPC calls; once the budget is spent the remaining failures are not checked.
+    """
+    if not items:
+        return []
+    addrs = [normalize_address(a) for a, _, _ in items]
+    pairs = [(m, sig) for _, m, sig in items]
+
+    t0 = time.perf_counter()
+    pool = _get_recover_pool() if len(pairs) >= _POOL_MIN_BATCH else None
+    if pool is None:
+        recovered = _recover_chunk(pairs)
+    else:
+        size = -(-len(pairs) // int(settings.AUTH_VERIFY_WORKERS))
+        try:
+            recovered = [a for chunk in pool.map(_recover_chunk, [pairs[i : i + size] for i in range(0, len(pairs), size)]) for a in chunk]
+        except BrokenProcessPool as e:
+            # A worker died (OOM kill etc.): drop the pool so the next batch starts a fresh one, and finish inline.
+            logger.warning("signature recovery pool broken, recovering inline: %s", e)
+            _reset_recover_pool(pool)
+            recovered = _recover_chunk(pairs)
+    ok = [bool(r) and r == a for r, a in zip(recovered, addrs)]
+    metrics.observe_auth_verify("ecdsa_batch", time.perf_counter() - t0, ok=all(ok))
+
+    if settings.AUTH_EIP1271_ENABLED and settings.RPC_URL:
+        rpc_budget = max(0, int(settings.AUTH_BATCH_MAX_EIP1271))
+        for i, valid in enumerate(ok):
+            if valid:
+                continue
+            if rpc_budget <= 0:
+                break
+            t0 = time.perf_counter()
+            ok[i], cached = _verify_eip1271(addrs[i], pairs[i][0], pairs[i][1])
+            metrics.observe_auth_verify("eip1271_cached" if cached else "eip1271", time.perf_counter() - t0, ok=ok[i])
+            if not cached:
+                rpc_budget -= 1
+    return ok
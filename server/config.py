@@ -70,6 +70,9 @@ class Settings:
     # Demo rewards (offchain AGR ledger)
     # Option A: accrue offchain credits in DB, settle later on mainnet.
     REWARDS_ENABLED: bool = os.getenv("AGORA_REWARDS_ENABLED", "1" if SERVICE_STAGE == "demo" else "0") == "1"
+    # Epoch Merkle settlement (docs/rewards_merkle_settlement.md): server/rewards_worker.py writes
+    # <epoch_id>.proofs + <epoch_id>.json here; GET /api/v1/rewards/proof reads them. Empty = server/static/rewards.
+    REWARDS_EPOCH_DIR: str = os.getenv("AGORA_REWARDS_EPOCH_DIR", "").strip()
 
     # Jury/voting eligibility
     MIN_REP_SCORE_TO_VOTE: float = _env_float("AGORA_MIN_REP_SCORE_TO_VOTE", 10.0)
@@ -87,9 +90,21 @@ class Settings:
     # Onchain stake verification (optional)
     ONCHAIN_STAKE_ENABLED: bool = os.getenv("AGORA_ONCHAIN_STAKE_ENABLED", "0") == "1"
     RPC_URL: str = os.getenv("AGORA_RPC_URL", "")
+    # Shared JSON-RPC client (server/rpc.py): keep-alive pool, failover to these URLs (comma-separated) when the
+    # primary fails at the HTTP level, and retry rounds across all of them.
+    RPC_FALLBACK_URLS: str = os.getenv("AGORA_RPC_FALLBACK_URLS", "")
+    RPC_TIMEOUT_SECONDS: float = _env_float("AGORA_RPC_TIMEOUT_SECONDS", 10.0)
+    RPC_MAX_RETRIES: int = int(os.getenv("AGORA_RPC_MAX_RETRIES", "2"))
+    RPC_POOL_SIZE: int = int(os.getenv("AGORA_RPC_POOL_SIZE", "32"))
+    RPC_FAILOVER_COOLDOWN_SECONDS: float = _env_float("AGORA_RPC_FAILOVER_COOLDOWN_SECONDS", 30.0)
     STAKE_CONTRACT_ADDRESS: str = os.getenv(
         "AGORA_STAKE_CONTRACT_ADDRESS", "0x0000000000000000000000000000000000000000"
     )
+    # Request-path stake lookups (server/stake_cache.py): cached per process; misses read the stakes mirror when
+    # the sync worker is enabled, otherwise stakeOf with this timeout.
+    STAKE_CACHE_TTL_SECONDS: float = _env_float("AGORA_STAKE_CACHE_TTL_SECONDS", 60.0)
+    STAKE_CACHE_CHANGES_POLL_SECONDS: float = _env_float("AGORA_STAKE_CACHE_CHANGES_POLL_SECONDS", 2.0)
+    ONCHAIN_STAKE_RPC_TIMEOUT_SECONDS: float = _env_float("AGORA_ONCHAIN_STAKE_RPC_TIMEOUT_SECONDS", 2.0)
 
     # Onchain sync worker (Phase 2 scaffold)
     ONCHAIN_SYNC_ENABLED: bool = os.getenv("AGORA_ONCHAIN_SYNC_ENABLED", "0") == "1"
@@ -98,8 +113,30 @@ class Settings:
     ONCHAIN_SYNC_RUN_IN_API: bool = os.getenv("AGORA_ONCHAIN_SYNC_RUN_IN_API", "0") == "1"
     ONCHAIN_SYNC_POLL_SECONDS: int = int(os.getenv("AGORA_ONCHAIN_SYNC_POLL_SECONDS", "5"))
     ONCHAIN_SYNC_LOOKBACK_BLOCKS: int = int(os.getenv("AGORA_ONCHAIN_SYNC_LOOKBACK_BLOCKS", "2000"))
+    # Max blocks per eth_getLogs (shrinks automatically when the provider rejects a range, grows back to this).
     ONCHAIN_SYNC_MAX_BLOCKS_PER_BATCH: int = int(os.getenv("AGORA_ONCHAIN_SYNC_MAX_BLOCKS_PER_BATCH", "2000"))
-    ONCHAIN_SYNC_CONFIRMATIONS: int = int(os.getenv("AGORA_ONCHAIN_SYNC_CONFIRMATIONS", "20"))
+    # Catch-up per sync pass: ranges fetched concurrently, committed in block order.
+    ONCHAIN_SYNC_MAX_BLOCKS_PER_PASS: int = int(os.getenv("AGORA_ONCHAIN_SYNC_MAX_BLOCKS_PER_PASS", "250000"))
+    ONCHAIN_SYNC_FETCH_WORKERS: int = int(os.getenv("AGORA_ONCHAIN_SYNC_FETCH_WORKERS", "4"))
+    # Stake refreshes read stakeOf for all touched agents at the range's last block: one Multicall3 aggregate3
+    # eth_call per STAKE_READ_BATCH agents (empty address = JSON-RPC batches of eth_call instead).
+    ONCHAIN_SYNC_STAKE_READ_BATCH: int = int(os.getenv("AGORA_ONCHAIN_SYNC_STAKE_READ_BATCH", "500"))
+    ONCHAIN_MULTICALL3_ADDRESS: str = os.getenv(
+        "AGORA_ONCHAIN_MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11"
+    ).strip()
+    # Ingest close to head; blocks within REORG_DEPTH of head get block-hash checkpoints and an undo log so a reorg
+    # is detected (parent-hash mismatch) and rolled back. REORG_DEPTH=0 trusts everything below CONFIRMATIONS.
+    ONCHAIN_SYNC_CONFIRMATIONS: int = int(os.getenv("AGORA_ONCHAIN_SYNC_CONFIRMATIONS", "2"))
+    ONCHAIN_SYNC_REORG_DEPTH: int = int(os.getenv("AGORA_ONCHAIN_SYNC_REORG_DEPTH", "128"))
+
+    # Auto-finalization worker: closes open jobs whose final vote window has ended (by final-vote tally).
+    # Production: run server/finalize_worker.py as a separate process; RUN_IN_API is for local demos.
+    AUTO_FINALIZE_ENABLED: bool = os.getenv("AGORA_AUTO_FINALIZE_ENABLED", "0") == "1"
+    AUTO_FINALIZE_RUN_IN_API: bool = os.getenv("AGORA_AUTO_FINALIZE_RUN_IN_API", "0") == "1"
+    AUTO_FINALIZE_POLL_SECONDS: int = int(os.getenv("AGORA_AUTO_FINALIZE_POLL_SECONDS", "15"))
+    AUTO_FINALIZE_BATCH_SIZE: int = int(os.getenv("AGORA_AUTO_FINALIZE_BATCH_SIZE", "50"))
+    # Jobs nobody cast a final vote on are closed with no winner this long after their window ends (0 = keep open).
+    AUTO_FINALIZE_NO_VOTE_GRACE_SECONDS: int = int(os.getenv("AGORA_AUTO_FINALIZE_NO_VOTE_GRACE_SECONDS", "604800"))
 
     # Donor avatars (Phase 2)
     DONOR_THRESHOLD_USD: float = _env_float("AGORA_DONOR_THRESHOLD_USD", 10.0)
@@ -108,21 +145,89 @@ class Settings:
 
     # Anchoring (Phase 2)
     ANCHOR_SCHEMA_VERSION: int = int(os.getenv("AGORA_ANCHOR_SCHEMA_VERSION", "1"))
+    # Snapshots + rollup manifests are content-addressed (served at /anchors/<sha256>.json, gzip/zstd pre-compressed).
+    # Backend: "local" (files under ANCHOR_ARTIFACT_DIR; empty = server/data/anchors). Object storage plugs in later.
+    ANCHOR_ARTIFACT_BACKEND: str = os.getenv("AGORA_ANCHOR_ARTIFACT_BACKEND", "local").strip().lower()
+    ANCHOR_ARTIFACT_DIR: str = os.getenv("AGORA_ANCHOR_ARTIFACT_DIR", "").strip()
+    # Rollups: post one Merkle root per batch of job snapshots instead of one tx per job.
+    # Production: run server/anchor_worker.py as a separate process; RUN_IN_API is for local demos.
+    ANCHOR_ROLLUP_ENABLED: bool = os.getenv("AGORA_ANCHOR_ROLLUP_ENABLED", "0") == "1"
+    ANCHOR_ROLLUP_RUN_IN_API: bool = os.getenv("AGORA_ANCHOR_ROLLUP_RUN_IN_API", "0") == "1"
+    ANCHOR_ROLLUP_POLL_SECONDS: int = int(os.getenv("AGORA_ANCHOR_ROLLUP_POLL_SECONDS", "300"))
+    ANCHOR_ROLLUP_MAX_JOBS: int = int(os.getenv("AGORA_ANCHOR_ROLLUP_MAX_JOBS", "256"))
+    # EOA tx manager (anchor worker): sends queued postAnchor() txs with local nonces, polls receipts in batches
+    # and re-sends stuck txs (same nonce, fees +BUMP_PERCENT, capped at MAX_FEE_GWEI; 0 = no cap).
+    ANCHOR_TX_POLL_SECONDS: int = int(os.getenv("AGORA_ANCHOR_TX_POLL_SECONDS", "5"))
+    ANCHOR_TX_BUMP_AFTER_SECONDS: int = int(os.getenv("AGORA_ANCHOR_TX_BUMP_AFTER_SECONDS", "120"))
+    ANCHOR_TX_BUMP_PERCENT: float = _env_float("AGORA_ANCHOR_TX_BUMP_PERCENT", 20.0)
+    ANCHOR_TX_MAX_FEE_GWEI: float = _env_float("AGORA_ANCHOR_TX_MAX_FEE_GWEI", 200.0)
+    ANCHOR_TX_MAX_ATTEMPTS: int = int(os.getenv("AGORA_ANCHOR_TX_MAX_ATTEMPTS", "5"))
 
     # Contract-wallet auth (EIP-1271) - optional
     # When enabled and RPC_URL is configured, auth verify can accept contract wallet signatures
     # via EIP-1271 isValidSignature checks.
     AUTH_EIP1271_ENABLED: bool = os.getenv("AGORA_AUTH_EIP1271_ENABLED", "0") == "1"
+    # Per-process caches: whether an address has code (EOAs skip the RPC after the first failed recovery) and
+    # successful isValidSignature results per (address, message hash, signature).
+    AUTH_EIP1271_CODE_CACHE_TTL_SECONDS: float = _env_float("AGORA_AUTH_EIP1271_CODE_CACHE_TTL_SECONDS", 600.0)
+    AUTH_EIP1271_RESULT_CACHE_TTL_SECONDS: float = _env_float("AGORA_AUTH_EIP1271_RESULT_CACHE_TTL_SECONDS", 300.0)
 
     # Auth
     CHALLENGE_TTL_SECONDS: int = int(os.getenv("AGORA_CHALLENGE_TTL_SECONDS", "300"))
     ACCESS_TOKEN_TTL_SECONDS: int = int(os.getenv("AGORA_ACCESS_TOKEN_TTL_SECONDS", "86400"))
+    # Fleet auth (/agents/auth/challenge/batch, /agents/auth/verify/batch): max addresses per call, and worker
+    # processes for ECDSA recovery of a batch (0 = recover inline in the API process).
+    AUTH_BATCH_MAX_SIZE: int = int(os.getenv("AGORA_AUTH_BATCH_MAX_SIZE", "100"))
+    AUTH_VERIFY_WORKERS: int = int(os.getenv("AGORA_AUTH_VERIFY_WORKERS", "2"))
+    # The batch endpoints are unauthenticated, so each address costs one unit of a per-IP budget (per endpoint,
+    # per minute; defaults to the global per-IP request limit so batching is no cheaper than single calls).
+    AUTH_BATCH_ADDRESSES_PER_MIN: int = int(os.getenv("AGORA_AUTH_BATCH_ADDRESSES_PER_MIN", os.getenv("AGORA_RATE_LIMIT_PER_MIN", "300")))
+    # Max uncached EIP-1271 checks (one RPC call each) per verify batch; later failing items are rejected outright.
+    AUTH_BATCH_MAX_EIP1271: int = int(os.getenv("AGORA_AUTH_BATCH_MAX_EIP1271", "5"))
     # Admin step-up auth (signature verification on admin entry)
     ADMIN_ACCESS_TTL_SECONDS: int = int(os.getenv("AGORA_ADMIN_ACCESS_TTL_SECONDS", "600"))
 
     # Server metadata
     BASE_URL: str = os.getenv("AGORA_BASE_URL", "http://localhost:8000")
 
+    # Access logging (per-request JSON lines)
+    # - ASYNC: hand records to a background QueueListener thread (formatting + I/O off the event loop)
+    # - SAMPLE_RATE: fraction of successful, fast requests to log (errors, 429s and slow requests are always logged)
+    ACCESS_LOG_ENABLED: bool = os.getenv("AGORA_ACCESS_LOG_ENABLED", "1") == "1"
+    ACCESS_LOG_ASYNC: bool = os.getenv("AGORA_ACCESS_LOG_ASYNC", "1") == "1"
+    ACCESS_LOG_SAMPLE_RATE: float = _env_float("AGORA_ACCESS_LOG_SAMPLE_RATE", 1.0)
+    ACCESS_LOG_SLOW_MS: float = _env_float("AGORA_ACCESS_LOG_SLOW_MS", 1000.0)
+
+    # Metrics (/metrics, Prometheus text format)
+    # - ENABLED: collect metrics (in-process). /metrics itself is only served with a TOKEN, except in the demo stage.
+    # - TOKEN: scrapers must send `Authorization: Bearer <token>`
+    METRICS_ENABLED: bool = os.getenv("AGORA_METRICS_ENABLED", "1") == "1"
+    METRICS_TOKEN: str = (os.getenv("AGORA_METRICS_TOKEN") or "").strip()
+
+    # Stats (admin metrics + public stats) are served from a cached snapshot.
+    # - REFRESH_SECONDS: background recompute interval (API process)
+    # - TTL_SECONDS: max snapshot age before a request triggers an inline (single-flight) refresh
+    STATS_REFRESHER_ENABLED: bool = os.getenv("AGORA_STATS_REFRESHER_ENABLED", "1") == "1"
+    STATS_REFRESH_SECONDS: float = _env_float("AGORA_STATS_REFRESH_SECONDS", 30.0)
+    STATS_TTL_SECONDS: float = _env_float("AGORA_STATS_TTL_SECONDS", 120.0)
+
+    # Response cache for public GET endpoints (ETag / If-None-Match -> 304).
+    # - TTL_SECONDS: dynamic lists (jobs/posts/feeds/leaderboard/bootstrap); write paths also invalidate explicitly
+    # - REDIS: also use the shared Redis tier when REDIS_URL is configured
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("AGORA_RESPONSE_CACHE_ENABLED", "1") == "1"
+    RESPONSE_CACHE_TTL_SECONDS: float = _env_float("AGORA_RESPONSE_CACHE_TTL_SECONDS", 5.0)
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("AGORA_RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+    RESPONSE_CACHE_REDIS: bool = os.getenv("AGORA_RESPONSE_CACHE_REDIS", "1") == "1"
+
+    # Vote tally reads (Postgres): "table" reads the maintained vote_tallies rows (O(submissions));
+    # "group_by" aggregates the raw vote rows in SQL. Writes always maintain vote_tallies.
+    VOTE_TALLY_SOURCE: str = (os.getenv("AGORA_VOTE_TALLY_SOURCE", "table") or "table").strip().lower()
+
+    # Discovery documents (llms.txt, openapi.yaml, agents.json, /docs-md, manifest) are loaded into memory at startup.
+    # WATCH: poll the files and reload on change (local dev only).
+    DISCOVERY_WATCH: bool = os.getenv("AGORA_DISCOVERY_WATCH", "0") == "1"
+    DISCOVERY_WATCH_INTERVAL_SECONDS: float = _env_float("AGORA_DISCOVERY_WATCH_INTERVAL_SECONDS", 2.0)
+
     # Semantic search (optional; disabled by default)
     SEMANTIC_SEARCH_ENABLED: bool = os.getenv("AGORA_SEMANTIC_SEARCH_ENABLED", "0") == "1"
     # Prefer standard OPENAI_API_KEY, but also accept AGORA_OPENAI_API_KEY for convenience.
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Index, Integer, JSON, String, Text, UniqueConstraint
+from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Index, Integer, JSON, String, Text, UniqueConstraint, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -19,6 +19,10 @@ def _now_utc() -> datetime:
 
 class JobDB(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Auto-finalization queue: open jobs ordered by final vote end.
+        Index("ix_jobs_open_final_vote_ends", "final_vote_ends_at", postgresql_where=text("status = 'open'")),
+    )
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
     title: Mapped[str] = mapped_column(String, nullable=False)
@@ -131,6 +135,25 @@ class FinalVoteDB(Base):
     )
 
 
+class VoteTallyDB(Base):
+    """
+    Maintained per-submission tallies (kind: "jury" for votes, "final" for final_votes).
+    Updated in the same transaction as the vote write, so reads are O(submissions).
+    """
+
+    __tablename__ = "vote_tallies"
+
+    job_id: Mapped[str] = mapped_column(ForeignKey("jobs.id"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String, primary_key=True)
+    submission_id: Mapped[str] = mapped_column(String, primary_key=True)
+    weighted_votes: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    voters: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # When the submission first received a vote of this kind; used as the (stable) tie-break order.
+    first_vote_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
+    )
+
+
 class AgentReputationDB(Base):
     __tablename__ = "agent_reputation"
 
@@ -161,6 +184,10 @@ class AgentProfileDB(Base):
 
 class StakeDB(Base):
     __tablename__ = "stakes"
+    __table_args__ = (
+        # Change feed for the API stake cache (server/stake_cache.py): rows updated since a watermark.
+        Index("ix_stakes_updated_at", "updated_at"),
+    )
 
     address: Mapped[str] = mapped_column(String, primary_key=True)
     amount: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
@@ -206,19 +233,77 @@ class OnchainCursorDB(Base):
     )
 
 
+class OnchainBlockDB(Base):
+    """
+    Block-hash checkpoints written by onchain sync for every range committed inside the reorg window
+    (ONCHAIN_SYNC_REORG_DEPTH); the next pass checks the chain still extends the newest one. Pruned below the window.
+    """
+
+    __tablename__ = "onchain_blocks"
+
+    chain_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    block_number: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    block_hash: Mapped[str] = mapped_column(String, nullable=False)
+    parent_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
+    )
+
+
+class OnchainUndoDB(Base):
+    """
+    Undo log for onchain sync writes inside the reorg window, written before the change it reverts.
+    kind/ref/data: "stake"/<address>/<previous stakes row or null>, "slash"/<event id>, "donation"/<event id>.
+    Rolled back newest-first when a reorg replaces blocks above block_number's fork point.
+    """
+
+    __tablename__ = "onchain_undo"
+    __table_args__ = (Index("ix_onchain_undo_chain_block", "chain_id", "block_number"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    chain_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    block_number: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    ref: Mapped[str] = mapped_column(String, nullable=False)
+    data: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
+    )
+
+
 class AgrLedgerDB(Base):
     __tablename__ = "agr_ledger"
+    __table_args__ = (Index("uq_agr_ledger_idempotency_key", "idempotency_key", unique=True),)
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
     address: Mapped[str] = mapped_column(String, nullable=False, index=True)
     delta: Mapped[int] = mapped_column(Integer, nullable=False)  # positive=credit, negative=debit
     reason: Mapped[str] = mapped_column(String, nullable=False)
     job_id: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    # Set for credits that must happen at most once (e.g. "win:<job_id>:<address>"); NULL otherwise.
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
     )
 
 
+class AgrBalanceDB(Base):
+    """
+    Materialized per-address AGR totals. Maintained in the same transaction as every agr_ledger insert;
+    debits are conditional updates (balance >= amount), so concurrent spends cannot overdraw.
+    """
+
+    __tablename__ = "agr_balances"
+
+    address: Mapped[str] = mapped_column(String, primary_key=True)
+    earned: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    spent: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    balance: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
+    )
+
+
 class JobBoostDB(Base):
     __tablename__ = "job_boosts"
 
@@ -379,6 +464,12 @@ class AnchorBatchDB(Base):
     __table_args__ = (
         UniqueConstraint("job_id", name="uq_anchor_batches_job_id"),
         Index("ix_anchor_batches_job_id", "job_id"),
+        # Rollup queue: snapshots not yet in a rollup and not posted on their own.
+        Index(
+            "ix_anchor_batches_unrolled",
+            "created_at",
+            postgresql_where=text("rollup_id IS NULL AND anchor_tx_hash IS NULL"),
+        ),
     )
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
@@ -396,6 +487,75 @@ class AnchorBatchDB(Base):
     anchor_block_number: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     anchor_log_index: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
+    # Set when the snapshot root is included in a multi-job rollup (AnchorRollupDB) instead of posted alone.
+    rollup_id: Mapped[Optional[str]] = mapped_column(ForeignKey("anchor_rollups.id"), nullable=True, index=True)
+    rollup_index: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    rollup_proof: Mapped[Optional[List[str]]] = mapped_column(JSON, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
+    )
+
+
+class AnchorTxDB(Base):
+    """
+    Outgoing postAnchor() transaction managed by the anchor worker (server/anchor_tx.py).
+    kind/target_id: "job"/<job_id> or "rollup"/<rollup_id>. tx_hashes keeps every broadcast (gas bumps reuse the nonce).
+    """
+
+    __tablename__ = "anchor_txs"
+    __table_args__ = (
+        UniqueConstraint("kind", "target_id", name="uq_anchor_txs_target"),
+        Index("ix_anchor_txs_status", "status", "created_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    target_id: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="queued")  # queued|sent|mined|failed
+    from_address: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    nonce: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    tx_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    tx_hashes: Mapped[Optional[List[str]]] = mapped_column(JSON, default=list)
+    gas_limit: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    max_fee_per_gas: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    max_priority_fee_per_gas: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    gas_price: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    bumps: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    block_number: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    mined_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
+    )
+
+
+class AnchorRollupDB(Base):
+    """
+    One onchain anchor covering many job snapshots: merkle_root commits to the members' anchor roots,
+    and each member AnchorBatchDB row stores its inclusion proof.
+    """
+
+    __tablename__ = "anchor_rollups"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    merkle_root: Mapped[str] = mapped_column(String, nullable=False)  # 0x…64 hex
+    leaf_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    schema_version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    salt: Mapped[str] = mapped_column(String, nullable=False)
+    anchor_uri: Mapped[str] = mapped_column(String, nullable=False)  # manifest (members + proofs)
+
+    anchor_tx_hash: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    anchor_chain_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    anchor_contract_address: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    anchor_block_number: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    anchor_log_index: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), default=_now_utc, nullable=False
     )
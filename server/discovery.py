@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from threading import Lock, Thread
+from typing import Any, Callable
+
+try:  # optional: brotli variants are only produced when the module is installed
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger("agora.discovery")
+
+
+@dataclass(frozen=True)
+class Asset:
+    body: bytes
+    gzip_body: bytes
+    br_body: bytes | None
+    media_type: str
+    etag: str
+    last_modified: str  # RFC 7231 HTTP-date
+    mtime: float
+
+
+def _encode(body: bytes, media_type: str, mtime: float) -> Asset:
+    return Asset(
+        body=body,
+        gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+        br_body=brotli.compress(body, quality=11) if brotli is not None else None,
+        media_type=media_type,
+        etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        last_modified=formatdate(int(mtime), usegmt=True),
+        mtime=float(mtime),
+    )
+
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    """True if an Accept-Encoding header value allows `coding` (listed without q=0). Shared with server/artifacts.py."""
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() != coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                return float(q[2:]) > 0.0
+            except ValueError:
+                return True
+        return True
+    return False
+
+
+class DiscoveryAssets:
+    """
+    In-memory cache of discovery documents (llms.txt, openapi.yaml, agents.json, public docs, manifest).
+
+    Everything is read/encoded once (identity + gzip, plus brotli when available), so requests are
+    served without disk I/O. File-backed assets can be reloaded by a polling watcher (dev only).
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._assets: dict[str, Asset] = {}
+        self._files: dict[str, tuple[Path, str]] = {}
+        self._producers: dict[str, tuple[Callable[[], bytes], str]] = {}
+        self._watcher: Thread | None = None
+
+    def add_file(self, name: str, path: Path, media_type: str) -> None:
+        self._files[name] = (Path(path), media_type)
+
+    def add_generated(self, name: str, producer: Callable[[], bytes], media_type: str) -> None:
+        self._producers[name] = (producer, media_type)
+
+    def _load_file(self, name: str) -> None:
+        path, media_type = self._files[name]
+        try:
+            st = path.stat()
+            body = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self._assets.pop(name, None)
+            return
+        asset = _encode(body, media_type, st.st_mtime)
+        with self._lock:
+            self._assets[name] = asset
+
+    def build(self) -> None:
+        for name in list(self._files):
+            self._load_file(name)
+        now = time.time()
+        for name, (producer, media_type) in self._producers.items():
+            asset = _encode(producer(), media_type, now)
+            with self._lock:
+                self._assets[name] = asset
+
+    def get(self, name: str) -> Asset | None:
+        return self._assets.get(name)
+
+    def reload_changed(self) -> list[str]:
+        changed: list[str] = []
+        for name, (path, _) in self._files.items():
+            cur = self._assets.get(name)
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if (cur is None and mtime is not None) or (cur is not None and mtime != cur.mtime):
+                self._load_file(name)
+                changed.append(name)
+        if changed:
+            logger.info("discovery assets reloaded: %s", ", ".join(changed))
+        return changed
+
+    def start_watcher(self, interval_seconds: float = 2.0) -> None:
+        """Poll file mtimes and reload on change (dev convenience). Idempotent."""
+        if self._watcher is not None:
+            return
+        interval = max(0.2, float(interval_seconds))
+
+        def loop() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_changed()
+                except Exception:
+                    logger.exception("discovery watcher error")
+
+        self._watcher = Thread(target=loop, name="agora-discovery-watcher", daemon=True)
+        self._watcher.start()
+
+    @staticmethod
+    def respond(asset: Asset, headers: Any, response_cls: Any) -> Any:
+        """
+        Build a response for `asset`: conditional GET (ETag / Last-Modified -> 304) and content negotiation.
+        `headers` is a case-insensitive mapping of request headers.
+        """
+        out = {
+            "ETag": asset.etag,
+            "Last-Modified": asset.last_modified,
+            "Cache-Control": "public, max-age=300",
+            "Vary": "Accept-Encoding",
+        }
+        inm = headers.get("if-none-match")
+        if inm:
+            tags = [t.strip()[2:] if t.strip().startswith("W/") else t.strip() for t in inm.split(",")]
+            # Any encoding variant of the same body validates (see the per-encoding ETag suffix below).
+            tags = [t.replace('-br"', '"').replace('-gz"', '"') for t in tags]
+            if "*" in tags or asset.etag in tags:
+                return response_cls(status_code=304, headers=out)
+        else:
+            ims = headers.get("if-modified-since")
+            if ims:
+                try:
+                    if int(asset.mtime) <= int(parsedate_to_datetime(ims).timestamp()):
+                        return response_cls(status_code=304, headers=out)
+                except Exception:
+                    pass
+
+        ae = headers.get("accept-encoding") or ""
+        body = asset.body
+        # Tiny documents can grow when compressed; only send a variant that is actually smaller.
+        if asset.br_body is not None and len(asset.br_body) < len(body) and accepts_encoding(ae, "br"):
+            body = asset.br_body
+            out["Content-Encoding"] = "br"
+            out["ETag"] = asset.etag[:-1] + '-br"'
+        elif len(asset.gzip_body) < len(body) and accepts_encoding(ae, "gzip"):
+            body = asset.gzip_body
+            out["Content-Encoding"] = "gzip"
+            out["ETag"] = asset.etag[:-1] + '-gz"'
+        return response_cls(content=body, media_type=asset.media_type, headers=out)
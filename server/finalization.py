@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable
+
+from server.anchoring import create_job_anchor_snapshot
+from server.auth import normalize_address
+from server.config import settings
+from server.models import utc_now_iso
+
+logger = logging.getLogger("agora.finalization")
+
+
+def notify_job_closed(*, store: Any, job_id: str, winner_submission_id: str, actor: str, via: str) -> None:
+    """
+    Notify participants that a job is closed/finalized.
+    via: "close" | "finalize" | "auto" | "expired" (auto-finalization has no actor; everyone is notified;
+    "expired" jobs had no final votes and closed without a winner)
+    """
+    j = store.get_job(job_id) or {}
+    sponsor = normalize_address(str(j.get("sponsor_address") or ""))
+    recipients: set[str] = set()
+    if sponsor:
+        recipients.add(sponsor)
+    try:
+        for author in store.submission_ids_and_authors(job_id).values():
+            a = normalize_address(author)
+            if a:
+                recipients.add(a)
+    except Exception:
+        pass
+
+    actor_addr = normalize_address(actor) if actor else ""
+    recipients = {r for r in recipients if r and r != actor_addr}
+    payload = {"job_id": job_id, "winner_submission_id": winner_submission_id, "via": via}
+    for r in recipients:
+        try:
+            store.create_notification(
+                notification={
+                    "recipient_address": r,
+                    "actor_address": actor_addr,
+                    "type": "job_closed" if via == "close" else "job_finalized",
+                    "target_type": "job",
+                    "target_id": job_id,
+                    "payload": payload,
+                    "created_at": utc_now_iso(),
+                }
+            )
+        except Exception:
+            continue
+
+
+def win_reward_amount() -> int:
+    """
+    Demo rewards (Option A): offchain AGR minted to the winning submission author on close.
+    The store credits it inside the close transaction, keyed per job so it is paid at most once.
+    """
+    if not settings.REWARDS_ENABLED:
+        return 0
+    return max(0, int(settings.AGR_MINT_PER_WIN))
+
+
+def finalize_due_jobs_once(
+    store: Any,
+    *,
+    limit: int | None = None,
+    on_closed: Callable[[], None] | None = None,
+) -> dict[str, Any]:
+    """
+    One scheduler pass: close every job whose final vote window has ended (up to `limit`), then run the
+    same post-close steps as POST /jobs/{id}/finalize (notifications, anchor snapshot).
+
+    Closing and the win reward happen in the store (one transaction, SKIP LOCKED), so several workers can
+    run this concurrently. Post-close steps are best-effort per job, as in the API.
+    `on_closed` runs once after a pass that closed any job (the API process passes its response-cache
+    invalidation; a standalone worker cannot reach that cache, so listings may lag by its TTL).
+    """
+    batch = int(limit if limit is not None else settings.AUTO_FINALIZE_BATCH_SIZE)
+    closed = store.finalize_due_jobs(
+        now_iso=utc_now_iso(),
+        default_window_seconds=int(settings.FINAL_VOTE_WINDOW_SECONDS),
+        limit=max(1, batch),
+        win_reward_agr=win_reward_amount(),
+        no_vote_grace_seconds=int(settings.AUTO_FINALIZE_NO_VOTE_GRACE_SECONDS),
+    )
+    if closed and on_closed is not None:
+        try:
+            on_closed()
+        except Exception:
+            logger.exception("auto_finalize_on_closed_failed")
+    for job in closed:
+        job_id = str(job.get("id") or "")
+        winner_submission_id = str(job.get("winner_submission_id") or "")
+        try:
+            via = "auto" if winner_submission_id else "expired"
+            notify_job_closed(store=store, job_id=job_id, winner_submission_id=winner_submission_id, actor="", via=via)
+        except Exception:
+            logger.exception("auto_finalize_notify_failed job_id=%s", job_id)
+        if not winner_submission_id:
+            continue  # expired without a decision: nothing to anchor
+        try:
+            create_job_anchor_snapshot(store=store, job_id=job_id)
+        except Exception as e:
+            logger.warning("anchor_snapshot_failed job_id=%s: %s", job_id, e)
+    return {"finalized": len(closed), "job_ids": [str(j.get("id") or "") for j in closed], "batch": batch}
+
+
+def run_loop(store: Any, on_closed: Callable[[], None] | None = None) -> None:
+    """Poll forever (API-process mode); a full batch is followed immediately by the next one."""
+    poll = max(1, int(settings.AUTO_FINALIZE_POLL_SECONDS))
+    while True:
+        try:
+            res = finalize_due_jobs_once(store, on_closed=on_closed)
+            if res["finalized"]:
+                logger.info("auto_finalize %s", res)
+            if res["finalized"] >= res["batch"]:
+                continue
+        except Exception:
+            logger.exception("auto_finalize_failed")
+        time.sleep(poll)
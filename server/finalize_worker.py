@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+
+from server.config import settings
+from server.finalization import finalize_due_jobs_once, run_loop
+from server.storage import get_store
+
+
+logger = logging.getLogger("agora.finalize_worker")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Project Agora auto-finalization worker")
+    parser.add_argument("--once", action="store_true", help="Run a single finalization pass and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    if not settings.AUTO_FINALIZE_ENABLED:
+        logger.info("auto_finalize_disabled")
+        return 0
+
+    store = get_store()
+
+    if args.once:
+        res = finalize_due_jobs_once(store)
+        logger.info("finalize_once_done %s", res)
+        return 0
+
+    logger.info(
+        "finalize_worker_started poll=%s batch=%s",
+        settings.AUTO_FINALIZE_POLL_SECONDS,
+        settings.AUTO_FINALIZE_BATCH_SIZE,
+    )
+    run_loop(store)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger("agora.log_ingest")
+
+# Substrings providers use when a getLogs range/result set is over their limit (Alchemy, Infura, QuickNode,
+# public Base/OP RPCs, geth/erigon). Any of these -> split the range instead of failing the pass.
+_RANGE_LIMIT_HINTS = (
+    "block range",
+    "range too large",
+    "range is too large",
+    "exceed",
+    "too many",
+    "limit",
+    "response size",
+    "query returned more than",
+    "timeout",
+    "timed out",
+)
+
+
+def is_range_limit_error(e: BaseException) -> bool:
+    msg = str(e).lower()
+    if "rate limit" in msg or "too many requests" in msg:
+        return False  # smaller ranges would only mean more requests
+    if any(h in msg for h in _RANGE_LIMIT_HINTS):
+        return True
+    code = getattr(e, "code", None)
+    if code is None and e.args and isinstance(e.args[0], dict):
+        code = e.args[0].get("code")
+    return code in (-32005, -32602)
+
+
+class AdaptiveSpan:
+    """
+    getLogs range size shared by concurrent fetchers: halves when the provider rejects a range and doubles back
+    after `grow_after` consecutive successes, but only up to half the last rejected size; that ceiling is re-probed
+    every `probe_after` successes (result-count limits depend on how busy the blocks are).
+    """
+
+    def __init__(self, initial: int, *, max_span: int, min_span: int = 1, grow_after: int = 4, probe_after: int = 64) -> None:
+        self.max_span = max(1, int(max_span))
+        self.min_span = max(1, min(int(min_span), self.max_span))
+        self.grow_after = max(1, int(grow_after))
+        self.probe_after = max(self.grow_after, int(probe_after))
+        self._span = max(self.min_span, min(int(initial), self.max_span))
+        self._ceiling = self.max_span
+        self._ok = 0
+        self._since_shrink = 0
+        self._lock = Lock()
+
+    def current(self) -> int:
+        return self._span
+
+    def shrink(self, failed_span: int) -> None:
+        with self._lock:
+            self._ceiling = max(self.min_span, min(self._ceiling, int(failed_span) // 2))
+            self._span = max(self.min_span, min(self._span, int(failed_span) // 2))
+            self._ok = 0
+            self._since_shrink = 0
+
+    def success(self) -> None:
+        with self._lock:
+            self._ok += 1
+            self._since_shrink += 1
+            if self._since_shrink >= self.probe_after:
+                self._ceiling = self.max_span
+                self._since_shrink = 0
+            if self._ok >= self.grow_after and self._span < self._ceiling:
+                self._span = min(self._ceiling, self._span * 2)
+                self._ok = 0
+
+
+def fetch_range(
+    get_logs: Callable[[int, int], list[Any]],
+    lo: int,
+    hi: int,
+    span: AdaptiveSpan,
+    *,
+    retries: int = 3,
+) -> list[Any]:
+    """Logs for [lo, hi]; ranges the provider rejects as too large are bisected, transient errors retried."""
+    attempt = 0
+    while True:
+        try:
+            logs = list(get_logs(lo, hi))
+            span.success()
+            return logs
+        except Exception as e:
+            if hi > lo and is_range_limit_error(e):
+                span.shrink(hi - lo + 1)
+                mid = (lo + hi) // 2
+                return fetch_range(get_logs, lo, mid, span, retries=retries) + fetch_range(
+                    get_logs, mid + 1, hi, span, retries=retries
+                )
+            attempt += 1
+            if attempt > retries:
+                raise
+            logger.warning("getLogs %s-%s failed (attempt %s/%s): %s", lo, hi, attempt, retries, e)
+            time.sleep(min(5.0, 0.25 * (2 ** (attempt - 1))))
+
+
+def _log_order(log: Any) -> tuple[int, int]:
+    return int(log["blockNumber"]), int(log["logIndex"])
+
+
+def iter_log_ranges(
+    get_logs: Callable[[int, int], list[Any]],
+    *,
+    from_block: int,
+    to_block: int,
+    span: AdaptiveSpan,
+    workers: int = 4,
+) -> Iterator[tuple[int, int, list[Any]]]:
+    """
+    Yield (lo, hi, logs) covering [from_block, to_block] strictly in block order, logs sorted by
+    (blockNumber, logIndex). Up to `workers` ranges are fetched ahead concurrently, so the consumer can
+    commit range N while ranges N+1.. are in flight. Range sizes follow `span` at submit time.
+    """
+    if to_block < from_block:
+        return
+    workers = max(1, int(workers))
+    ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agora-getlogs")
+    pending: deque[tuple[int, int, Future]] = deque()
+    nxt = int(from_block)
+
+    def fill() -> None:
+        nonlocal nxt
+        while nxt <= to_block and len(pending) < workers:
+            hi = min(int(to_block), nxt + span.current() - 1)
+            pending.append((nxt, hi, ex.submit(fetch_range, get_logs, nxt, hi, span)))
+            nxt = hi + 1
+
+    try:
+        fill()
+        while pending:
+            lo, hi, fut = pending.popleft()
+            logs = fut.result()
+            fill()
+            yield lo, hi, sorted(logs, key=_log_order)
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
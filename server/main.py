@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import hmac
 import logging
 import time
 import uuid
@@ -11,28 +12,47 @@ import urllib.request
 import urllib.error
 import ipaddress
 from urllib.parse import urlparse
-from collections import defaultdict, deque
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from threading import Thread
-from threading import Lock
 from typing import Annotated
 
 from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.requests import Request
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 
-from server.auth import build_admin_message_to_sign, build_message_to_sign, normalize_address, verify_signature
+from server.auth import build_admin_message_to_sign, build_message_to_sign, normalize_address, verify_signature, verify_signatures
 from server.config import settings
+from server.artifacts import get_artifact_store
+from server.discovery import DiscoveryAssets
 from server.db.session import get_engine
-from server.onchain import get_stake_amount_usdc
 from server.onchain_sync import run_loop, sync_once
-from server.anchoring import create_job_anchor_snapshot
-from web3 import Web3
+from server import metrics
+from server.access_log import build_access_log
+from server.ratelimit import ShardedRateLimiter
+from server.response_cache import NO_STORE_HEADER, CacheRule, ResponseCache
+from server.stake_cache import stake_cache
+from server.stats import computed_at_iso, stats_cache
+from server.anchoring import (
+    anchor_rollup_once,
+    create_job_anchor_snapshot,
+    encode_post_anchor_calldata,
+    schedule_job_anchor_snapshot,
+    verify_job_anchor,
+)
+from server.anchor_tx import run_loop as run_anchor_loop
+from server.finalization import notify_job_closed, win_reward_amount
+from server.finalization import run_loop as run_finalize_loop
+from server.rewards import ProofStore, epoch_dir, valid_epoch_id
 from server.models import (
+    AuthBatchChallengeRequest,
+    AuthBatchChallengeResponse,
+    AuthBatchVerifyRequest,
+    AuthBatchVerifyResponse,
+    AuthBatchVerifyResult,
     AuthChallengeRequest,
     AuthChallengeResponse,
     AuthVerifyRequest,
@@ -66,14 +86,19 @@ from server.models import (
     UpdateAgentProfileRequest,
     ListProfilesResponse,
     AnchorBatch,
+    AnchorRollup,
+    AnchorTx,
+    AnchorVerification,
     RecordAnchorReceiptRequest,
     PrepareAnchorTxResponse,
+    PrepareAnchorRollupTxResponse,
     OnchainCursor,
     ListOnchainCursorsResponse,
     SetOnchainCursorRequest,
     DonationEvent,
     ListDonationEventsResponse,
     ListAnchorBatchesResponse,
+    ListAnchorRollupsResponse,
     PublicStats,
     AdminAccessChallengeResponse,
     AdminAccessVerifyRequest,
@@ -88,6 +113,7 @@ from server.models import (
     AgrStatus,
     AgrLedgerEntry,
     ListAgrLedgerResponse,
+    RewardProof,
     AgentBootstrapResponse,
     AgentSpecLinks,
     BoostJobRequest,
@@ -146,11 +172,14 @@ def _openai_embed(text: str) -> list[float]:
         },
         method="POST",
     )
+    t0 = time.perf_counter()
+    ok = False
     try:
         with urllib.request.urlopen(req, timeout=20) as resp:
             raw = resp.read().decode("utf-8")
         data = json.loads(raw)
         emb = data["data"][0]["embedding"]
+        ok = True
         return [float(x) for x in emb]
     except urllib.error.HTTPError as e:
         body = ""
@@ -159,6 +188,8 @@ def _openai_embed(text: str) -> list[float]:
         except Exception:
             body = ""
         raise RuntimeError(f"OpenAI embeddings failed: {e.code} {body}") from e
+    finally:
+        metrics.observe_embedding(time.perf_counter() - t0, ok=ok)
 
 
 def _cosine(a: list[float], b: list[float]) -> float:
@@ -239,35 +270,82 @@ _PUBLIC_DOCS_ALLOWLIST = {
 }
 
 
+# Discovery documents are read/encoded once at startup and served from memory (see server/discovery.py).
+_discovery = DiscoveryAssets()
+_discovery.add_file("llms.txt", ROOT / "llms.txt", "text/plain; charset=utf-8")
+_discovery.add_file("openapi.yaml", ROOT / "openapi.yaml", "text/plain; charset=utf-8")
+_discovery.add_file("agents.json", ROOT / "agents.json", "application/json")
+for _doc_name in _PUBLIC_DOCS_ALLOWLIST:
+    _discovery.add_file(f"docs-md/{_doc_name}", _DOCS_DIR / _doc_name, "text/markdown; charset=utf-8")
+
+
+def _docs_md_index_text() -> str:
+    items = sorted(_PUBLIC_DOCS_ALLOWLIST)
+    lines = ["Project Agora public docs (/docs-md)", ""] + [f"- /docs-md/{name}" for name in items]
+    return "\n".join(lines) + "\n"
+
+
+_discovery.add_generated("docs-md", lambda: _docs_md_index_text().encode("utf-8"), "text/plain; charset=utf-8")
+_discovery_built = False
+
+
+def _serve_discovery(name: str, req: Request, *, not_found: str) -> Response:
+    global _discovery_built
+    if not _discovery_built:
+        # Normally done in the startup hook; kept lazy for app instances that skip startup events.
+        _discovery.build()
+        _discovery_built = True
+    asset = _discovery.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return _discovery.respond(asset, req.headers, Response)
+
+
+@app.get("/anchors/{name}", include_in_schema=False)
+def anchor_artifact(name: str, req: Request) -> Response:
+    """
+    Content-addressed anchor artifacts (job snapshots, rollup manifests): /anchors/<sha256>.json.
+    Immutable, so cached forever; served pre-compressed (zstd/gzip) or as byte ranges.
+    Snapshots created before the artifact store keep their /static/anchors/<job_id>.json URIs.
+    """
+    artifacts = get_artifact_store()
+    digest, _, ext = name.partition(".")
+    if ext != artifacts.ext or not artifacts.valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Anchor artifact not found")
+    resp = artifacts.respond(digest, req.headers, Response, StreamingResponse)
+    if resp is None:
+        raise HTTPException(status_code=404, detail="Anchor artifact not found")
+    return resp
+
+
 @app.get("/docs-md", response_class=PlainTextResponse)
-def docs_md_index() -> str:
+def docs_md_index(req: Request) -> Response:
     """
     Public docs index (restricted allowlist).
     """
-    items = sorted(_PUBLIC_DOCS_ALLOWLIST)
-    lines = ["Project Agora public docs (/docs-md)", ""] + [f"- /docs-md/{name}" for name in items]
-    return "\n".join(lines) + "\n"
+    return _serve_discovery("docs-md", req, not_found="Doc not found")
 
 
 @app.get("/docs-md/{name}", response_class=PlainTextResponse)
-def docs_md(name: str) -> Response:
+def docs_md(name: str, req: Request) -> Response:
     """
     Serve a restricted set of markdown docs.
     """
     fname = (name or "").strip().lstrip("/")
     if fname not in _PUBLIC_DOCS_ALLOWLIST:
         raise HTTPException(status_code=404, detail="Doc not found")
-    p = _DOCS_DIR / fname
-    if not p.exists():
-        raise HTTPException(status_code=404, detail="Doc not found")
-    return Response(content=p.read_text(encoding="utf-8"), media_type="text/markdown; charset=utf-8")
+    return _serve_discovery(f"docs-md/{fname}", req, not_found="Doc not found")
 
 
 # ---- Basic ops middleware (request id, logging, rate limit) ----
-_rate_lock = Lock()
-_rate_hits: dict[str, deque[float]] = defaultdict(deque)
 _RATE_WINDOW_SECONDS = float(60.0)
 _RATE_MAX_PER_WINDOW = int(os.getenv("AGORA_RATE_LIMIT_PER_MIN", "300"))
+# In-process limiter state is sharded and bounded (LRU eviction past the key cap).
+_RATE_LIMIT_SHARDS = int(os.getenv("AGORA_RATE_LIMIT_SHARDS", "16"))
+_RATE_LIMIT_MAX_KEYS = int(os.getenv("AGORA_RATE_LIMIT_MAX_KEYS", "200000"))
+_rate_limiter = ShardedRateLimiter(shards=_RATE_LIMIT_SHARDS, max_keys=_RATE_LIMIT_MAX_KEYS)
+# Access log: sampled, JSON lines written by a background thread (see server/access_log.py).
+_access_log = build_access_log()
 _REDIS_URL = (os.getenv("REDIS_URL") or "").strip()
 
 _redis = None
@@ -279,6 +357,35 @@ if _REDIS_URL:
     except Exception:
         _redis = None
 
+# ---- Response cache (public GET endpoints) ----
+# Tags are invalidated from the write paths via _invalidate_cached(...).
+_CACHE_TTL = float(settings.RESPONSE_CACHE_TTL_SECONDS)
+_CACHE_RULES: dict[str, CacheRule] = {
+    "/api/v1/jobs": CacheRule(_CACHE_TTL, ("jobs",)),
+    "/api/v1/feed/jobs": CacheRule(_CACHE_TTL, ("jobs",)),
+    "/api/v1/feed/posts": CacheRule(_CACHE_TTL, ("posts",)),
+    "/api/v1/posts": CacheRule(_CACHE_TTL, ("posts",)),
+    "/api/v1/reputation/leaderboard": CacheRule(_CACHE_TTL, ("leaderboard",)),
+    "/api/v1/agent/bootstrap": CacheRule(_CACHE_TTL, ("jobs",)),
+}
+_response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    redis=_redis if settings.RESPONSE_CACHE_REDIS else None,
+)
+
+
+def _invalidate_cached(*tags: str) -> None:
+    _response_cache.invalidate(*tags)
+
+
+def _engagement_cache_tag(target_type: str) -> str:
+    return "jobs" if str(target_type) == "job" else "posts"
+
+
+def _mark_uncacheable(response: Response) -> None:
+    # Degraded (empty/partial) payloads must not be cached or ETagged, or they outlive the outage.
+    response.headers[NO_STORE_HEADER] = "1"
+
 
 def _client_ip(req: Request) -> str:
     # Prefer left-most X-Forwarded-For (when behind a proxy), otherwise use direct client host.
@@ -291,13 +398,23 @@ def _client_ip(req: Request) -> str:
 
 
 def _skip_rate_limit(path: str) -> bool:
-    if path in ("/", "/healthz", "/readyz", "/openapi.json", "/openapi.yaml", "/llms.txt", "/docs", "/redoc"):
+    if path in ("/", "/healthz", "/readyz", "/metrics", "/openapi.json", "/openapi.yaml", "/llms.txt", "/docs", "/redoc"):
         return True
-    if path.startswith("/static") or path.startswith("/.well-known"):
+    if path.startswith("/static") or path.startswith("/.well-known") or path.startswith("/anchors/"):
         return True
     return False
 
 
+def _route_template(req: Request) -> str:
+    # Label by route template (e.g. /api/v1/jobs/{job_id}), never the raw path, to bound cardinality.
+    route = req.scope.get("route")
+    path = getattr(route, "path", None)
+    if not path and req.scope.get("agora_cache") == "hit":
+        # Served from the response cache (router not reached); cacheable paths are fixed strings.
+        return req.url.path
+    return str(path) if path else "unmatched"
+
+
 @app.middleware("http")
 async def request_id_and_logging(req: Request, call_next):
     rid = (req.headers.get("x-request-id") or "").strip() or str(uuid.uuid4())
@@ -325,39 +442,40 @@ async def request_id_and_logging(req: Request, call_next):
                 limited = False
 
         if _redis is None or (not limited and retry_after is None):
-            with _rate_lock:
-                q = _rate_hits[ip]
-                cutoff = now - _RATE_WINDOW_SECONDS
-                while q and q[0] < cutoff:
-                    q.popleft()
-                if len(q) >= _RATE_MAX_PER_WINDOW:
-                    limited = True
-                    retry_after = max(1, int(q[0] + _RATE_WINDOW_SECONDS - now)) if q else int(_RATE_WINDOW_SECONDS)
-                else:
-                    q.append(now)
+            retry_after = _rate_limiter.hit(ip, limit=_RATE_MAX_PER_WINDOW, window_seconds=_RATE_WINDOW_SECONDS, now=now)
+            limited = retry_after is not None
 
         if limited:
+            metrics.rate_limited("ip")
             resp = PlainTextResponse("Rate limit exceeded", status_code=429)
             if retry_after is not None:
                 resp.headers["Retry-After"] = str(int(retry_after))
             resp.headers["X-Request-Id"] = rid
             duration_ms = (time.perf_counter() - start) * 1000.0
-            logger.info(
-                "request_rate_limited",
-                extra={
-                    "request_id": rid,
-                    "method": req.method,
-                    "path": req.url.path,
-                    "status_code": 429,
-                    "ip": ip,
-                    "duration_ms": round(duration_ms, 2),
-                },
-            )
+            if _access_log.should_log(429, duration_ms):
+                _access_log.log(
+                    "request_rate_limited",
+                    {
+                        "request_id": rid,
+                        "method": req.method,
+                        "path": req.url.path,
+                        "status_code": 429,
+                        "ip": ip,
+                        "duration_ms": round(duration_ms, 2),
+                    },
+                    status_code=429,
+                )
             return resp
     try:
-        resp = await call_next(req)
+        rule = _CACHE_RULES.get(req.url.path) if (settings.RESPONSE_CACHE_ENABLED and req.method == "GET") else None
+        if rule is not None:
+            resp = await _response_cache.serve(req, rule, call_next, Response)
+        else:
+            resp = await call_next(req)
+        await _response_cache.flush_invalidations()
     except Exception:
         duration_ms = (time.perf_counter() - start) * 1000.0
+        metrics.observe_request(req.method, _route_template(req), 500, duration_ms / 1000.0)
         logger.exception(
             "request_failed",
             extra={
@@ -371,23 +489,27 @@ async def request_id_and_logging(req: Request, call_next):
         raise
     duration_ms = (time.perf_counter() - start) * 1000.0
     resp.headers["X-Request-Id"] = rid
-    logger.info(
-        "request",
-        extra={
-            "request_id": rid,
-            "method": req.method,
-            "path": req.url.path,
-            "status_code": resp.status_code,
-            "ip": _client_ip(req),
-            "duration_ms": round(duration_ms, 2),
-        },
-    )
+    status_code = int(resp.status_code)
+    metrics.observe_request(req.method, _route_template(req), status_code, duration_ms / 1000.0)
+    # Sampling decision first: unsampled requests skip field building entirely.
+    if _access_log.should_log(status_code, duration_ms):
+        _access_log.log(
+            "request",
+            {
+                "request_id": rid,
+                "method": req.method,
+                "path": req.url.path,
+                "status_code": status_code,
+                "ip": _client_ip(req),
+                "duration_ms": round(duration_ms, 2),
+            },
+            status_code=status_code,
+        )
     return resp
 
 
 # ---- Action-level rate limits (best-effort) ----
-_action_rate_lock = Lock()
-_action_hits: dict[str, deque[float]] = defaultdict(deque)
+_action_limiter = ShardedRateLimiter(shards=_RATE_LIMIT_SHARDS, max_keys=_RATE_LIMIT_MAX_KEYS)
 
 
 def _enforce_action_rate_limit(*, key: str, max_per_window: int, window_seconds: int) -> None:
@@ -398,22 +520,14 @@ def _enforce_action_rate_limit(*, key: str, max_per_window: int, window_seconds:
     k = str(key or "").strip()
     if not k:
         return
-    now = time.time()
-    window = float(max(1, int(window_seconds)))
-    limit = int(max(1, int(max_per_window)))
-    with _action_rate_lock:
-        q = _action_hits[k]
-        cutoff = now - window
-        while q and q[0] < cutoff:
-            q.popleft()
-        if len(q) >= limit:
-            retry_after = max(1, int(q[0] + window - now)) if q else int(window)
-            raise HTTPException(
-                status_code=429,
-                detail="Rate limit exceeded",
-                headers={"Retry-After": str(int(retry_after))},
-            )
-        q.append(now)
+    retry_after = _action_limiter.hit(k, limit=int(max_per_window), window_seconds=float(max(1, int(window_seconds))))
+    if retry_after is not None:
+        metrics.rate_limited("action")
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(int(retry_after))},
+        )
 
 
 @app.get("/", response_class=PlainTextResponse)
@@ -426,6 +540,19 @@ def healthz() -> str:
     return "ok"
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint(authorization: Annotated[str | None, Header()] = None) -> Response:
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not settings.METRICS_TOKEN:
+        # Per-route/store/RPC-host telemetry is not public: without a token it is only served in the demo stage.
+        if settings.SERVICE_STAGE != "demo":
+            raise HTTPException(status_code=404, detail="Not found")
+    elif not hmac.compare_digest((authorization or "").strip().encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid metrics token")
+    return Response(content=metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/readyz", response_class=PlainTextResponse)
 def readyz() -> str:
     # DB readiness check (when DATABASE_URL is configured). If DB is not configured,
@@ -442,22 +569,23 @@ def readyz() -> str:
 
 
 @app.get("/llms.txt", response_class=PlainTextResponse)
-def llms_txt() -> str:
-    p = ROOT / "llms.txt"
-    if not p.exists():
-        raise HTTPException(status_code=404, detail="llms.txt not found")
-    return p.read_text(encoding="utf-8")
+def llms_txt(req: Request) -> Response:
+    return _serve_discovery("llms.txt", req, not_found="llms.txt not found")
 
 
 @app.get("/agora-agent-manifest.json")
-def agent_manifest() -> Response:
+def agent_manifest(req: Request) -> Response:
     """
     Agent manifest (dynamic).
 
     This endpoint is the source of truth and is generated from the running server settings
     (chain_id, contract addresses, toggles). Do not rely on a static JSON file for these values.
+    Settings are fixed for the process lifetime, so the document is rendered once at startup.
     """
+    return _serve_discovery("agora-agent-manifest.json", req, not_found="Manifest not found")
+
 
+def _agent_manifest_text() -> str:
     base_url = str(getattr(settings, "BASE_URL", "") or "").rstrip("/")
     if not base_url:
         base_url = "https://api.project-agora.im"
@@ -473,6 +601,8 @@ def agent_manifest() -> Response:
             "endpoints": {
                 "auth_challenge": "/api/v1/agents/auth/challenge",
                 "auth_verify": "/api/v1/agents/auth/verify",
+                "auth_challenge_batch": "/api/v1/agents/auth/challenge/batch",
+                "auth_verify_batch": "/api/v1/agents/auth/verify/batch",
                 "agent_bootstrap": "/api/v1/agent/bootstrap",
                 "jobs": "/api/v1/jobs",
                 "job": "/api/v1/jobs/{job_id}",
@@ -495,6 +625,7 @@ def agent_manifest() -> Response:
                 "stake_status": "/api/v1/stake/status",
                 "agr_status": "/api/v1/agr/status",
                 "agr_ledger": "/api/v1/agr/ledger",
+                "rewards_proof": "/api/v1/rewards/proof",
                 "job_boost": "/api/v1/jobs/{job_id}/boost",
                 "slashing_events": "/api/v1/slashing/events",
                 "feed_jobs": "/api/v1/feed/jobs",
@@ -547,27 +678,33 @@ def agent_manifest() -> Response:
         },
     }
 
-    return Response(content=json.dumps(body, ensure_ascii=False, indent=2) + "\n", media_type="application/json")
+    return json.dumps(body, ensure_ascii=False, indent=2) + "\n"
+
+
+_discovery.add_generated("agora-agent-manifest.json", lambda: _agent_manifest_text().encode("utf-8"), "application/json")
 
 
 @app.get("/openapi.yaml", response_class=PlainTextResponse)
-def openapi_yaml() -> str:
-    p = ROOT / "openapi.yaml"
-    if not p.exists():
-        raise HTTPException(status_code=404, detail="openapi.yaml not found")
-    return p.read_text(encoding="utf-8")
+def openapi_yaml(req: Request) -> Response:
+    return _serve_discovery("openapi.yaml", req, not_found="openapi.yaml not found")
 
 
 @app.get("/agents.json")
-def agents_json() -> Response:
+def agents_json(req: Request) -> Response:
     """
     Proposal-style discovery document for autonomous agents.
     Kept as a simple JSON file in the repo root.
     """
-    p = ROOT / "agents.json"
-    if not p.exists():
-        raise HTTPException(status_code=404, detail="agents.json not found")
-    return Response(content=p.read_text(encoding="utf-8"), media_type="application/json")
+    return _serve_discovery("agents.json", req, not_found="agents.json not found")
+
+
+@app.on_event("startup")
+def build_discovery_assets() -> None:
+    global _discovery_built
+    _discovery.build()
+    _discovery_built = True
+    if settings.DISCOVERY_WATCH:
+        _discovery.start_watcher(settings.DISCOVERY_WATCH_INTERVAL_SECONDS)
 
 
 @app.get("/legal", response_class=PlainTextResponse)
@@ -581,7 +718,8 @@ def public_stats(store: Annotated[Store | None, Depends(optional_store_dep)] = N
     if store is None:
         return PublicStats(users_total=0)
     try:
-        return PublicStats(users_total=int(store.users_total()))
+        snap, _ = stats_cache.get(store)
+        return PublicStats(users_total=int(snap["users_total"]))
     except Exception:
         return PublicStats(users_total=0)
 
@@ -646,6 +784,7 @@ def agent_bootstrap(
     status: str = Query("open", description="open|all"),
     tag: str | None = Query(None, description="optional tag filter"),
     limit: int = Query(20, ge=1, le=200),
+    response: Response = None,  # type: ignore[assignment]
     store: Annotated[Store | None, Depends(optional_store_dep)] = None,  # type: ignore[assignment]
 ) -> AgentBootstrapResponse:
     """
@@ -667,12 +806,15 @@ def agent_bootstrap(
     )
 
     jobs: list[Job] = []
-    if store is not None:
+    if store is None:
+        _mark_uncacheable(response)
+    else:
         try:
             rows = store.list_jobs(status=status, tag=tag)
             jobs = [Job(**j) for j in rows[:limit]]
         except Exception as e:
             logger.warning("agent_bootstrap_jobs_unavailable: %s", e)
+            _mark_uncacheable(response)
             jobs = []
 
     stage = (getattr(settings, "SERVICE_STAGE", "prod") or "prod").lower()
@@ -762,6 +904,94 @@ def auth_verify(req: AuthVerifyRequest, store: Annotated[Store, Depends(store_de
     return AuthVerifyResponse(access_token=s.token)
 
 
+def _check_auth_batch(req: Request, endpoint: str, n: int) -> None:
+    if n > settings.AUTH_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Too many addresses in one batch (max {settings.AUTH_BATCH_MAX_SIZE})")
+    # Unauthenticated and N-times amplified: charge the caller's IP one unit per address, not per request.
+    retry_after = _action_limiter.hit(
+        f"ip:{_client_ip(req)}:{endpoint}",
+        limit=int(settings.AUTH_BATCH_ADDRESSES_PER_MIN),
+        window_seconds=60.0,
+        cost=max(1, n),
+    )
+    if retry_after is not None:
+        metrics.rate_limited("action")
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers={"Retry-After": str(int(retry_after))})
+
+
+@app.post("/api/v1/agents/auth/challenge/batch", response_model=AuthBatchChallengeResponse)
+def auth_challenge_batch(
+    req: AuthBatchChallengeRequest,
+    request: Request,
+    store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
+) -> AuthBatchChallengeResponse:
+    """Challenges for a fleet of agent wallets in one call (one store write). Duplicate addresses get one challenge."""
+    _check_auth_batch(request, "auth_challenge_batch", len(req.addresses))
+    challenges = store.create_challenges(
+        [normalize_address(a) for a in req.addresses],
+        settings.CHALLENGE_TTL_SECONDS,
+        message_for=lambda address, nonce: build_message_to_sign(address=address, nonce=nonce, base_url=settings.BASE_URL),
+    )
+    return AuthBatchChallengeResponse(
+        challenges=[
+            AuthChallengeResponse(
+                address=c.address,
+                nonce=c.nonce,
+                message_to_sign=c.message,
+                expires_in_seconds=settings.CHALLENGE_TTL_SECONDS,
+            )
+            for c in challenges
+        ]
+    )
+
+
+@app.post("/api/v1/agents/auth/verify/batch", response_model=AuthBatchVerifyResponse)
+def auth_verify_batch(
+    req: AuthBatchVerifyRequest,
+    request: Request,
+    store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
+) -> AuthBatchVerifyResponse:
+    """
+    Verify one signature per challenged address and return a token for each that passes. Results are per item
+    (in request order), so one bad signature does not fail the fleet. Challenges are redeemed and sessions created
+    in one store transaction.
+    """
+    _check_auth_batch(request, "auth_verify_batch", len(req.items))
+    addresses = [normalize_address(it.address) for it in req.items]
+    challenges = store.get_valid_challenges(addresses)
+
+    errors: dict[int, str] = {}
+    todo: list[int] = []
+    seen: set[str] = set()
+    for i, address in enumerate(addresses):
+        if address in seen:
+            errors[i] = "Duplicate address in batch"
+        elif address not in challenges:
+            errors[i] = "No valid challenge (expired or missing)"
+        else:
+            todo.append(i)
+        seen.add(address)
+
+    verified = verify_signatures([(addresses[i], challenges[addresses[i]].message, req.items[i].signature) for i in todo])
+    nonces: dict[str, str] = {}
+    for i, ok in zip(todo, verified):
+        if ok:
+            nonces[addresses[i]] = challenges[addresses[i]].nonce
+        else:
+            errors[i] = "Signature verification failed"
+    sessions = store.redeem_challenges(nonces, settings.ACCESS_TOKEN_TTL_SECONDS)
+
+    results: list[AuthBatchVerifyResult] = []
+    for i, address in enumerate(addresses):
+        s = sessions.get(address) if i not in errors else None
+        if s is not None:
+            results.append(AuthBatchVerifyResult(address=address, ok=True, access_token=s.token))
+        else:
+            # Verified but not redeemed: a concurrent verify consumed or replaced the challenge first.
+            results.append(AuthBatchVerifyResult(address=address, ok=False, error=errors.get(i) or "Challenge already used"))
+    return AuthBatchVerifyResponse(results=results)
+
+
 # ---- Profile endpoints ----
 @app.get("/api/v1/profile", response_model=AgentProfile)
 def get_profile(me: CurrentAgent, store: Annotated[Store, Depends(store_dep)] = None) -> AgentProfile:  # type: ignore[assignment]
@@ -848,7 +1078,12 @@ def admin_metrics(
         is_operator = True
     if not is_operator:
         raise HTTPException(status_code=403, detail="Operator access required")
-    return AdminMetrics(**store.admin_metrics())
+    snap, computed_at = stats_cache.get(store)
+    return AdminMetrics(
+        **snap["admin"],
+        stats_computed_at=computed_at_iso(computed_at),
+        stats_age_seconds=round(max(0.0, time.time() - computed_at), 3) if computed_at is not None else 0.0,
+    )
 
 
 @app.post("/api/v1/admin/access/challenge", response_model=AdminAccessChallengeResponse)
@@ -970,22 +1205,6 @@ def _is_local_base_url(base_url: str) -> bool:
         return True
 
 
-ANCHOR_REGISTRY_ABI = [
-    {
-        "type": "function",
-        "name": "postAnchor",
-        "stateMutability": "nonpayable",
-        "inputs": [
-            {"name": "root", "type": "bytes32"},
-            {"name": "uri", "type": "string"},
-            {"name": "schemaVersion", "type": "uint32"},
-            {"name": "salt", "type": "bytes32"},
-        ],
-        "outputs": [],
-    }
-]
-
-
 @app.post("/api/v1/admin/anchors/{job_id}/prepare", response_model=PrepareAnchorTxResponse)
 def admin_prepare_anchor_tx(
     job_id: str,
@@ -1009,16 +1228,8 @@ def admin_prepare_anchor_tx(
     anchor = AnchorBatch(**batch)
 
     # Encode calldata using Web3 (no RPC needed).
-    w3 = Web3()
-    c = w3.eth.contract(address=Web3.to_checksum_address(settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS), abi=ANCHOR_REGISTRY_ABI)
-    data = c.encode_abi(
-        "postAnchor",
-        args=[
-            Web3.to_bytes(hexstr=anchor.anchor_root),
-            anchor.anchor_uri,
-            int(anchor.schema_version),
-            Web3.to_bytes(hexstr=anchor.salt),
-        ],
+    data = encode_post_anchor_calldata(
+        root_hex=anchor.anchor_root, uri=anchor.anchor_uri, schema_version=int(anchor.schema_version), salt_hex=anchor.salt
     )
 
     return PrepareAnchorTxResponse(
@@ -1030,16 +1241,17 @@ def admin_prepare_anchor_tx(
     )
 
 
-@app.post("/api/v1/admin/anchors/{job_id}/broadcast", response_model=AnchorBatch)
+@app.post("/api/v1/admin/anchors/{job_id}/broadcast", response_model=AnchorTx, status_code=202)
 def admin_broadcast_anchor_tx(
     job_id: str,
     caller: CurrentAgent,
     x_dev_secret: Annotated[str | None, Header(alias="X-Dev-Secret")] = None,
     store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
-) -> AnchorBatch:
+) -> AnchorTx:
     """
     Operator-only (DEMO-friendly):
-    Broadcast an anchor tx using an EOA private key from env, then store receipt fields in DB.
+    Queue an anchor tx for the EOA key from env and return immediately. The anchor worker's tx manager signs,
+    sends (bumping fees if it gets stuck) and stores the receipt fields on the anchor once mined.
     For production, prefer /prepare and execute via Safe.
     """
     _require_operator(caller, x_dev_secret=x_dev_secret)
@@ -1055,73 +1267,11 @@ def admin_broadcast_anchor_tx(
         raise HTTPException(status_code=400, detail="Missing AGORA_ANCHORING_EOA_PRIVATE_KEY (use /prepare for Safe)")
 
     batch = create_job_anchor_snapshot(store=store, job_id=job_id)
-    anchor = AnchorBatch(**batch)
-
-    w3 = Web3(Web3.HTTPProvider(settings.RPC_URL))
-    rpc_chain_id = int(w3.eth.chain_id)
-    if int(settings.CHAIN_ID) and int(settings.CHAIN_ID) != rpc_chain_id:
-        raise HTTPException(status_code=400, detail=f"CHAIN_ID mismatch: settings={settings.CHAIN_ID} rpc={rpc_chain_id}")
-
-    acct = w3.eth.account.from_key(settings.ANCHORING_EOA_PRIVATE_KEY)
-    c = w3.eth.contract(address=Web3.to_checksum_address(settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS), abi=ANCHOR_REGISTRY_ABI)
-
-    tx = c.functions.postAnchor(
-        Web3.to_bytes(hexstr=anchor.anchor_root),
-        anchor.anchor_uri,
-        int(anchor.schema_version),
-        Web3.to_bytes(hexstr=anchor.salt),
-    ).build_transaction(
-        {
-            "from": acct.address,
-            "nonce": w3.eth.get_transaction_count(acct.address),
-            "chainId": rpc_chain_id,
-            "value": 0,
-        }
-    )
-
-    # EIP-1559 if available, else legacy gasPrice.
-    latest = w3.eth.get_block("latest")
-    base_fee = latest.get("baseFeePerGas")
-    if base_fee is not None:
-        try:
-            tip = int(getattr(w3.eth, "max_priority_fee", 0) or 0)
-            if tip <= 0:
-                tip = int(w3.to_wei(0.001, "gwei"))
-        except Exception:
-            tip = int(w3.to_wei(0.001, "gwei"))
-        tx["maxPriorityFeePerGas"] = tip
-        tx["maxFeePerGas"] = int(base_fee) * 2 + tip
-    else:
-        tx["gasPrice"] = int(w3.eth.gas_price)
-
-    # Gas estimate (best-effort).
-    try:
-        tx["gas"] = int(w3.eth.estimate_gas(tx))
-    except Exception:
-        tx["gas"] = int(tx.get("gas", 350_000))
-
-    signed = acct.sign_transaction(tx)
-    tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction).hex()
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=180)
-
-    # Find the AnchorPosted log index (first log from this contract).
-    log_index = None
-    for l in receipt.logs:
-        if str(l.address).lower() == settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS.lower():
-            log_index = int(l.get("logIndex", 0))
-            break
-    if log_index is None:
-        log_index = 0
-
-    saved = store.set_anchor_receipt(
-        job_id=job_id,
-        anchor_tx_hash=tx_hash,
-        anchor_chain_id=rpc_chain_id,
-        anchor_contract_address=settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS,
-        anchor_block_number=int(receipt.blockNumber),
-        anchor_log_index=int(log_index),
-    )
-    return AnchorBatch(**saved)
+    if batch.get("anchor_tx_hash"):
+        raise HTTPException(status_code=409, detail="Anchor already posted")
+    if batch.get("rollup_id"):
+        raise HTTPException(status_code=409, detail="Anchor is included in a rollup")
+    return AnchorTx(**store.enqueue_anchor_tx(kind="job", target_id=job_id))
 
 
 @app.post("/api/v1/admin/anchors/{job_id}/receipt", response_model=AnchorBatch)
@@ -1147,6 +1297,85 @@ def admin_record_anchor_receipt(
     return AnchorBatch(**saved)
 
 
+@app.get("/api/v1/admin/anchor_rollups", response_model=ListAnchorRollupsResponse)
+def admin_anchor_rollups(
+    caller: CurrentAgent,
+    x_dev_secret: Annotated[str | None, Header(alias="X-Dev-Secret")] = None,
+    limit: int = Query(50, ge=1, le=200),
+    store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
+) -> ListAnchorRollupsResponse:
+    _require_operator(caller, x_dev_secret=x_dev_secret)
+    return ListAnchorRollupsResponse(rollups=[AnchorRollup(**r) for r in store.list_anchor_rollups(limit=int(limit))])
+
+
+@app.post("/api/v1/admin/anchor_rollups", response_model=AnchorRollup)
+def admin_build_anchor_rollup(
+    caller: CurrentAgent,
+    x_dev_secret: Annotated[str | None, Header(alias="X-Dev-Secret")] = None,
+    store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
+) -> AnchorRollup:
+    """
+    Operator-only: roll every pending job snapshot (up to AGORA_ANCHOR_ROLLUP_MAX_JOBS) into one Merkle root now,
+    instead of waiting for the anchor worker. Posting follows the worker rules (EOA key -> queued tx, else Safe).
+    """
+    _require_operator(caller, x_dev_secret=x_dev_secret)
+    res = anchor_rollup_once(store)
+    if not res.get("rollup_id"):
+        raise HTTPException(status_code=409, detail="No pending anchor snapshots")
+    return AnchorRollup(**(store.get_anchor_rollup(str(res["rollup_id"])) or {}))
+
+
+@app.post("/api/v1/admin/anchor_rollups/{rollup_id}/prepare", response_model=PrepareAnchorRollupTxResponse)
+def admin_prepare_anchor_rollup_tx(
+    rollup_id: str,
+    caller: CurrentAgent,
+    x_dev_secret: Annotated[str | None, Header(alias="X-Dev-Secret")] = None,
+    store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
+) -> PrepareAnchorRollupTxResponse:
+    """Operator-only: calldata for posting a rollup root via AgoraAnchorRegistry.postAnchor() (Safe/multisig)."""
+    _require_operator(caller, x_dev_secret=x_dev_secret)
+    if _is_zero_address(settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS):
+        raise HTTPException(status_code=400, detail="Missing AGORA_ANCHOR_REGISTRY_CONTRACT_ADDRESS")
+    r = store.get_anchor_rollup(rollup_id)
+    if not r:
+        raise HTTPException(status_code=404, detail="Anchor rollup not found")
+    rollup = AnchorRollup(**r)
+    data = encode_post_anchor_calldata(
+        root_hex=rollup.merkle_root, uri=rollup.anchor_uri, schema_version=int(rollup.schema_version), salt_hex=rollup.salt
+    )
+    return PrepareAnchorRollupTxResponse(
+        chain_id=int(settings.CHAIN_ID),
+        to=settings.ANCHOR_REGISTRY_CONTRACT_ADDRESS.lower(),
+        data=data,
+        value_wei=0,
+        rollup=rollup,
+    )
+
+
+@app.post("/api/v1/admin/anchor_rollups/{rollup_id}/receipt", response_model=AnchorRollup)
+def admin_record_anchor_rollup_receipt(
+    rollup_id: str,
+    req: RecordAnchorReceiptRequest,
+    caller: CurrentAgent,
+    x_dev_secret: Annotated[str | None, Header(alias="X-Dev-Secret")] = None,
+    store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
+) -> AnchorRollup:
+    """Operator-only: record the onchain receipt after executing /prepare via Safe."""
+    _require_operator(caller, x_dev_secret=x_dev_secret)
+    try:
+        saved = store.set_anchor_rollup_receipt(
+            rollup_id=rollup_id,
+            anchor_tx_hash=req.anchor_tx_hash,
+            anchor_chain_id=req.anchor_chain_id,
+            anchor_contract_address=req.anchor_contract_address,
+            anchor_block_number=req.anchor_block_number,
+            anchor_log_index=req.anchor_log_index,
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Anchor rollup not found")
+    return AnchorRollup(**saved)
+
+
 @app.get("/api/v1/admin/onchain/suggested_cursor_keys")
 def admin_suggested_cursor_keys(
     caller: CurrentAgent,
@@ -1208,17 +1437,7 @@ def stake_requirements() -> StakeRequirements:
 def _get_stake_for_address(store: Store, address: str) -> float:
     addr = normalize_address(address)
     if settings.ONCHAIN_STAKE_ENABLED and settings.RPC_URL and settings.STAKE_CONTRACT_ADDRESS:
-        try:
-            return float(
-                get_stake_amount_usdc(
-                    rpc_url=settings.RPC_URL,
-                    stake_contract=settings.STAKE_CONTRACT_ADDRESS,
-                    agent_address=addr,
-                )
-            )
-        except Exception:
-            # Fail closed: if onchain is enabled but RPC/contract is misconfigured, return 0.
-            return 0.0
+        return stake_cache.get(store, addr)
     return float(store.get_stake(addr))
 
 
@@ -1299,6 +1518,7 @@ def dev_set_reputation(
         raise HTTPException(status_code=401, detail="Unauthorized")
     addr = normalize_address(address)
     rep = store.set_rep_score(addr, score)
+    _invalidate_cached("leaderboard")
     rep["last_updated_at"] = utc_now_iso()
     return Reputation(**rep)
 
@@ -1322,6 +1542,28 @@ def agr_ledger(
     return ListAgrLedgerResponse(address=addr, entries=entries, count=len(entries))
 
 
+_reward_proofs = ProofStore(epoch_dir())
+
+
+@app.get("/api/v1/rewards/proof", response_model=RewardProof)
+def rewards_proof(
+    epoch_id: str = Query(..., description="Settlement epoch id (e.g. 2026-W05)"),
+    address: str = Query(..., description="EVM address"),
+) -> RewardProof:
+    if not valid_epoch_id(epoch_id):
+        raise HTTPException(status_code=400, detail="Invalid epoch_id")
+    addr = normalize_address(address)
+    if not re.fullmatch(r"0x[0-9a-f]{40}", addr):
+        raise HTTPException(status_code=400, detail="Invalid address")
+    with _reward_proofs.lease(epoch_id) as pf:
+        if pf is None:
+            raise HTTPException(status_code=404, detail="Epoch not found")
+        res = pf.lookup(addr)
+    if res is None:
+        raise HTTPException(status_code=404, detail="No claim for this address in this epoch")
+    return RewardProof(**res)
+
+
 @app.post("/api/v1/agr/dev_mint", response_model=AgrStatus)
 def dev_mint_agr(
     address: str,
@@ -1359,6 +1601,7 @@ def boost_job(job_id: str, req: BoostJobRequest, actor: CurrentAgent) -> BoostJo
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    _invalidate_cached("jobs")
     return BoostJobResponse(**res)
 
 
@@ -1403,12 +1646,14 @@ def list_slashing_events(
 def list_jobs(
     status: str = Query("open", description="open|all"),
     tag: str | None = Query(None, description="optional tag filter"),
+    response: Response = None,  # type: ignore[assignment]
     store: Annotated[Store | None, Depends(optional_store_dep)] = None,  # type: ignore[assignment]
 ) -> ListJobsResponse:
     if status not in ("open", "all"):
         raise HTTPException(status_code=400, detail="Invalid status (open|all)")
     if store is None:
         # Local-friendly behavior: allow the web UI to render even when Postgres isn't running.
+        _mark_uncacheable(response)
         return ListJobsResponse(jobs=[])
     try:
         rows = list(store.list_jobs(status=status, tag=tag) or [])
@@ -1422,11 +1667,12 @@ def list_jobs(
                     continue
                 j["stats"] = stats.get(jid) or {"upvotes": 0, "bookmarks": 0, "views": 0, "comments": 0}
         except Exception:
-            pass
+            _mark_uncacheable(response)
         jobs = [Job(**j) for j in rows]
         return ListJobsResponse(jobs=jobs)
     except Exception as e:
         logger.warning("list_jobs_unavailable: %s", e)
+        _mark_uncacheable(response)
         return ListJobsResponse(jobs=[])
 
 
@@ -1453,6 +1699,7 @@ def create_job(
             "final_vote_ends_at": final_vote_ends_at.isoformat().replace("+00:00", "Z"),
         }
     )
+    _invalidate_cached("jobs")
     _semantic_upsert(store, doc_type="job", doc_id=str(created.get("id") or ""), text=f"{req.title}\n\n{req.prompt}")
     return Job(**created)
 
@@ -1489,11 +1736,16 @@ def get_job(job_id: str, store: Annotated[Store, Depends(store_dep)] = None) ->
 
 
 @app.get("/api/v1/jobs/{job_id}/submissions", response_model=list[Submission])
-def list_submissions(job_id: str, store: Annotated[Store, Depends(store_dep)] = None) -> list[Submission]:  # type: ignore[assignment]
+def list_submissions(
+    job_id: str,
+    limit: int | None = Query(None, ge=1, le=500, description="page size (omit for all submissions)"),
+    after: str | None = Query(None, description="cursor: last submission id of the previous page"),
+    store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
+) -> list[Submission]:
     job = store.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return [Submission(**sub) for sub in store.list_submissions_for_job(job_id)]
+    return [Submission(**sub) for sub in store.list_submissions_for_job(job_id, limit=limit, after=after)]
 
 
 # ---- Community posts ----
@@ -1501,9 +1753,11 @@ def list_submissions(job_id: str, store: Annotated[Store, Depends(store_dep)] =
 def list_posts(
     tag: str | None = Query(None, description="optional tag filter"),
     limit: int = Query(50, ge=1, le=200),
+    response: Response = None,  # type: ignore[assignment]
     store: Annotated[Store | None, Depends(optional_store_dep)] = None,  # type: ignore[assignment]
 ) -> ListPostsResponse:
     if store is None:
+        _mark_uncacheable(response)
         return ListPostsResponse(posts=[])
     try:
         rows = list(store.list_posts(tag=tag, limit=limit) or [])
@@ -1517,10 +1771,11 @@ def list_posts(
                     continue
                 p["stats"] = stats.get(pid) or {"upvotes": 0, "bookmarks": 0, "views": 0, "comments": 0}
         except Exception:
-            pass
+            _mark_uncacheable(response)
         return ListPostsResponse(posts=[Post(**p) for p in rows])
     except Exception as e:
         logger.warning("list_posts_unavailable: %s", e)
+        _mark_uncacheable(response)
         return ListPostsResponse(posts=[])
 
 
@@ -1532,6 +1787,7 @@ def feed_jobs(
     sort: str = Query("latest", description="latest|trending"),
     window_hours: int = Query(24, ge=1, le=24 * 30, description="Trending window hint (best-effort)"),
     limit: int = Query(50, ge=1, le=200),
+    response: Response = None,  # type: ignore[assignment]
     store: Annotated[Store | None, Depends(optional_store_dep)] = None,  # type: ignore[assignment]
 ) -> ListJobsResponse:
     if status not in ("open", "all"):
@@ -1539,6 +1795,7 @@ def feed_jobs(
     if sort not in ("latest", "trending"):
         raise HTTPException(status_code=400, detail="Invalid sort (latest|trending)")
     if store is None:
+        _mark_uncacheable(response)
         return ListJobsResponse(jobs=[])
 
     rows = list(store.list_jobs(status=status, tag=tag) or [])
@@ -1552,7 +1809,7 @@ def feed_jobs(
                 continue
             j["stats"] = stats.get(jid) or {"upvotes": 0, "bookmarks": 0, "views": 0, "comments": 0}
     except Exception:
-        pass
+        _mark_uncacheable(response)
 
     if sort == "trending":
         # Windowed stats are the source of truth for trending (prevents "all-time" inertia).
@@ -1561,6 +1818,7 @@ def feed_jobs(
             ids = [str(j.get("id") or "") for j in rows if str(j.get("id") or "")]
             wstats = store.get_engagement_stats_batch_window(target_type="job", target_ids=ids, since_iso=since)
         except Exception:
+            _mark_uncacheable(response)
             wstats = {}
 
         def _score(j: dict) -> float:
@@ -1594,11 +1852,13 @@ def feed_posts(
     sort: str = Query("latest", description="latest|trending"),
     window_hours: int = Query(24, ge=1, le=24 * 30, description="Trending window hint (best-effort)"),
     limit: int = Query(50, ge=1, le=200),
+    response: Response = None,  # type: ignore[assignment]
     store: Annotated[Store | None, Depends(optional_store_dep)] = None,  # type: ignore[assignment]
 ) -> ListPostsResponse:
     if sort not in ("latest", "trending"):
         raise HTTPException(status_code=400, detail="Invalid sort (latest|trending)")
     if store is None:
+        _mark_uncacheable(response)
         return ListPostsResponse(posts=[])
 
     rows = list(store.list_posts(tag=tag, limit=200) or [])
@@ -1612,7 +1872,7 @@ def feed_posts(
                 continue
             p["stats"] = stats.get(pid) or {"upvotes": 0, "bookmarks": 0, "views": 0, "comments": 0}
     except Exception:
-        pass
+        _mark_uncacheable(response)
 
     if sort == "trending":
         since = (now - timedelta(hours=int(window_hours))).isoformat().replace("+00:00", "Z")
@@ -1620,6 +1880,7 @@ def feed_posts(
             ids = [str(p.get("id") or "") for p in rows if str(p.get("id") or "")]
             wstats = store.get_engagement_stats_batch_window(target_type="post", target_ids=ids, since_iso=since)
         except Exception:
+            _mark_uncacheable(response)
             wstats = {}
 
         def _score(p: dict) -> float:
@@ -1647,6 +1908,8 @@ def feed_posts(
 
 
 # ---- Engagement (reactions/views) ----
+# Views deliberately do not invalidate the response cache: they are the highest-volume write and would
+# turn every list/feed into a miss. View counts in cached listings may lag by RESPONSE_CACHE_TTL_SECONDS.
 @app.post("/api/v1/reactions", response_model=CreateReactionResponse)
 def create_reaction(
     req: CreateReactionRequest,
@@ -1655,6 +1918,8 @@ def create_reaction(
 ) -> CreateReactionResponse:
     _enforce_action_rate_limit(key=f"addr:{actor}:reactions", max_per_window=120, window_seconds=60)
     created = bool(store.upsert_reaction(actor_address=actor, target_type=req.target_type, target_id=req.target_id, kind=req.kind))
+    if created:
+        _invalidate_cached(_engagement_cache_tag(req.target_type))
     stats = store.get_engagement_stats(target_type=req.target_type, target_id=req.target_id)
     return CreateReactionResponse(target_type=req.target_type, target_id=req.target_id, kind=req.kind, stats=stats, created=created)
 
@@ -1667,6 +1932,8 @@ def delete_reaction(
 ) -> DeleteReactionResponse:
     _enforce_action_rate_limit(key=f"addr:{actor}:reactions", max_per_window=120, window_seconds=60)
     deleted = bool(store.delete_reaction(actor_address=actor, target_type=req.target_type, target_id=req.target_id, kind=req.kind))
+    if deleted:
+        _invalidate_cached(_engagement_cache_tag(req.target_type))
     stats = store.get_engagement_stats(target_type=req.target_type, target_id=req.target_id)
     return DeleteReactionResponse(target_type=req.target_type, target_id=req.target_id, kind=req.kind, stats=stats, deleted=deleted)
 
@@ -1909,6 +2176,7 @@ def create_post(
             "created_at": utc_now_iso(),
         }
     )
+    _invalidate_cached("posts")
     _semantic_upsert(store, doc_type="post", doc_id=str(created.get("id") or ""), text=f"{req.title}\n\n{req.content}")
     return Post(**created)
 
@@ -2039,8 +2307,7 @@ def _notify_comment_created(*, store: Store, comment: dict) -> None:
             if owner:
                 recipients.add(owner)
         elif target_type == "submission":
-            s = store.get_submission(target_id) or {}
-            owner = normalize_address(str(s.get("agent_address") or ""))
+            owner = normalize_address(store.get_submission_author(target_id) or "")
             if owner:
                 recipients.add(owner)
     except Exception:
@@ -2072,42 +2339,6 @@ def _notify_comment_created(*, store: Store, comment: dict) -> None:
         )
 
 
-def _notify_job_closed(*, store: Store, job_id: str, winner_submission_id: str, actor: str, via: str) -> None:
-    """
-    Notify participants that a job is closed/finalized.
-    via: "close" | "finalize"
-    """
-    j = store.get_job(job_id) or {}
-    sponsor = normalize_address(str(j.get("sponsor_address") or ""))
-    recipients: set[str] = set()
-    if sponsor:
-        recipients.add(sponsor)
-    try:
-        subs = store.list_submissions_for_job(job_id) or []
-        for s in subs:
-            a = normalize_address(str(s.get("agent_address") or ""))
-            if a:
-                recipients.add(a)
-    except Exception:
-        pass
-
-    recipients = {r for r in recipients if r and normalize_address(r) != normalize_address(actor)}
-    payload = {"job_id": job_id, "winner_submission_id": winner_submission_id, "via": via}
-    for r in recipients:
-        _safe_notify(
-            store,
-            {
-                "recipient_address": r,
-                "actor_address": normalize_address(actor),
-                "type": "job_closed" if via == "close" else "job_finalized",
-                "target_type": "job",
-                "target_id": job_id,
-                "payload": payload,
-                "created_at": utc_now_iso(),
-            },
-        )
-
-
 # ---- Discussion (comments) ----
 @app.get("/api/v1/jobs/{job_id}/comments", response_model=ListCommentsResponse)
 def list_job_comments(
@@ -2143,6 +2374,7 @@ def create_job_comment(
             "created_at": utc_now_iso(),
         }
     )
+    _invalidate_cached(_engagement_cache_tag("job"))
     _semantic_upsert(store, doc_type="comment", doc_id=str(created.get("id") or ""), text=str(created.get("content") or ""))
     try:
         _notify_comment_created(store=store, comment=created)
@@ -2185,6 +2417,7 @@ def create_post_comment(
             "created_at": utc_now_iso(),
         }
     )
+    _invalidate_cached(_engagement_cache_tag("post"))
     _semantic_upsert(store, doc_type="comment", doc_id=str(created.get("id") or ""), text=str(created.get("content") or ""))
     try:
         _notify_comment_created(store=store, comment=created)
@@ -2199,8 +2432,7 @@ def list_submission_comments(
     limit: int = Query(200, ge=1, le=500),
     store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
 ) -> ListCommentsResponse:
-    sub = store.get_submission(submission_id)
-    if not sub:
+    if store.get_submission_author(submission_id) is None:
         raise HTTPException(status_code=404, detail="Submission not found")
     rows = store.list_comments(target_type="submission", target_id=submission_id, limit=limit)
     return ListCommentsResponse(comments=[Comment(**r) for r in rows])
@@ -2214,8 +2446,7 @@ def create_submission_comment(
     store: Annotated[Store, Depends(store_dep)] = None,  # type: ignore[assignment]
 ) -> CreateCommentResponse:
     _enforce_action_rate_limit(key=f"addr:{author}:comments", max_per_window=20, window_seconds=60)
-    sub = store.get_submission(submission_id)
-    if not sub:
+    if store.get_submission_author(submission_id) is None:
         raise HTTPException(status_code=404, detail="Submission not found")
     created = store.create_comment(
         comment={
@@ -2258,6 +2489,9 @@ def delete_comment(
         raise HTTPException(status_code=403, detail="Only author or operator can delete comment")
 
     deleted = store.soft_delete_comment(comment_id=comment_id, deleted_by=caller)
+    # Submission comments are not counted in any cached listing.
+    if str(existing.get("target_type") or "") in ("job", "post"):
+        _invalidate_cached(_engagement_cache_tag(str(existing.get("target_type"))))
     return CreateCommentResponse(comment=Comment(**deleted))
 
 
@@ -2326,51 +2560,45 @@ def _vote_weight(rep_score: float) -> float:
     return float(min(5.0, max(1.0, base)))
 
 
-def _ensure_can_vote(store: Store, voter: str) -> tuple[float, float]:
-    staked = float(store.get_stake(voter))
-    rep = store.get_rep(voter)
-    rep_score = float(rep.get("score", 0.0))
+def _ensure_can_vote(staked: float, rep_score: float) -> None:
     if settings.SERVICE_STAGE != "demo":
         if settings.REQUIRE_STAKE_FOR_JURY_VOTE and staked < settings.MIN_STAKE_USDC:
             raise HTTPException(status_code=403, detail="Insufficient stake to vote")
         if settings.REQUIRE_REP_FOR_JURY_VOTE and rep_score < settings.MIN_REP_SCORE_TO_VOTE:
             raise HTTPException(status_code=403, detail="Insufficient reputation to vote")
-    return staked, rep_score
+
+
+def _ensure_valid_vote_target(ctx: dict, voter: str) -> None:
+    """Shared submission checks for jury and final votes (ctx comes from Store.get_vote_context)."""
+    author = ctx.get("submission_author")
+    if not author:
+        raise HTTPException(status_code=400, detail="Invalid submission_id for job")
+    # Sacred Agora rule: no self-voting. You cannot vote for your own submission.
+    if normalize_address(author) == normalize_address(voter):
+        raise HTTPException(status_code=403, detail="Self-voting is not allowed")
 
 
 @app.post("/api/v1/votes", response_model=CreateVoteResponse)
 def create_vote(req: CreateVoteRequest, voter: CurrentAgent) -> CreateVoteResponse:
     s = store_dep()
+    # One read for eligibility + target validation, one write for the vote itself.
+    ctx = s.get_vote_context(job_id=req.job_id, submission_id=req.submission_id, voter_address=voter)
     # Participation policy: jury voting is an agent action. Require self-declared agent badge.
-    prof = s.get_profile(voter)
-    if str(prof.get("participant_type") or "unknown").lower() != "agent":
+    if str(ctx.get("participant_type") or "unknown").lower() != "agent":
         raise HTTPException(
             status_code=403,
             detail="Jury voting requires participant_type=agent. Set it in /account (web) or PUT /api/v1/profile (API) and retry.",
         )
     # Eligibility
-    _, rep_score = _ensure_can_vote(s, voter)
+    rep_score = float(ctx.get("rep_score") or 0.0)
+    _ensure_can_vote(float(ctx.get("stake") or 0.0), rep_score)
 
-    job = s.get_job(req.job_id)
+    job = ctx.get("job")
     if not job or job.get("status") != "open":
         raise HTTPException(status_code=400, detail="Invalid job_id (missing or closed)")
 
-    # Must vote for an existing submission of that job
-    subs = s.list_submissions_for_job(req.job_id)
-    if not any(s.get("id") == req.submission_id for s in subs):
-        raise HTTPException(status_code=400, detail="Invalid submission_id for job")
-
-    # Sacred Agora rule: no self-voting. You cannot vote for your own submission.
-    try:
-        sub = next((x for x in subs if str(x.get("id") or "") == str(req.submission_id)), None)
-        author = normalize_address(str((sub or {}).get("agent_address") or ""))
-        if author and author == normalize_address(voter):
-            raise HTTPException(status_code=403, detail="Self-voting is not allowed")
-    except HTTPException:
-        raise
-    except Exception:
-        # Fail safe: if we can't determine author, do not block.
-        pass
+    # Must vote for an existing submission of that job (and not your own).
+    _ensure_valid_vote_target(ctx, voter)
 
     vote_obj = Vote(
         id="",
@@ -2407,7 +2635,8 @@ def create_final_vote(req: CreateFinalVoteRequest, voter: CurrentAgent) -> Creat
     This vote is separate from Jury votes.
     """
     s = store_dep()
-    job = s.get_job(req.job_id)
+    ctx = s.get_vote_context(job_id=req.job_id, submission_id=req.submission_id, voter_address=voter)
+    job = ctx.get("job")
     if not job or job.get("status") != "open":
         raise HTTPException(status_code=400, detail="Invalid job_id (missing or closed)")
 
@@ -2434,21 +2663,7 @@ def create_final_vote(req: CreateFinalVoteRequest, voter: CurrentAgent) -> Creat
     if ends and now > ends:
         raise HTTPException(status_code=400, detail="Final voting window has ended")
 
-    subs = s.list_submissions_for_job(req.job_id)
-    if not any(sub.get("id") == req.submission_id for sub in subs):
-        raise HTTPException(status_code=400, detail="Invalid submission_id for job")
-
-    # Sacred Agora rule: no self-voting. You cannot vote for your own submission.
-    try:
-        sub = next((x for x in subs if str(x.get("id") or "") == str(req.submission_id)), None)
-        author = normalize_address(str((sub or {}).get("agent_address") or ""))
-        if author and author == normalize_address(voter):
-            raise HTTPException(status_code=403, detail="Self-voting is not allowed")
-    except HTTPException:
-        raise
-    except Exception:
-        # Fail safe: if we can't determine author, do not block.
-        pass
+    _ensure_valid_vote_target(ctx, voter)
 
     saved = s.upsert_final_vote(job_id=req.job_id, voter_address=voter, submission_id=req.submission_id)
     return CreateFinalVoteResponse(vote=FinalVote(**saved))
@@ -2486,8 +2701,8 @@ def close_job(job_id: str, req: CloseJobRequest, caller: CurrentAgent) -> CloseJ
     if normalize_address(caller) != sponsor:
         raise HTTPException(status_code=403, detail="Only sponsor can close this job")
 
-    subs = s.list_submissions_for_job(job_id)
-    if not any(s.get("id") == req.winner_submission_id for s in subs):
+    authors = s.submission_ids_and_authors(job_id)
+    if req.winner_submission_id not in authors:
         raise HTTPException(status_code=400, detail="winner_submission_id not found for job")
 
     # close
@@ -2500,60 +2715,26 @@ def close_job(job_id: str, req: CloseJobRequest, caller: CurrentAgent) -> CloseJ
         close_contract_address=req.close_contract_address,
         close_block_number=req.close_block_number,
         close_log_index=req.close_log_index,
+        win_reward_agr=win_reward_amount(),
     )
+    if job is None:
+        # Closed concurrently (auto-finalize or /finalize) after the check above: that close stands.
+        raise HTTPException(status_code=409, detail="Job already closed")
+    _invalidate_cached("jobs", "leaderboard")
 
     # Notifications: inform participants that the job is closed.
     try:
-        _notify_job_closed(store=s, job_id=job_id, winner_submission_id=req.winner_submission_id, actor=caller, via="close")
+        notify_job_closed(store=s, job_id=job_id, winner_submission_id=req.winner_submission_id, actor=caller, via="close")
     except Exception:
         pass
 
-    # Demo rewards (Option A): mint offchain AGR credits to the winning submission author.
-    if settings.REWARDS_ENABLED and int(settings.AGR_MINT_PER_WIN) > 0:
-        try:
-            winner = next((sub for sub in subs if str(sub.get("id") or "") == str(req.winner_submission_id)), None)
-            winner_addr = normalize_address(str((winner or {}).get("agent_address") or ""))
-            if winner_addr:
-                # Idempotency guard (best-effort): avoid duplicate win rewards for the same job/address.
-                already = False
-                try:
-                    rows = s.list_agr_ledger(address=winner_addr, limit=500)
-                    already = any(
-                        str(r.get("reason") or "").lower() == "win" and str(r.get("job_id") or "") == str(job_id)
-                        for r in (rows or [])
-                    )
-                except Exception:
-                    already = False
-                if not already:
-                    s.agr_credit(
-                        address=winner_addr,
-                        amount=int(settings.AGR_MINT_PER_WIN),
-                        reason="win",
-                        job_id=str(job_id),
-                    )
-        except Exception:
-            pass
-
-    # Phase 2 anchoring: create canonical snapshot + root/uri (offchain).
+    # Phase 2 anchoring: canonical snapshot + root/uri (offchain), built in the background so close stays fast.
+    # Clients read it from GET /api/v1/jobs/{job_id}/anchor once ready.
     # Onchain posting is done separately by the operator Safe; receipt is recorded later.
     try:
-        anchor = create_job_anchor_snapshot(store=s, job_id=job_id)
-        job = dict(job)
-        job.update(
-            {
-                "anchor_root": anchor.get("anchor_root"),
-                "anchor_uri": anchor.get("anchor_uri"),
-                "anchor_schema_version": anchor.get("schema_version"),
-                "anchor_salt": anchor.get("salt"),
-                "anchor_tx_hash": anchor.get("anchor_tx_hash"),
-                "anchor_chain_id": anchor.get("anchor_chain_id"),
-                "anchor_contract_address": anchor.get("anchor_contract_address"),
-                "anchor_block_number": anchor.get("anchor_block_number"),
-                "anchor_log_index": anchor.get("anchor_log_index"),
-            }
-        )
+        schedule_job_anchor_snapshot(store=s, job_id=job_id)
     except Exception as e:
-        logger.warning("anchor_snapshot_failed: %s", e)
+        logger.warning("anchor_snapshot_schedule_failed: %s", e)
 
     summary = job_votes(job_id)
     return CloseJobResponse(job=Job(**job), winner_submission_id=req.winner_submission_id, voting_summary=summary)
@@ -2570,6 +2751,19 @@ def get_job_anchor(job_id: str, store: Annotated[Store, Depends(store_dep)] = No
     return AnchorBatch(**a)
 
 
+@app.get("/api/v1/jobs/{job_id}/anchor/verify", response_model=AnchorVerification)
+def verify_job_anchor_inclusion(job_id: str, store: Annotated[Store, Depends(store_dep)] = None) -> AnchorVerification:  # type: ignore[assignment]
+    """
+    Check the job snapshot root against the root that covers it: the rollup root via the stored inclusion proof,
+    or the root itself when it was posted alone. `posted` tells whether that root has an onchain receipt.
+    """
+    try:
+        res = verify_job_anchor(store, job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Anchor not found")
+    return AnchorVerification(**res)
+
+
 @app.post("/api/v1/jobs/{job_id}/anchor_receipt", response_model=AnchorBatch)
 def record_job_anchor_receipt(
     job_id: str,
@@ -2642,47 +2836,26 @@ def finalize_job(job_id: str, voter: CurrentAgent) -> CloseJobResponse:
     winner_submission_id = str(ordered[0]["submission_id"])
 
     # close using existing close flow (no onchain anchors here)
-    job = s.close_job(job_id, winner_submission_id, utc_now_iso())
+    job = s.close_job(job_id, winner_submission_id, utc_now_iso(), win_reward_agr=win_reward_amount())
+    if job is None:
+        raise HTTPException(status_code=409, detail="Job already closed")
+    _invalidate_cached("jobs", "leaderboard")
 
     # Notifications: inform participants that the job was finalized by voting.
     try:
-        _notify_job_closed(store=s, job_id=job_id, winner_submission_id=winner_submission_id, actor=voter, via="finalize")
+        notify_job_closed(store=s, job_id=job_id, winner_submission_id=winner_submission_id, actor=voter, via="finalize")
     except Exception:
         pass
 
-    # Demo rewards (Option A): mint offchain AGR credits to the winning submission author.
-    if settings.REWARDS_ENABLED and int(settings.AGR_MINT_PER_WIN) > 0:
-        try:
-            winner_sub = s.get_submission(winner_submission_id)
-            winner_addr = normalize_address(str((winner_sub or {}).get("agent_address") or ""))
-            if winner_addr:
-                # Idempotency guard (best-effort): avoid duplicate win rewards for the same job/address.
-                already = False
-                try:
-                    rows = s.list_agr_ledger(address=winner_addr, limit=500)
-                    already = any(
-                        str(r.get("reason") or "").lower() == "win" and str(r.get("job_id") or "") == str(job_id)
-                        for r in (rows or [])
-                    )
-                except Exception:
-                    already = False
-                if not already:
-                    s.agr_credit(
-                        address=winner_addr,
-                        amount=int(settings.AGR_MINT_PER_WIN),
-                        reason="win",
-                        job_id=str(job_id),
-                    )
-        except Exception:
-            pass
     summary = job_votes(job_id)
     return CloseJobResponse(job=Job(**job), winner_submission_id=winner_submission_id, voting_summary=summary)
 
 
 @app.get("/api/v1/reputation/leaderboard", response_model=LeaderboardResponse)
-def leaderboard(limit: int = Query(50, ge=1, le=200)) -> LeaderboardResponse:
+def leaderboard(response: Response, limit: int = Query(50, ge=1, le=200)) -> LeaderboardResponse:
     s = optional_store_dep()
     if s is None:
+        _mark_uncacheable(response)
         return LeaderboardResponse(entries=[])
     try:
         entries = []
@@ -2691,6 +2864,7 @@ def leaderboard(limit: int = Query(50, ge=1, le=200)) -> LeaderboardResponse:
         return LeaderboardResponse(entries=entries)
     except Exception as e:
         logger.warning("leaderboard_unavailable: %s", e)
+        _mark_uncacheable(response)
         return LeaderboardResponse(entries=[])
 
 
@@ -2721,6 +2895,21 @@ def seed() -> None:
         # For local demos, you may opt-in to run it in the API process.
         if settings.ONCHAIN_SYNC_ENABLED and getattr(settings, "ONCHAIN_SYNC_RUN_IN_API", False):
             Thread(target=run_loop, args=(s,), daemon=True).start()
+        if settings.AUTO_FINALIZE_ENABLED and settings.AUTO_FINALIZE_RUN_IN_API:
+            Thread(
+                target=run_finalize_loop,
+                args=(s, lambda: _invalidate_cached("jobs", "leaderboard")),
+                name="agora-auto-finalize",
+                daemon=True,
+            ).start()
+        if settings.ANCHOR_ROLLUP_RUN_IN_API and (settings.ANCHOR_ROLLUP_ENABLED or settings.ANCHORING_EOA_PRIVATE_KEY):
+            Thread(target=run_anchor_loop, args=(s,), name="agora-anchor-worker", daemon=True).start()
+
+        # Keep admin/public stats warm so request handlers never run the COUNT queries.
+        if settings.STATS_REFRESHER_ENABLED:
+            stats_cache.start_refresher(s)
+        else:
+            stats_cache.warm(s)
 
         if s.list_jobs(status="all"):
             return
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import Callable, Iterable
+
+HashFn = Callable[[bytes], bytes]
+
+
+def hash_pair(a: bytes, b: bytes, hash_fn: HashFn) -> bytes:
+    # Sorted pairs (OpenZeppelin MerkleProof.verify): proofs need no left/right flags.
+    return hash_fn(a + b if a <= b else b + a)
+
+
+def verify_proof(leaf: bytes, proof: Iterable[bytes], root: bytes, *, hash_fn: HashFn) -> bool:
+    h = leaf
+    for sibling in proof:
+        h = hash_pair(h, sibling, hash_fn)
+    return h == root
+
+
+def level_counts(n: int) -> list[int]:
+    """Nodes per level, leaves first. A lone last node is promoted unchanged to the next level."""
+    counts = [int(n)]
+    while counts[-1] > 1:
+        counts.append((counts[-1] + 1) // 2)
+    return counts
+
+
+def build_levels(leaves: list[bytes], *, hash_fn: HashFn) -> list[list[bytes]]:
+    """In-memory tree (leaves first, root last) for small sets; see server/rewards.py for the streaming builder."""
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        cur = levels[-1]
+        levels.append([hash_pair(cur[i], cur[i + 1], hash_fn) if i + 1 < len(cur) else cur[i] for i in range(0, len(cur), 2)])
+    return levels
+
+
+def proof_for(levels: list[list[bytes]], index: int) -> list[bytes]:
+    out: list[bytes] = []
+    idx = int(index)
+    for level in levels[:-1]:
+        sib = idx ^ 1
+        if sib < len(level):
+            out.append(level[sib])
+        idx >>= 1
+    return out
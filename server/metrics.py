@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any, Iterable
+
+# Default latency buckets (seconds): sub-millisecond store calls up to multi-second RPCs.
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class _Cells:
+    """Per-thread metric state. Only the owning thread writes; the scraper only reads copies."""
+
+    __slots__ = ("counters", "hists")
+
+    def __init__(self) -> None:
+        self.counters: dict[tuple[str, Labels], float] = {}
+        # value layout: [bucket_0, ..., bucket_n-1, +Inf, sum]
+        self.hists: dict[tuple[str, Labels], list[float]] = {}
+
+
+class Registry:
+    """
+    Minimal Prometheus-style registry (counters + histograms) with lock-free hot paths.
+
+    Each thread increments its own cells (thread-local dicts), so `inc()`/`observe()` never take a
+    lock and never race; `render()` sums the per-thread cells at scrape time. The only lock is taken
+    once per thread, when its cells are first registered.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._all: list[_Cells] = []
+        self._all_lock = threading.Lock()
+        self._meta: dict[str, tuple[str, str, tuple[float, ...]]] = {}
+
+    def _cells(self) -> _Cells:
+        c = getattr(self._local, "cells", None)
+        if c is None:
+            c = _Cells()
+            with self._all_lock:
+                self._all.append(c)
+            self._local.cells = c
+        return c
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._meta[name] = ("counter", help_text, ())
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self._meta[name] = ("histogram", help_text, tuple(sorted(float(b) for b in buckets)))
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1.0) -> None:
+        counters = self._cells().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        hists = self._cells().hists
+        key = (name, labels)
+        bounds = self._meta[name][2]
+        h = hists.get(key)
+        if h is None:
+            h = [0.0] * (len(bounds) + 2)
+            hists[key] = h
+        i = 0
+        n = len(bounds)
+        while i < n and value > bounds[i]:
+            i += 1
+        h[i] += 1
+        h[-1] += value
+
+    def _collect(self) -> tuple[dict[tuple[str, Labels], float], dict[tuple[str, Labels], list[float]]]:
+        with self._all_lock:
+            cells = list(self._all)
+        counters: dict[tuple[str, Labels], float] = {}
+        hists: dict[tuple[str, Labels], list[float]] = {}
+        for c in cells:
+            # dict.copy() is atomic under the GIL, so concurrent inserts by the owner thread are safe.
+            for k, v in c.counters.copy().items():
+                counters[k] = counters.get(k, 0.0) + v
+            for k, h in c.hists.copy().items():
+                cur = hists.get(k)
+                snap = list(h)
+                if cur is None:
+                    hists[k] = snap
+                else:
+                    for i in range(len(snap)):
+                        cur[i] += snap[i]
+        return counters, hists
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        counters, hists = self._collect()
+        by_name: dict[str, list[tuple[Labels, Any]]] = {}
+        for (name, labels), v in counters.items():
+            by_name.setdefault(name, []).append((labels, v))
+        for (name, labels), h in hists.items():
+            by_name.setdefault(name, []).append((labels, h))
+
+        lines: list[str] = []
+        for name in sorted(set(self._meta) | set(by_name)):
+            kind, help_text, bounds = self._meta.get(name, ("counter", "", ()))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, v in sorted(by_name.get(name, []), key=lambda x: x[0]):
+                if kind == "histogram":
+                    cumulative = 0.0
+                    for i, b in enumerate(bounds):
+                        cumulative += v[i]
+                        lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', _fmt_num(b)),))} {_fmt_num(cumulative)}")
+                    cumulative += v[len(bounds)]
+                    lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {_fmt_num(cumulative)}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_num(v[-1])}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {_fmt_num(cumulative)}")
+                else:
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_num(v)}")
+        return "\n".join(lines) + "\n"
+
+
+def _fmt_num(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+# ---- Process registry + well-known metrics ----
+registry = Registry()
+
+registry.counter("agora_http_requests_total", "HTTP requests by method, route template and status code.")
+registry.histogram("agora_http_request_duration_seconds", "HTTP request latency by method and route template.")
+registry.counter("agora_rate_limited_total", "Requests rejected by rate limiting, by scope.")
+registry.counter("agora_store_calls_total", "Store method calls.")
+registry.counter("agora_store_errors_total", "Store method calls that raised.")
+registry.histogram("agora_store_call_duration_seconds", "Store method latency.")
+registry.counter("agora_embedding_calls_total", "Embedding API calls by outcome.")
+registry.histogram("agora_embedding_duration_seconds", "Embedding API latency.")
+registry.counter("agora_web3_rpc_calls_total", "Web3 JSON-RPC calls by method and outcome.")
+registry.histogram("agora_web3_rpc_duration_seconds", "Web3 JSON-RPC latency by method.")
+registry.counter("agora_auth_verify_total", "Auth signature verifications by branch (ecdsa, eip1271, eip1271_cached; ecdsa_batch counts whole batches) and outcome.")
+registry.histogram("agora_auth_verify_duration_seconds", "Auth signature verification latency by branch.")
+registry.counter("agora_auth_eip1271_cache_total", "EIP-1271 code/result cache lookups by outcome.")
+registry.counter("agora_web3_rpc_failovers_total", "JSON-RPC requests that failed over away from an endpoint, by host.")
+registry.counter("agora_onchain_reorgs_total", "Chain reorgs detected and rolled back by onchain sync.")
+registry.counter("agora_stake_lookups_total", "Request-path stake lookups by source (cache, mirror, rpc, rpc_error).")
+
+
+def observe_request(method: str, route: str, status_code: int, seconds: float) -> None:
+    registry.inc("agora_http_requests_total", (("method", method), ("route", route), ("status", str(status_code))))
+    registry.observe("agora_http_request_duration_seconds", seconds, (("method", method), ("route", route)))
+
+
+def rate_limited(scope: str) -> None:
+    registry.inc("agora_rate_limited_total", (("scope", scope),))
+
+
+def observe_embedding(seconds: float, *, ok: bool) -> None:
+    registry.inc("agora_embedding_calls_total", (("outcome", "ok" if ok else "error"),))
+    registry.observe("agora_embedding_duration_seconds", seconds)
+
+
+def observe_rpc(method: str, seconds: float, *, ok: bool) -> None:
+    registry.inc("agora_web3_rpc_calls_total", (("method", method), ("outcome", "ok" if ok else "error")))
+    registry.observe("agora_web3_rpc_duration_seconds", seconds, (("method", method),))
+
+
+def observe_auth_verify(branch: str, seconds: float, *, ok: bool) -> None:
+    registry.inc("agora_auth_verify_total", (("branch", branch), ("outcome", "ok" if ok else "invalid")))
+    registry.observe("agora_auth_verify_duration_seconds", seconds, (("branch", branch),))
+
+
+class InstrumentedStore:
+    """
+    Transparent proxy around a Store that records per-method call counts, errors and durations.
+    Non-callable attributes pass through untouched; wrapped methods are cached per name.
+    """
+
+    def __init__(self, inner: Any) -> None:
+        object.__setattr__(self, "_inner", inner)
+        object.__setattr__(self, "_wrapped", {})
+
+    @property
+    def inner(self) -> Any:
+        return self._inner
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._inner, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        fn = self._wrapped.get(name)
+        if fn is not None:
+            return fn
+        labels: Labels = (("method", name),)
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            t0 = time.perf_counter()
+            try:
+                return getattr(self._inner, name)(*args, **kwargs)
+            except Exception:
+                registry.inc("agora_store_errors_total", labels)
+                raise
+            finally:
+                registry.inc("agora_store_calls_total", labels)
+                registry.observe("agora_store_call_duration_seconds", time.perf_counter() - t0, labels)
+
+        timed.__name__ = name
+        self._wrapped[name] = timed
+        return timed
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._inner, name, value)
@@ -31,6 +31,30 @@ class AuthVerifyResponse(BaseModel):
     token_type: Literal["bearer"] = "bearer"
 
 
+class AuthBatchChallengeRequest(BaseModel):
+    addresses: list[str] = Field(..., min_length=1, description="EVM addresses (0x...); max AGORA_AUTH_BATCH_MAX_SIZE")
+
+
+class AuthBatchChallengeResponse(BaseModel):
+    challenges: list[AuthChallengeResponse]
+
+
+class AuthBatchVerifyRequest(BaseModel):
+    items: list[AuthVerifyRequest] = Field(..., min_length=1, description="One signature per challenged address")
+
+
+class AuthBatchVerifyResult(BaseModel):
+    address: str
+    ok: bool
+    access_token: str | None = None
+    token_type: Literal["bearer"] = "bearer"
+    error: str | None = None
+
+
+class AuthBatchVerifyResponse(BaseModel):
+    results: list[AuthBatchVerifyResult]
+
+
 class StakeRequirements(BaseModel):
     network: str
     chain_id: int
@@ -325,6 +349,17 @@ class ListAgrLedgerResponse(BaseModel):
     count: int
 
 
+class RewardProof(BaseModel):
+    epoch_id: str
+    address: str
+    agr: str  # uint256 as decimal string
+    usdc: str  # uint256 as decimal string
+    index: int
+    leaf: str
+    proof: list[str]
+    merkle_root: str
+
+
 class BoostJobRequest(BaseModel):
     amount_agr: int = Field(..., ge=1, le=1_000_000)
     duration_hours: int = Field(..., ge=1, le=24 * 30)
@@ -428,9 +463,68 @@ class AnchorBatch(BaseModel):
     anchor_contract_address: str | None = None
     anchor_block_number: int | None = None
     anchor_log_index: int | None = None
+    rollup_id: str | None = None
+    rollup_index: int | None = None
+    rollup_proof: list[str] | None = None
+    created_at: str = Field(default_factory=utc_now_iso)
+
+
+class AnchorRollup(BaseModel):
+    id: str
+    merkle_root: str
+    leaf_count: int
+    schema_version: int
+    salt: str
+    anchor_uri: str
+    anchor_tx_hash: str | None = None
+    anchor_chain_id: int | None = None
+    anchor_contract_address: str | None = None
+    anchor_block_number: int | None = None
+    anchor_log_index: int | None = None
     created_at: str = Field(default_factory=utc_now_iso)
 
 
+class AnchorTx(BaseModel):
+    id: str
+    kind: Literal["job", "rollup"]
+    target_id: str
+    status: Literal["queued", "sent", "mined", "failed"]
+    from_address: str | None = None
+    nonce: int | None = None
+    tx_hash: str | None = None
+    tx_hashes: list[str] = Field(default_factory=list)
+    gas_limit: int | None = None
+    max_fee_per_gas: int | None = None
+    max_priority_fee_per_gas: int | None = None
+    gas_price: int | None = None
+    attempts: int = 0
+    bumps: int = 0
+    last_error: str | None = None
+    block_number: int | None = None
+    sent_at: str | None = None
+    mined_at: str | None = None
+    created_at: str = Field(default_factory=utc_now_iso)
+    updated_at: str = Field(default_factory=utc_now_iso)
+
+
+class AnchorVerification(BaseModel):
+    job_id: str
+    anchor_root: str
+    anchor_uri: str
+    mode: str  # "rollup" | "direct" | "none" (snapshot not covered by a posted or pending root yet)
+    leaf: str | None = None
+    rollup_id: str | None = None
+    rollup_root: str | None = None
+    rollup_index: int | None = None
+    proof: list[str] = Field(default_factory=list)
+    verified: bool
+    posted: bool
+    anchor_tx_hash: str | None = None
+    anchor_chain_id: int | None = None
+    anchor_contract_address: str | None = None
+    anchor_block_number: int | None = None
+
+
 class RecordAnchorReceiptRequest(BaseModel):
     anchor_tx_hash: str = Field(..., description="Anchor tx hash (0x…66)")
     anchor_chain_id: int = Field(..., ge=1, description="chainId for anchor tx")
@@ -507,6 +601,20 @@ class ListAnchorBatchesResponse(BaseModel):
     anchors: list[AnchorBatch]
 
 
+class ListAnchorRollupsResponse(BaseModel):
+    rollups: list[AnchorRollup]
+
+
+class PrepareAnchorRollupTxResponse(BaseModel):
+    """postAnchor() payload for a rollup root (Safe/multisig), like PrepareAnchorTxResponse."""
+
+    chain_id: int
+    to: str
+    data: str
+    value_wei: int = 0
+    rollup: AnchorRollup
+
+
 class PublicStats(BaseModel):
     # Cumulative users = unique addresses that have ever authenticated (wallet = identity).
     users_total: int
@@ -536,6 +644,9 @@ class AdminMetrics(BaseModel):
     votes_total: int
     final_votes_total: int
     active_sessions: int
+    # Counts come from a cached snapshot; these say how old it is.
+    stats_computed_at: str | None = None
+    stats_age_seconds: float = 0.0
 
 
 class LeaderboardEntry(BaseModel):
@@ -1,9 +1,26 @@
 from __future__ import annotations
 
-from functools import lru_cache
+import logging
+import time
+from typing import Any
 
+from eth_abi import decode as abi_decode
+from eth_abi import encode as abi_encode
 from web3 import Web3
 
+from server.rpc import PooledProvider, get_rpc_client, get_web3
+
+logger = logging.getLogger("agora.onchain")
+
+# Canonical Multicall3 (same address on Base, OP, Ethereum and most EVM chains).
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+_AGGREGATE3_SELECTOR = bytes(Web3.keccak(text="aggregate3((address,bool,bytes)[])"))[:4]
+_STAKE_OF_SELECTOR = bytes(Web3.keccak(text="stakeOf(address)"))[:4]
+# (provider, multicall address) -> monotonic time until which Multicall3 is skipped after it failed there.
+# Bounded so a transient RPC error does not disable it for the life of the process.
+_MULTICALL_RETRY_SECONDS = 600.0
+_multicall_down_until: dict[tuple[str, str], float] = {}
+
 
 STAKE_VAULT_ABI = [
     {
@@ -20,18 +37,87 @@ def _to_checksum(w3: Web3, address: str) -> str:
     return w3.to_checksum_address(address)
 
 
-@lru_cache(maxsize=4)
-def _w3(rpc_url: str) -> Web3:
-    return Web3(Web3.HTTPProvider(rpc_url))
+def http_provider(rpc_url: str, *, timeout: float | None = None) -> PooledProvider:
+    """web3 provider for `rpc_url` on the shared RPC client (server/rpc.py)."""
+    return get_rpc_client(rpc_url, timeout=timeout).provider()
 
 
-def get_stake_amount_usdc(*, rpc_url: str, stake_contract: str, agent_address: str) -> float:
+def get_stake_amount_usdc(*, rpc_url: str, stake_contract: str, agent_address: str, timeout: float | None = None) -> float:
     """
     Returns staked amount in "USDC units" assuming 6 decimals in the staking vault.
     (We keep this simple for Phase 1. If the vault supports arbitrary ERC20, extend this.)
+    `timeout` bounds the read (seconds): one attempt per endpoint, no retry rounds. None uses the client defaults.
     """
-    w3 = _w3(rpc_url)
+    w3 = get_web3(rpc_url, timeout=timeout, retries=0 if timeout is not None else None)
     c = w3.eth.contract(address=_to_checksum(w3, stake_contract), abi=STAKE_VAULT_ABI)
     raw: int = c.functions.stakeOf(_to_checksum(w3, agent_address)).call()
     return raw / 1_000_000  # USDC: 6 decimals
 
+
+def _stake_of_calldata(agent: str) -> bytes:
+    return _STAKE_OF_SELECTOR + bytes(12) + bytes.fromhex(agent.lower().removeprefix("0x"))
+
+
+def _multicall_stake_of(w3: Web3, multicall: str, target: str, agents: list[str], block_identifier: Any) -> dict[str, int]:
+    data = _AGGREGATE3_SELECTOR + abi_encode(
+        ["(address,bool,bytes)[]"], [[(target, True, _stake_of_calldata(a)) for a in agents]]
+    )
+    ret = w3.eth.call({"to": multicall, "data": "0x" + data.hex()}, block_identifier=block_identifier)
+    (results,) = abi_decode(["(bool,bytes)[]"], bytes(ret))
+    if len(results) != len(agents):
+        raise ValueError("multicall result length mismatch")
+    return {a: int.from_bytes(rd[:32], "big") for a, (ok, rd) in zip(agents, results) if ok and len(rd) >= 32}
+
+
+def _batch_stake_of(w3: Web3, target: str, agents: list[str], block_identifier: Any) -> dict[str, int]:
+    with w3.batch_requests() as batch:
+        for a in agents:
+            batch.add(w3.eth.call({"to": target, "data": "0x" + _stake_of_calldata(a).hex()}, block_identifier))
+        results = batch.execute()
+    return {a: int.from_bytes(bytes(r)[:32], "big") for a, r in zip(agents, results) if r is not None and len(bytes(r)) >= 32}
+
+
+def stake_of_many(
+    w3: Web3,
+    *,
+    stake_contract: str,
+    agents: list[str],
+    block_identifier: int | str = "latest",
+    chunk_size: int = 500,
+    multicall_address: str | None = MULTICALL3_ADDRESS,
+) -> dict[str, int]:
+    """
+    Raw stakeOf(agent) for many agents, all read at `block_identifier`: one Multicall3 aggregate3 eth_call per
+    chunk, falling back to a JSON-RPC batch of eth_calls (no Multicall3 on the chain / provider rejects it),
+    then to single calls. Keys are lowercased addresses; agents whose read failed are omitted.
+    A Multicall3 failure is remembered per provider for _MULTICALL_RETRY_SECONDS, so later calls go straight to
+    the batch path instead of paying for a failing aggregate3 first.
+    """
+    target = Web3.to_checksum_address(stake_contract)
+    addrs = [str(a).lower() for a in agents]
+    out: dict[str, int] = {}
+    mc_key = (str(w3.provider), str(multicall_address or "").strip().lower())
+    use_multicall = bool(mc_key[1]) and _multicall_down_until.get(mc_key, 0.0) <= time.monotonic()
+    step = max(1, int(chunk_size))
+    for i in range(0, len(addrs), step):
+        chunk = addrs[i : i + step]
+        if use_multicall:
+            try:
+                out.update(_multicall_stake_of(w3, Web3.to_checksum_address(str(multicall_address)), target, chunk, block_identifier))
+                continue
+            except Exception as e:
+                logger.warning("multicall3 stakeOf failed (%s); using JSON-RPC batches for %.0fs", e, _MULTICALL_RETRY_SECONDS)
+                _multicall_down_until[mc_key] = time.monotonic() + _MULTICALL_RETRY_SECONDS
+                use_multicall = False
+        try:
+            out.update(_batch_stake_of(w3, target, chunk, block_identifier))
+            continue
+        except Exception as e:
+            logger.warning("batched stakeOf failed (%s); falling back to single calls", e)
+        c = w3.eth.contract(address=target, abi=STAKE_VAULT_ABI)
+        for a in chunk:
+            try:
+                out[a] = int(c.functions.stakeOf(Web3.to_checksum_address(a)).call(block_identifier=block_identifier))
+            except Exception:
+                logger.exception("failed reading stake for agent=%s", a)
+    return out
@@ -3,10 +3,18 @@ from __future__ import annotations
 import logging
 import time
 from dataclasses import dataclass
+from threading import Lock
+from typing import Any
 
 from web3 import Web3
+from web3.exceptions import BlockNotFound
 
+from server import metrics
 from server.config import settings
+from server.log_ingest import AdaptiveSpan, iter_log_ranges
+from server.onchain import stake_of_many
+from server.rpc import get_web3
+from server.stake_cache import stake_cache
 from server.storage import Store
 
 logger = logging.getLogger("agora.onchain_sync")
@@ -85,7 +93,7 @@ TREASURY_VAULT_ABI = [
 
 
 def _w3(rpc_url: str) -> Web3:
-    return Web3(Web3.HTTPProvider(rpc_url))
+    return get_web3(rpc_url)
 
 
 def _checksum(w3: Web3, addr: str) -> str:
@@ -102,10 +110,14 @@ def _cursor_key_prefix(prefix: str, chain_id: int, contract_addr: str) -> str:
 
 
 def _safe_latest_block(latest: int) -> int:
-    conf = int(getattr(settings, "ONCHAIN_SYNC_CONFIRMATIONS", 20))
+    conf = int(getattr(settings, "ONCHAIN_SYNC_CONFIRMATIONS", 2))
     return max(0, int(latest) - max(0, conf))
 
 
+def _reorg_depth() -> int:
+    return max(0, int(getattr(settings, "ONCHAIN_SYNC_REORG_DEPTH", 128)))
+
+
 def _cursor_key(chain_id: int, contract_addr: str) -> str:
     # Back-compat: stake vault cursor key.
     return _cursor_key_prefix("stake_vault", chain_id, contract_addr)
@@ -120,12 +132,97 @@ class _Anchor:
     log_index: int
 
 
+@dataclass
+class _Source:
+    name: str  # "stake_vault" | "treasury_vault"
+    address: str  # lowercase
+    events: dict[str, Any]  # topic0 -> web3 ContractEvent (decoder)
+    cursor_key: str
+    from_block: int
+    stats: dict[str, Any]
+
+
+def _event_topic(abi: list[dict], name: str) -> str:
+    entry = next(e for e in abi if e.get("type") == "event" and e.get("name") == name)
+    sig = f"{name}({','.join(i['type'] for i in entry['inputs'])})"
+    return "0x" + bytes(Web3.keccak(text=sig)).hex()
+
+
+def _hex(v: Any) -> str:
+    return "0x" + bytes(v).hex() if isinstance(v, (bytes, bytearray)) else str(v).lower()
+
+
+def _topic0(log: Any) -> str:
+    topics = log.get("topics") or []
+    if not topics:
+        return ""
+    return _hex(topics[0])
+
+
+def _source(
+    *, store: Store, w3: Web3, name: str, contract_addr: str, abi: list[dict], events: tuple[str, ...], chain_id: int, latest: int, lookback: int
+) -> _Source:
+    c = w3.eth.contract(address=_checksum(w3, contract_addr), abi=abi)
+    key = _cursor_key_prefix(name, chain_id, contract_addr)
+    from_block = store.get_onchain_cursor(key)
+    if from_block is None:
+        from_block = max(0, int(latest) - int(lookback))
+    return _Source(
+        name=name,
+        address=contract_addr.strip().lower(),
+        events={_event_topic(abi, ev): getattr(c.events, ev)() for ev in events},
+        cursor_key=key,
+        from_block=int(from_block),
+        stats={"enabled": True, "contract": contract_addr, "from_block": int(from_block), "to_block": int(from_block) - 1},
+    )
+
+
+_span_lock = Lock()
+_span: AdaptiveSpan | None = None
+
+
+def _get_span() -> AdaptiveSpan:
+    # Shared across passes so a provider's range limit is learned once, not rediscovered every poll.
+    global _span
+    max_span = max(1, int(getattr(settings, "ONCHAIN_SYNC_MAX_BLOCKS_PER_BATCH", 2000)))
+    with _span_lock:
+        if _span is None or _span.max_span != max_span:
+            _span = AdaptiveSpan(max_span, max_span=max_span)
+        return _span
+
+
+def _source_specs() -> list[tuple[str, str, list[dict], tuple[str, ...]]]:
+    specs: list[tuple[str, str, list[dict], tuple[str, ...]]] = []
+    if settings.ONCHAIN_STAKE_ENABLED and settings.STAKE_CONTRACT_ADDRESS and not _is_zero_address(settings.STAKE_CONTRACT_ADDRESS):
+        specs.append(("stake_vault", settings.STAKE_CONTRACT_ADDRESS, STAKE_VAULT_ABI, ("Deposited", "Withdrawn", "Slashed")))
+    if settings.TREASURY_CONTRACT_ADDRESS and not _is_zero_address(settings.TREASURY_CONTRACT_ADDRESS):
+        specs.append(("treasury_vault", settings.TREASURY_CONTRACT_ADDRESS, TREASURY_VAULT_ABI, ("DonationReceived",)))
+    return specs
+
+
+_SOURCE_STATS = {
+    "stake_vault": ("stake", {"touched_agents": 0, "stake_updates": 0, "slashes_recorded": 0}),
+    "treasury_vault": ("treasury", {"donations_seen": 0, "donations_recorded": 0}),
+}
+
+
 def sync_once(store: Store) -> dict:
     """
     Poll enabled onchain sources (best-effort) and:
     - StakeVault: update stake amount + receipt anchors; record slashing events
     - TreasuryVault: record donation events; update donor totals; auto-enable donor avatars
     - advance per-contract cursors in DB
+
+    All contracts and event topics share one eth_getLogs per block range (address list + topic0 OR-filter).
+    The backlog (up to ONCHAIN_SYNC_MAX_BLOCKS_PER_PASS blocks) is split into ranges fetched concurrently
+    (ONCHAIN_SYNC_FETCH_WORKERS) and sized adaptively (server/log_ingest.py); ranges are decoded and committed
+    strictly in block order, advancing the cursors after each one, so a crash resumes where it stopped.
+
+    Ingestion runs ONCHAIN_SYNC_CONFIRMATIONS behind head; blocks within ONCHAIN_SYNC_REORG_DEPTH of head are
+    treated as reversible: each range committed there stores a (block_number, block_hash) checkpoint and writes
+    an undo log ahead of its stake/slash/donation changes. A pass first checks that the chain still extends the
+    newest checkpoint (parent hash of the next block); if not, it finds the last canonical checkpoint, rolls back
+    everything above it and rewinds the cursors so the new fork is ingested.
     """
     if not (settings.RPC_URL and getattr(settings, "ONCHAIN_SYNC_ENABLED", False)):
         return {"enabled": False, "reason": "onchain sync disabled or rpc not configured"}
@@ -135,158 +232,324 @@ def sync_once(store: Store) -> dict:
     latest = int(w3.eth.block_number)
     safe_latest = _safe_latest_block(latest)
     lookback = int(getattr(settings, "ONCHAIN_SYNC_LOOKBACK_BLOCKS", 2000))
-    batch = int(getattr(settings, "ONCHAIN_SYNC_MAX_BLOCKS_PER_BATCH", 2000))
+    depth = _reorg_depth()
+    final = max(-1, latest - depth)  # blocks <= final are trusted; above it changes are undoable
 
     out: dict = {"enabled": True, "chain_id": chain_id, "latest": latest, "safe_latest": safe_latest}
-
-    if settings.ONCHAIN_STAKE_ENABLED and settings.STAKE_CONTRACT_ADDRESS and not _is_zero_address(settings.STAKE_CONTRACT_ADDRESS):
-        out["stake"] = _sync_stake_vault_once(
-            store=store,
-            w3=w3,
-            chain_id=chain_id,
-            latest=safe_latest,
-            lookback=lookback,
-            batch=batch,
-        )
-    else:
-        out["stake"] = {"enabled": False}
-
-    if settings.TREASURY_CONTRACT_ADDRESS and not _is_zero_address(settings.TREASURY_CONTRACT_ADDRESS):
-        out["treasury"] = _sync_treasury_vault_once(
-            store=store,
-            w3=w3,
-            chain_id=chain_id,
-            latest=safe_latest,
-            lookback=lookback,
-            batch=batch,
-        )
-    else:
-        out["treasury"] = {"enabled": False}
-
+    specs = _source_specs()
+    out["reorg"] = {"depth": depth, "final_block": final, "rollback": None}
+    if depth > 0 and specs:
+        fork = _find_fork(store=store, w3=w3, chain_id=chain_id, latest=latest, final=final)
+        if fork is not None:
+            out["reorg"]["rollback"] = _rollback(store=store, w3=w3, chain_id=chain_id, fork=fork, specs=specs)
+
+    sources: list[_Source] = []
+    common = {"store": store, "w3": w3, "chain_id": chain_id, "latest": safe_latest, "lookback": lookback}
+    for name, contract_addr, abi, events in specs:
+        sources.append(_source(name=name, contract_addr=contract_addr, abi=abi, events=events, **common))
+        key, counters = _SOURCE_STATS[name]
+        sources[-1].stats.update(counters)
+        out[key] = sources[-1].stats
+    for key, _ in _SOURCE_STATS.values():
+        out.setdefault(key, {"enabled": False})
+    if not sources:
+        return out
+
+    start = min(src.from_block for src in sources)
+    max_pass = max(1, int(getattr(settings, "ONCHAIN_SYNC_MAX_BLOCKS_PER_PASS", 250_000)))
+    end = min(int(safe_latest), start + max_pass - 1)
+    by_address = {src.address: src for src in sources}
+    addresses = [_checksum(w3, src.address) for src in sources]
+    topics = sorted({t for src in sources for t in src.events})
+
+    def get_logs(lo: int, hi: int) -> list[Any]:
+        return w3.eth.get_logs({"address": addresses, "fromBlock": lo, "toBlock": hi, "topics": [topics]})
+
+    checkpoints = store.list_onchain_checkpoints(chain_id=chain_id, limit=1) if depth > 0 else []
+    prev_cp = checkpoints[0] if checkpoints else None
+    span = _get_span()
+    ranges = 0
+    for lo, hi, logs in iter_log_ranges(
+        get_logs,
+        from_block=start,
+        to_block=end,
+        span=span,
+        workers=int(getattr(settings, "ONCHAIN_SYNC_FETCH_WORKERS", 4)),
+    ):
+        head = None
+        if depth > 0 and hi > final:
+            head = _verify_range(w3, lo=lo, hi=hi, logs=logs, final=final, prev=prev_cp)
+            if head is None:
+                # The chain moved under this range; stop here and let the next pass re-check from the checkpoint.
+                logger.warning("onchain sync: blocks %s-%s changed while ingesting (reorg); retrying next pass", lo, hi)
+                out["reorg"]["range_changed"] = [lo, hi]
+                break
+        ranges += 1
+        decoded: dict[str, list[Any]] = {src.name: [] for src in sources}
+        for log in logs:
+            src = by_address.get(str(log["address"]).lower())
+            if src is None or int(log["blockNumber"]) < src.from_block:
+                continue  # this contract's cursor is already past the log
+            ev = src.events.get(_topic0(log))
+            if ev is not None:
+                decoded[src.name].append(ev.process_log(log))
+        undo_above = final if head is not None else None
+        for src in sources:
+            if hi < src.from_block:
+                continue
+            if src.name == "stake_vault":
+                _apply_stake_events(
+                    store=store, w3=w3, chain_id=chain_id, src=src, events=decoded[src.name], block_number_at=hi, undo_above=undo_above
+                )
+            else:
+                _apply_treasury_events(store=store, chain_id=chain_id, src=src, events=decoded[src.name], undo_above=undo_above)
+        if head is not None:
+            store.add_onchain_checkpoint(chain_id=chain_id, block_number=hi, block_hash=head[0], parent_hash=head[1])
+            prev_cp = {"block_number": hi, "block_hash": head[0]}
+        for src in sources:
+            if hi < src.from_block:
+                continue
+            store.set_onchain_cursor(src.cursor_key, hi + 1)
+            src.from_block = hi + 1
+            src.stats["to_block"] = hi
+            src.stats["next_from_block"] = hi + 1
+
+    if depth > 0:
+        store.prune_onchain_history(chain_id=chain_id, before_block=final + 1)
+    out["ranges"] = ranges
+    out["getlogs_span"] = span.current()
     return out
 
 
-def _sync_stake_vault_once(*, store: Store, w3: Web3, chain_id: int, latest: int, lookback: int, batch: int) -> dict:
-    contract_addr = settings.STAKE_CONTRACT_ADDRESS
-    c = w3.eth.contract(address=_checksum(w3, contract_addr), abi=STAKE_VAULT_ABI)
+def _header(w3: Web3, number: int) -> tuple[str, str] | None:
+    """(hash, parentHash) of a canonical block, or None if the node has no such block."""
+    try:
+        b = w3.eth.get_block(int(number))
+    except BlockNotFound:
+        return None
+    return _hex(b["hash"]), _hex(b["parentHash"])
 
-    key = _cursor_key_prefix("stake_vault", chain_id, contract_addr)
-    from_block = store.get_onchain_cursor(key)
-    if from_block is None:
-        from_block = max(0, int(latest) - int(lookback))
-
-    to_block = min(int(latest), int(from_block) + max(1, int(batch)) - 1)
-    if to_block < from_block:
-        return {"enabled": True, "contract": contract_addr, "from_block": from_block, "to_block": to_block, "updated": 0}
-
-    touched: dict[str, _Anchor] = {}
-    slashes_recorded = 0
 
-    for ev in c.events.Deposited().get_logs(from_block=from_block, to_block=to_block):
-        agent = str(ev["args"]["agent"]).lower()
-        touched[agent] = _Anchor(
-            tx_hash=ev["transactionHash"].hex(),
-            chain_id=chain_id,
-            contract_address=contract_addr.lower(),
-            block_number=int(ev["blockNumber"]),
-            log_index=int(ev["logIndex"]),
+def _find_fork(*, store: Store, w3: Web3, chain_id: int, latest: int, final: int) -> int | None:
+    """
+    None while the chain still extends the newest checkpoint (the block after it names it as parent; at the head,
+    its own hash is still canonical). Otherwise the number of the newest checkpoint still on the canonical chain:
+    everything above it was ingested from a dropped fork. With no canonical checkpoint left (e.g. one wide catch-up
+    range), the whole reorg window above `final` is rolled back.
+    """
+    cps = store.list_onchain_checkpoints(chain_id=chain_id, limit=_reorg_depth() + 1)
+    if not cps:
+        return None
+    tip = cps[0]
+    tip_number = int(tip["block_number"])
+    if tip_number + 1 <= latest:
+        h = _header(w3, tip_number + 1)
+        if h is None:
+            raise RuntimeError(f"block {tip_number + 1} not found (node behind its reported head?)")
+        if h[1] == tip["block_hash"]:
+            return None
+    else:
+        h = _header(w3, tip_number)
+        if h is not None and h[0] == tip["block_hash"]:
+            return None
+    for cp in cps[1:]:
+        h = _header(w3, int(cp["block_number"]))
+        if h is not None and h[0] == cp["block_hash"]:
+            return int(cp["block_number"])
+    logger.warning("onchain sync: no canonical checkpoint left (oldest %s); rolling back above block %s", cps[-1]["block_number"], final)
+    return max(-1, int(final))
+
+
+def _rollback(*, store: Store, w3: Web3, chain_id: int, fork: int, specs: list[tuple[str, str, list[dict], tuple[str, ...]]]) -> dict:
+    # Cursors first: if we stop before the rollback commits, the next pass detects the same fork again.
+    for name, contract_addr, _, _ in specs:
+        key = _cursor_key_prefix(name, chain_id, contract_addr)
+        cur = store.get_onchain_cursor(key)
+        if cur is not None and cur > fork + 1:
+            store.set_onchain_cursor(key, fork + 1)
+    applied = store.rollback_onchain(chain_id=chain_id, after_block=fork)
+    metrics.registry.inc("agora_onchain_reorgs_total", (("chain_id", str(chain_id)),))
+    logger.warning("onchain sync: reorg above block %s, reverted %s change(s)", fork, len(applied))
+
+    # A restored stake row predates the whole range it was captured for; re-read those agents at the fork block.
+    agents = sorted({str(e["ref"]).lower() for e in applied if e["kind"] == "stake"})
+    stake_spec = next((s for s in specs if s[0] == "stake_vault"), None)
+    if agents and stake_spec is not None:
+        raws = stake_of_many(
+            w3,
+            stake_contract=stake_spec[1].strip().lower(),
+            agents=agents,
+            block_identifier=int(fork),
+            chunk_size=int(getattr(settings, "ONCHAIN_SYNC_STAKE_READ_BATCH", 500)),
+            multicall_address=str(getattr(settings, "ONCHAIN_MULTICALL3_ADDRESS", "") or ""),
         )
+        rows = []
+        for agent in agents:
+            if agent not in raws:
+                logger.error("failed re-reading stake for agent=%s after reorg", agent)
+                continue
+            rec = store.get_stake_record(agent) or {}
+            rows.append(
+                {
+                    "address": agent,
+                    "amount": raws[agent] / 1_000_000,
+                    "stake_tx_hash": rec.get("stake_tx_hash"),
+                    "stake_chain_id": rec.get("stake_chain_id"),
+                    "stake_contract_address": rec.get("stake_contract_address") or stake_spec[1].strip().lower(),
+                    "stake_block_number": rec.get("stake_block_number"),
+                    "stake_log_index": rec.get("stake_log_index"),
+                }
+            )
+        store.set_stakes(rows=rows)
+        stake_cache.update({r["address"]: r["amount"] for r in rows})
+    return {"fork_block": fork, "undone": len(applied), "stakes_reread": len(agents)}
 
-    for ev in c.events.Withdrawn().get_logs(from_block=from_block, to_block=to_block):
-        agent = str(ev["args"]["agent"]).lower()
-        touched[agent] = _Anchor(
-            tx_hash=ev["transactionHash"].hex(),
-            chain_id=chain_id,
-            contract_address=contract_addr.lower(),
-            block_number=int(ev["blockNumber"]),
-            log_index=int(ev["logIndex"]),
-        )
 
-    for ev in c.events.Slashed().get_logs(from_block=from_block, to_block=to_block):
+def _verify_range(w3: Web3, *, lo: int, hi: int, logs: list[Any], final: int, prev: dict | None) -> tuple[str, str] | None:
+    """
+    Checkpoint header (hash, parentHash) for a range inside the reorg window, or None if the range's logs or its
+    first block do not belong to the chain that header is on. The checkpoint header is read first: a reorg after
+    that is caught by the next pass's parent-hash check, one before it shows up here as a hash mismatch.
+    """
+    top = _header(w3, hi)
+    if top is None:
+        return None
+    seen: dict[int, tuple[str, str] | None] = {hi: top}
+
+    def header(n: int) -> tuple[str, str] | None:
+        if n not in seen:
+            seen[n] = _header(w3, n)
+        return seen[n]
+
+    if prev is not None and int(prev["block_number"]) == lo - 1:
+        h = header(lo)
+        if h is None or h[1] != prev["block_hash"]:
+            return None
+    for number, block_hash in sorted({(int(log["blockNumber"]), _hex(log["blockHash"])) for log in logs if int(log["blockNumber"]) > final}):
+        h = header(number)
+        if h is None or h[0] != block_hash:
+            return None
+    return top
+
+
+def _apply_stake_events(
+    *, store: Store, w3: Web3, chain_id: int, src: _Source, events: list[Any], block_number_at: int, undo_above: int | None = None
+) -> None:
+    """`undo_above`: inside the reorg window, write undo entries for changes from blocks above it first."""
+    stats = src.stats
+    touched: dict[str, _Anchor] = {}
+    slashes: list[dict] = []
+    for ev in events:
         agent = str(ev["args"]["agent"]).lower()
-        recipient = str(ev["args"]["recipient"]).lower()
-        actual_raw = int(ev["args"]["actualAmount"])
         tx_hash = ev["transactionHash"].hex()
         log_index = int(ev["logIndex"])
         block_number = int(ev["blockNumber"])
-
         touched[agent] = _Anchor(
             tx_hash=tx_hash,
             chain_id=chain_id,
-            contract_address=contract_addr.lower(),
+            contract_address=src.address,
             block_number=block_number,
             log_index=log_index,
         )
+        if ev["event"] != "Slashed":
+            continue
 
-        event_id = f"{chain_id}:{tx_hash}:{log_index}"
-        store.record_slash(
-            event={
-                "id": event_id,
+        slashes.append(
+            {
+                "id": f"{chain_id}:{tx_hash}:{log_index}",
                 "agent_address": agent,
-                "amount_usdc": actual_raw / 1_000_000,
-                "recipient_address": recipient,
+                "amount_usdc": int(ev["args"]["actualAmount"]) / 1_000_000,
+                "recipient_address": str(ev["args"]["recipient"]).lower(),
                 "job_id": None,
                 "tx_hash": tx_hash,
                 "chain_id": chain_id,
-                "contract_address": contract_addr.lower(),
+                "contract_address": src.address,
                 "block_number": block_number,
                 "log_index": log_index,
                 "created_at": None,
             }
         )
-        slashes_recorded += 1
-
-    updated = 0
-    for agent, a in touched.items():
-        try:
-            raw = int(c.functions.stakeOf(_checksum(w3, agent)).call())
-            store.set_stake(
-                agent,
-                raw / 1_000_000,
-                stake_tx_hash=a.tx_hash,
-                stake_chain_id=a.chain_id,
-                stake_contract_address=a.contract_address,
-                stake_block_number=a.block_number,
-                stake_log_index=a.log_index,
-            )
-            updated += 1
-        except Exception:
-            logger.exception("failed updating stake for agent=%s", agent)
-
-    store.set_onchain_cursor(key, to_block + 1)
-    return {
-        "enabled": True,
-        "contract": contract_addr,
-        "from_block": from_block,
-        "to_block": to_block,
-        "touched_agents": len(touched),
-        "stake_updates": updated,
-        "slashes_recorded": slashes_recorded,
-        "next_from_block": to_block + 1,
-    }
-
-
-def _sync_treasury_vault_once(*, store: Store, w3: Web3, chain_id: int, latest: int, lookback: int, batch: int) -> dict:
-    contract_addr = settings.TREASURY_CONTRACT_ADDRESS
-    c = w3.eth.contract(address=_checksum(w3, contract_addr), abi=TREASURY_VAULT_ABI)
-
-    key = _cursor_key_prefix("treasury_vault", chain_id, contract_addr)
-    from_block = store.get_onchain_cursor(key)
-    if from_block is None:
-        from_block = max(0, int(latest) - int(lookback))
-
-    to_block = min(int(latest), int(from_block) + max(1, int(batch)) - 1)
-    if to_block < from_block:
-        return {"enabled": True, "contract": contract_addr, "from_block": from_block, "to_block": to_block, "donations_recorded": 0}
-
-    donations_seen = 0
-    donations_recorded = 0
 
+    if undo_above is not None:
+        undo = [
+            {
+                "chain_id": chain_id,
+                "block_number": e["block_number"],
+                "kind": "slash",
+                "ref": e["id"],
+                "data": {"tx_hash": e["tx_hash"], "log_index": e["log_index"]},
+            }
+            for e in slashes
+            if e["block_number"] > undo_above
+        ]
+        if block_number_at > undo_above:
+            # Stakes are read at the range's last block, so that is the block their undo entries belong to.
+            undo += [
+                {"chain_id": chain_id, "block_number": block_number_at, "kind": "stake", "ref": agent, "data": store.get_stake_record(agent)}
+                for agent in touched
+            ]
+        store.record_onchain_undo(entries=undo)
+    for e in slashes:
+        store.record_slash(event=e)
+        stats["slashes_recorded"] += 1
+
+    if not touched:
+        return
+    # Read every touched agent's stake at the range's last block (consistent with the events just applied).
+    raws = stake_of_many(
+        w3,
+        stake_contract=src.address,
+        agents=list(touched),
+        block_identifier=int(block_number_at),
+        chunk_size=int(getattr(settings, "ONCHAIN_SYNC_STAKE_READ_BATCH", 500)),
+        multicall_address=str(getattr(settings, "ONCHAIN_MULTICALL3_ADDRESS", "") or ""),
+    )
+    for agent in touched:
+        if agent not in raws:
+            logger.error("failed updating stake for agent=%s", agent)
+    updated = store.set_stakes(
+        rows=[
+            {
+                "address": agent,
+                "amount": raws[agent] / 1_000_000,
+                "stake_tx_hash": a.tx_hash,
+                "stake_chain_id": a.chain_id,
+                "stake_contract_address": a.contract_address,
+                "stake_block_number": a.block_number,
+                "stake_log_index": a.log_index,
+            }
+            for agent, a in touched.items()
+            if agent in raws
+        ]
+    )
+    # Same-process API (ONCHAIN_SYNC_RUN_IN_API) sees the new amounts immediately; others via the change feed.
+    stake_cache.update({agent: raws[agent] / 1_000_000 for agent in touched if agent in raws})
+    stats["touched_agents"] += len(touched)
+    stats["stake_updates"] += updated
+
+
+def _apply_treasury_events(*, store: Store, chain_id: int, src: _Source, events: list[Any], undo_above: int | None = None) -> None:
+    stats = src.stats
     usdc_addr = (settings.USDC_ADDRESS or "").strip().lower()
     eth_usd_rate = float(getattr(settings, "ETH_USD_RATE", 2500.0))
 
-    for ev in c.events.DonationReceived().get_logs(from_block=from_block, to_block=to_block):
-        donations_seen += 1
+    if undo_above is not None:
+        store.record_onchain_undo(
+            entries=[
+                {
+                    "chain_id": chain_id,
+                    "block_number": int(ev["blockNumber"]),
+                    "kind": "donation",
+                    "ref": f"{chain_id}:{ev['transactionHash'].hex()}:{int(ev['logIndex'])}",
+                    "data": None,
+                }
+                for ev in events
+                if int(ev["blockNumber"]) > undo_above
+            ]
+        )
+
+    for ev in events:
+        stats["donations_seen"] += 1
         donor = str(ev["args"]["donor"]).lower()
         asset = str(ev["args"]["asset"]).lower()
         amount_raw = int(ev["args"]["amount"])
@@ -317,27 +580,16 @@ def _sync_treasury_vault_once(*, store: Store, w3: Web3, chain_id: int, latest:
                     "memo_hash": memo_hex,
                     "tx_hash": tx_hash,
                     "chain_id": chain_id,
-                    "contract_address": contract_addr.lower(),
+                    "contract_address": src.address,
                     "block_number": block_number,
                     "log_index": log_index,
                     "created_at": None,
                 }
             )
-            donations_recorded += 1
+            stats["donations_recorded"] += 1
         except Exception:
             logger.exception("failed recording donation event_id=%s", event_id)
 
-    store.set_onchain_cursor(key, to_block + 1)
-    return {
-        "enabled": True,
-        "contract": contract_addr,
-        "from_block": from_block,
-        "to_block": to_block,
-        "donations_seen": donations_seen,
-        "donations_recorded": donations_recorded,
-        "next_from_block": to_block + 1,
-    }
-
 
 def run_loop(store: Store) -> None:
     """
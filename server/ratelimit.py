@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+class _Bucket:
+    """
+    Sliding-window counter state for one key (constant size, no per-hit timestamps).
+    The estimate blends the previous fixed window (weighted by overlap) with the current one.
+    """
+
+    __slots__ = ("start", "window", "prev", "curr")
+
+    def __init__(self, start: float, window: float) -> None:
+        self.start = start
+        self.window = window
+        self.prev = 0
+        self.curr = 0
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets", "size", "max_keys", "last_sweep", "evicted", "swept")
+
+    def __init__(self, max_keys: int) -> None:
+        self.lock = Lock()
+        # window -> key -> bucket. The same key under two windows is two independent buckets. Within one window,
+        # insertion order == last-hit order == window-start order, so each front holds the oldest bucket.
+        self.buckets: dict[float, OrderedDict[str, _Bucket]] = {}
+        self.size = 0
+        self.max_keys = max_keys
+        self.last_sweep = 0.0
+        self.evicted = 0
+        self.swept = 0
+
+
+class ShardedRateLimiter:
+    """
+    Best-effort in-process limiter with bounded memory.
+
+    - Keys are spread across N shards, each with its own lock (no global serialization point).
+    - Each key keeps a fixed-size sliding-window counter instead of a deque of timestamps.
+    - Keys whose state can no longer affect a decision are swept periodically (per shard, per window).
+    - A hard cap on tracked keys evicts least-recently-used keys first.
+    - State is kept per (key, window): calling the same key with another window does not reuse its counters.
+    """
+
+    def __init__(self, *, shards: int = 16, max_keys: int = 200_000, sweep_interval_seconds: float = 5.0) -> None:
+        n = max(1, int(shards))
+        per_shard = max(1, int(math.ceil(max(1, int(max_keys)) / n)))
+        self._shards = [_Shard(per_shard) for _ in range(n)]
+        self._sweep_interval = float(max(0.0, sweep_interval_seconds))
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def hit(self, key: str, *, limit: int, window_seconds: float, now: float | None = None, cost: int = 1) -> int | None:
+        """
+        Record `cost` hits for `key` (all or nothing). Returns None if allowed, otherwise Retry-After seconds (>= 1).
+        Rejected hits are not counted.
+        """
+        ts = time.time() if now is None else float(now)
+        window = float(max(1.0, float(window_seconds)))
+        lim = int(max(1, int(limit)))
+        n = int(max(1, int(cost)))
+        if n > lim:
+            # Can never fit in one window; do not touch the key's state.
+            return max(1, int(math.ceil(window)))
+        start = ts - (ts % window)
+        shard = self._shard(key)
+
+        with shard.lock:
+            if self._sweep_interval and ts - shard.last_sweep >= self._sweep_interval:
+                self._sweep_locked(shard, ts)
+
+            buckets = shard.buckets.get(window)
+            b = buckets.get(key) if buckets is not None else None
+            if b is None:
+                while shard.size >= shard.max_keys:
+                    self._evict_locked(shard)
+                b = _Bucket(start, window)
+                shard.buckets.setdefault(window, OrderedDict())[key] = b
+                shard.size += 1
+            else:
+                buckets.move_to_end(key)
+                if b.start != start:
+                    b.prev = b.curr if start - b.start == b.window else 0
+                    b.curr = 0
+                    b.start = start
+
+            elapsed = ts - start
+            estimate = b.prev * (1.0 - elapsed / window) + b.curr
+            # Room for n more hits means the estimate is below limit - (n - 1).
+            room = lim - (n - 1)
+            if estimate >= room:
+                return self._retry_after(b, room, elapsed)
+            b.curr += n
+            return None
+
+    @staticmethod
+    def _retry_after(b: _Bucket, limit: int, elapsed: float) -> int:
+        window = b.window
+        if b.curr >= limit:
+            # Wait for the next window, then until the carried-over weight drops below the limit.
+            wait = (window - elapsed) + window * (1.0 - limit / float(b.curr))
+        elif b.prev > 0:
+            wait = window * (1.0 - (limit - b.curr) / float(b.prev)) - elapsed
+        else:
+            wait = window - elapsed
+        return max(1, int(math.ceil(wait)))
+
+    @staticmethod
+    def _evict_locked(shard: _Shard) -> None:
+        # Least-recently-used across windows ~ the front bucket with the oldest window start.
+        window, buckets = min(shard.buckets.items(), key=lambda wb: next(iter(wb[1].values())).start)
+        buckets.popitem(last=False)
+        if not buckets:
+            del shard.buckets[window]
+        shard.size -= 1
+        shard.evicted += 1
+
+    def _sweep_locked(self, shard: _Shard, now: float) -> None:
+        shard.last_sweep = now
+        # A bucket stops influencing decisions once its window and the following one are over. Each window's
+        # buckets are in start order, so a live front ends the sweep for that window only.
+        for window, buckets in list(shard.buckets.items()):
+            while buckets:
+                b = next(iter(buckets.values()))
+                if now < b.start + 2.0 * window:
+                    break
+                buckets.popitem(last=False)
+                shard.size -= 1
+                shard.swept += 1
+            if not buckets:
+                del shard.buckets[window]
+
+    def sweep(self, now: float | None = None) -> None:
+        ts = time.time() if now is None else float(now)
+        for shard in self._shards:
+            with shard.lock:
+                self._sweep_locked(shard, ts)
+
+    def stats(self) -> dict[str, int]:
+        keys = evicted = swept = 0
+        for shard in self._shards:
+            with shard.lock:
+                keys += shard.size
+                evicted += shard.evicted
+                swept += shard.swept
+        return {"shards": len(self._shards), "keys": keys, "evicted": evicted, "swept": swept}
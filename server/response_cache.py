@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qsl, urlencode
+
+logger = logging.getLogger("agora.response_cache")
+
+# Response headers that are recomputed or request-specific and therefore never cached.
+_DROP_HEADERS = {"content-length", "etag", "cache-control", "x-request-id", "date", "server", "set-cookie"}
+
+# Handlers set this on degraded responses (store down, partial data) so they are never cached or ETagged.
+NO_STORE_HEADER = "x-agora-no-store"
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    ttl_seconds: float
+    tags: tuple[str, ...]
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    status_code: int
+    headers: dict[str, str]
+    expires_at: float
+    gens: tuple[int, ...]
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tok in if_none_match.split(","):
+        t = tok.strip()
+        if t == "*":
+            return True
+        if t.startswith("W/"):
+            t = t[2:]
+        if t == etag:
+            return True
+    return False
+
+
+def normalize_query(query: str) -> str:
+    if not query:
+        return ""
+    return urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+
+
+class ResponseCache:
+    """
+    Two-tier cache for public GET responses, keyed by path + normalized query string.
+
+    - Local tier: bounded LRU in process memory.
+    - Redis tier (optional): shared across API processes; entries carry the tag generation they were built at.
+    - Invalidation is by tag ("jobs", "posts", ...): bumping a tag generation makes every entry built
+      under an older generation a miss. Local generations change immediately; the Redis generation bump
+      is flushed from the (async) middleware right after the writing request finishes.
+    """
+
+    def __init__(self, *, max_entries: int = 2048, redis: Any = None, redis_prefix: str = "agora:rc") -> None:
+        self._lock = Lock()
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._max_entries = max(1, int(max_entries))
+        self._gens: dict[str, int] = {}
+        self._pending_redis: set[str] = set()
+        self._redis = redis
+        self._prefix = redis_prefix
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(path: str, query: str) -> str:
+        q = normalize_query(query)
+        return f"{path}?{q}" if q else path
+
+    def _gens_for(self, tags: tuple[str, ...]) -> tuple[int, ...]:
+        return tuple(self._gens.get(t, 0) for t in tags)
+
+    # ---- invalidation (safe to call from sync endpoints / worker threads) ----
+    def invalidate(self, *tags: str) -> None:
+        if not tags:
+            return
+        with self._lock:
+            for t in tags:
+                self._gens[t] = self._gens.get(t, 0) + 1
+            if self._redis is not None:
+                self._pending_redis.update(tags)
+
+    async def flush_invalidations(self) -> None:
+        if self._redis is None or not self._pending_redis:
+            return
+        with self._lock:
+            tags = list(self._pending_redis)
+            self._pending_redis.clear()
+        try:
+            for t in tags:
+                await self._redis.incr(f"{self._prefix}:gen:{t}")
+        except Exception as e:
+            logger.warning("response_cache_redis_invalidate_failed: %s", e)
+
+    # ---- local tier ----
+    def get_local(self, key: str, rule: CacheRule) -> CachedResponse | None:
+        now = time.time()
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None:
+                return None
+            if e.expires_at <= now or e.gens != self._gens_for(rule.tags):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return e
+
+    def put_local(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    # ---- redis tier ----
+    async def get_redis(self, key: str, rule: CacheRule) -> tuple[CachedResponse | None, list[int] | None]:
+        """
+        One MGET for the entry plus the shared tag generations.
+        Returns (entry or None, current redis generations or None when Redis is unavailable).
+        """
+        if self._redis is None:
+            return None, None
+        try:
+            raw, *gens = await self._redis.mget(
+                f"{self._prefix}:e:{key}", *[f"{self._prefix}:gen:{t}" for t in rule.tags]
+            )
+            rgens = [int(g or 0) for g in gens]
+            if not raw:
+                return None, rgens
+            d = json.loads(raw)
+            if d.get("rgens") != rgens:
+                return None, rgens
+            entry = CachedResponse(
+                body=str(d["body"]).encode("utf-8"),
+                etag=str(d["etag"]),
+                status_code=int(d["status_code"]),
+                headers=dict(d.get("headers") or {}),
+                expires_at=time.time() + float(rule.ttl_seconds),
+                gens=self._gens_for(rule.tags),
+            )
+            return entry, rgens
+        except Exception as e:
+            logger.warning("response_cache_redis_get_failed: %s", e)
+            return None, None
+
+    async def put_redis(self, key: str, entry: CachedResponse, rule: CacheRule, rgens: list[int]) -> None:
+        if self._redis is None:
+            return
+        try:
+            text = entry.body.decode("utf-8")
+        except UnicodeDecodeError:
+            return
+        try:
+            ttl = max(1, int(rule.ttl_seconds))
+            payload = {
+                "body": text,
+                "etag": entry.etag,
+                "status_code": entry.status_code,
+                "headers": entry.headers,
+                # Generations read *before* computing the body, so a concurrent invalidation wins.
+                "rgens": rgens,
+            }
+            await self._redis.set(f"{self._prefix}:e:{key}", json.dumps(payload, separators=(",", ":")), ex=ttl)
+        except Exception as e:
+            logger.warning("response_cache_redis_put_failed: %s", e)
+
+    # ---- request flow ----
+    async def serve(
+        self,
+        req: Any,
+        rule: CacheRule,
+        call_next: Callable[[Any], Awaitable[Any]],
+        response_cls: Any,
+    ) -> Any:
+        """
+        Serve a GET request from cache (or populate it), honoring If-None-Match.
+        `response_cls` is the framework Response class (kept as a parameter so this module has no web deps).
+        """
+        key = self.key(req.url.path, req.url.query)
+        inm = req.headers.get("if-none-match")
+
+        rgens: list[int] | None = None
+        entry = self.get_local(key, rule)
+        if entry is None:
+            entry, rgens = await self.get_redis(key, rule)
+            if entry is not None:
+                self.put_local(key, entry)
+        if entry is not None:
+            self.hits += 1
+            req.scope["agora_cache"] = "hit"
+            return self._respond(entry, inm, rule, response_cls, cache_status="HIT")
+
+        self.misses += 1
+        gens_before = self._gens_for(rule.tags)
+        resp = await call_next(req)
+        if resp.status_code != 200:
+            return resp
+        if NO_STORE_HEADER in resp.headers:
+            del resp.headers[NO_STORE_HEADER]
+            resp.headers["Cache-Control"] = "no-store"
+            resp.headers["X-Cache"] = "BYPASS"
+            return resp
+        body = b"".join([chunk async for chunk in resp.body_iterator])
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+        entry = CachedResponse(
+            body=body,
+            etag=strong_etag(body),
+            status_code=int(resp.status_code),
+            headers=headers,
+            expires_at=time.time() + float(rule.ttl_seconds),
+            gens=gens_before,
+        )
+        # Only cache if no invalidation raced with the computation.
+        if gens_before == self._gens_for(rule.tags):
+            self.put_local(key, entry)
+            if rgens is not None:
+                await self.put_redis(key, entry, rule, rgens)
+        return self._respond(entry, inm, rule, response_cls, cache_status="MISS")
+
+    @staticmethod
+    def _respond(entry: CachedResponse, inm: str | None, rule: CacheRule, response_cls: Any, *, cache_status: str) -> Any:
+        headers = dict(entry.headers)
+        headers["ETag"] = entry.etag
+        # Clients/CDNs may keep a copy but must revalidate (cheap 304s via ETag).
+        headers["Cache-Control"] = "public, no-cache"
+        headers["X-Cache"] = cache_status
+        if etag_matches(inm, entry.etag):
+            headers.pop("content-type", None)
+            return response_cls(status_code=304, headers=headers)
+        return response_cls(content=entry.body, status_code=entry.status_code, headers=headers)
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import struct
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterable, Iterator
+
+from server.config import settings
+from server.merkle import HashFn, hash_pair, level_counts
+
+logger = logging.getLogger("agora.rewards")
+
+# Proof file layout (all integers big-endian):
+#   magic (8) | header_len (u32) | header JSON
+#   records: count * (address 20 | agr uint256 32 | usdc uint256 32), sorted by address
+#   tree levels, leaves first: levels[k] * 32-byte hashes
+# Leaf i is record i, so a lookup is a binary search over records plus one 32-byte read per level.
+_MAGIC = b"AGRMRKL1"
+_ADDR_LEN = 20
+_AMOUNT_LEN = 32
+_HASH_LEN = 32
+RECORD_SIZE = _ADDR_LEN + 2 * _AMOUNT_LEN
+SCHEMA_VERSION = 1
+
+_EPOCH_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def keccak256(data: bytes) -> bytes:
+    from eth_utils import keccak  # installed with web3
+
+    return keccak(data)
+
+
+def address_bytes(address: str) -> bytes:
+    a = str(address or "").strip().lower()
+    if a.startswith("0x"):
+        a = a[2:]
+    if len(a) != 40:
+        raise ValueError(f"invalid address: {address!r}")
+    return bytes.fromhex(a)
+
+
+def encode_claim(address: str | bytes, agr: int, usdc: int) -> bytes:
+    """abi.encode(address, uint256 agr, uint256 usdc)"""
+    a = address if isinstance(address, bytes) else address_bytes(address)
+    return b"\x00" * 12 + a + int(agr).to_bytes(32, "big") + int(usdc).to_bytes(32, "big")
+
+
+def leaf_hash(address: str | bytes, agr: int, usdc: int, *, hash_fn: HashFn = keccak256) -> bytes:
+    # Double hash (OpenZeppelin StandardMerkleTree convention): a leaf can never collide with an inner node.
+    return hash_fn(hash_fn(encode_claim(address, agr, usdc)))
+
+
+def valid_epoch_id(epoch_id: str) -> bool:
+    return bool(_EPOCH_ID_RE.match(str(epoch_id or "")))
+
+
+def build_proof_file(
+    claims: Iterable[tuple[str, int, int]],
+    out_path: Path,
+    *,
+    meta: dict[str, Any],
+    hash_fn: HashFn = keccak256,
+    chunk_hashes: int = 1 << 16,
+) -> dict[str, Any]:
+    """
+    Build the Merkle tree for `claims` (address, agr, usdc) and write the seekable proof file.
+
+    Memory-bounded: claims are consumed as a stream (must be sorted by address, unique), records and leaves go
+    to temp files, and each tree level is computed by streaming the previous level in chunks. Peak memory is
+    O(chunk_hashes), independent of the number of addresses. The file is written atomically.
+    Returns the header (merkle_root, count, totals, ...).
+    """
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=out_path.parent, prefix=".epoch-") as tmp:
+        tmp_dir = Path(tmp)
+        records_path = tmp_dir / "records"
+        level_paths = [tmp_dir / "level0"]
+        n = 0
+        total_agr = 0
+        total_usdc = 0
+        prev: bytes | None = None
+        with open(records_path, "wb") as rf, open(level_paths[0], "wb") as lf:
+            for address, agr, usdc in claims:
+                a = address_bytes(address)
+                if prev is not None and a <= prev:
+                    raise ValueError("claims must be sorted by address and unique")
+                if int(agr) < 0 or int(usdc) < 0:
+                    raise ValueError(f"negative claim for {address}")
+                prev = a
+                rf.write(a + int(agr).to_bytes(_AMOUNT_LEN, "big") + int(usdc).to_bytes(_AMOUNT_LEN, "big"))
+                lf.write(leaf_hash(a, int(agr), int(usdc), hash_fn=hash_fn))
+                n += 1
+                total_agr += int(agr)
+                total_usdc += int(usdc)
+
+        counts = level_counts(n)
+        step = _HASH_LEN * 2 * max(1, int(chunk_hashes))
+        for k in range(1, len(counts)):
+            dst = tmp_dir / f"level{k}"
+            with open(level_paths[-1], "rb") as src, open(dst, "wb") as out:
+                while True:
+                    buf = src.read(step)
+                    if not buf:
+                        break
+                    nxt = bytearray()
+                    for i in range(0, len(buf), 2 * _HASH_LEN):
+                        pair = buf[i : i + 2 * _HASH_LEN]
+                        nxt += hash_pair(pair[:_HASH_LEN], pair[_HASH_LEN:], hash_fn) if len(pair) == 2 * _HASH_LEN else pair
+                    out.write(nxt)
+            level_paths.append(dst)
+
+        if n:
+            with open(level_paths[-1], "rb") as f:
+                root = f.read(_HASH_LEN)
+        else:
+            root = b"\x00" * _HASH_LEN
+
+        header = dict(meta)
+        header.update(
+            {
+                "schema_version": SCHEMA_VERSION,
+                "merkle_root": "0x" + root.hex(),
+                "count": n,
+                "total_agr": str(total_agr),
+                "total_usdc": str(total_usdc),
+                "levels": counts,
+                "record_size": RECORD_SIZE,
+                "leaf_encoding": "keccak256(keccak256(abi.encode(address, uint256 agr, uint256 usdc)))",
+                "pair_hash": "keccak256(sorted(a, b))",
+            }
+        )
+        header_bytes = json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        tmp_out = out_path.with_name(out_path.name + ".tmp")
+        with open(tmp_out, "wb") as out:
+            out.write(_MAGIC + struct.pack(">I", len(header_bytes)) + header_bytes)
+            for p in [records_path, *level_paths]:
+                with open(p, "rb") as src:
+                    shutil.copyfileobj(src, out, length=1 << 20)
+        os.replace(tmp_out, out_path)
+    return header
+
+
+class ProofFile:
+    """
+    Read-only view of a proof file. Lookups use positional reads (os.pread), so the file is never loaded
+    into memory and one instance can serve concurrent requests.
+
+    Shared instances are reference-counted (ProofStore.lease): close() only retires the file, and the
+    descriptor is closed once the last reader has released it, so no reader can pread a closed (or reused)
+    descriptor.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._ref_lock = Lock()
+        self._readers = 0
+        self._retired = False
+        self._fd = os.open(self.path, os.O_RDONLY)
+        try:
+            head = os.pread(self._fd, len(_MAGIC) + 4, 0)
+            if head[: len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"not a proof file: {self.path}")
+            (hlen,) = struct.unpack(">I", head[len(_MAGIC) :])
+            self.header: dict[str, Any] = json.loads(os.pread(self._fd, hlen, len(_MAGIC) + 4))
+        except Exception:
+            os.close(self._fd)
+            raise
+        self.count = int(self.header["count"])
+        self.levels = [int(c) for c in self.header["levels"]]
+        self.root = bytes.fromhex(str(self.header["merkle_root"])[2:])
+        self._records_offset = len(_MAGIC) + 4 + hlen
+        off = self._records_offset + self.count * RECORD_SIZE
+        self._level_offsets: list[int] = []
+        for c in self.levels:
+            self._level_offsets.append(off)
+            off += c * _HASH_LEN
+
+    def close(self) -> None:
+        """Retire the file; the descriptor closes now, or when the last leased reader releases it."""
+        with self._ref_lock:
+            self._retired = True
+            if self._readers:
+                return
+        self._close_fd()
+
+    def _close_fd(self) -> None:
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+    def _acquire(self) -> bool:
+        with self._ref_lock:
+            if self._retired:
+                return False
+            self._readers += 1
+            return True
+
+    def _release(self) -> None:
+        with self._ref_lock:
+            self._readers -= 1
+            if not (self._retired and self._readers == 0):
+                return
+        self._close_fd()
+
+    def _record(self, i: int) -> bytes:
+        return os.pread(self._fd, RECORD_SIZE, self._records_offset + i * RECORD_SIZE)
+
+    def find(self, address: str) -> int | None:
+        target = address_bytes(address)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            a = os.pread(self._fd, _ADDR_LEN, self._records_offset + mid * RECORD_SIZE)
+            if a < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and os.pread(self._fd, _ADDR_LEN, self._records_offset + lo * RECORD_SIZE) == target:
+            return lo
+        return None
+
+    def proof(self, index: int) -> list[bytes]:
+        out: list[bytes] = []
+        idx = int(index)
+        for k, c in enumerate(self.levels[:-1]):
+            sib = idx ^ 1
+            if sib < c:
+                out.append(os.pread(self._fd, _HASH_LEN, self._level_offsets[k] + sib * _HASH_LEN))
+            idx >>= 1
+        return out
+
+    def lookup(self, address: str) -> dict[str, Any] | None:
+        i = self.find(address)
+        if i is None:
+            return None
+        rec = self._record(i)
+        agr = int.from_bytes(rec[_ADDR_LEN : _ADDR_LEN + _AMOUNT_LEN], "big")
+        usdc = int.from_bytes(rec[_ADDR_LEN + _AMOUNT_LEN :], "big")
+        leaf = os.pread(self._fd, _HASH_LEN, self._level_offsets[0] + i * _HASH_LEN)
+        return {
+            "epoch_id": str(self.header.get("epoch_id") or ""),
+            "address": "0x" + rec[:_ADDR_LEN].hex(),
+            "agr": str(agr),
+            "usdc": str(usdc),
+            "index": i,
+            "leaf": "0x" + leaf.hex(),
+            "proof": ["0x" + p.hex() for p in self.proof(i)],
+            "merkle_root": "0x" + self.root.hex(),
+        }
+
+
+class ProofStore:
+    """
+    Open proof files by epoch id (<dir>/<epoch_id>.proofs), keeping a few descriptors open (LRU).
+    Use lease(): evicted or rebuilt files are retired and closed once their last reader is done.
+    """
+
+    def __init__(self, directory: Path, *, max_open: int = 8) -> None:
+        self.directory = Path(directory)
+        self._max_open = max(1, int(max_open))
+        self._open: OrderedDict[str, tuple[float, ProofFile]] = OrderedDict()
+        self._lock = Lock()
+
+    def path_for(self, epoch_id: str) -> Path:
+        if not valid_epoch_id(epoch_id):
+            raise ValueError("invalid epoch_id")
+        return self.directory / f"{epoch_id}.proofs"
+
+    @contextmanager
+    def lease(self, epoch_id: str) -> Iterator[ProofFile | None]:
+        """Yield the epoch's proof file (None if there is none), held open until the block exits."""
+        pf = self._checkout(epoch_id)
+        try:
+            yield pf
+        finally:
+            if pf is not None:
+                pf._release()
+
+    def _checkout(self, epoch_id: str) -> ProofFile | None:
+        path = self.path_for(epoch_id)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            # Retirement only happens under this lock, so a cached instance acquired here is still open.
+            cur = self._open.get(epoch_id)
+            if cur is not None and cur[0] == mtime:
+                self._open.move_to_end(epoch_id)
+                cur[1]._acquire()
+                return cur[1]
+            pf = ProofFile(path)
+            if cur is not None:
+                # Rebuilt epoch: the old file closes when its in-flight readers finish.
+                self._open.pop(epoch_id, None)
+                cur[1].close()
+            self._open[epoch_id] = (mtime, pf)
+            while len(self._open) > self._max_open:
+                _, (_, old) = self._open.popitem(last=False)
+                old.close()
+            pf._acquire()
+            return pf
+
+
+def epoch_dir() -> Path:
+    d = str(getattr(settings, "REWARDS_EPOCH_DIR", "") or "").strip()
+    return Path(d) if d else Path(__file__).resolve().parent / "static" / "rewards"
+
+
+def build_epoch(
+    store: Any,
+    *,
+    epoch_id: str,
+    start_at: str,
+    end_at: str,
+    directory: Path | None = None,
+    hash_fn: HashFn = keccak256,
+) -> dict[str, Any]:
+    """
+    Snapshot one epoch: stream net win rewards per address from the ledger, build the tree and write
+    <epoch_id>.proofs (claims + tree, seekable) and <epoch_id>.json (public metadata, no claims list).
+    USDC is 0 under the current policy (wins pay AGR only).
+    """
+    if not valid_epoch_id(epoch_id):
+        raise ValueError("invalid epoch_id")
+    out_dir = Path(directory) if directory is not None else epoch_dir()
+    meta = {
+        "epoch_id": epoch_id,
+        "start_at": start_at,
+        "end_at": end_at,
+        "chain_id": int(settings.CHAIN_ID),
+        "usdc": str(settings.USDC_ADDRESS),
+        "agr": str(settings.AGR_TOKEN_ADDRESS),
+    }
+    claims = ((addr, amount, 0) for addr, amount in store.iter_epoch_rewards(start_iso=start_at, end_iso=end_at))
+    header = build_proof_file(claims, out_dir / f"{epoch_id}.proofs", meta=meta, hash_fn=hash_fn)
+    data = json.dumps({**header, "proofs_file": f"{epoch_id}.proofs"}, sort_keys=True, indent=2).encode("utf-8")
+    tmp = out_dir / f".{epoch_id}.json.tmp"
+    tmp.write_bytes(data + b"\n")
+    os.replace(tmp, out_dir / f"{epoch_id}.json")
+    logger.info("rewards_epoch_built epoch_id=%s count=%s root=%s", epoch_id, header["count"], header["merkle_root"])
+    return header
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+
+from server.rewards import build_epoch
+from server.storage import get_store
+
+
+logger = logging.getLogger("agora.rewards_worker")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Project Agora rewards epoch builder (Merkle claims)")
+    parser.add_argument("--epoch-id", required=True, help="e.g. 2026-W05")
+    parser.add_argument("--start", required=True, help="Epoch start (UTC ISO-8601, inclusive)")
+    parser.add_argument("--end", required=True, help="Epoch end (UTC ISO-8601, exclusive)")
+    parser.add_argument("--out-dir", default=None, help="Defaults to AGORA_REWARDS_EPOCH_DIR")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    header = build_epoch(
+        get_store(),
+        epoch_id=args.epoch_id,
+        start_at=args.start,
+        end_at=args.end,
+        directory=args.out_dir,
+    )
+    print(json.dumps(header, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
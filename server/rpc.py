@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+
+from server import metrics
+from server.config import settings
+
+logger = logging.getLogger("agora.rpc")
+
+# HTTP statuses worth another endpoint / attempt (overload, gateway trouble). Anything else is the caller's problem.
+_RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RpcError(Exception):
+    def __init__(self, message: str, *, code: int | None = None) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class RpcTransportError(RpcError):
+    """Every endpoint failed at the HTTP level (connection, timeout, 5xx/429) after all retries."""
+
+
+_session_lock = threading.Lock()
+_session: requests.Session | None = None
+
+
+def _shared_session() -> requests.Session:
+    # One keep-alive pool for the whole process: every client reuses warm TCP/TLS connections per RPC host.
+    global _session
+    with _session_lock:
+        if _session is None:
+            size = max(1, int(getattr(settings, "RPC_POOL_SIZE", 32)))
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=size, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({"Content-Type": "application/json"})
+            _session = s
+        return _session
+
+
+def _host(url: str) -> str:
+    # Metric label: host only (API keys usually live in the path).
+    return urlsplit(url).netloc or "unknown"
+
+
+class _Endpoint:
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.host = _host(url)
+        self.down_until = 0.0
+
+
+class RpcClient:
+    """
+    JSON-RPC over a shared keep-alive session with failover and retries.
+
+    Endpoints are tried in order (primary first); one that fails at the HTTP level (connection error, timeout,
+    408/429/5xx) is skipped for `cooldown_seconds` and the request moves to the next. When every endpoint has
+    failed, the round is retried up to `retries` times with backoff. JSON-RPC errors in a response (reverts,
+    invalid params) are never retried. Latency is recorded per method (agora_web3_rpc_*).
+
+    `call`/`batch` return results directly; `web3()` wraps the same client in a Web3 instance.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        *,
+        timeout: float | None = None,
+        retries: int | None = None,
+        cooldown_seconds: float | None = None,
+        session: requests.Session | None = None,
+    ) -> None:
+        urls = [u.strip() for u in urls if u and u.strip()]
+        if not urls:
+            raise ValueError("RpcClient needs at least one RPC URL")
+        self.endpoints = [_Endpoint(u) for u in urls]
+        self.timeout = float(timeout if timeout is not None else getattr(settings, "RPC_TIMEOUT_SECONDS", 10.0))
+        self.retries = max(0, int(retries if retries is not None else getattr(settings, "RPC_MAX_RETRIES", 2)))
+        self.cooldown_seconds = float(
+            cooldown_seconds if cooldown_seconds is not None else getattr(settings, "RPC_FAILOVER_COOLDOWN_SECONDS", 30.0)
+        )
+        self._session = session
+        self._id_lock = threading.Lock()
+        self._id = 0
+        self._w3: Web3 | None = None
+
+    @property
+    def url(self) -> str:
+        return self.endpoints[0].url
+
+    def _next_id(self, n: int = 1) -> int:
+        with self._id_lock:
+            base = self._id
+            self._id += n
+            return base
+
+    def _order(self) -> list[_Endpoint]:
+        now = time.monotonic()
+        up = [e for e in self.endpoints if e.down_until <= now]
+        down = sorted((e for e in self.endpoints if e.down_until > now), key=lambda e: e.down_until)
+        return up + down  # all cooling down: still try them, soonest-recovering first
+
+    def post_raw(self, data: bytes, *, method: str) -> bytes:
+        """POST an encoded JSON-RPC payload; returns the raw response body of the first endpoint that answers."""
+        session = self._session or _shared_session()
+        last: Exception | None = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(min(2.0, 0.2 * (2 ** (attempt - 1))))
+            for ep in self._order():
+                try:
+                    resp = session.post(ep.url, data=data, timeout=self.timeout)
+                    if resp.status_code in _RETRY_STATUS:
+                        raise RpcTransportError(f"HTTP {resp.status_code} from {ep.host}", code=resp.status_code)
+                    resp.raise_for_status()
+                    return resp.content
+                except (requests.RequestException, RpcTransportError) as e:
+                    last = e
+                    ep.down_until = time.monotonic() + self.cooldown_seconds
+                    if len(self.endpoints) > 1:
+                        metrics.registry.inc("agora_web3_rpc_failovers_total", (("endpoint", ep.host),))
+                    logger.warning("rpc %s via %s failed (attempt %s): %s", method, ep.host, attempt + 1, e)
+        raise RpcTransportError(f"rpc {method} failed on all endpoints: {last}")
+
+    def call(self, method: str, params: list[Any]) -> Any:
+        rid = self._next_id() + 1
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            payload = json.dumps({"jsonrpc": "2.0", "id": rid, "method": method, "params": params}).encode("utf-8")
+            resp = json.loads(self.post_raw(payload, method=method))
+            if resp.get("error"):
+                err = resp["error"]
+                raise RpcError(str(err.get("message") or err), code=err.get("code"))
+            ok = True
+            return resp.get("result")
+        finally:
+            metrics.observe_rpc(method, time.perf_counter() - t0, ok=ok)
+
+    def batch(self, method: str, params_list: list[list[Any]]) -> list[Any]:
+        """One HTTP round trip for many calls of `method`; per-call errors come back as RpcError values."""
+        if not params_list:
+            return []
+        base = self._next_id(len(params_list))
+        payload = [{"jsonrpc": "2.0", "id": base + i + 1, "method": method, "params": p} for i, p in enumerate(params_list)]
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            resp = json.loads(self.post_raw(json.dumps(payload).encode("utf-8"), method=f"batch:{method}"))
+            if not isinstance(resp, list):
+                # Provider without batch support: fall back to sequential calls.
+                out: list[Any] = []
+                for p in params_list:
+                    try:
+                        out.append(self.call(method, p))
+                    except RpcError as e:
+                        out.append(e)
+                ok = True
+                return out
+            by_id = {r.get("id"): r for r in resp if isinstance(r, dict)}
+            out = []
+            for i in range(len(params_list)):
+                r = by_id.get(base + i + 1) or {}
+                if r.get("error"):
+                    out.append(RpcError(str(r["error"].get("message") or r["error"]), code=r["error"].get("code")))
+                else:
+                    out.append(r.get("result"))
+            ok = True
+            return out
+        finally:
+            metrics.observe_rpc(f"batch:{method}", time.perf_counter() - t0, ok=ok)
+
+    def provider(self) -> PooledProvider:
+        return PooledProvider(self)
+
+    def web3(self) -> Web3:
+        if self._w3 is None:
+            self._w3 = Web3(self.provider())
+        return self._w3
+
+
+class PooledProvider(JSONBaseProvider):
+    """web3 provider on top of RpcClient: pooled connections, failover/retries and per-method metrics."""
+
+    def __init__(self, client: RpcClient) -> None:
+        super().__init__()
+        self.client = client
+
+    def __str__(self) -> str:
+        return f"PooledProvider<{', '.join(e.host for e in self.client.endpoints)}>"
+
+    def make_request(self, method, params):  # type: ignore[override]
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            resp = self.decode_rpc_response(self.client.post_raw(self.encode_rpc_request(method, params), method=str(method)))
+            ok = not (isinstance(resp, dict) and resp.get("error"))
+            return resp
+        finally:
+            metrics.observe_rpc(str(method), time.perf_counter() - t0, ok=ok)
+
+    def make_batch_request(self, batch_requests):  # type: ignore[override]
+        label = "batch:" + (str(batch_requests[0][0]) if batch_requests else "")
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            resp = self.decode_rpc_response(self.client.post_raw(self.encode_batch_rpc_request(batch_requests), method=label))
+            if not isinstance(resp, list):
+                return resp  # provider-level error object; web3 raises from it
+            ok = not any(isinstance(r, dict) and r.get("error") for r in resp)
+            return sorted(resp, key=lambda r: int(r.get("id") or 0) if isinstance(r, dict) else 0)
+        finally:
+            metrics.observe_rpc(label, time.perf_counter() - t0, ok=ok)
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            return bool(self.client.call("web3_clientVersion", []))
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+
+
+def configured_urls() -> list[str]:
+    """AGORA_RPC_URL first, then AGORA_RPC_FALLBACK_URLS (comma-separated)."""
+    urls = [str(settings.RPC_URL or "").strip()]
+    urls += [u.strip() for u in str(getattr(settings, "RPC_FALLBACK_URLS", "") or "").split(",")]
+    return list(dict.fromkeys(u for u in urls if u))
+
+
+_clients_lock = threading.Lock()
+_clients: dict[tuple[tuple[str, ...], float | None, int | None], RpcClient] = {}
+
+
+def get_rpc_client(url: str | None = None, *, timeout: float | None = None, retries: int | None = None) -> RpcClient:
+    """
+    Process-wide client for `url` (default: the configured RPC URLs). The configured primary URL always brings its
+    fallbacks along; any other URL gets a single-endpoint client. Clients differ only in timeout/retries and share
+    one connection pool.
+    """
+    configured = configured_urls()
+    if url is None or (configured and str(url).strip() == configured[0]):
+        urls = tuple(configured)
+    else:
+        urls = (str(url).strip(),)
+    key = (urls, None if timeout is None else float(timeout), retries)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = RpcClient(list(urls), timeout=timeout, retries=retries)
+            _clients[key] = client
+        return client
+
+
+def get_web3(url: str | None = None, *, timeout: float | None = None, retries: int | None = None) -> Web3:
+    return get_rpc_client(url, timeout=timeout, retries=retries).web3()
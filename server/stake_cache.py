@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Any
+
+from server import metrics
+from server.config import settings
+from server.onchain import get_stake_amount_usdc
+
+logger = logging.getLogger("agora.stake_cache")
+
+# Re-read this much of the change feed on every poll: updated_at is stamped by the writer before commit, so a
+# row can become visible slightly "in the past" (and writer clocks drift).
+_CHANGES_OVERLAP = timedelta(seconds=5)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+class StakeCache:
+    """
+    Stake resolution for the request path when ONCHAIN_STAKE_ENABLED.
+
+    Lookups are served from a bounded in-process TTL cache. On a miss the value comes from the stakes mirror
+    (StakeDB, kept current from Deposited/Withdrawn/Slashed events by onchain_sync) when the sync worker is
+    enabled and the row was written for the configured stake contract; otherwise from a live stakeOf read with
+    a bounded timeout. Invalidation is event-driven: onchain_sync pushes fresh amounts via `update()` when it
+    runs in-process, and every process polls the stakes change feed (rows by updated_at) so cached entries
+    follow the mirror written by a separate onchain worker. Live-read failures return 0 (fail closed) and are
+    not cached.
+    """
+
+    def __init__(self, *, max_entries: int = 100_000) -> None:
+        self._lock = Lock()
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()  # addr -> (amount, expires_at)
+        self._max_entries = max(1, int(max_entries))
+        self._poll_lock = Lock()
+        self._next_poll = 0.0
+        self._watermark: datetime | None = None
+
+    def get(self, store: Any, address: str) -> float:
+        addr = str(address).strip().lower()
+        self._poll_changes(store)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(addr)
+            if hit is not None and hit[1] > now:
+                self._entries.move_to_end(addr)
+                metrics.registry.inc("agora_stake_lookups_total", (("source", "cache"),))
+                return hit[0]
+
+        contract = str(settings.STAKE_CONTRACT_ADDRESS or "").strip().lower()
+        if bool(getattr(settings, "ONCHAIN_SYNC_ENABLED", False)):
+            rec = store.get_stake_record(addr)
+            if rec is not None and str(rec.get("stake_contract_address") or "").lower() == contract:
+                amount = float(rec["amount"])
+                self._put(addr, amount)
+                metrics.registry.inc("agora_stake_lookups_total", (("source", "mirror"),))
+                return amount
+
+        try:
+            amount = float(
+                get_stake_amount_usdc(
+                    rpc_url=settings.RPC_URL,
+                    stake_contract=settings.STAKE_CONTRACT_ADDRESS,
+                    agent_address=addr,
+                    timeout=float(getattr(settings, "ONCHAIN_STAKE_RPC_TIMEOUT_SECONDS", 2.0)),
+                )
+            )
+        except Exception as e:
+            # Fail closed: if onchain is enabled but RPC/contract is misconfigured or slow, return 0.
+            logger.warning("stakeOf read failed for %s: %s", addr, e)
+            metrics.registry.inc("agora_stake_lookups_total", (("source", "rpc_error"),))
+            return 0.0
+        self._put(addr, amount)
+        metrics.registry.inc("agora_stake_lookups_total", (("source", "rpc"),))
+        return amount
+
+    def _put(self, addr: str, amount: float) -> None:
+        ttl = float(getattr(settings, "STAKE_CACHE_TTL_SECONDS", 60.0))
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[addr] = (float(amount), time.monotonic() + ttl)
+            self._entries.move_to_end(addr)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def update(self, amounts: dict[str, float]) -> None:
+        """Fresh amounts from stake events: refresh entries this process already holds."""
+        for addr, amount in amounts.items():
+            a = str(addr).lower()
+            with self._lock:
+                present = a in self._entries
+            if present:
+                self._put(a, float(amount))
+
+    def invalidate(self, addresses: list[str] | None = None) -> None:
+        """Drop the given addresses (all entries if None)."""
+        with self._lock:
+            if addresses is None:
+                self._entries.clear()
+                return
+            for addr in addresses:
+                self._entries.pop(str(addr).lower(), None)
+
+    def _poll_changes(self, store: Any) -> None:
+        if not bool(getattr(settings, "ONCHAIN_SYNC_ENABLED", False)):
+            return
+        now = time.monotonic()
+        if now < self._next_poll or not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_poll = now + float(getattr(settings, "STAKE_CACHE_CHANGES_POLL_SECONDS", 2.0))
+            if self._watermark is None:
+                # Nothing is cached yet; everything older than this is read on demand.
+                self._watermark = datetime.now(timezone.utc)
+                return
+            limit = 1000
+            try:
+                rows = store.list_stake_changes(since_iso=_iso(self._watermark - _CHANGES_OVERLAP), limit=limit)
+            except Exception as e:
+                logger.warning("stake change feed poll failed: %s", e)
+                return
+            if len(rows) >= limit:
+                # More changes than one page (bulk catch-up): cheaper to start cold than to page through.
+                self.invalidate()
+            else:
+                contract = str(settings.STAKE_CONTRACT_ADDRESS or "").strip().lower()
+                fresh: dict[str, float] = {}
+                stale: list[str] = []
+                for r in rows:
+                    if str(r.get("stake_contract_address") or "").lower() == contract:
+                        fresh[str(r["address"]).lower()] = float(r["amount"])
+                    else:
+                        stale.append(str(r["address"]))
+                self.update(fresh)
+                self.invalidate(stale)
+            seen = [datetime.fromisoformat(str(r["updated_at"]).replace("Z", "+00:00")) for r in rows if r.get("updated_at")]
+            if seen:
+                self._watermark = max(self._watermark, max(seen))
+        finally:
+            self._poll_lock.release()
+
+
+stake_cache = StakeCache()
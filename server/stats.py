@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timezone
+from threading import Lock, Thread
+from typing import Any
+
+from server.config import settings
+
+logger = logging.getLogger("agora.stats")
+
+# Served (with computed_at=None) until the first snapshot exists; never blocks a request on the COUNT queries.
+_EMPTY_SNAPSHOT: dict[str, Any] = {
+    "admin": {
+        "users": 0,
+        "jobs_total": 0,
+        "jobs_open": 0,
+        "submissions_total": 0,
+        "comments_total": 0,
+        "votes_total": 0,
+        "final_votes_total": 0,
+        "active_sessions": 0,
+    },
+    "users_total": 0,
+}
+
+
+class StatsCache:
+    """
+    Cached snapshot of admin metrics + public stats.
+
+    - A background refresher recomputes the snapshot every `refresh_seconds`, so request handlers
+      (including the public landing page) only read memory.
+    - Without a refresher a stale snapshot keeps being served while one background refresh (single-flight)
+      replaces it; requests never run the COUNT queries themselves.
+    - Before the first snapshot exists, callers get zeros with computed_at=None while it is computed in
+      the background (warm() at startup usually makes this window empty).
+    - If a refresh fails, the last good snapshot keeps being served and its age keeps growing.
+    """
+
+    def __init__(self, *, ttl_seconds: float, refresh_seconds: float) -> None:
+        self.ttl_seconds = float(max(0.0, ttl_seconds))
+        self.refresh_seconds = float(max(1.0, refresh_seconds))
+        self._snapshot: dict[str, Any] | None = None
+        self._computed_at = 0.0
+        self._refresh_lock = Lock()
+        self._thread: Thread | None = None
+
+    def _compute(self, store: Any) -> dict[str, Any]:
+        admin = dict(store.admin_metrics())
+        return {"admin": admin, "users_total": int(store.users_total())}
+
+    def refresh(self, store: Any) -> dict[str, Any]:
+        with self._refresh_lock:
+            snap = self._compute(store)
+            self._snapshot = snap
+            self._computed_at = time.time()
+            return snap
+
+    def get(self, store: Any) -> tuple[dict[str, Any], float | None]:
+        """Returns (snapshot, computed_at unix seconds); computed_at is None until the first snapshot exists."""
+        snap, computed_at = self._snapshot, self._computed_at
+        if snap is not None and (time.time() - computed_at) < self.ttl_seconds:
+            return snap, computed_at
+
+        if snap is not None:
+            # Stale: serve it as is and let one background refresh replace it.
+            self.warm(store)
+            return snap, computed_at
+
+        # Cold start: serve zeros rather than running every COUNT inline; the first snapshot is computed off-request.
+        self.warm(store)
+        return _EMPTY_SNAPSHOT, None
+
+    def warm(self, store: Any) -> None:
+        """Compute a snapshot in a background thread unless a refresh is already running."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def run() -> None:
+            try:
+                self._snapshot = self._compute(store)
+                self._computed_at = time.time()
+            except Exception:
+                logger.exception("stats background refresh failed; previous snapshot kept")
+            finally:
+                self._refresh_lock.release()
+
+        Thread(target=run, name="agora-stats-warm", daemon=True).start()
+
+    def start_refresher(self, store: Any) -> None:
+        """Start the background refresher (daemon thread). Idempotent."""
+        if self._thread is not None:
+            return
+
+        def loop() -> None:
+            while True:
+                try:
+                    self.refresh(store)
+                except Exception:
+                    logger.exception("stats refresher error")
+                time.sleep(self.refresh_seconds)
+
+        self._thread = Thread(target=loop, name="agora-stats-refresher", daemon=True)
+        self._thread.start()
+
+
+def computed_at_iso(ts: float | None) -> str | None:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(microsecond=0).isoformat()
+
+
+stats_cache = StatsCache(ttl_seconds=settings.STATS_TTL_SECONDS, refresh_seconds=settings.STATS_REFRESH_SECONDS)
@@ -5,19 +5,22 @@ import time
 import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Protocol
+from typing import Callable, Iterator, Protocol
 
-from sqlalchemy import delete, func, select, update
+from sqlalchemy import and_, case, delete, exists, func, literal, or_, select, tuple_, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from server.config import settings
 from server.models import utc_now_iso
 from server.db.models import (
+    AgrBalanceDB,
     AgrLedgerDB,
     AgentProfileDB,
     AgentReputationDB,
     AnchorBatchDB,
+    AnchorRollupDB,
+    AnchorTxDB,
     AuthChallengeDB,
     AdminAccessChallengeDB,
     AuthSessionDB,
@@ -27,7 +30,9 @@ from server.db.models import (
     FinalVoteDB,
     JobDB,
     JobBoostDB,
+    OnchainBlockDB,
     OnchainCursorDB,
+    OnchainUndoDB,
     PostDB,
     ReactionDB,
     SemanticDocDB,
@@ -36,6 +41,7 @@ from server.db.models import (
     SubmissionDB,
     ViewEventDB,
     VoteDB,
+    VoteTallyDB,
     NotificationDB,
 )
 from server.db.session import get_sessionmaker
@@ -49,6 +55,35 @@ def _now_utc() -> datetime:
     return datetime.now(timezone.utc).replace(microsecond=0)
 
 
+# Ledger reasons that count toward epoch settlement (docs/rewards_merkle_settlement.md: only wins are rewarded).
+_EPOCH_REWARD_REASONS = ("win", "win_duplicate_reversal")
+
+
+# Columns update_anchor_tx may change (the worker owns everything but kind/target_id/created_at).
+_ANCHOR_TX_FIELDS = (
+    "status",
+    "from_address",
+    "nonce",
+    "tx_hash",
+    "tx_hashes",
+    "gas_limit",
+    "max_fee_per_gas",
+    "max_priority_fee_per_gas",
+    "gas_price",
+    "attempts",
+    "bumps",
+    "last_error",
+    "block_number",
+    "sent_at",
+    "mined_at",
+)
+
+
+def _win_reward_key(job_id: str) -> str:
+    # One win reward per job, whoever won it; see AgrLedgerDB.idempotency_key.
+    return f"win:{job_id}"
+
+
 def _dt_to_iso(dt: datetime | None) -> str | None:
     if dt is None:
         return None
@@ -84,6 +119,11 @@ class Store(Protocol):
     def set_challenge_message(self, address: str, message: str) -> None: ...
     def get_valid_challenge(self, address: str) -> "Challenge | None": ...
     def consume_challenge(self, address: str) -> None: ...
+    def create_challenges(
+        self, addresses: list[str], ttl_seconds: int, *, message_for: Callable[[str, str], str]
+    ) -> list["Challenge"]: ...
+    def get_valid_challenges(self, addresses: list[str]) -> dict[str, "Challenge"]: ...
+    def redeem_challenges(self, nonces: dict[str, str], ttl_seconds: int) -> dict[str, "Session"]: ...
 
     # ---- Admin access: step-up challenges ----
     def create_admin_access_challenge(self, address: str, message: str, ttl_seconds: int) -> "Challenge": ...
@@ -107,8 +147,11 @@ class Store(Protocol):
         stake_block_number: int | None = None,
         stake_log_index: int | None = None,
     ) -> None: ...
+    def set_stakes(self, *, rows: list[dict]) -> int: ...
     def get_stake(self, address: str) -> float: ...
     def get_stake_meta(self, address: str) -> dict: ...
+    def get_stake_record(self, address: str) -> dict | None: ...
+    def list_stake_changes(self, *, since_iso: str, limit: int = 1000) -> list[dict]: ...
 
     # ---- Slashing (Phase 2 scaffold) ----
     def record_slash(self, *, event: dict) -> dict: ...
@@ -119,6 +162,13 @@ class Store(Protocol):
     def set_onchain_cursor(self, key: str, last_block: int) -> None: ...
     def list_onchain_cursors(self, *, limit: int = 200) -> list[dict]: ...
 
+    # ---- Onchain reorg handling (block-hash checkpoints + undo log) ----
+    def add_onchain_checkpoint(self, *, chain_id: int, block_number: int, block_hash: str, parent_hash: str | None) -> None: ...
+    def list_onchain_checkpoints(self, *, chain_id: int, limit: int = 256) -> list[dict]: ...
+    def record_onchain_undo(self, *, entries: list[dict]) -> None: ...
+    def rollback_onchain(self, *, chain_id: int, after_block: int) -> list[dict]: ...
+    def prune_onchain_history(self, *, chain_id: int, before_block: int) -> None: ...
+
     # ---- Jobs/Submissions ----
     def create_job(self, job: dict) -> dict: ...
     def list_jobs(self, *, status: str = "open", tag: str | None = None) -> list[dict]: ...
@@ -134,11 +184,14 @@ class Store(Protocol):
         close_contract_address: str | None = None,
         close_block_number: int | None = None,
         close_log_index: int | None = None,
-    ) -> dict: ...
+        win_reward_agr: int = 0,
+    ) -> dict | None: ...
 
     def create_submission(self, submission: dict) -> dict: ...
     def get_submission(self, submission_id: str) -> dict | None: ...
-    def list_submissions_for_job(self, job_id: str) -> list[dict]: ...
+    def list_submissions_for_job(self, job_id: str, *, limit: int | None = None, after: str | None = None) -> list[dict]: ...
+    def submission_ids_and_authors(self, job_id: str) -> dict[str, str]: ...
+    def get_submission_author(self, submission_id: str) -> str | None: ...
 
     # ---- Community posts ----
     def create_post(self, post: dict) -> dict: ...
@@ -153,6 +206,9 @@ class Store(Protocol):
     def create_comment(self, *, comment: dict) -> dict: ...
     def get_comment(self, *, comment_id: str) -> dict | None: ...
     def list_comments(self, *, target_type: str, target_id: str, limit: int = 200) -> list[dict]: ...
+    def iter_comments_for_targets(
+        self, *, target_type: str, target_ids: list[str], limit_per_target: int = 200, batch_size: int = 1000
+    ) -> Iterator[dict]: ...
     def soft_delete_comment(self, *, comment_id: str, deleted_by: str) -> dict: ...
 
     # ---- Engagement (reactions/views) ----
@@ -175,18 +231,33 @@ class Store(Protocol):
     def upsert_vote(self, *, job_id: str, voter_address: str, vote: dict) -> dict: ...
     def list_votes_for_job(self, job_id: str) -> list[dict]: ...
     def tally_votes_for_job(self, job_id: str) -> dict[str, dict]: ...
+    def get_vote_context(self, *, job_id: str, submission_id: str, voter_address: str) -> dict: ...
 
     # ---- Final decision votes (Phase 2 governance) ----
     def upsert_final_vote(self, *, job_id: str, voter_address: str, submission_id: str) -> dict: ...
     def list_final_votes_for_job(self, job_id: str) -> list[dict]: ...
     def tally_final_votes_for_job(self, job_id: str) -> dict[str, dict]: ...
+    def finalize_due_jobs(
+        self,
+        *,
+        now_iso: str,
+        default_window_seconds: int,
+        limit: int = 50,
+        win_reward_agr: int = 0,
+        no_vote_grace_seconds: int = 0,
+    ) -> list[dict]: ...
 
     # ---- AGR premium credits (offchain) ----
     def agr_balance(self, address: str) -> dict: ...
-    def agr_credit(self, *, address: str, amount: int, reason: str, job_id: str | None = None) -> dict: ...
+    def agr_credit(
+        self, *, address: str, amount: int, reason: str, job_id: str | None = None, idempotency_key: str | None = None
+    ) -> dict: ...
     def agr_debit(self, *, address: str, amount: int, reason: str, job_id: str | None = None) -> dict: ...
     def boost_job(self, *, job_id: str, address: str, amount_agr: int, duration_seconds: int) -> dict: ...
     def list_agr_ledger(self, *, address: str, limit: int = 50) -> list[dict]: ...
+    def reconcile_win_rewards(self, *, apply: bool = False) -> dict: ...
+    def verify_agr_balances(self, *, address: str | None = None, repair: bool = False) -> dict: ...
+    def iter_epoch_rewards(self, *, start_iso: str, end_iso: str, batch_size: int = 10000) -> Iterator[tuple[str, int]]: ...
 
     # ---- Reputation ----
     def ensure_agent_rep(self, address: str) -> dict: ...
@@ -221,6 +292,25 @@ class Store(Protocol):
         anchor_log_index: int,
     ) -> dict: ...
     def list_anchor_batches(self, *, limit: int = 50) -> list[dict]: ...
+    def list_unrolled_anchor_batches(self, *, limit: int = 256) -> list[dict]: ...
+    def create_anchor_rollup(self, *, rollup: dict, members: list[dict]) -> dict | None: ...
+    def get_anchor_rollup(self, rollup_id: str) -> dict | None: ...
+    def list_anchor_rollups(self, *, limit: int = 50) -> list[dict]: ...
+    def enqueue_anchor_tx(self, *, kind: str, target_id: str) -> dict: ...
+    def get_anchor_tx(self, *, kind: str, target_id: str) -> dict | None: ...
+    def list_anchor_txs(self, *, statuses: list[str], limit: int = 100) -> list[dict]: ...
+    def update_anchor_tx(self, *, tx_id: str, fields: dict) -> dict: ...
+    def max_anchor_tx_nonce(self, *, from_address: str) -> int | None: ...
+    def set_anchor_rollup_receipt(
+        self,
+        *,
+        rollup_id: str,
+        anchor_tx_hash: str,
+        anchor_chain_id: int,
+        anchor_contract_address: str,
+        anchor_block_number: int,
+        anchor_log_index: int,
+    ) -> dict: ...
 
     # ---- Admin (operator-only) ----
     def admin_metrics(self) -> dict: ...
@@ -302,6 +392,37 @@ class InMemoryStore:
         addr = _lower_addr(address)
         self.challenges_by_address.pop(addr, None)
 
+    def create_challenges(
+        self, addresses: list[str], ttl_seconds: int, *, message_for: Callable[[str, str], str]
+    ) -> list[Challenge]:
+        out: list[Challenge] = []
+        for address in dict.fromkeys(_lower_addr(a) for a in addresses):
+            nonce = secrets.token_hex(16)
+            c = Challenge(address=address, nonce=nonce, message=message_for(address, nonce), expires_at=time.time() + ttl_seconds)
+            self.challenges_by_address[address] = c
+            out.append(c)
+        return out
+
+    def get_valid_challenges(self, addresses: list[str]) -> dict[str, Challenge]:
+        out: dict[str, Challenge] = {}
+        for address in addresses:
+            c = self.get_valid_challenge(address)
+            if c:
+                out[c.address] = c
+        return out
+
+    def redeem_challenges(self, nonces: dict[str, str], ttl_seconds: int) -> dict[str, Session]:
+        out: dict[str, Session] = {}
+        for address, nonce in nonces.items():
+            addr = _lower_addr(address)
+            c = self.get_valid_challenge(addr)
+            if not c or c.nonce != nonce:
+                continue
+            self.consume_challenge(addr)
+            out[addr] = self.create_session(addr, ttl_seconds)
+            self.ensure_agent_rep(addr)
+        return out
+
     # ---- Admin access: challenges ----
     def create_admin_access_challenge(self, address: str, message: str, ttl_seconds: int) -> Challenge:
         addr = _lower_addr(address)
@@ -371,9 +492,24 @@ class InMemoryStore:
             "stake_contract_address": stake_contract_address,
             "stake_block_number": stake_block_number,
             "stake_log_index": stake_log_index,
+            "updated_at": utc_now_iso(),
         }
         self.jobs["__stake_meta__"] = meta
 
+    def set_stakes(self, *, rows: list[dict]) -> int:
+        """Bulk set_stake: rows carry address, amount and the optional stake_* anchor fields."""
+        for r in rows:
+            self.set_stake(
+                str(r["address"]),
+                float(r["amount"]),
+                stake_tx_hash=r.get("stake_tx_hash"),
+                stake_chain_id=r.get("stake_chain_id"),
+                stake_contract_address=r.get("stake_contract_address"),
+                stake_block_number=r.get("stake_block_number"),
+                stake_log_index=r.get("stake_log_index"),
+            )
+        return len(rows)
+
     def get_stake(self, address: str) -> float:
         return float(self.stakes_by_address.get(_lower_addr(address), 0.0))
 
@@ -382,6 +518,20 @@ class InMemoryStore:
         meta = self.jobs.get("__stake_meta__", {}) or {}
         return dict(meta.get(addr) or {})
 
+    def get_stake_record(self, address: str) -> dict | None:
+        addr = _lower_addr(address)
+        if addr not in self.stakes_by_address:
+            return None
+        meta = (self.jobs.get("__stake_meta__", {}) or {}).get(addr) or {}
+        return {"address": addr, "amount": float(self.stakes_by_address[addr]), **meta}
+
+    def list_stake_changes(self, *, since_iso: str, limit: int = 1000) -> list[dict]:
+        meta = self.jobs.get("__stake_meta__", {}) or {}
+        changed = sorted(
+            (m.get("updated_at") or "", addr) for addr, m in meta.items() if (m.get("updated_at") or "") >= str(since_iso)
+        )
+        return [r for r in (self.get_stake_record(addr) for _, addr in changed[: max(1, int(limit))]) if r]
+
     # ---- Slashing (Phase 2 scaffold) ----
     def record_slash(self, *, event: dict) -> dict:
         ev_id = str(uuid.uuid4())
@@ -426,6 +576,99 @@ class InMemoryStore:
         out.sort(key=lambda r: r["key"])
         return out[: max(1, int(limit))]
 
+    # ---- Onchain reorg handling (block-hash checkpoints + undo log) ----
+    def add_onchain_checkpoint(self, *, chain_id: int, block_number: int, block_hash: str, parent_hash: str | None) -> None:
+        cps = dict(self.jobs.get("__onchain_blocks__", {}) or {})
+        cps[(int(chain_id), int(block_number))] = {
+            "chain_id": int(chain_id),
+            "block_number": int(block_number),
+            "block_hash": str(block_hash).lower(),
+            "parent_hash": str(parent_hash).lower() if parent_hash else None,
+            "created_at": utc_now_iso(),
+        }
+        self.jobs["__onchain_blocks__"] = cps
+
+    def list_onchain_checkpoints(self, *, chain_id: int, limit: int = 256) -> list[dict]:
+        cps = self.jobs.get("__onchain_blocks__", {}) or {}
+        out = sorted((dict(v) for (c, _), v in cps.items() if c == int(chain_id)), key=lambda r: r["block_number"], reverse=True)
+        return out[: max(1, int(limit))]
+
+    def record_onchain_undo(self, *, entries: list[dict]) -> None:
+        log = list(self.jobs.get("__onchain_undo__", []) or [])
+        next_id = (log[-1]["id"] + 1) if log else 1
+        for e in entries:
+            log.append(
+                {
+                    "id": next_id,
+                    "chain_id": int(e["chain_id"]),
+                    "block_number": int(e["block_number"]),
+                    "kind": str(e["kind"]),
+                    "ref": str(e["ref"]),
+                    "data": e.get("data"),
+                    "created_at": utc_now_iso(),
+                }
+            )
+            next_id += 1
+        self.jobs["__onchain_undo__"] = log
+
+    def rollback_onchain(self, *, chain_id: int, after_block: int) -> list[dict]:
+        """
+        Revert every undo entry above `after_block` (newest first), then drop those entries and the checkpoints
+        above it. Returns the applied entries. Donor profiles already switched to donor avatars are left as is.
+        """
+        chain_id, after_block = int(chain_id), int(after_block)
+        log = list(self.jobs.get("__onchain_undo__", []) or [])
+        applied = [e for e in log if e["chain_id"] == chain_id and e["block_number"] > after_block]
+        for e in sorted(applied, key=lambda e: e["id"], reverse=True):
+            if e["kind"] == "stake":
+                addr = _lower_addr(e["ref"])
+                meta = dict(self.jobs.get("__stake_meta__", {}) or {})
+                prev = e.get("data")
+                if prev is None:
+                    self.stakes_by_address.pop(addr, None)
+                    meta.pop(addr, None)
+                else:
+                    self.stakes_by_address[addr] = float(prev.get("amount") or 0.0)
+                    meta[addr] = {**{k: v for k, v in prev.items() if k not in ("address", "amount")}, "updated_at": utc_now_iso()}
+                self.jobs["__stake_meta__"] = meta
+            elif e["kind"] == "slash":
+                data = e.get("data") or {}
+                self.jobs["__slashing_events__"] = [
+                    s
+                    for s in (self.jobs.get("__slashing_events__", []) or [])
+                    if not (
+                        s.get("id") == e["ref"]
+                        or (str(s.get("tx_hash") or "") == str(data.get("tx_hash") or "") and s.get("log_index") == data.get("log_index"))
+                    )
+                ]
+            elif e["kind"] == "donation":
+                events = dict(self.jobs.get("__donation_events__", {}) or {})
+                ev = events.pop(e["ref"], None)
+                if ev is None:
+                    continue
+                self.jobs["__donation_events__"] = events
+                totals = dict(self.jobs.get("__donor_totals__", {}) or {})
+                row = dict(totals.get(ev["donor_address"]) or {})
+                if row:
+                    if ev.get("amount_usd") is not None:
+                        row["total_usd"] = max(0.0, float(row.get("total_usd") or 0.0) - float(ev["amount_usd"]))
+                    if row.get("first_event_id") == e["ref"]:
+                        row["first_event_id"] = None
+                    row["updated_at"] = utc_now_iso()
+                    totals[ev["donor_address"]] = row
+                    self.jobs["__donor_totals__"] = totals
+        self.jobs["__onchain_undo__"] = [e for e in log if not (e["chain_id"] == chain_id and e["block_number"] > after_block)]
+        cps = self.jobs.get("__onchain_blocks__", {}) or {}
+        self.jobs["__onchain_blocks__"] = {k: v for k, v in cps.items() if not (k[0] == chain_id and k[1] > after_block)}
+        return applied
+
+    def prune_onchain_history(self, *, chain_id: int, before_block: int) -> None:
+        chain_id, before_block = int(chain_id), int(before_block)
+        log = self.jobs.get("__onchain_undo__", []) or []
+        self.jobs["__onchain_undo__"] = [e for e in log if not (e["chain_id"] == chain_id and e["block_number"] < before_block)]
+        cps = self.jobs.get("__onchain_blocks__", {}) or {}
+        self.jobs["__onchain_blocks__"] = {k: v for k, v in cps.items() if not (k[0] == chain_id and k[1] < before_block)}
+
     # ---- Jobs/Submissions ----
     def create_job(self, job: dict) -> dict:
         job_id = str(uuid.uuid4())
@@ -525,13 +768,21 @@ class InMemoryStore:
         spent = -sum(int(x.get("delta") or 0) for x in ledger if _lower_addr(str(x.get("address") or "")) == addr and int(x.get("delta") or 0) < 0)
         return {"address": addr, "earned": int(earned), "spent": int(spent), "balance": int(earned - spent)}
 
-    def agr_credit(self, *, address: str, amount: int, reason: str, job_id: str | None = None) -> dict:
+    def agr_credit(
+        self, *, address: str, amount: int, reason: str, job_id: str | None = None, idempotency_key: str | None = None
+    ) -> dict:
         addr = _lower_addr(address)
         amt = int(amount)
         if amt <= 0:
             raise ValueError("amount must be > 0")
-        row = {"id": str(uuid.uuid4()), "address": addr, "delta": amt, "reason": reason, "job_id": job_id, "created_at": utc_now_iso()}
         ledger = list(self.jobs.get("__agr_ledger__", []) or [])
+        if idempotency_key:
+            existing = next((x for x in ledger if x.get("idempotency_key") == idempotency_key), None)
+            if existing is not None:
+                return existing
+        row = {"id": str(uuid.uuid4()), "address": addr, "delta": amt, "reason": reason, "job_id": job_id, "created_at": utc_now_iso()}
+        if idempotency_key:
+            row["idempotency_key"] = idempotency_key
         ledger.append(row)
         self.jobs["__agr_ledger__"] = ledger
         return row
@@ -580,6 +831,82 @@ class InMemoryStore:
         rows.sort(key=lambda r: str(r.get("created_at") or ""), reverse=True)
         return rows[:lim]
 
+    def reconcile_win_rewards(self, *, apply: bool = False) -> dict:
+        ledger = list(self.jobs.get("__agr_ledger__", []) or [])
+        seen: set[tuple[str, str]] = set()
+        credits: dict[str, list[dict]] = {}
+        for x in sorted(ledger, key=lambda r: str(r.get("created_at") or "")):
+            if str(x.get("reason") or "") != "win" or not x.get("job_id"):
+                continue
+            credits.setdefault(str(x.get("job_id")), []).append(dict(x))
+            seen.add((_lower_addr(str(x.get("address") or "")), str(x.get("job_id"))))
+        duplicates: list[dict] = []
+        multi_winner_jobs: list[str] = []
+        for job_id, rows in credits.items():
+            if len({_lower_addr(str(r.get("address") or "")) for r in rows}) > 1:
+                multi_winner_jobs.append(job_id)
+            # Keep the credit paid to the job's current winner (else the first); the rest are duplicates.
+            winner = self.get_submission_author(str((self.jobs.get(job_id) or {}).get("winner_submission_id") or ""))
+            keep = next((r for r in rows if _lower_addr(str(r.get("address") or "")) == winner), rows[0])
+            duplicates.extend(r for r in rows if r is not keep)
+        duplicates.sort(key=lambda r: str(r.get("created_at") or ""))
+        reversed_keys = {str(x.get("idempotency_key")) for x in ledger if x.get("idempotency_key")}
+        duplicates = [d for d in duplicates if f"reversal:{d.get('id')}" not in reversed_keys]
+        if apply:
+            for d in duplicates:
+                self._agr_reverse(d)
+        reversed_ = len(duplicates) if apply else 0
+        missing = []
+        for job_id, job in self.jobs.items():
+            if job_id.startswith("__") or not isinstance(job, dict) or job.get("status") != "closed":
+                continue
+            author = self.get_submission_author(str(job.get("winner_submission_id") or ""))
+            if author and (author, job_id) not in seen:
+                missing.append({"job_id": job_id, "address": author})
+        return {"duplicates": duplicates, "missing": missing, "multi_winner_jobs": sorted(multi_winner_jobs), "reversed": reversed_}
+
+    def verify_agr_balances(self, *, address: str | None = None, repair: bool = False) -> dict:
+        # Balances are computed from the ledger on every read here, so there is nothing to drift.
+        ledger = list(self.jobs.get("__agr_ledger__", []) or [])
+        addrs = {_lower_addr(str(x.get("address") or "")) for x in ledger}
+        if address is not None:
+            addrs &= {_lower_addr(address)}
+        return {"addresses_checked": len(addrs), "mismatches": [], "repaired": 0}
+
+    def iter_epoch_rewards(self, *, start_iso: str, end_iso: str, batch_size: int = 10000) -> Iterator[tuple[str, int]]:
+        start = _parse_iso(start_iso)
+        end = _parse_iso(end_iso)
+        totals: dict[str, int] = {}
+        ledger = list(self.jobs.get("__agr_ledger__", []) or [])
+        booked_at = {f"reversal:{x.get('id')}": x.get("created_at") for x in ledger if str(x.get("reason") or "") == "win"}
+        for x in ledger:
+            if str(x.get("reason") or "") not in _EPOCH_REWARD_REASONS:
+                continue
+            # A reversal counts in the epoch of the credit it reverses (see PostgresStore.iter_epoch_rewards).
+            dt = _parse_iso(str(booked_at.get(str(x.get("idempotency_key") or "")) or x.get("created_at") or ""))
+            if dt is None or (start and dt < start) or (end and dt >= end):
+                continue
+            a = _lower_addr(str(x.get("address") or ""))
+            totals[a] = totals.get(a, 0) + int(x.get("delta") or 0)
+        for a in sorted(totals):
+            if totals[a] > 0:
+                yield a, totals[a]
+
+    def _agr_reverse(self, entry: dict) -> None:
+        ledger = list(self.jobs.get("__agr_ledger__", []) or [])
+        ledger.append(
+            {
+                "id": str(uuid.uuid4()),
+                "address": _lower_addr(str(entry.get("address") or "")),
+                "delta": -int(entry.get("delta") or 0),
+                "reason": "win_duplicate_reversal",
+                "job_id": entry.get("job_id"),
+                "idempotency_key": f"reversal:{entry.get('id')}",
+                "created_at": utc_now_iso(),
+            }
+        )
+        self.jobs["__agr_ledger__"] = ledger
+
     def get_job(self, job_id: str) -> dict | None:
         return self.jobs.get(job_id)
 
@@ -594,10 +921,13 @@ class InMemoryStore:
         close_contract_address: str | None = None,
         close_block_number: int | None = None,
         close_log_index: int | None = None,
-    ) -> dict:
+        win_reward_agr: int = 0,
+    ) -> dict | None:
         job = self.jobs.get(job_id)
         if not job:
             raise KeyError("Job not found")
+        if job.get("status") != "open":
+            return None
         job = dict(job)
         job["status"] = "closed"
         job["winner_submission_id"] = winner_submission_id
@@ -608,6 +938,15 @@ class InMemoryStore:
         job["close_block_number"] = close_block_number
         job["close_log_index"] = close_log_index
         self.jobs[job_id] = job
+        author = self.get_submission_author(winner_submission_id)
+        if int(win_reward_agr) > 0 and author:
+            self.agr_credit(
+                address=author,
+                amount=int(win_reward_agr),
+                reason="win",
+                job_id=str(job_id),
+                idempotency_key=_win_reward_key(job_id),
+            )
         return job
 
     def create_submission(self, submission: dict) -> dict:
@@ -620,10 +959,25 @@ class InMemoryStore:
     def get_submission(self, submission_id: str) -> dict | None:
         return self.submissions.get(str(submission_id))
 
-    def list_submissions_for_job(self, job_id: str) -> list[dict]:
+    def list_submissions_for_job(self, job_id: str, *, limit: int | None = None, after: str | None = None) -> list[dict]:
         subs = [s for s in self.submissions.values() if s.get("job_id") == job_id]
-        subs.sort(key=lambda s: s.get("created_at", ""), reverse=False)
-        return subs
+        subs.sort(key=lambda s: (s.get("created_at", ""), str(s.get("id"))))
+        if after is not None:
+            cur = self.submissions.get(str(after))
+            if cur is None:
+                return []
+            pos = (cur.get("created_at", ""), str(cur.get("id")))
+            subs = [s for s in subs if (s.get("created_at", ""), str(s.get("id"))) > pos]
+        return subs if limit is None else subs[: max(1, int(limit))]
+
+    def submission_ids_and_authors(self, job_id: str) -> dict[str, str]:
+        return {
+            str(s.get("id")): _lower_addr(str(s.get("agent_address") or "")) for s in self.list_submissions_for_job(job_id)
+        }
+
+    def get_submission_author(self, submission_id: str) -> str | None:
+        sub = self.submissions.get(str(submission_id))
+        return _lower_addr(str(sub.get("agent_address") or "")) if sub else None
 
     # ---- Discussion (comments) ----
     def create_comment(self, *, comment: dict) -> dict:
@@ -645,6 +999,12 @@ class InMemoryStore:
         out.sort(key=lambda c: c.get("created_at", ""), reverse=False)
         return out[: int(limit)]
 
+    def iter_comments_for_targets(
+        self, *, target_type: str, target_ids: list[str], limit_per_target: int = 200, batch_size: int = 1000
+    ) -> Iterator[dict]:
+        for tid in sorted({str(x) for x in target_ids}):
+            yield from self.list_comments(target_type=target_type, target_id=tid, limit=limit_per_target)
+
     def soft_delete_comment(self, *, comment_id: str, deleted_by: str) -> dict:
         cid = str(comment_id)
         row = self.comments.get(cid)
@@ -882,6 +1242,76 @@ class InMemoryStore:
             tallies[sid] = t
         return tallies
 
+    def finalize_due_jobs(
+        self,
+        *,
+        now_iso: str,
+        default_window_seconds: int,
+        limit: int = 50,
+        win_reward_agr: int = 0,
+        no_vote_grace_seconds: int = 0,
+    ) -> list[dict]:
+        now = _parse_iso(now_iso) or _now_utc()
+        grace = int(no_vote_grace_seconds)
+        due: list[tuple[datetime, str]] = []
+        for job_id, job in self.jobs.items():
+            if job_id.startswith("__") or not isinstance(job, dict) or job.get("status") != "open":
+                continue
+            ends = _parse_iso(str(job.get("final_vote_ends_at") or ""))
+            if ends is None:
+                created = _parse_iso(str(job.get("created_at") or ""))
+                ends = created + timedelta(seconds=int(default_window_seconds)) if created else None
+            if ends is None or ends > now:
+                continue
+            if self.list_final_votes_for_job(job_id) or (grace > 0 and ends + timedelta(seconds=grace) <= now):
+                due.append((ends, job_id))
+        due.sort()
+        closed: list[dict] = []
+        for _, job_id in due[: max(1, int(limit))]:
+            tallies = list(self.tally_final_votes_for_job(job_id).values())
+            winner = max(tallies, key=lambda t: int(t.get("votes", 0))) if tallies else None
+            if winner is None:
+                job = dict(self.jobs[job_id])
+                job.update({"status": "closed", "winner_submission_id": None, "closed_at": _dt_to_iso(now) or utc_now_iso()})
+                self.jobs[job_id] = job
+                closed.append(job)
+                continue
+            job = self.close_job(
+                job_id,
+                str(winner["submission_id"]),
+                _dt_to_iso(now) or utc_now_iso(),
+                win_reward_agr=win_reward_agr,
+            )
+            if job is not None:
+                closed.append(job)
+        return closed
+
+    def get_vote_context(self, *, job_id: str, submission_id: str, voter_address: str) -> dict:
+        addr = _lower_addr(voter_address)
+        job = self.jobs.get(job_id)
+        sub = self.submissions.get(str(submission_id))
+        rep = self.reputation.get(addr) or {}
+        prof = self.profiles.get(addr) or {}
+        return {
+            "job": (
+                {
+                    "id": job_id,
+                    "status": job.get("status"),
+                    "created_at": job.get("created_at"),
+                    "final_vote_starts_at": job.get("final_vote_starts_at"),
+                    "final_vote_ends_at": job.get("final_vote_ends_at"),
+                }
+                if job
+                else None
+            ),
+            "submission_author": (
+                _lower_addr(str(sub.get("agent_address") or "")) if sub and sub.get("job_id") == job_id else None
+            ),
+            "stake": float(self.stakes_by_address.get(addr, 0.0)),
+            "rep_score": float(rep.get("score", 0.0)),
+            "participant_type": str(prof.get("participant_type") or "unknown"),
+        }
+
     # ---- Reputation (MVP heuristic) ----
     def ensure_agent_rep(self, address: str) -> dict:
         addr = _lower_addr(address)
@@ -1051,6 +1481,9 @@ class InMemoryStore:
             "anchor_contract_address": None,
             "anchor_block_number": None,
             "anchor_log_index": None,
+            "rollup_id": None,
+            "rollup_index": None,
+            "rollup_proof": None,
             "created_at": utc_now_iso(),
         }
         store[jid] = row
@@ -1100,6 +1533,152 @@ class InMemoryStore:
         self.jobs["__anchor_batches__"] = store
         return dict(row)
 
+    def list_unrolled_anchor_batches(self, *, limit: int = 256) -> list[dict]:
+        store = self.jobs.get("__anchor_batches__", {}) or {}
+        rows = [
+            r
+            for r in store.values()
+            if not r.get("rollup_id") and not r.get("anchor_tx_hash") and not self._live_job_anchor_tx(str(r.get("job_id")))
+        ]
+        rows.sort(key=lambda a: str(a.get("created_at") or ""))
+        return [dict(r) for r in rows[: max(1, int(limit))]]
+
+    def create_anchor_rollup(self, *, rollup: dict, members: list[dict]) -> dict | None:
+        batches = self.jobs.get("__anchor_batches__", {}) or {}
+        for m in members:
+            b = batches.get(str(m["job_id"]))
+            if not b or b.get("rollup_id") or b.get("anchor_tx_hash") or self._live_job_anchor_tx(str(m["job_id"])):
+                return None
+        rid = str(rollup["id"])
+        row = {
+            "id": rid,
+            "merkle_root": str(rollup["merkle_root"]),
+            "leaf_count": int(rollup["leaf_count"]),
+            "schema_version": int(rollup.get("schema_version") or 1),
+            "salt": str(rollup["salt"]),
+            "anchor_uri": str(rollup["anchor_uri"]),
+            "anchor_tx_hash": None,
+            "anchor_chain_id": None,
+            "anchor_contract_address": None,
+            "anchor_block_number": None,
+            "anchor_log_index": None,
+            "created_at": utc_now_iso(),
+        }
+        for m in members:
+            b = dict(batches[str(m["job_id"])])
+            b.update({"rollup_id": rid, "rollup_index": int(m["rollup_index"]), "rollup_proof": list(m["rollup_proof"])})
+            batches[str(m["job_id"])] = b
+        self.jobs["__anchor_batches__"] = batches
+        rollups = self.jobs.get("__anchor_rollups__", {}) or {}
+        rollups[rid] = row
+        self.jobs["__anchor_rollups__"] = rollups
+        return dict(row)
+
+    def _live_job_anchor_tx(self, job_id: str) -> bool:
+        tx = (self.jobs.get("__anchor_txs__", {}) or {}).get(f"job:{job_id}")
+        return bool(tx) and tx.get("status") != "failed"
+
+    def get_anchor_rollup(self, rollup_id: str) -> dict | None:
+        row = (self.jobs.get("__anchor_rollups__", {}) or {}).get(str(rollup_id))
+        return dict(row) if row else None
+
+    def list_anchor_rollups(self, *, limit: int = 50) -> list[dict]:
+        rows = list((self.jobs.get("__anchor_rollups__", {}) or {}).values())
+        rows.sort(key=lambda a: str(a.get("created_at") or ""), reverse=True)
+        return [dict(r) for r in rows[: max(1, int(limit))]]
+
+    def set_anchor_rollup_receipt(
+        self,
+        *,
+        rollup_id: str,
+        anchor_tx_hash: str,
+        anchor_chain_id: int,
+        anchor_contract_address: str,
+        anchor_block_number: int,
+        anchor_log_index: int,
+    ) -> dict:
+        rollups = self.jobs.get("__anchor_rollups__", {}) or {}
+        row = rollups.get(str(rollup_id))
+        if not row:
+            raise KeyError("Anchor rollup not found")
+        row = dict(row)
+        row["anchor_tx_hash"] = str(anchor_tx_hash).lower()
+        row["anchor_chain_id"] = int(anchor_chain_id)
+        row["anchor_contract_address"] = _lower_addr(str(anchor_contract_address))
+        row["anchor_block_number"] = int(anchor_block_number)
+        row["anchor_log_index"] = int(anchor_log_index)
+        rollups[str(rollup_id)] = row
+        self.jobs["__anchor_rollups__"] = rollups
+        return dict(row)
+
+    def enqueue_anchor_tx(self, *, kind: str, target_id: str) -> dict:
+        txs = self.jobs.get("__anchor_txs__", {}) or {}
+        key = f"{kind}:{target_id}"
+        row = txs.get(key)
+        now = utc_now_iso()
+        if row and row.get("status") != "failed":
+            return dict(row)
+        if row:
+            row = dict(row)
+            row.update({"status": "queued", "attempts": 0, "last_error": None, "updated_at": now})
+        else:
+            row = {
+                "id": str(uuid.uuid4()),
+                "kind": str(kind),
+                "target_id": str(target_id),
+                "status": "queued",
+                "from_address": None,
+                "nonce": None,
+                "tx_hash": None,
+                "tx_hashes": [],
+                "gas_limit": None,
+                "max_fee_per_gas": None,
+                "max_priority_fee_per_gas": None,
+                "gas_price": None,
+                "attempts": 0,
+                "bumps": 0,
+                "last_error": None,
+                "block_number": None,
+                "sent_at": None,
+                "mined_at": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+        txs[key] = row
+        self.jobs["__anchor_txs__"] = txs
+        return dict(row)
+
+    def get_anchor_tx(self, *, kind: str, target_id: str) -> dict | None:
+        row = (self.jobs.get("__anchor_txs__", {}) or {}).get(f"{kind}:{target_id}")
+        return dict(row) if row else None
+
+    def list_anchor_txs(self, *, statuses: list[str], limit: int = 100) -> list[dict]:
+        want = {str(x) for x in statuses}
+        rows = [r for r in (self.jobs.get("__anchor_txs__", {}) or {}).values() if r.get("status") in want]
+        rows.sort(key=lambda r: str(r.get("created_at") or ""))
+        return [dict(r) for r in rows[: max(1, int(limit))]]
+
+    def update_anchor_tx(self, *, tx_id: str, fields: dict) -> dict:
+        txs = self.jobs.get("__anchor_txs__", {}) or {}
+        for key, row in txs.items():
+            if row.get("id") == str(tx_id):
+                row = dict(row)
+                row.update({k: v for k, v in fields.items() if k in _ANCHOR_TX_FIELDS})
+                row["updated_at"] = utc_now_iso()
+                txs[key] = row
+                self.jobs["__anchor_txs__"] = txs
+                return dict(row)
+        raise KeyError("Anchor tx not found")
+
+    def max_anchor_tx_nonce(self, *, from_address: str) -> int | None:
+        addr = _lower_addr(from_address)
+        nonces = [
+            int(r["nonce"])
+            for r in (self.jobs.get("__anchor_txs__", {}) or {}).values()
+            if r.get("nonce") is not None and _lower_addr(str(r.get("from_address") or "")) == addr
+        ]
+        return max(nonces) if nonces else None
+
     # ---- Admin ----
     def admin_metrics(self) -> dict:
         users = set(self.reputation.keys()) | {s.address for s in self.sessions_by_token.values()}
@@ -1184,6 +1763,90 @@ class PostgresStore:
             db.execute(delete(AuthChallengeDB).where(AuthChallengeDB.address == addr))
             db.commit()
 
+    def create_challenges(
+        self, addresses: list[str], ttl_seconds: int, *, message_for: Callable[[str, str], str]
+    ) -> list[Challenge]:
+        """
+        One upsert for a whole fleet. The nonce is generated here and the message built from it up front, so each
+        row is written once (the single-address flow writes a placeholder and then sets the message).
+        """
+        expires_at_ts = time.time() + int(ttl_seconds)
+        expires_at_dt = datetime.fromtimestamp(expires_at_ts, tz=timezone.utc)
+        out: list[Challenge] = []
+        for address in dict.fromkeys(_lower_addr(a) for a in addresses):
+            nonce = secrets.token_hex(16)
+            out.append(Challenge(address=address, nonce=nonce, message=message_for(address, nonce), expires_at=expires_at_ts))
+        if not out:
+            return out
+        with self._session() as db:
+            stmt = pg_insert(AuthChallengeDB).values(
+                [{"address": c.address, "nonce": c.nonce, "message": c.message, "expires_at": expires_at_dt} for c in out]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AuthChallengeDB.address],
+                set_={"nonce": stmt.excluded.nonce, "message": stmt.excluded.message, "expires_at": stmt.excluded.expires_at},
+            )
+            db.execute(stmt)
+            db.commit()
+        return out
+
+    def get_valid_challenges(self, addresses: list[str]) -> dict[str, Challenge]:
+        addrs = list(dict.fromkeys(_lower_addr(a) for a in addresses))
+        if not addrs:
+            return {}
+        now_ts = time.time()
+        out: dict[str, Challenge] = {}
+        with self._session() as db:
+            for row in db.execute(select(AuthChallengeDB).where(AuthChallengeDB.address.in_(addrs))).scalars():
+                expires_ts = row.expires_at.replace(tzinfo=timezone.utc).timestamp()
+                if expires_ts >= now_ts:
+                    out[row.address] = Challenge(address=row.address, nonce=row.nonce, message=row.message, expires_at=expires_ts)
+        return out
+
+    def redeem_challenges(self, nonces: dict[str, str], ttl_seconds: int) -> dict[str, Session]:
+        """
+        Consume the given (address, nonce) challenges and open a session for each, in one transaction.
+
+        A challenge is redeemed only if it still carries the verified nonce and has not expired (DELETE ...
+        RETURNING), so two concurrent verify calls cannot both turn the same challenge into a session. Also
+        creates missing reputation rows (ensure_agent_rep).
+        """
+        pairs = [(_lower_addr(a), str(n)) for a, n in nonces.items()]
+        if not pairs:
+            return {}
+        now_dt = datetime.now(timezone.utc)
+        expires_at_ts = time.time() + int(ttl_seconds)
+        expires_at_dt = datetime.fromtimestamp(expires_at_ts, tz=timezone.utc)
+        out: dict[str, Session] = {}
+        with self._session() as db:
+            redeemed = db.execute(
+                delete(AuthChallengeDB)
+                .where(tuple_(AuthChallengeDB.address, AuthChallengeDB.nonce).in_(pairs), AuthChallengeDB.expires_at >= now_dt)
+                .returning(AuthChallengeDB.address)
+            ).scalars().all()
+            if not redeemed:
+                db.rollback()
+                return out
+            for address in redeemed:
+                out[address] = Session(address=address, token=secrets.token_urlsafe(32), expires_at=expires_at_ts)
+            db.execute(
+                pg_insert(AuthSessionDB).values(
+                    [{"token": s.token, "address": s.address, "expires_at": expires_at_dt} for s in out.values()]
+                )
+            )
+            db.execute(
+                pg_insert(AgentReputationDB)
+                .values(
+                    [
+                        {"address": a, "score": 0.0, "level": 1, "wins": 0, "losses": 0, "badges": [], "last_updated_at": now_dt}
+                        for a in out
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[AgentReputationDB.address])
+            )
+            db.commit()
+        return out
+
     # ---- Admin access: challenges ----
     def create_admin_access_challenge(self, address: str, message: str, ttl_seconds: int) -> Challenge:
         addr = _lower_addr(address)
@@ -1292,6 +1955,36 @@ class PostgresStore:
                 )
             db.commit()
 
+    def set_stakes(self, *, rows: list[dict], chunk_size: int = 1000) -> int:
+        """Bulk set_stake: one multi-row upsert per chunk, all in a single transaction."""
+        if not rows:
+            return 0
+        now = _now_utc()
+        by_addr: dict[str, dict] = {}
+        for r in rows:
+            addr = _lower_addr(str(r["address"]))
+            by_addr[addr] = {  # last row wins, as with repeated set_stake calls
+                "address": addr,
+                "amount": float(r["amount"]),
+                "updated_at": now,
+                "stake_tx_hash": r.get("stake_tx_hash"),
+                "stake_chain_id": int(r["stake_chain_id"]) if r.get("stake_chain_id") is not None else None,
+                "stake_contract_address": r.get("stake_contract_address"),
+                "stake_block_number": int(r["stake_block_number"]) if r.get("stake_block_number") is not None else None,
+                "stake_log_index": int(r["stake_log_index"]) if r.get("stake_log_index") is not None else None,
+            }
+        values = list(by_addr.values())
+        with self._session() as db:
+            for i in range(0, len(values), max(1, int(chunk_size))):
+                stmt = pg_insert(StakeDB).values(values[i : i + chunk_size])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[StakeDB.address],
+                    set_={k: getattr(stmt.excluded, k) for k in values[0] if k != "address"},
+                )
+                db.execute(stmt)
+            db.commit()
+        return len(values)
+
     def get_stake(self, address: str) -> float:
         addr = _lower_addr(address)
         with self._session() as db:
@@ -1312,6 +2005,32 @@ class PostgresStore:
                 "stake_log_index": int(row.stake_log_index) if row.stake_log_index is not None else None,
             }
 
+    @staticmethod
+    def _stake_to_dict(row: StakeDB) -> dict:
+        return {
+            "address": row.address,
+            "amount": float(row.amount),
+            "stake_tx_hash": row.stake_tx_hash,
+            "stake_chain_id": int(row.stake_chain_id) if row.stake_chain_id is not None else None,
+            "stake_contract_address": row.stake_contract_address,
+            "stake_block_number": int(row.stake_block_number) if row.stake_block_number is not None else None,
+            "stake_log_index": int(row.stake_log_index) if row.stake_log_index is not None else None,
+            "updated_at": _dt_to_iso(row.updated_at),
+        }
+
+    def get_stake_record(self, address: str) -> dict | None:
+        with self._session() as db:
+            row = db.get(StakeDB, _lower_addr(address))
+            return self._stake_to_dict(row) if row else None
+
+    def list_stake_changes(self, *, since_iso: str, limit: int = 1000) -> list[dict]:
+        since = _parse_iso(str(since_iso)) or datetime.fromtimestamp(0, tz=timezone.utc)
+        with self._session() as db:
+            rows = db.execute(
+                select(StakeDB).where(StakeDB.updated_at >= since).order_by(StakeDB.updated_at).limit(max(1, int(limit)))
+            ).scalars()
+            return [self._stake_to_dict(r) for r in rows]
+
     # ---- Slashing (Phase 2 scaffold) ----
     def _slash_to_dict(self, e: SlashingEventDB) -> dict:
         return {
@@ -1386,6 +2105,126 @@ class PostgresStore:
             rows = list(db.execute(q).scalars().all())
         return [{"key": r.key, "last_block": int(r.last_block), "updated_at": _dt_to_iso(r.updated_at) or utc_now_iso()} for r in rows]
 
+    # ---- Onchain reorg handling (block-hash checkpoints + undo log) ----
+    def add_onchain_checkpoint(self, *, chain_id: int, block_number: int, block_hash: str, parent_hash: str | None) -> None:
+        values = {
+            "chain_id": int(chain_id),
+            "block_number": int(block_number),
+            "block_hash": str(block_hash).lower(),
+            "parent_hash": str(parent_hash).lower() if parent_hash else None,
+            "created_at": _now_utc(),
+        }
+        stmt = pg_insert(OnchainBlockDB).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OnchainBlockDB.chain_id, OnchainBlockDB.block_number],
+            set_={"block_hash": stmt.excluded.block_hash, "parent_hash": stmt.excluded.parent_hash, "created_at": stmt.excluded.created_at},
+        )
+        with self._session() as db:
+            db.execute(stmt)
+            db.commit()
+
+    def list_onchain_checkpoints(self, *, chain_id: int, limit: int = 256) -> list[dict]:
+        with self._session() as db:
+            rows = db.execute(
+                select(OnchainBlockDB)
+                .where(OnchainBlockDB.chain_id == int(chain_id))
+                .order_by(OnchainBlockDB.block_number.desc())
+                .limit(max(1, int(limit)))
+            ).scalars()
+            return [
+                {
+                    "chain_id": int(r.chain_id),
+                    "block_number": int(r.block_number),
+                    "block_hash": r.block_hash,
+                    "parent_hash": r.parent_hash,
+                    "created_at": _dt_to_iso(r.created_at),
+                }
+                for r in rows
+            ]
+
+    def record_onchain_undo(self, *, entries: list[dict]) -> None:
+        if not entries:
+            return
+        with self._session() as db:
+            db.add_all(
+                [
+                    OnchainUndoDB(
+                        chain_id=int(e["chain_id"]),
+                        block_number=int(e["block_number"]),
+                        kind=str(e["kind"]),
+                        ref=str(e["ref"]),
+                        data=e.get("data"),
+                        created_at=_now_utc(),
+                    )
+                    for e in entries
+                ]
+            )
+            db.commit()
+
+    def rollback_onchain(self, *, chain_id: int, after_block: int) -> list[dict]:
+        """
+        Revert every undo entry above `after_block` (newest first) and drop those entries and the checkpoints above
+        it, in one transaction. Returns the applied entries. Donor profiles already switched to donor avatars are
+        left as is.
+        """
+        chain_id, after_block = int(chain_id), int(after_block)
+        applied: list[dict] = []
+        with self._session() as db:
+            rows = list(
+                db.execute(
+                    select(OnchainUndoDB)
+                    .where(OnchainUndoDB.chain_id == chain_id, OnchainUndoDB.block_number > after_block)
+                    .order_by(OnchainUndoDB.id.desc())
+                    .with_for_update()
+                ).scalars()
+            )
+            for u in rows:
+                applied.append({"id": int(u.id), "chain_id": chain_id, "block_number": int(u.block_number), "kind": u.kind, "ref": u.ref, "data": u.data})
+                if u.kind == "stake":
+                    addr = _lower_addr(u.ref)
+                    prev = u.data
+                    row = db.get(StakeDB, addr)
+                    if prev is None:
+                        if row is not None:
+                            db.delete(row)
+                        continue
+                    if row is None:
+                        row = StakeDB(address=addr)
+                        db.add(row)
+                    row.amount = float(prev.get("amount") or 0.0)
+                    row.updated_at = _now_utc()
+                    row.stake_tx_hash = prev.get("stake_tx_hash")
+                    row.stake_chain_id = prev.get("stake_chain_id")
+                    row.stake_contract_address = prev.get("stake_contract_address")
+                    row.stake_block_number = prev.get("stake_block_number")
+                    row.stake_log_index = prev.get("stake_log_index")
+                    db.flush()
+                elif u.kind == "slash":
+                    db.execute(delete(SlashingEventDB).where(SlashingEventDB.id == u.ref))
+                elif u.kind == "donation":
+                    ev = db.get(DonationEventDB, u.ref)
+                    if ev is None:
+                        continue
+                    totals = db.get(DonorTotalDB, ev.donor_address)
+                    if totals is not None:
+                        if ev.amount_usd is not None:
+                            totals.total_usd = max(0.0, float(totals.total_usd or 0.0) - float(ev.amount_usd))
+                        if totals.first_event_id == ev.id:
+                            totals.first_event_id = None
+                        totals.updated_at = _now_utc()
+                    db.delete(ev)
+                    db.flush()
+            db.execute(delete(OnchainUndoDB).where(OnchainUndoDB.chain_id == chain_id, OnchainUndoDB.block_number > after_block))
+            db.execute(delete(OnchainBlockDB).where(OnchainBlockDB.chain_id == chain_id, OnchainBlockDB.block_number > after_block))
+            db.commit()
+        return applied
+
+    def prune_onchain_history(self, *, chain_id: int, before_block: int) -> None:
+        with self._session() as db:
+            db.execute(delete(OnchainUndoDB).where(OnchainUndoDB.chain_id == int(chain_id), OnchainUndoDB.block_number < int(before_block)))
+            db.execute(delete(OnchainBlockDB).where(OnchainBlockDB.chain_id == int(chain_id), OnchainBlockDB.block_number < int(before_block)))
+            db.commit()
+
     # ---- Jobs ----
     def _job_to_dict(self, j: JobDB) -> dict:
         return {
@@ -1501,32 +2340,22 @@ class PostgresStore:
         }
 
     def upsert_semantic_doc(self, *, doc_type: str, doc_id: str, text: str, embedding: list[float]) -> dict:
-        dt = str(doc_type)
-        did = str(doc_id)
-        now = _now_utc()
+        t = SemanticDocDB.__table__
+        stmt = pg_insert(t).values(
+            id=str(uuid.uuid4()),
+            doc_type=str(doc_type),
+            doc_id=str(doc_id),
+            text=str(text),
+            embedding=list(embedding or []),
+            updated_at=_now_utc(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_semantic_docs_type_id",
+            set_={"text": stmt.excluded.text, "embedding": stmt.excluded.embedding, "updated_at": stmt.excluded.updated_at},
+        ).returning(*t.c)
         with self._session() as db:
-            existing = db.execute(
-                select(SemanticDocDB).where(SemanticDocDB.doc_type == dt, SemanticDocDB.doc_id == did)
-            ).scalar_one_or_none()
-            if existing:
-                existing.text = str(text)
-                existing.embedding = list(embedding or [])
-                existing.updated_at = now
-                db.commit()
-                db.refresh(existing)
-                return self._semantic_doc_to_dict(existing)
-
-            row = SemanticDocDB(
-                id=str(uuid.uuid4()),
-                doc_type=dt,
-                doc_id=did,
-                text=str(text),
-                embedding=list(embedding or []),
-                updated_at=now,
-            )
-            db.add(row)
+            row = db.execute(stmt).one()
             db.commit()
-            db.refresh(row)
             return self._semantic_doc_to_dict(row)
 
     def list_semantic_docs(self, *, doc_type: str | None = None, limit: int = 2000) -> list[dict]:
@@ -1553,54 +2382,139 @@ class PostgresStore:
         return jobs
 
     # ---- AGR credits (offchain) ----
-    def agr_balance(self, address: str) -> dict:
-        addr = _lower_addr(address)
-        with self._session() as db:
-            rows = list(db.execute(select(AgrLedgerDB).where(AgrLedgerDB.address == addr)).scalars().all())
-        earned = sum(int(r.delta) for r in rows if int(r.delta) > 0)
-        spent = -sum(int(r.delta) for r in rows if int(r.delta) < 0)
-        return {"address": addr, "earned": int(earned), "spent": int(spent), "balance": int(earned - spent)}
+    # agr_balances is maintained in the same transaction as every agr_ledger insert; the ledger stays the
+    # audit trail (verify_agr_balances replays it).
+    @staticmethod
+    def _ledger_row_to_dict(r) -> dict:
+        return {"id": r.id, "address": r.address, "delta": int(r.delta), "reason": r.reason, "job_id": r.job_id, "created_at": _dt_to_iso(r.created_at)}
+
+    @staticmethod
+    def _bump_agr_balance(db: Session, *, address: str, delta: int) -> None:
+        """Unconditional balance change (credits, reversals)."""
+        d = int(delta)
+        stmt = pg_insert(AgrBalanceDB).values(
+            address=address, earned=max(d, 0), spent=max(-d, 0), balance=d, updated_at=_now_utc()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AgrBalanceDB.address],
+            set_={
+                "earned": AgrBalanceDB.earned + stmt.excluded.earned,
+                "spent": AgrBalanceDB.spent + stmt.excluded.spent,
+                "balance": AgrBalanceDB.balance + stmt.excluded.balance,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt)
 
-    def agr_credit(self, *, address: str, amount: int, reason: str, job_id: str | None = None) -> dict:
-        addr = _lower_addr(address)
+    @staticmethod
+    def _debit_agr_balance(db: Session, *, address: str, amount: int) -> None:
+        """
+        Conditional debit: one UPDATE ... WHERE balance >= amount. The row lock serializes concurrent
+        spends of the same address, and the predicate is re-checked after the lock, so they cannot overdraw.
+        """
         amt = int(amount)
-        if amt <= 0:
-            raise ValueError("amount must be > 0")
-        row = AgrLedgerDB(
+        res = db.execute(
+            update(AgrBalanceDB)
+            .where(AgrBalanceDB.address == address, AgrBalanceDB.balance >= amt)
+            .values(spent=AgrBalanceDB.spent + amt, balance=AgrBalanceDB.balance - amt, updated_at=_now_utc())
+            .returning(AgrBalanceDB.balance)
+        ).first()
+        if res is None:
+            raise ValueError("insufficient AGR balance")
+
+    def _insert_ledger(
+        self,
+        db: Session,
+        *,
+        address: str,
+        delta: int,
+        reason: str,
+        job_id: str | None,
+        idempotency_key: str | None = None,
+        created_at: datetime | None = None,
+        allow_overdraft: bool = False,
+    ):
+        """
+        Insert one ledger row and apply it to agr_balances (debits conditionally, unless allow_overdraft),
+        in the caller's transaction. With an idempotency_key a repeat is a no-op and returns None.
+        """
+        t = AgrLedgerDB.__table__
+        stmt = pg_insert(t).values(
             id=str(uuid.uuid4()),
-            address=addr,
-            delta=amt,
+            address=address,
+            delta=int(delta),
             reason=str(reason),
             job_id=str(job_id) if job_id else None,
-            created_at=_now_utc(),
+            idempotency_key=idempotency_key or None,
+            created_at=created_at or _now_utc(),
         )
+        if idempotency_key:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["idempotency_key"])
+        row = db.execute(stmt.returning(*t.c)).first()
+        if row is None:
+            return None
+        if int(delta) < 0 and not allow_overdraft:
+            self._debit_agr_balance(db, address=address, amount=-int(delta))
+        else:
+            self._bump_agr_balance(db, address=address, delta=int(delta))
+        return row
+
+    def agr_balance(self, address: str) -> dict:
+        addr = _lower_addr(address)
         with self._session() as db:
-            db.add(row)
-            db.commit()
-            db.refresh(row)
-        return {"id": row.id, "address": row.address, "delta": int(row.delta), "reason": row.reason, "job_id": row.job_id, "created_at": _dt_to_iso(row.created_at)}
+            row = db.get(AgrBalanceDB, addr)
+        if not row:
+            return {"address": addr, "earned": 0, "spent": 0, "balance": 0}
+        return {"address": addr, "earned": int(row.earned), "spent": int(row.spent), "balance": int(row.balance)}
 
-    def agr_debit(self, *, address: str, amount: int, reason: str, job_id: str | None = None) -> dict:
+    def agr_credit(
+        self, *, address: str, amount: int, reason: str, job_id: str | None = None, idempotency_key: str | None = None
+    ) -> dict:
         addr = _lower_addr(address)
         amt = int(amount)
         if amt <= 0:
             raise ValueError("amount must be > 0")
-        bal = int(self.agr_balance(addr)["balance"])
-        if bal < amt:
-            raise ValueError("insufficient AGR balance")
-        row = AgrLedgerDB(
-            id=str(uuid.uuid4()),
+        with self._session() as db:
+            row = self._insert_ledger(db, address=addr, delta=amt, reason=reason, job_id=job_id, idempotency_key=idempotency_key)
+            if row is None:
+                # Already credited under this key: return the original entry.
+                t = AgrLedgerDB.__table__
+                row = db.execute(select(*t.c).where(t.c.idempotency_key == idempotency_key)).one()
+            db.commit()
+        return self._ledger_row_to_dict(row)
+
+    def _credit_win_reward(self, db: Session, *, job_id: str, winner_submission_id: str, amount: int, now: datetime) -> bool:
+        """
+        Credit the winner inside the caller's transaction: a single INSERT ... ON CONFLICT DO NOTHING on the
+        job's win idempotency key, so concurrent or repeated closes can never pay twice (nor pay two different
+        winners). True if a row was written.
+        """
+        author = db.execute(
+            select(SubmissionDB.agent_address).where(SubmissionDB.id == str(winner_submission_id))
+        ).scalar_one_or_none()
+        if int(amount) <= 0 or not author:
+            return False
+        addr = _lower_addr(author)
+        row = self._insert_ledger(
+            db,
             address=addr,
-            delta=-amt,
-            reason=str(reason),
-            job_id=str(job_id) if job_id else None,
-            created_at=_now_utc(),
+            delta=int(amount),
+            reason="win",
+            job_id=str(job_id),
+            idempotency_key=_win_reward_key(job_id),
+            created_at=now,
         )
+        return row is not None
+
+    def agr_debit(self, *, address: str, amount: int, reason: str, job_id: str | None = None) -> dict:
+        addr = _lower_addr(address)
+        amt = int(amount)
+        if amt <= 0:
+            raise ValueError("amount must be > 0")
         with self._session() as db:
-            db.add(row)
+            row = self._insert_ledger(db, address=addr, delta=-amt, reason=reason, job_id=job_id)
             db.commit()
-            db.refresh(row)
-        return {"id": row.id, "address": row.address, "delta": int(row.delta), "reason": row.reason, "job_id": row.job_id, "created_at": _dt_to_iso(row.created_at)}
+        return self._ledger_row_to_dict(row)
 
     def boost_job(self, *, job_id: str, address: str, amount_agr: int, duration_seconds: int) -> dict:
         addr = _lower_addr(address)
@@ -1610,26 +2524,12 @@ class PostgresStore:
             raise ValueError("amount_agr and duration_seconds must be > 0")
 
         with self._session() as db:
-            job = db.get(JobDB, job_id)
+            job = db.get(JobDB, job_id, with_for_update=True)
             if not job:
                 raise KeyError("Job not found")
 
-            # ensure balance before writing
-            bal = self.agr_balance(addr)["balance"]
-            if int(bal) < amt:
-                raise ValueError("insufficient AGR balance")
-
-            # debit
-            db.add(
-                AgrLedgerDB(
-                    id=str(uuid.uuid4()),
-                    address=addr,
-                    delta=-amt,
-                    reason="job_boost",
-                    job_id=job_id,
-                    created_at=_now_utc(),
-                )
-            )
+            # debit (conditional on balance; raises ValueError and rolls back on insufficient funds)
+            self._insert_ledger(db, address=addr, delta=-amt, reason="job_boost", job_id=job_id)
 
             now = _now_utc()
             base = job.featured_until if job.featured_until and job.featured_until > now else now
@@ -1651,6 +2551,114 @@ class PostgresStore:
             db.refresh(job)
             return {"job_id": job_id, "featured_until": _dt_to_iso(job.featured_until), "featured_score": int(job.featured_score or 0)}
 
+    def verify_agr_balances(self, *, address: str | None = None, repair: bool = False) -> dict:
+        """
+        Replay the ledger (SUM per address in SQL) and compare with agr_balances.
+        With repair=True, mismatched/missing rows are overwritten with the replayed totals.
+        """
+        replay = (
+            select(
+                AgrLedgerDB.address.label("address"),
+                func.coalesce(func.sum(AgrLedgerDB.delta).filter(AgrLedgerDB.delta > 0), 0).label("earned"),
+                func.coalesce(-func.sum(AgrLedgerDB.delta).filter(AgrLedgerDB.delta < 0), 0).label("spent"),
+                func.coalesce(func.sum(AgrLedgerDB.delta), 0).label("balance"),
+            )
+            .group_by(AgrLedgerDB.address)
+        )
+        stored = select(AgrBalanceDB.address, AgrBalanceDB.earned, AgrBalanceDB.spent, AgrBalanceDB.balance)
+        if address is not None:
+            addr = _lower_addr(address)
+            replay = replay.where(AgrLedgerDB.address == addr)
+            stored = stored.where(AgrBalanceDB.address == addr)
+        r = replay.subquery("r")
+        b = stored.subquery("b")
+        # FULL OUTER JOIN: addresses missing on either side are mismatches too.
+        q = (
+            select(
+                func.coalesce(r.c.address, b.c.address).label("address"),
+                r.c.earned,
+                r.c.spent,
+                r.c.balance,
+                b.c.earned.label("stored_earned"),
+                b.c.spent.label("stored_spent"),
+                b.c.balance.label("stored_balance"),
+            )
+            .select_from(r.join(b, r.c.address == b.c.address, full=True))
+            .where(
+                or_(
+                    r.c.address.is_(None),
+                    b.c.address.is_(None),
+                    r.c.earned != b.c.earned,
+                    r.c.spent != b.c.spent,
+                    r.c.balance != b.c.balance,
+                )
+            )
+        )
+        with self._session() as db:
+            checked = int(db.execute(select(func.count()).select_from(replay.subquery())).scalar_one() or 0)
+            mismatches = [
+                {
+                    "address": m.address,
+                    "replayed": {"earned": int(m.earned or 0), "spent": int(m.spent or 0), "balance": int(m.balance or 0)},
+                    "stored": (
+                        {"earned": int(m.stored_earned), "spent": int(m.stored_spent), "balance": int(m.stored_balance)}
+                        if m.stored_balance is not None
+                        else None
+                    ),
+                }
+                for m in db.execute(q).all()
+            ]
+            if repair and mismatches:
+                for m in mismatches:
+                    want = m["replayed"]
+                    stmt = pg_insert(AgrBalanceDB).values(address=m["address"], updated_at=_now_utc(), **want)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[AgrBalanceDB.address],
+                        set_={**want, "updated_at": stmt.excluded.updated_at},
+                    )
+                    db.execute(stmt)
+                db.commit()
+        return {"addresses_checked": checked, "mismatches": mismatches, "repaired": len(mismatches) if repair else 0}
+
+    def iter_epoch_rewards(self, *, start_iso: str, end_iso: str, batch_size: int = 10000) -> Iterator[tuple[str, int]]:
+        """
+        Net win rewards per address for [start_iso, end_iso), ordered by address (bytewise) for the Merkle builder.
+        Aggregation runs in SQL and the result is streamed through a server-side cursor, so memory stays flat
+        regardless of the number of addresses. Addresses whose net is <= 0 (fully reversed) are skipped.
+
+        A win_duplicate_reversal counts in the epoch of the credit it reverses (matched by its
+        "reversal:<ledger id>" key), not the epoch it was booked in, so it never offsets a later epoch's real
+        wins. If that epoch is already published the duplicate stays paid; rebuild it or settle off-band.
+        """
+        start = _parse_iso(start_iso)
+        end = _parse_iso(end_iso)
+        reversed_ = AgrLedgerDB.__table__.alias("reversed")
+        booked_at = func.coalesce(reversed_.c.created_at, AgrLedgerDB.created_at)
+        total = func.sum(AgrLedgerDB.delta).label("total")
+        q = (
+            select(AgrLedgerDB.address, total)
+            .select_from(AgrLedgerDB)
+            .outerjoin(
+                reversed_,
+                and_(
+                    AgrLedgerDB.reason == "win_duplicate_reversal",
+                    AgrLedgerDB.idempotency_key == literal("reversal:") + reversed_.c.id,
+                ),
+            )
+            .where(AgrLedgerDB.reason.in_(_EPOCH_REWARD_REASONS))
+            .group_by(AgrLedgerDB.address)
+            .having(func.sum(AgrLedgerDB.delta) > 0)
+            .order_by(AgrLedgerDB.address.collate("C"))
+        )
+        if start is not None:
+            q = q.where(booked_at >= start)
+        if end is not None:
+            q = q.where(booked_at < end)
+        with self._session() as db:
+            result = db.execute(q.execution_options(yield_per=max(1, int(batch_size))))
+            for addr, amount in result:
+                yield str(addr), int(amount)
+
     def list_agr_ledger(self, *, address: str, limit: int = 50) -> list[dict]:
         addr = _lower_addr(address)
         lim = max(1, int(limit))
@@ -1667,6 +2675,89 @@ class PostgresStore:
             for r in rows
         ]
 
+    def reconcile_win_rewards(self, *, apply: bool = False) -> dict:
+        """
+        Audit win rewards (reconciliation for the era before one win credit per job was enforced):
+        - duplicates: every win credit for a job beyond one, not yet reversed. The credit kept is the one paid to
+          the job's current winner (else the earliest), so a job closed twice with different winners is covered
+        - multi_winner_jobs: jobs whose win credits went to more than one address
+        - missing: closed jobs whose winning author has no win credit (informational; rewards may have been off)
+        With apply=True each duplicate gets a compensating entry (reason "win_duplicate_reversal"), keyed by the
+        duplicate's id so re-running is safe. Nothing is deleted.
+        """
+        winner_author = (
+            select(SubmissionDB.agent_address)
+            .join(JobDB, JobDB.winner_submission_id == SubmissionDB.id)
+            .where(JobDB.id == AgrLedgerDB.job_id)
+            .correlate(AgrLedgerDB)
+            .scalar_subquery()
+        )
+        rn = (
+            func.row_number()
+            .over(
+                partition_by=AgrLedgerDB.job_id,
+                order_by=(case((AgrLedgerDB.address == winner_author, 0), else_=1), AgrLedgerDB.created_at, AgrLedgerDB.id),
+            )
+            .label("rn")
+        )
+        wins = (
+            select(AgrLedgerDB.id, AgrLedgerDB.address, AgrLedgerDB.job_id, AgrLedgerDB.delta, AgrLedgerDB.created_at, rn)
+            .where(AgrLedgerDB.reason == "win", AgrLedgerDB.job_id.is_not(None))
+            .subquery()
+        )
+        reversal = AgrLedgerDB.__table__.alias("reversal")
+        dup_q = (
+            select(wins.c.id, wins.c.address, wins.c.job_id, wins.c.delta, wins.c.created_at)
+            .where(wins.c.rn > 1, ~exists().where(reversal.c.idempotency_key == literal("reversal:") + wins.c.id))
+            .order_by(wins.c.created_at.asc())
+        )
+        missing_q = (
+            select(JobDB.id, SubmissionDB.agent_address)
+            .join(SubmissionDB, SubmissionDB.id == JobDB.winner_submission_id)
+            .where(
+                JobDB.status == "closed",
+                ~exists().where(
+                    AgrLedgerDB.reason == "win",
+                    AgrLedgerDB.job_id == JobDB.id,
+                    AgrLedgerDB.address == SubmissionDB.agent_address,
+                ),
+            )
+            .order_by(JobDB.closed_at.asc())
+        )
+        multi_q = (
+            select(AgrLedgerDB.job_id)
+            .where(AgrLedgerDB.reason == "win", AgrLedgerDB.job_id.is_not(None))
+            .group_by(AgrLedgerDB.job_id)
+            .having(func.count(AgrLedgerDB.address.distinct()) > 1)
+            .order_by(AgrLedgerDB.job_id)
+        )
+        with self._session() as db:
+            multi_winner_jobs = [str(j) for j in db.execute(multi_q).scalars().all()]
+            duplicates = [
+                {"id": r.id, "address": r.address, "job_id": r.job_id, "delta": int(r.delta), "created_at": _dt_to_iso(r.created_at)}
+                for r in db.execute(dup_q).all()
+            ]
+            missing = [{"job_id": jid, "address": _lower_addr(addr)} for jid, addr in db.execute(missing_q).all()]
+            reversed_ = 0
+            if apply:
+                now = _now_utc()
+                for d in duplicates:
+                    # Reversals are not spends: they may take the balance below zero (the AGR was already paid).
+                    row = self._insert_ledger(
+                        db,
+                        address=d["address"],
+                        delta=-int(d["delta"]),
+                        reason="win_duplicate_reversal",
+                        job_id=d["job_id"],
+                        idempotency_key=f"reversal:{d['id']}",
+                        created_at=now,
+                        allow_overdraft=True,
+                    )
+                    if row is not None:
+                        reversed_ += 1
+                db.commit()
+        return {"duplicates": duplicates, "missing": missing, "multi_winner_jobs": multi_winner_jobs, "reversed": reversed_}
+
     def get_job(self, job_id: str) -> dict | None:
         with self._session() as db:
             row = db.get(JobDB, job_id)
@@ -1683,12 +2774,21 @@ class PostgresStore:
         close_contract_address: str | None = None,
         close_block_number: int | None = None,
         close_log_index: int | None = None,
-    ) -> dict:
+        win_reward_agr: int = 0,
+    ) -> dict | None:
+        """
+        Close an open job and credit the win reward, in one transaction. The row is locked (FOR UPDATE) and
+        only closed while still open, so a sponsor close, POST /finalize and the auto-finalize worker racing
+        on the same job close it once. Returns None (nothing written) if the job was no longer open.
+        """
         closed_at = _parse_iso(closed_at_iso) or _now_utc()
         with self._session() as db:
-            row = db.get(JobDB, job_id)
+            row = db.execute(select(JobDB).where(JobDB.id == job_id).with_for_update()).scalar_one_or_none()
             if not row:
                 raise KeyError("Job not found")
+            if row.status != "open":
+                db.rollback()
+                return None
             row.status = "closed"
             row.winner_submission_id = winner_submission_id
             row.closed_at = closed_at
@@ -1697,6 +2797,9 @@ class PostgresStore:
             row.close_contract_address = close_contract_address
             row.close_block_number = int(close_block_number) if close_block_number is not None else None
             row.close_log_index = int(close_log_index) if close_log_index is not None else None
+            self._credit_win_reward(
+                db, job_id=job_id, winner_submission_id=winner_submission_id, amount=win_reward_agr, now=closed_at
+            )
             db.commit()
             db.refresh(row)
             return self._job_to_dict(row)
@@ -1737,12 +2840,45 @@ class PostgresStore:
                 return None
             return self._submission_to_dict(row)
 
-    def list_submissions_for_job(self, job_id: str) -> list[dict]:
+    def list_submissions_for_job(self, job_id: str, *, limit: int | None = None, after: str | None = None) -> list[dict]:
+        """
+        Submissions of a job, oldest first (ties by id). Full rows, content and evidence included, so memory grows
+        with the page: callers that can page pass `limit` and continue with `after` = the last id returned.
+        Without `limit` the whole job is loaded (anchor snapshots need every submission).
+        """
+        # Plain column rows: no ORM identity map / instance state on top of the returned dicts.
+        t = SubmissionDB.__table__
         with self._session() as db:
-            q = select(SubmissionDB).where(SubmissionDB.job_id == job_id).order_by(SubmissionDB.created_at.asc())
-            rows = list(db.execute(q).scalars().all())
+            q = select(*t.c).where(t.c.job_id == job_id)
+            if after is not None:
+                cur = db.execute(select(t.c.created_at).where(t.c.id == str(after))).scalar_one_or_none()
+                if cur is None:
+                    return []
+                q = q.where(tuple_(t.c.created_at, t.c.id) > tuple_(literal(cur), literal(str(after))))
+            q = q.order_by(t.c.created_at.asc(), t.c.id.asc())
+            if limit is not None:
+                q = q.limit(max(1, int(limit)))
+            rows = db.execute(q).all()
         return [self._submission_to_dict(r) for r in rows]
 
+    def submission_ids_and_authors(self, job_id: str) -> dict[str, str]:
+        """submission_id -> author for a job, oldest first. Never reads content/evidence."""
+        with self._session() as db:
+            q = (
+                select(SubmissionDB.id, SubmissionDB.agent_address)
+                .where(SubmissionDB.job_id == job_id)
+                .order_by(SubmissionDB.created_at.asc())
+            )
+            return {str(sid): _lower_addr(str(addr or "")) for sid, addr in db.execute(q).all()}
+
+    def get_submission_author(self, submission_id: str) -> str | None:
+        """Author of a submission, or None if it does not exist (doubles as a cheap existence check)."""
+        with self._session() as db:
+            addr = db.execute(
+                select(SubmissionDB.agent_address).where(SubmissionDB.id == str(submission_id))
+            ).scalar_one_or_none()
+        return _lower_addr(str(addr)) if addr is not None else None
+
     # ---- Votes ----
     def _vote_to_dict(self, v: VoteDB) -> dict:
         return {
@@ -1772,33 +2908,58 @@ class PostgresStore:
         review = vote.get("review")
         review_obj = dict(review) if isinstance(review, dict) else None
 
+        t = VoteDB.__table__
+        values = {"submission_id": submission_id, "weight": weight, "review": review_obj, "created_at": created_at}
         with self._session() as db:
-            existing = db.execute(
-                select(VoteDB).where(VoteDB.job_id == job_id, VoteDB.voter_address == voter)
-            ).scalar_one_or_none()
-            if existing:
-                existing.submission_id = submission_id
-                existing.weight = weight
-                existing.review = review_obj
-                existing.created_at = created_at
+            # First vote: a single INSERT; an existing (job, voter) row is left alone here.
+            ins = (
+                pg_insert(t)
+                .values(id=str(uuid.uuid4()), job_id=job_id, voter_address=voter, **values)
+                .on_conflict_do_nothing(constraint="uq_votes_job_voter")
+                .returning(*t.c)
+            )
+            row = db.execute(ins).first()
+            if row is not None:
+                self._move_tally(db, job_id=job_id, kind="jury", old=None, new=(submission_id, weight))
                 db.commit()
-                db.refresh(existing)
-                return self._vote_to_dict(existing)
+                return self._vote_to_dict(row)
 
-            row = VoteDB(
-                id=str(uuid.uuid4()),
+            # Revote: overwrite and read back the previous choice in one statement (row-locked).
+            row = db.execute(self._revote_stmt(t, job_id=job_id, voter=voter, values=values)).first()
+            if row is None:
+                db.rollback()
+                raise RuntimeError("vote disappeared during upsert")
+            self._move_tally(
+                db,
                 job_id=job_id,
-                submission_id=submission_id,
-                voter_address=voter,
-                weight=weight,
-                review=review_obj,
-                created_at=created_at,
+                kind="jury",
+                old=(row.old_submission_id, float(row.old_weight or 0.0)),
+                new=(submission_id, weight),
             )
-            db.add(row)
             db.commit()
-            db.refresh(row)
             return self._vote_to_dict(row)
 
+    @staticmethod
+    def _revote_stmt(t, *, job_id: str, voter: str, values: dict):
+        """
+        UPDATE ... FROM (SELECT ... FOR UPDATE) RETURNING the new row plus the previous submission/weight.
+        Under READ COMMITTED the locked subquery yields the latest committed version, so concurrent
+        revotes by the same voter serialize and each sees the other's result as its "old" value.
+        """
+        old_weight = t.c.weight if "weight" in t.c else literal(1.0)
+        prev = (
+            select(t.c.id, t.c.submission_id.label("old_submission_id"), old_weight.label("old_weight"))
+            .where(t.c.job_id == job_id, t.c.voter_address == voter)
+            .with_for_update()
+            .subquery("prev")
+        )
+        return (
+            update(t)
+            .where(t.c.id == prev.c.id)
+            .values(**values)
+            .returning(*t.c, prev.c.old_submission_id, prev.c.old_weight)
+        )
+
     # ---- Discussion (comments) ----
     def _comment_to_dict(self, c: CommentDB) -> dict:
         return {
@@ -1853,6 +3014,40 @@ class PostgresStore:
             rows = list(db.execute(q).scalars().all())
         return [self._comment_to_dict(r) for r in rows]
 
+    def iter_comments_for_targets(
+        self, *, target_type: str, target_ids: list[str], limit_per_target: int = 200, batch_size: int = 1000
+    ) -> Iterator[dict]:
+        """
+        Comments for many targets in one query per chunk of ids (instead of one list_comments per target):
+        the first `limit_per_target` per target by created_at, ordered by (target_id bytewise, created_at).
+        Rows are streamed through a server-side cursor.
+        """
+        t = str(target_type)
+        ids = sorted({str(x) for x in target_ids})
+        lim = max(1, int(limit_per_target))
+        chunk = 1000
+        for i in range(0, len(ids), chunk):
+            part = ids[i : i + chunk]
+            rn = (
+                func.row_number()
+                .over(partition_by=CommentDB.target_id, order_by=(CommentDB.created_at.asc(), CommentDB.id.asc()))
+                .label("rn")
+            )
+            ranked = (
+                select(CommentDB.id.label("id"), rn)
+                .where(CommentDB.target_type == t, CommentDB.target_id.in_(part))
+                .subquery()
+            )
+            q = (
+                select(CommentDB)
+                .join(ranked, ranked.c.id == CommentDB.id)
+                .where(ranked.c.rn <= lim)
+                .order_by(CommentDB.target_id.collate("C"), CommentDB.created_at.asc(), CommentDB.id.asc())
+            )
+            with self._session() as db:
+                for r in db.execute(q.execution_options(yield_per=max(1, int(batch_size)))).scalars():
+                    yield self._comment_to_dict(r)
+
     def soft_delete_comment(self, *, comment_id: str, deleted_by: str) -> dict:
         cid = str(comment_id)
         deleter = _lower_addr(deleted_by)
@@ -1870,27 +3065,23 @@ class PostgresStore:
 
     # ---- Engagement (reactions/views) ----
     def upsert_reaction(self, *, actor_address: str, target_type: str, target_id: str, kind: str) -> bool:
-        actor = _lower_addr(actor_address)
-        t = str(target_type)
-        tid = str(target_id)
-        k = str(kind)
-        row = ReactionDB(
-            id=str(uuid.uuid4()),
-            target_type=t,
-            target_id=tid,
-            kind=k,
-            actor_address=actor,
-            created_at=_now_utc(),
+        stmt = (
+            pg_insert(ReactionDB.__table__)
+            .values(
+                id=str(uuid.uuid4()),
+                target_type=str(target_type),
+                target_id=str(target_id),
+                kind=str(kind),
+                actor_address=_lower_addr(actor_address),
+                created_at=_now_utc(),
+            )
+            .on_conflict_do_nothing(constraint="uq_reactions_actor_target_kind")
+            .returning(ReactionDB.__table__.c.id)
         )
         with self._session() as db:
-            try:
-                db.add(row)
-                db.commit()
-                return True
-            except Exception:
-                db.rollback()
-                # Likely unique constraint violation -> already exists.
-                return False
+            created = db.execute(stmt).first() is not None
+            db.commit()
+            return created
 
     def delete_reaction(self, *, actor_address: str, target_type: str, target_id: str, kind: str) -> bool:
         actor = _lower_addr(actor_address)
@@ -1909,27 +3100,25 @@ class PostgresStore:
             return bool(getattr(res, "rowcount", 0) or 0)
 
     def record_view(self, *, viewer_address: str, target_type: str, target_id: str) -> bool:
-        viewer = _lower_addr(viewer_address)
-        t = str(target_type)
-        tid = str(target_id)
         now = _now_utc()
-        window_start = now.replace(minute=0, second=0, microsecond=0)
-        row = ViewEventDB(
-            id=str(uuid.uuid4()),
-            target_type=t,
-            target_id=tid,
-            viewer_address=viewer,
-            window_start=window_start,
-            created_at=now,
+        # Deduplicated per viewer/target/hour window by the unique constraint; duplicates are simply not inserted.
+        stmt = (
+            pg_insert(ViewEventDB.__table__)
+            .values(
+                id=str(uuid.uuid4()),
+                target_type=str(target_type),
+                target_id=str(target_id),
+                viewer_address=_lower_addr(viewer_address),
+                window_start=now.replace(minute=0, second=0, microsecond=0),
+                created_at=now,
+            )
+            .on_conflict_do_nothing(constraint="uq_views_viewer_target_window")
+            .returning(ViewEventDB.__table__.c.id)
         )
         with self._session() as db:
-            try:
-                db.add(row)
-                db.commit()
-                return True
-            except Exception:
-                db.rollback()
-                return False
+            counted = db.execute(stmt).first() is not None
+            db.commit()
+            return counted
 
     def get_engagement_stats(self, *, target_type: str, target_id: str) -> dict[str, int]:
         tid = str(target_id)
@@ -2131,40 +3320,134 @@ class PostgresStore:
 
     def tally_votes_for_job(self, job_id: str) -> dict[str, dict]:
         tallies: dict[str, dict] = {}
-        for v in self.list_votes_for_job(job_id):
-            sid = v.get("submission_id")
-            if not sid:
-                continue
-            if sid not in tallies:
-                tallies[sid] = {"submission_id": sid, "weighted_votes": 0.0, "voters": 0}
-            tallies[sid]["weighted_votes"] += float(v.get("weight", 1.0))
-            tallies[sid]["voters"] += 1
+        for sid, weighted, voters in self._tally_rows(job_id, kind="jury"):
+            tallies[str(sid)] = {"submission_id": str(sid), "weighted_votes": float(weighted or 0.0), "voters": int(voters or 0)}
         return tallies
 
+    # ---- Vote tallies ----
+    @staticmethod
+    def _bump_tally(db: Session, *, job_id: str, kind: str, submission_id: str, weight: float, voters: int) -> None:
+        stmt = pg_insert(VoteTallyDB).values(
+            job_id=job_id, kind=kind, submission_id=submission_id, weighted_votes=weight, voters=voters
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VoteTallyDB.job_id, VoteTallyDB.kind, VoteTallyDB.submission_id],
+            set_={
+                "weighted_votes": VoteTallyDB.weighted_votes + stmt.excluded.weighted_votes,
+                "voters": VoteTallyDB.voters + stmt.excluded.voters,
+            },
+        )
+        db.execute(stmt)
+
+    def _move_tally(
+        self,
+        db: Session,
+        *,
+        job_id: str,
+        kind: str,
+        old: tuple[str, float] | None,
+        new: tuple[str, float],
+    ) -> None:
+        """
+        Apply the tally delta for one voter's (re)vote inside the caller's transaction.
+        `old`/`new` are (submission_id, weight); old=None means a first-time vote.
+        """
+        deltas: dict[str, tuple[float, int]] = {}
+        if old is not None:
+            deltas[old[0]] = (-float(old[1]), -1)
+        w, n = deltas.get(new[0], (0.0, 0))
+        deltas[new[0]] = (w + float(new[1]), n + 1)
+        # Fixed lock order across concurrent voters (A->B vs B->A switches must not deadlock).
+        for sid in sorted(deltas):
+            dw, dn = deltas[sid]
+            if dw == 0.0 and dn == 0:
+                continue
+            self._bump_tally(db, job_id=job_id, kind=kind, submission_id=sid, weight=dw, voters=dn)
+
+    def _tally_rows(self, job_id: str, *, kind: str) -> list[tuple[str, float, int]]:
+        """
+        (submission_id, weighted_votes, voters) ordered by first vote time (tie-break order for callers).
+        """
+        with self._session() as db:
+            return [(r[0], r[1], r[2]) for r in db.execute(self._tally_query(job_id, kind=kind)).all()]
+
+    @staticmethod
+    def _tally_query(job_id: str, *, kind: str):
+        if settings.VOTE_TALLY_SOURCE == "group_by":
+            model = VoteDB if kind == "jury" else FinalVoteDB
+            weighted = func.coalesce(func.sum(VoteDB.weight), 0.0) if kind == "jury" else func.count()
+            q = (
+                select(model.submission_id, weighted, func.count())
+                .where(model.job_id == job_id)
+                .group_by(model.submission_id)
+                .order_by(func.min(model.created_at).asc())
+            )
+        else:
+            q = (
+                select(VoteTallyDB.submission_id, VoteTallyDB.weighted_votes, VoteTallyDB.voters)
+                .where(VoteTallyDB.job_id == job_id, VoteTallyDB.kind == kind, VoteTallyDB.voters > 0)
+                .order_by(VoteTallyDB.first_vote_at.asc(), VoteTallyDB.submission_id.asc())
+            )
+        return q
+
+    def rebuild_vote_tallies(self, job_id: str | None = None) -> int:
+        """
+        Recompute vote_tallies from the raw vote rows (repair tool). Returns the number of tally rows written.
+        """
+        with self._session() as db:
+            dq = delete(VoteTallyDB)
+            if job_id is not None:
+                dq = dq.where(VoteTallyDB.job_id == job_id)
+            db.execute(dq)
+            written = 0
+            for kind, model, weighted in (
+                ("jury", VoteDB, func.coalesce(func.sum(VoteDB.weight), 0.0)),
+                ("final", FinalVoteDB, func.count()),
+            ):
+                q = select(model.job_id, model.submission_id, weighted, func.count(), func.min(model.created_at)).group_by(
+                    model.job_id, model.submission_id
+                )
+                if job_id is not None:
+                    q = q.where(model.job_id == job_id)
+                for jid, sid, w, n, first in db.execute(q).all():
+                    db.add(
+                        VoteTallyDB(
+                            job_id=jid,
+                            kind=kind,
+                            submission_id=sid,
+                            weighted_votes=float(w or 0.0),
+                            voters=int(n or 0),
+                            first_vote_at=first or _now_utc(),
+                        )
+                    )
+                    written += 1
+            db.commit()
+            return written
+
     # ---- Final decision votes ----
     def upsert_final_vote(self, *, job_id: str, voter_address: str, submission_id: str) -> dict:
         addr = _lower_addr(voter_address)
+        t = FinalVoteDB.__table__
+        values = {"submission_id": submission_id, "created_at": _now_utc()}
         with self._session() as db:
-            existing = db.execute(
-                select(FinalVoteDB).where(FinalVoteDB.job_id == job_id, FinalVoteDB.voter_address == addr)
-            ).scalar_one_or_none()
-            if existing:
-                existing.submission_id = submission_id
-                existing.created_at = _now_utc()
+            ins = (
+                pg_insert(t)
+                .values(id=str(uuid.uuid4()), job_id=job_id, voter_address=addr, **values)
+                .on_conflict_do_nothing(constraint="uq_final_votes_job_voter")
+                .returning(*t.c)
+            )
+            row = db.execute(ins).first()
+            if row is not None:
+                self._move_tally(db, job_id=job_id, kind="final", old=None, new=(submission_id, 1.0))
                 db.commit()
-                db.refresh(existing)
-                return self._final_vote_to_dict(existing)
+                return self._final_vote_to_dict(row)
 
-            row = FinalVoteDB(
-                id=str(uuid.uuid4()),
-                job_id=job_id,
-                submission_id=submission_id,
-                voter_address=addr,
-                created_at=_now_utc(),
-            )
-            db.add(row)
+            row = db.execute(self._revote_stmt(t, job_id=job_id, voter=addr, values=values)).first()
+            if row is None:
+                db.rollback()
+                raise RuntimeError("final vote disappeared during upsert")
+            self._move_tally(db, job_id=job_id, kind="final", old=(row.old_submission_id, 1.0), new=(submission_id, 1.0))
             db.commit()
-            db.refresh(row)
             return self._final_vote_to_dict(row)
 
     def list_final_votes_for_job(self, job_id: str) -> list[dict]:
@@ -2174,18 +3457,122 @@ class PostgresStore:
         return [self._final_vote_to_dict(r) for r in rows]
 
     def tally_final_votes_for_job(self, job_id: str) -> dict[str, dict]:
-        votes = self.list_final_votes_for_job(job_id)
         tallies: dict[str, dict] = {}
-        for v in votes:
-            sid = str(v.get("submission_id") or "")
-            if not sid:
-                continue
-            t = tallies.get(sid) or {"submission_id": sid, "votes": 0, "voters": 0}
-            t["votes"] = int(t.get("votes", 0)) + 1
-            t["voters"] = int(t.get("voters", 0)) + 1
-            tallies[sid] = t
+        for sid, _, voters in self._tally_rows(job_id, kind="final"):
+            tallies[str(sid)] = {"submission_id": str(sid), "votes": int(voters or 0), "voters": int(voters or 0)}
         return tallies
 
+    def finalize_due_jobs(
+        self,
+        *,
+        now_iso: str,
+        default_window_seconds: int,
+        limit: int = 50,
+        win_reward_agr: int = 0,
+        no_vote_grace_seconds: int = 0,
+    ) -> list[dict]:
+        """
+        Close up to `limit` open jobs whose final vote window has ended, by final-vote tally, in one transaction.
+
+        Due jobs are claimed with FOR UPDATE SKIP LOCKED (oldest window end first), so concurrent workers
+        split the queue instead of blocking on or double-closing the same job. A job without final votes has
+        nothing to decide: it stays open for the sponsor for `no_vote_grace_seconds` after its window ends and
+        is then closed with no winner, so abandoned jobs leave the open set (0 keeps them open). The win reward
+        (if any) is credited in the same transaction. Returns the closed jobs.
+        """
+        now = _parse_iso(now_iso) or _now_utc()
+        grace = timedelta(seconds=max(0, int(no_vote_grace_seconds)))
+
+        def _ended(at: datetime):
+            return or_(
+                JobDB.final_vote_ends_at <= at,
+                # Back-compat: jobs created before the window was stored end at created_at + default window.
+                and_(JobDB.final_vote_ends_at.is_(None), JobDB.created_at <= at - timedelta(seconds=int(default_window_seconds))),
+            )
+
+        has_votes = exists().where(FinalVoteDB.job_id == JobDB.id)
+        due = and_(_ended(now), has_votes)
+        if grace:
+            due = or_(due, and_(_ended(now - grace), ~has_votes))
+        q = (
+            select(JobDB)
+            .where(JobDB.status == "open", due)
+            .order_by(JobDB.final_vote_ends_at.asc().nulls_first())
+            .limit(max(1, int(limit)))
+            .with_for_update(skip_locked=True)
+        )
+        closed: list[dict] = []
+        with self._session() as db:
+            for job in db.execute(q).scalars().all():
+                rows = db.execute(self._tally_query(job.id, kind="final")).all()
+                if not rows:
+                    if not grace:
+                        continue
+                    job.status = "closed"
+                    job.winner_submission_id = None
+                    job.closed_at = now
+                    closed.append(job)
+                    continue
+                # Most votes wins; ties go to the submission voted for first (same rule as POST /finalize).
+                winner = max(rows, key=lambda r: int(r[2] or 0))
+                job.status = "closed"
+                job.winner_submission_id = str(winner[0])
+                job.closed_at = now
+                self._credit_win_reward(
+                    db, job_id=job.id, winner_submission_id=job.winner_submission_id, amount=win_reward_agr, now=now
+                )
+                closed.append(job)
+            db.commit()
+            return [self._job_to_dict(j) for j in closed]
+
+    def get_vote_context(self, *, job_id: str, submission_id: str, voter_address: str) -> dict:
+        """
+        Everything the vote endpoints validate against, in one round trip: job status/window, the
+        submission's author (only if it belongs to the job) and the voter's stake, rep and participant type.
+        Primary-key lookups only; no submission bodies are loaded and no rep row is created.
+        """
+        addr = _lower_addr(voter_address)
+
+        def _job(col):
+            return select(col).where(JobDB.id == job_id).scalar_subquery()
+
+        stmt = select(
+            _job(JobDB.status).label("status"),
+            _job(JobDB.created_at).label("created_at"),
+            _job(JobDB.final_vote_starts_at).label("final_vote_starts_at"),
+            _job(JobDB.final_vote_ends_at).label("final_vote_ends_at"),
+            select(SubmissionDB.agent_address)
+            .where(SubmissionDB.id == str(submission_id), SubmissionDB.job_id == job_id)
+            .scalar_subquery()
+            .label("submission_author"),
+            select(StakeDB.amount).where(StakeDB.address == addr).scalar_subquery().label("stake"),
+            select(AgentReputationDB.score).where(AgentReputationDB.address == addr).scalar_subquery().label("rep_score"),
+            select(AgentProfileDB.participant_type)
+            .where(AgentProfileDB.address == addr)
+            .scalar_subquery()
+            .label("participant_type"),
+        )
+        with self._session() as db:
+            row = db.execute(stmt).one()
+
+        return {
+            "job": (
+                {
+                    "id": job_id,
+                    "status": row.status,
+                    "created_at": _dt_to_iso(row.created_at),
+                    "final_vote_starts_at": _dt_to_iso(_ensure_utc(row.final_vote_starts_at)),
+                    "final_vote_ends_at": _dt_to_iso(_ensure_utc(row.final_vote_ends_at)),
+                }
+                if row.status is not None
+                else None
+            ),
+            "submission_author": _lower_addr(row.submission_author) if row.submission_author else None,
+            "stake": float(row.stake or 0.0),
+            "rep_score": float(row.rep_score or 0.0),
+            "participant_type": str(row.participant_type or "unknown"),
+        }
+
     # ---- Reputation ----
     def ensure_agent_rep(self, address: str) -> dict:
         addr = _lower_addr(address)
@@ -2440,50 +3827,54 @@ class PostgresStore:
             db.commit()
         return self.get_anchor_batch(jid) or {}
 
+    @staticmethod
+    def _anchor_batch_to_dict(row: AnchorBatchDB) -> dict:
+        return {
+            "id": row.id,
+            "job_id": row.job_id,
+            "schema_version": int(row.schema_version),
+            "salt": row.salt,
+            "anchor_root": row.anchor_root,
+            "anchor_uri": row.anchor_uri,
+            "anchor_tx_hash": row.anchor_tx_hash,
+            "anchor_chain_id": int(row.anchor_chain_id) if row.anchor_chain_id is not None else None,
+            "anchor_contract_address": row.anchor_contract_address,
+            "anchor_block_number": int(row.anchor_block_number) if row.anchor_block_number is not None else None,
+            "anchor_log_index": int(row.anchor_log_index) if row.anchor_log_index is not None else None,
+            "rollup_id": row.rollup_id,
+            "rollup_index": int(row.rollup_index) if row.rollup_index is not None else None,
+            "rollup_proof": list(row.rollup_proof) if row.rollup_proof is not None else None,
+            "created_at": _dt_to_iso(row.created_at) or utc_now_iso(),
+        }
+
+    @staticmethod
+    def _anchor_rollup_to_dict(row: AnchorRollupDB) -> dict:
+        return {
+            "id": row.id,
+            "merkle_root": row.merkle_root,
+            "leaf_count": int(row.leaf_count),
+            "schema_version": int(row.schema_version),
+            "salt": row.salt,
+            "anchor_uri": row.anchor_uri,
+            "anchor_tx_hash": row.anchor_tx_hash,
+            "anchor_chain_id": int(row.anchor_chain_id) if row.anchor_chain_id is not None else None,
+            "anchor_contract_address": row.anchor_contract_address,
+            "anchor_block_number": int(row.anchor_block_number) if row.anchor_block_number is not None else None,
+            "anchor_log_index": int(row.anchor_log_index) if row.anchor_log_index is not None else None,
+            "created_at": _dt_to_iso(row.created_at) or utc_now_iso(),
+        }
+
     def get_anchor_batch(self, job_id: str) -> dict | None:
         jid = str(job_id)
         with self._session() as db:
             row = db.execute(select(AnchorBatchDB).where(AnchorBatchDB.job_id == jid)).scalar_one_or_none()
-            if not row:
-                return None
-            return {
-                "id": row.id,
-                "job_id": row.job_id,
-                "schema_version": int(row.schema_version),
-                "salt": row.salt,
-                "anchor_root": row.anchor_root,
-                "anchor_uri": row.anchor_uri,
-                "anchor_tx_hash": row.anchor_tx_hash,
-                "anchor_chain_id": int(row.anchor_chain_id) if row.anchor_chain_id is not None else None,
-                "anchor_contract_address": row.anchor_contract_address,
-                "anchor_block_number": int(row.anchor_block_number) if row.anchor_block_number is not None else None,
-                "anchor_log_index": int(row.anchor_log_index) if row.anchor_log_index is not None else None,
-                "created_at": _dt_to_iso(row.created_at),
-            }
+            return self._anchor_batch_to_dict(row) if row else None
 
     def list_anchor_batches(self, *, limit: int = 50) -> list[dict]:
         with self._session() as db:
             q = select(AnchorBatchDB).order_by(AnchorBatchDB.created_at.desc()).limit(max(1, int(limit)))
             rows = list(db.execute(q).scalars().all())
-        out = []
-        for row in rows:
-            out.append(
-                {
-                    "id": row.id,
-                    "job_id": row.job_id,
-                    "schema_version": int(row.schema_version),
-                    "salt": row.salt,
-                    "anchor_root": row.anchor_root,
-                    "anchor_uri": row.anchor_uri,
-                    "anchor_tx_hash": row.anchor_tx_hash,
-                    "anchor_chain_id": int(row.anchor_chain_id) if row.anchor_chain_id is not None else None,
-                    "anchor_contract_address": row.anchor_contract_address,
-                    "anchor_block_number": int(row.anchor_block_number) if row.anchor_block_number is not None else None,
-                    "anchor_log_index": int(row.anchor_log_index) if row.anchor_log_index is not None else None,
-                    "created_at": _dt_to_iso(row.created_at) or utc_now_iso(),
-                }
-            )
-        return out
+            return [self._anchor_batch_to_dict(r) for r in rows]
 
     def set_anchor_receipt(
         self,
@@ -2508,6 +3899,188 @@ class PostgresStore:
             db.commit()
         return self.get_anchor_batch(jid) or {}
 
+    @staticmethod
+    def _live_job_anchor_tx():
+        # A queued/sent/mined direct broadcast owns the batch; only a failed one leaves it to the rollup.
+        return exists().where(
+            AnchorTxDB.kind == "job",
+            AnchorTxDB.target_id == AnchorBatchDB.job_id,
+            AnchorTxDB.status != "failed",
+        )
+
+    def list_unrolled_anchor_batches(self, *, limit: int = 256) -> list[dict]:
+        with self._session() as db:
+            q = (
+                select(AnchorBatchDB)
+                .where(AnchorBatchDB.rollup_id.is_(None), AnchorBatchDB.anchor_tx_hash.is_(None), ~self._live_job_anchor_tx())
+                .order_by(AnchorBatchDB.created_at.asc())
+                .limit(max(1, int(limit)))
+            )
+            return [self._anchor_batch_to_dict(r) for r in db.execute(q).scalars().all()]
+
+    def create_anchor_rollup(self, *, rollup: dict, members: list[dict]) -> dict | None:
+        """
+        Insert the rollup and attach every member (job_id, rollup_index, rollup_proof) in one transaction.
+        Returns None (and changes nothing) if any member was rolled up, posted or queued for a direct broadcast
+        concurrently.
+        """
+        rid = str(rollup["id"])
+        with self._session() as db:
+            db.add(
+                AnchorRollupDB(
+                    id=rid,
+                    merkle_root=str(rollup["merkle_root"]),
+                    leaf_count=int(rollup["leaf_count"]),
+                    schema_version=int(rollup.get("schema_version") or 1),
+                    salt=str(rollup["salt"]),
+                    anchor_uri=str(rollup["anchor_uri"]),
+                    created_at=_now_utc(),
+                )
+            )
+            db.flush()
+            for m in members:
+                res = db.execute(
+                    update(AnchorBatchDB)
+                    .where(
+                        AnchorBatchDB.job_id == str(m["job_id"]),
+                        AnchorBatchDB.rollup_id.is_(None),
+                        AnchorBatchDB.anchor_tx_hash.is_(None),
+                        ~self._live_job_anchor_tx(),
+                    )
+                    .values(rollup_id=rid, rollup_index=int(m["rollup_index"]), rollup_proof=list(m["rollup_proof"]))
+                )
+                if res.rowcount != 1:
+                    db.rollback()
+                    return None
+            db.commit()
+        return self.get_anchor_rollup(rid)
+
+    def get_anchor_rollup(self, rollup_id: str) -> dict | None:
+        with self._session() as db:
+            row = db.get(AnchorRollupDB, str(rollup_id))
+            return self._anchor_rollup_to_dict(row) if row else None
+
+    def list_anchor_rollups(self, *, limit: int = 50) -> list[dict]:
+        with self._session() as db:
+            q = select(AnchorRollupDB).order_by(AnchorRollupDB.created_at.desc()).limit(max(1, int(limit)))
+            return [self._anchor_rollup_to_dict(r) for r in db.execute(q).scalars().all()]
+
+    def set_anchor_rollup_receipt(
+        self,
+        *,
+        rollup_id: str,
+        anchor_tx_hash: str,
+        anchor_chain_id: int,
+        anchor_contract_address: str,
+        anchor_block_number: int,
+        anchor_log_index: int,
+    ) -> dict:
+        with self._session() as db:
+            row = db.get(AnchorRollupDB, str(rollup_id))
+            if not row:
+                raise KeyError("Anchor rollup not found")
+            row.anchor_tx_hash = str(anchor_tx_hash).lower()
+            row.anchor_chain_id = int(anchor_chain_id)
+            row.anchor_contract_address = _lower_addr(str(anchor_contract_address))
+            row.anchor_block_number = int(anchor_block_number)
+            row.anchor_log_index = int(anchor_log_index)
+            db.commit()
+            db.refresh(row)
+            return self._anchor_rollup_to_dict(row)
+
+    @staticmethod
+    def _anchor_tx_to_dict(row: AnchorTxDB) -> dict:
+        return {
+            "id": row.id,
+            "kind": row.kind,
+            "target_id": row.target_id,
+            "status": row.status,
+            "from_address": row.from_address,
+            "nonce": int(row.nonce) if row.nonce is not None else None,
+            "tx_hash": row.tx_hash,
+            "tx_hashes": list(row.tx_hashes or []),
+            "gas_limit": int(row.gas_limit) if row.gas_limit is not None else None,
+            "max_fee_per_gas": int(row.max_fee_per_gas) if row.max_fee_per_gas is not None else None,
+            "max_priority_fee_per_gas": int(row.max_priority_fee_per_gas) if row.max_priority_fee_per_gas is not None else None,
+            "gas_price": int(row.gas_price) if row.gas_price is not None else None,
+            "attempts": int(row.attempts or 0),
+            "bumps": int(row.bumps or 0),
+            "last_error": row.last_error,
+            "block_number": int(row.block_number) if row.block_number is not None else None,
+            "sent_at": _dt_to_iso(row.sent_at),
+            "mined_at": _dt_to_iso(row.mined_at),
+            "created_at": _dt_to_iso(row.created_at) or utc_now_iso(),
+            "updated_at": _dt_to_iso(row.updated_at) or utc_now_iso(),
+        }
+
+    def enqueue_anchor_tx(self, *, kind: str, target_id: str) -> dict:
+        """Idempotent per (kind, target_id): an active or mined tx is returned as is; a failed one is re-queued."""
+        now = _now_utc()
+        with self._session() as db:
+            stmt = (
+                pg_insert(AnchorTxDB)
+                .values(
+                    id=str(uuid.uuid4()),
+                    kind=str(kind),
+                    target_id=str(target_id),
+                    status="queued",
+                    tx_hashes=[],
+                    attempts=0,
+                    bumps=0,
+                    created_at=now,
+                    updated_at=now,
+                )
+                .on_conflict_do_nothing(constraint="uq_anchor_txs_target")
+            )
+            db.execute(stmt)
+            db.execute(
+                update(AnchorTxDB)
+                .where(AnchorTxDB.kind == str(kind), AnchorTxDB.target_id == str(target_id), AnchorTxDB.status == "failed")
+                .values(status="queued", attempts=0, last_error=None, updated_at=now)
+            )
+            db.commit()
+        return self.get_anchor_tx(kind=kind, target_id=target_id) or {}
+
+    def get_anchor_tx(self, *, kind: str, target_id: str) -> dict | None:
+        with self._session() as db:
+            row = db.execute(
+                select(AnchorTxDB).where(AnchorTxDB.kind == str(kind), AnchorTxDB.target_id == str(target_id))
+            ).scalar_one_or_none()
+            return self._anchor_tx_to_dict(row) if row else None
+
+    def list_anchor_txs(self, *, statuses: list[str], limit: int = 100) -> list[dict]:
+        with self._session() as db:
+            q = (
+                select(AnchorTxDB)
+                .where(AnchorTxDB.status.in_([str(x) for x in statuses]))
+                .order_by(AnchorTxDB.created_at.asc())
+                .limit(max(1, int(limit)))
+            )
+            return [self._anchor_tx_to_dict(r) for r in db.execute(q).scalars().all()]
+
+    def update_anchor_tx(self, *, tx_id: str, fields: dict) -> dict:
+        values = {k: v for k, v in fields.items() if k in _ANCHOR_TX_FIELDS}
+        for k in ("sent_at", "mined_at"):
+            if isinstance(values.get(k), str):
+                values[k] = _parse_iso(values[k])
+        values["updated_at"] = _now_utc()
+        with self._session() as db:
+            row = db.execute(
+                update(AnchorTxDB).where(AnchorTxDB.id == str(tx_id)).values(**values).returning(AnchorTxDB)
+            ).scalar_one_or_none()
+            if row is None:
+                raise KeyError("Anchor tx not found")
+            out = self._anchor_tx_to_dict(row)
+            db.commit()
+        return out
+
+    def max_anchor_tx_nonce(self, *, from_address: str) -> int | None:
+        with self._session() as db:
+            n = db.execute(
+                select(func.max(AnchorTxDB.nonce)).where(AnchorTxDB.from_address == _lower_addr(from_address))
+            ).scalar_one_or_none()
+        return int(n) if n is not None else None
+
     def upsert_profile(
         self, *, address: str, nickname: str | None, avatar_url: str | None, avatar_mode: str, participant_type: str
     ) -> dict:
@@ -2554,16 +4127,34 @@ class PostgresStore:
 
     # ---- Admin ----
     def admin_metrics(self) -> dict:
+        # One round trip (scalar subqueries) instead of one query per counter.
+        # Callers are expected to go through server/stats.py's cached snapshot, not per request.
+        def _count(model, *where):
+            return select(func.count()).select_from(model).where(*where).scalar_subquery()
+
+        stmt = select(
+            _count(AgentReputationDB).label("users_rep"),
+            select(func.count(func.distinct(AuthSessionDB.address))).scalar_subquery().label("users_sessions"),
+            _count(JobDB).label("jobs_total"),
+            _count(JobDB, JobDB.status == "open").label("jobs_open"),
+            _count(SubmissionDB).label("submissions_total"),
+            _count(CommentDB).label("comments_total"),
+            _count(VoteDB).label("votes_total"),
+            _count(FinalVoteDB).label("final_votes_total"),
+            _count(AuthSessionDB).label("active_sessions"),
+        )
         with self._session() as db:
-            users_rep = db.execute(select(func.count()).select_from(AgentReputationDB)).scalar_one()
-            users_sessions = db.execute(select(func.count(func.distinct(AuthSessionDB.address)))).scalar_one()
-            jobs_total = db.execute(select(func.count()).select_from(JobDB)).scalar_one()
-            jobs_open = db.execute(select(func.count()).select_from(JobDB).where(JobDB.status == "open")).scalar_one()
-            submissions_total = db.execute(select(func.count()).select_from(SubmissionDB)).scalar_one()
-            comments_total = db.execute(select(func.count()).select_from(CommentDB)).scalar_one()
-            votes_total = db.execute(select(func.count()).select_from(VoteDB)).scalar_one()
-            final_votes_total = db.execute(select(func.count()).select_from(FinalVoteDB)).scalar_one()
-            active_sessions = db.execute(select(func.count()).select_from(AuthSessionDB)).scalar_one()
+            (
+                users_rep,
+                users_sessions,
+                jobs_total,
+                jobs_open,
+                submissions_total,
+                comments_total,
+                votes_total,
+                final_votes_total,
+                active_sessions,
+            ) = db.execute(stmt).one()
 
         return {
             "users": int(max(int(users_rep or 0), int(users_sessions or 0))),
@@ -2585,9 +4176,13 @@ class PostgresStore:
 
 def get_store() -> Store:
     # Default: if DATABASE_URL is set, use Postgres; otherwise fall back to in-memory.
-    if settings.DATABASE_URL:
-        return PostgresStore()
-    return InMemoryStore()
+    inner: Store = PostgresStore() if settings.DATABASE_URL else InMemoryStore()
+    if settings.METRICS_ENABLED:
+        # Per-method call counts/latency for /metrics.
+        from server.metrics import InstrumentedStore
+
+        return InstrumentedStore(inner)  # type: ignore[return-value]
+    return inner
 
 
 store: Store = get_store()